@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Load test of the API component over localhost: keep-alive client connections sending requests
+(optionally pipelined) to a static and a streaming route, reporting requests per second and
+client-side p50/p99 latency.
+
+Usage:
+------
+    python benchmarks/api_bench.py [--connections N] [--requests N] [--pipeline N]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from jorkieserver.api import ApiComponent, Response
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Configuration
+
+
+def percentile(latencies: list[float], fraction: float) -> float:
+    return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+
+async def read_response(reader: asyncio.StreamReader) -> None:
+    head = await reader.readuntil(b"\r\n\r\n")
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            await reader.readexactly(int(line.split(b":")[1]))
+            return
+    while (size := int(await reader.readline(), 16)) != 0:
+        await reader.readexactly(size + 2)
+    await reader.readline()
+
+
+async def client(
+    address: tuple[str, int], request: bytes, count: int, pipeline: int
+) -> list[float]:
+    """Sends `count` requests on one keep-alive connection, `pipeline` at a time.
+
+    Returns:
+    --------
+        list[float]: The latency of every request in seconds.
+    """
+    reader, writer = await asyncio.open_connection(*address)
+    latencies = []
+    for _ in range(0, count, pipeline):
+        started = time.perf_counter()
+        writer.write(request * pipeline)
+        for _ in range(pipeline):
+            await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+    writer.close()
+    return latencies
+
+
+async def load(
+    address: tuple[str, int],
+    request: bytes,
+    connections: int,
+    requests: int,
+    pipeline: int,
+) -> tuple[float, list[float]]:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            client(address, request, requests // connections, pipeline)
+            for _ in range(connections)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    return elapsed, sorted(latency for result in results for latency in result)
+
+
+async def stream(request) -> Response:
+    async def chunks():
+        for _ in range(4):
+            yield b"x" * 1024
+
+    return Response(chunks())
+
+
+def serve(work_dir: str, connections: int, addresses, stopping) -> None:
+    """Runs the API component in its own process, so the load generator doesn't share its GIL."""
+    log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+    api = ApiComponent(
+        Configuration(
+            api_host="127.0.0.1", api_port=0, api_client_concurrency=connections
+        ),
+        log_writer,
+    )
+    api.route("GET", "/stream")(stream)
+    api.start()
+    addresses.put(api.address)
+    stopping.wait()
+    api.stop()
+    log_writer.close()
+
+
+def run(connections: int, requests: int, pipeline: int) -> dict[str, dict[str, float]]:
+    """Runs the load test against every benchmarked route.
+
+    Returns:
+    --------
+        dict[str, dict[str, float]]: Requests per second, p50 and p99 latency in milliseconds, by route.
+    """
+    routes = {
+        "GET /health": b"GET /api/v1/health HTTP/1.1\r\nHost: bench\r\n\r\n",
+        "GET /stream (4 KiB)": b"GET /api/v1/stream HTTP/1.1\r\nHost: bench\r\n\r\n",
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        addresses = multiprocessing.Queue()
+        stopping = multiprocessing.Event()
+        server = multiprocessing.Process(
+            target=serve, args=(work_dir, connections, addresses, stopping)
+        )
+        server.start()
+        try:
+            address = addresses.get(timeout=30)
+            for name, request in routes.items():
+                elapsed, latencies = asyncio.run(
+                    load(address, request, connections, requests, pipeline)
+                )
+                results[name] = {
+                    "rps": len(latencies) / elapsed,
+                    "p50": percentile(latencies, 0.5) * 1000,
+                    "p99": percentile(latencies, 0.99) * 1000,
+                }
+        finally:
+            stopping.set()
+            server.join()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--pipeline", type=int, default=1)
+    args = parser.parse_args()
+
+    results = run(args.connections, args.requests, args.pipeline)
+    print(f"{'route':>22}  {'req/s':>10}  {'p50 ms':>8}  {'p99 ms':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:>22}  {result['rps']:10.0f}  {result['p50']:8.3f}  {result['p99']:8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
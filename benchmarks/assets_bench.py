@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the memory held by a working set of N distinct assets (subdomains and IPv4
+addresses, with a source, first and last seen times), as an `AssetStore` and as the naive
+representation it replaces: a dictionary per asset, indexed by `(kind, value)`. Also times adding
+and finding assets in both.
+
+The naive representation takes several GiB at 10M assets, above `--naive-limit` it is measured
+at the limit and extrapolated linearly.
+
+Usage:
+------
+    python benchmarks/assets_bench.py [--assets N] [--naive-limit N]
+"""
+
+import argparse
+import contextlib
+import gc
+import os
+import time
+import tracemalloc
+
+from jorkieserver.assets import AssetStore
+
+SOURCES = ("subfinder", "amass", "dnsx", "naabu", "httpx")
+
+
+def generate_assets(count: int):
+    """Yields `(kind, value, source)` assets, a third of them IPv4 addresses."""
+    for i in range(count):
+        if i % 3 == 0:
+            yield "ip", f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", SOURCES[i % 5]
+        else:
+            yield "subdomain", f"host-{i}.target-{i % 1000}.example.com", SOURCES[i % 5]
+
+
+def build_naive(count: int) -> dict:
+    assets = {}
+    for i, (kind, value, source) in enumerate(generate_assets(count)):
+        assets[(kind, value)] = {
+            "kind": kind,
+            "value": value,
+            "source": source,
+            "first_seen": float(i),
+            "last_seen": float(i),
+        }
+    return assets
+
+
+def build_store(count: int) -> AssetStore:
+    store = AssetStore()
+    for i, (kind, value, source) in enumerate(generate_assets(count)):
+        store.add(kind, value, source, float(i))
+    return store
+
+
+def measure(build, count: int):
+    """Returns what `build(count)` returns, and the bytes it holds allocated."""
+    gc.collect()
+    tracemalloc.start()
+    built = build(count)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, allocated
+
+
+def run(assets: int, naive_limit: int) -> dict[str, tuple[float, str]]:
+    """Builds a working set of `assets` assets both ways, and times lookups in each.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    results = {}
+    naive_count = min(assets, naive_limit)
+    naive, naive_bytes = measure(build_naive, naive_count)
+    results["naive"] = (naive_bytes / 2**20 * assets / naive_count, "MiB")
+    results["naive per asset"] = (naive_bytes / naive_count, "bytes")
+    probes = [
+        (kind, value) for kind, value, _ in generate_assets(min(naive_count, 100_000))
+    ]
+    started = time.perf_counter()
+    for key in probes:
+        naive[key]
+    results["naive find"] = (len(probes) / (time.perf_counter() - started), "assets/s")
+    del naive
+    gc.collect()
+    # tracemalloc slows down allocations, the rates are timed in a second build without it.
+    started = time.perf_counter()
+    naive = build_naive(naive_count)
+    results["naive add"] = (naive_count / (time.perf_counter() - started), "assets/s")
+    del naive
+    gc.collect()
+
+    store, store_bytes = measure(build_store, assets)
+    results["store"] = (store_bytes / 2**20, "MiB")
+    results["store per asset"] = (store_bytes / assets, "bytes")
+    results["reduction"] = (results["naive"][0] / results["store"][0], "x")
+    del store
+    gc.collect()
+    started = time.perf_counter()
+    store = build_store(assets)
+    results["store add"] = (assets / (time.perf_counter() - started), "assets/s")
+    started = time.perf_counter()
+    for kind, value in probes:
+        store.find(kind, value)
+    results["store find"] = (len(probes) / (time.perf_counter() - started), "assets/s")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--assets", type=int, default=1_000_000)
+    parser.add_argument("--naive-limit", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.assets, args.naive_limit)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark of configuration loading: cold load (parse, validate and build the snapshot),
+warm lookup through `get_configuration()` (stat + cache hit) and the `configuration` property.
+
+Usage:
+------
+    python benchmarks/configurator_bench.py [--iterations N]
+"""
+
+import argparse
+import contextlib
+import os
+import tempfile
+import timeit
+
+import yaml
+
+from jorkieserver.configurator import Configurator, default_config_document
+from jorkieserver.logging import LogWriter
+
+
+def bench(statement, iterations: int) -> float:
+    """Returns the best per-call cost of `statement` in microseconds."""
+    timer = timeit.Timer(statement)
+    return min(timer.repeat(repeat=3, number=iterations)) / iterations * 1e6
+
+
+def run(iterations: int) -> dict[str, float]:
+    """Measures every configuration access path.
+
+    Returns:
+    --------
+        dict[str, float]: Per-call cost in microseconds, by access path.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        config_file_path = os.path.join(work_dir, "config.yaml")
+        with open(config_file_path, "w") as config_file:
+            yaml.safe_dump(default_config_document(), config_file, sort_keys=False)
+        # A freshly written file is "racily clean" and would be re-hashed on every lookup.
+        os.utime(config_file_path, (0, 0))
+        configurator = Configurator(log_writer, config_file_path)
+
+        def cold_load():
+            Configurator.clear_cache()
+            configurator.get_configuration(config_file_path)
+
+        results = {"cold load": bench(cold_load, max(1, iterations // 100))}
+        configurator.get_configuration(config_file_path)
+        results["warm get_configuration()"] = bench(
+            lambda: configurator.get_configuration(config_file_path), iterations
+        )
+        results["configuration property"] = bench(
+            lambda: configurator.configuration, iterations
+        )
+        log_writer.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100000)
+    iterations = parser.parse_args().iterations
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(iterations)
+
+    for name, microseconds in results.items():
+        print(f"{name:>26}: {microseconds:10.3f} us")
+
+
+if __name__ == "__main__":
+    main()
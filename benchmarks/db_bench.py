@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the SQLite storage engine: inserting N new assets, re-inserting them (every row is
+a duplicate, rejected by one index probe), upserting them, and random point lookups.
+
+Usage:
+------
+    python benchmarks/db_bench.py [--assets N] [--batch-size N] [--lookups N]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+
+from jorkieserver.db import Database
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Configuration
+
+
+def asset(i: int) -> tuple[str, str]:
+    """Returns the i-th synthetic asset, a mix of domains, IPs and ASNs."""
+    kind = i % 3
+    if kind == 0:
+        return "domain", f"host-{i}.example.com"
+    if kind == 1:
+        return "ip", f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+    return "asn", f"AS{i}"
+
+
+def batches(assets: int, batch_size: int):
+    for start in range(0, assets, batch_size):
+        yield [asset(i) for i in range(start, min(assets, start + batch_size))]
+
+
+def run(assets: int, batch_size: int, lookups: int) -> dict[str, tuple[float, str]]:
+    """Runs every phase once against a fresh database.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by phase.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        db = Database(
+            Configuration(db_path=os.path.join(work_dir, "jorkie.db")), log_writer
+        )
+        db.start()
+
+        for name, write in (
+            ("insert new", db.insert_assets),
+            ("insert duplicates", db.insert_assets),
+            ("upsert known", db.upsert_assets),
+        ):
+            started = time.perf_counter()
+            for batch in batches(assets, batch_size):
+                write("bench", batch, time.time())
+            results[name] = (assets / (time.perf_counter() - started), "assets/s")
+
+        sample = [asset(random.randrange(assets)) for _ in range(lookups)]
+        started = time.perf_counter()
+        for kind, value in sample:
+            db.lookup_asset("bench", kind, value)
+        results["lookup (hit)"] = (
+            (time.perf_counter() - started) / lookups * 1e6,
+            "us",
+        )
+        started = time.perf_counter()
+        for i in range(lookups):
+            db.lookup_asset("bench", "domain", f"missing-{i}.example.com")
+        results["lookup (miss)"] = (
+            (time.perf_counter() - started) / lookups * 1e6,
+            "us",
+        )
+
+        db.stop()
+        results["database size"] = (
+            os.path.getsize(db.path) / (1024 * 1024),
+            "MiB",
+        )
+        log_writer.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--assets", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.assets, args.batch_size, args.lookups)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
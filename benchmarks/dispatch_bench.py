@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the agent dispatcher under contention: projects with different weights and backlogs
+share the run slots, running stand-in agent processes. Reports the share of the runs each project
+got while every project still had queued jobs, and the queue wait of its jobs.
+
+Usage:
+------
+    python benchmarks/dispatch_bench.py [--concurrency N] [--jobs N] [--work SECONDS]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+
+from jorkieserver.dispatch import Dispatcher, Job, run_command
+from jorkieserver.logging import LogWriter
+
+# (project, weight, share of the jobs)
+PROJECTS = (("huge-scope", 1, 0.7), ("weighted", 2, 0.2), ("small", 1, 0.1))
+
+
+def run(concurrency: int, jobs: int, work: float) -> dict[str, tuple[float, str]]:
+    """Dispatches every job once, with stand-in agents working `work` seconds.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    command = [sys.executable, "-c", f"import time; time.sleep({work})"]
+    started = []
+
+    async def runner(job: Job) -> int:
+        started.append(job)
+        return await run_command(job)
+
+    async def dispatch_all() -> float:
+        dispatcher = Dispatcher(concurrency, 1e6, 1e6, log_writer, runner)
+        for project, weight, _ in PROJECTS:
+            dispatcher.set_weight(project, weight)
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        for project, _, share in PROJECTS:
+            for _ in range(int(jobs * share)):
+                dispatcher.submit(Job(project, "stand-in", command=command))
+        await dispatcher.join()
+        return loop.time() - begin
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        elapsed = asyncio.run(dispatch_all())
+        log_writer.close()
+
+    results = {"throughput": (len(started) / elapsed, "jobs/s")}
+    # The contended window ends when the first project runs out of queued jobs.
+    contended = min(
+        max(i for i, job in enumerate(started) if job.project == project)
+        for project, _, _ in PROJECTS
+    )
+    for project, weight, _ in PROJECTS:
+        waits = [job.wait for job in started if job.project == project]
+        runs = sum(1 for job in started[:contended] if job.project == project)
+        results[f"{project} share"] = (runs / contended * 100, f"% (weight {weight})")
+        results[f"{project} mean wait"] = (statistics.fmean(waits) * 1000, "ms")
+        results[f"{project} p99 wait"] = (
+            statistics.quantiles(waits, n=100)[98] * 1000,
+            "ms",
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--jobs", type=int, default=400)
+    parser.add_argument("--work", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.concurrency, args.jobs, args.work)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>22}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
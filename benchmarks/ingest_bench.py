@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark of bulk result ingestion over localhost: streams N generated NDJSON records
+(optionally gzip-compressed) to `POST /projects/{project_id}/results` with chunked transfer
+encoding, and reports records per second and the server's memory high-water mark.
+
+Usage:
+------
+    python benchmarks/ingest_bench.py [--records N] [--encoding identity|gzip] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import zlib
+
+from jorkieserver.api import ApiComponent
+from jorkieserver.db import Database
+from jorkieserver.ingest import register_routes
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Components, Configuration
+
+CHUNK_RECORDS = 1000
+
+
+def max_rss_mib() -> float:
+    """Returns the memory high-water mark of this process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def serve(work_dir: str, batch_size: int, messages, stopping) -> None:
+    """Runs the API and database components in their own process, and reports their memory use."""
+    configuration = Configuration(
+        api_host="127.0.0.1",
+        api_port=0,
+        db_path=os.path.join(work_dir, "jorkie.db"),
+        ingest_batch_size=batch_size,
+    )
+    log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+    components = Components()
+    components.api = ApiComponent(configuration, log_writer)
+    components.db = Database(configuration, log_writer)
+    components.services.append(register_routes(components, configuration, log_writer))
+    components.start()
+    messages.put((components.api.address, max_rss_mib()))
+    stopping.wait()
+    messages.put(max_rss_mib())
+    components.stop()
+    log_writer.close()
+
+
+def generate_chunks(records: int, encoding: str):
+    """Yields the request body in chunks, generated (and compressed) on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if encoding == "gzip" else None
+    for start in range(0, records, CHUNK_RECORDS):
+        chunk = "".join(
+            json.dumps(
+                {
+                    "type": "subdomain",
+                    "value": f"host-{i}.example.com",
+                    "scan_id": "bench",
+                    "source": "bruteforce",
+                    "addresses": [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"],
+                }
+            )
+            + "\n"
+            for i in range(start, min(records, start + CHUNK_RECORDS))
+        ).encode()
+        yield chunk if compressor is None else compressor.compress(chunk)
+    if compressor is not None:
+        yield compressor.flush()
+
+
+async def upload(address: tuple[str, int], records: int, encoding: str) -> dict:
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(
+        b"POST /api/v1/projects/bench/results HTTP/1.1\r\nHost: bench\r\n"
+        b"Transfer-Encoding: chunked\r\nContent-Encoding: %b\r\n"
+        b"Connection: close\r\n\r\n" % encoding.encode()
+    )
+    for chunk in generate_chunks(records, encoding):
+        if chunk:
+            writer.write(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+            await writer.drain()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.partition(b"\r\n\r\n")[2])
+
+
+def run(records: int, encoding: str, batch_size: int) -> dict[str, float]:
+    """Ingests `records` records once.
+
+    Returns:
+    --------
+        dict[str, float]: Records per second, elapsed seconds and server memory in MiB.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        messages = multiprocessing.Queue()
+        stopping = multiprocessing.Event()
+        server = multiprocessing.Process(
+            target=serve, args=(work_dir, batch_size, messages, stopping)
+        )
+        server.start()
+        try:
+            address, idle_rss = messages.get(timeout=30)
+            started = time.perf_counter()
+            report = asyncio.run(upload(address, records, encoding))
+            elapsed = time.perf_counter() - started
+        finally:
+            stopping.set()
+        peak_rss = messages.get(timeout=30)
+        server.join()
+    return {
+        "records accepted": report["accepted"],
+        "elapsed (s)": elapsed,
+        "records/s": report["accepted"] / elapsed,
+        "server RSS idle (MiB)": idle_rss,
+        "server RSS peak (MiB)": peak_rss,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--encoding", choices=("identity", "gzip"), default="gzip")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    results = run(args.records, args.encoding, args.batch_size)
+    for name, value in results.items():
+        print(f"{name:>22}: {value:14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark comparing the per-call cost of the eager `LogWriter` calls
+(caller builds an f-string, the prefix is concatenated on every call) with the
+lazy template and pre-bound `ComponentLogger` calls, at each log level (0-3).
+
+Usage:
+------
+    python benchmarks/logging_bench.py [--iterations N]
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import timeit
+
+from jorkieserver.logging import LogWriter
+
+COMPONENT = "BENCHMARK"
+
+
+def legacy_debug(log_writer: LogWriter, message: str, component: str) -> None:
+    # The pre-template `LogWriter.debug()` body.
+    if log_writer.level == 0:
+        message = f"DEBUG: [COMPONENT: {component}] {message}"
+        log_writer.logger.debug(message)
+        print(message, file=sys.stdout)
+
+
+def legacy_info(log_writer: LogWriter, message: str, component: str) -> None:
+    # The pre-template `LogWriter.info()` body.
+    if log_writer.level <= 1:
+        message = f"INFO: [COMPONENT: {component}] {message}"
+        log_writer.logger.info(message)
+        print(message, file=sys.stdout)
+
+
+def legacy_error(log_writer: LogWriter, message: str, component: str) -> None:
+    # The pre-template `LogWriter.error()` body.
+    if log_writer.level <= 2:
+        message = f"ERROR: [COMPONENT: {component}] {message}"
+        log_writer.logger.error(message)
+        print(message, file=sys.stderr)
+
+
+def bench(statement, iterations: int) -> float:
+    """Returns the best per-call cost of `statement` in nanoseconds."""
+    timer = timeit.Timer(statement)
+    return min(timer.repeat(repeat=3, number=iterations)) / iterations * 1e9
+
+
+def run(iterations: int) -> list[tuple[int, str, float, float, float]]:
+    """Measures every method at every log level.
+
+    Returns:
+    --------
+        list: `(level, method, eager_ns, template_ns, bound_ns)` rows.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as log_dir:
+        log_writer = LogWriter(0, os.path.join(log_dir, "bench.log"), log_dir)
+        component_logger = log_writer.component(COMPONENT)
+        legacy = {"debug": legacy_debug, "info": legacy_info, "error": legacy_error}
+        agent_id, line = 42, "sub.example.com A 203.0.113.7"
+
+        for level in range(4):
+            log_writer.level = level
+            logging.getLogger().setLevel(logging.DEBUG)
+            for method, legacy_call in legacy.items():
+                writer_call = getattr(log_writer, method)
+                bound_call = getattr(component_logger, method)
+                eager = bench(
+                    lambda: legacy_call(
+                        log_writer, f"agent {agent_id} result: {line}", COMPONENT
+                    ),
+                    iterations,
+                )
+                template = bench(
+                    lambda: writer_call(
+                        "agent %d result: %s", COMPONENT, agent_id, line
+                    ),
+                    iterations,
+                )
+                bound = bench(
+                    lambda: bound_call("agent %d result: %s", agent_id, line),
+                    iterations,
+                )
+                results.append((level, method, eager, template, bound))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    iterations = parser.parse_args().iterations
+
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            results = run(iterations)
+
+    print(
+        f"{'level':>5} {'method':>6} {'eager ns':>10} {'template ns':>12} {'bound ns':>10}"
+    )
+    for level, method, eager, template, bound in results:
+        print(f"{level:>5} {method:>6} {eager:>10.1f} {template:>12.1f} {bound:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
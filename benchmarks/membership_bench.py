@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the per-project asset membership: classifying N new assets, classifying them again
+(every one is known), and the memory used per million assets: the memory growth while classifying
+(pending hashes and the scan diff), and the Bloom filter and sorted set files once flushed.
+
+Usage:
+------
+    python benchmarks/membership_bench.py [--assets N]
+"""
+
+import argparse
+import contextlib
+import os
+import resource
+import tempfile
+import time
+
+from jorkieserver.db import asset_hash
+from jorkieserver.logging import LogWriter
+from jorkieserver.membership import MembershipStore
+
+
+def rows(start: int, stop: int) -> list[tuple]:
+    """Returns ingested rows of synthetic domain assets."""
+    return [
+        ("bench", "scan", "domain", f"host-{i}.example.com", None, 0.0)
+        for i in range(start, stop)
+    ]
+
+
+def rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(assets: int, batch_size: int = 5000) -> dict[str, tuple[float, str]]:
+    """Runs every phase once against a fresh membership directory.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by phase.
+    """
+    results = {}
+    millions = assets / 1_000_000
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        store = MembershipStore(os.path.join(work_dir, "membership"), log_writer)
+        rss_before = rss_mib()
+
+        for name in ("classify new", "classify known"):
+            elapsed = 0.0
+            # Batches are built one at a time and dropped once observed, as ingestion does.
+            for start in range(0, assets, batch_size):
+                batch = rows(start, min(assets, start + batch_size))
+                started = time.perf_counter()
+                store.observe(batch)
+                elapsed += time.perf_counter() - started
+            results[name] = (assets / elapsed, "assets/s")
+
+        started = time.perf_counter()
+        diff = store.finish_scan("bench", "scan")
+        results["flush"] = (time.perf_counter() - started, "s")
+        assert len(diff) == assets
+
+        project = store.project("bench")
+        hashes = [
+            asset_hash("domain", f"host-{i}.example.com") for i in range(0, assets, 7)
+        ]
+        started = time.perf_counter()
+        for hash_ in hashes:
+            hash_ in project
+        results["lookup (on disk)"] = (
+            (time.perf_counter() - started) / len(hashes) * 1e6,
+            "us",
+        )
+
+        results["peak RSS growth"] = ((rss_mib() - rss_before) / millions, "MiB/M")
+        for suffix in ("bloom", "set"):
+            path = os.path.join(work_dir, "membership", f"bench.{suffix}")
+            results[f"{suffix} file"] = (
+                os.path.getsize(path) / (1024 * 1024) / millions,
+                "MiB/M",
+            )
+        store.stop()
+        log_writer.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--assets", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.assets)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark of configuration migrations on large synthetic configs: shortest-path search over a
+long version chain, memoized path lookup, applying the chain, and a full cold migrate through
+the `Configurator` (parse, migrate, validate and atomic rewrite).
+
+Usage:
+------
+    python benchmarks/migrations_bench.py [--iterations N] [--versions N] [--projects N]
+"""
+
+import argparse
+import contextlib
+import os
+import tempfile
+import timeit
+
+import yaml
+
+from jorkieserver import configurator as configurator_module
+from jorkieserver.configurator import Configurator, default_config_document
+from jorkieserver.constants import LATEST_CONFIG_VERSION
+from jorkieserver.logging import LogWriter
+from jorkieserver.migrations import MigrationRegistry
+
+
+def bench(statement, iterations: int) -> float:
+    """Returns the best per-call cost of `statement` in microseconds."""
+    timer = timeit.Timer(statement)
+    return min(timer.repeat(repeat=3, number=iterations)) / iterations * 1e6
+
+
+def build_registry(versions: int) -> MigrationRegistry:
+    """Returns a registry chaining `versions` synthetic versions to `LATEST_CONFIG_VERSION`,
+    with a shortcut every 10 versions so the search has to pick the shortest path."""
+    registry = MigrationRegistry()
+    names = [f"0.0.{i}" for i in range(versions)] + [LATEST_CONFIG_VERSION]
+
+    def rename(step: int):
+        def transform(document: dict) -> None:
+            for project in document.get("projects", {}).values():
+                project[f"setting_{step}"] = project.pop(f"setting_{step - 1}", step)
+
+        return transform
+
+    for step, (source, target) in enumerate(zip(names, names[1:]), start=1):
+        registry.register(source, target)(rename(step))
+        if step % 10 == 0 and step + 9 < len(names):
+            registry.register(source, names[step + 9])(rename(step + 9))
+    return registry
+
+
+def build_document(projects: int) -> dict:
+    """Returns a config in the oldest synthetic version with `projects` project sections."""
+    document = default_config_document()
+    document["version"] = "0.0.0"
+    document["projects"] = {
+        f"project-{i}": {
+            "setting_0": i,
+            "scope": [f"10.{i % 256}.{j}.0/24" for j in range(8)],
+        }
+        for i in range(projects)
+    }
+    return document
+
+
+def run(iterations: int, versions: int, projects: int) -> dict[str, float]:
+    """Measures every migration step.
+
+    Returns:
+    --------
+        dict[str, float]: Per-call cost in microseconds, by step.
+    """
+    registry = build_registry(versions)
+    document = build_document(projects)
+    contents = yaml.safe_dump(document, sort_keys=False)
+
+    def search():
+        registry.register("unused", "unused")(lambda document: None)
+        registry.path("0.0.0", LATEST_CONFIG_VERSION)
+
+    results = {"path search": bench(search, max(1, iterations // 100))}
+    path = registry.path("0.0.0", LATEST_CONFIG_VERSION)
+    results["memoized path lookup"] = bench(
+        lambda: registry.path("0.0.0", LATEST_CONFIG_VERSION), iterations
+    )
+    results["apply chain"] = bench(
+        lambda: registry.apply(document, path), max(1, iterations // 1000)
+    )
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        config_file_path = os.path.join(work_dir, "config.yaml")
+        configurator = Configurator(log_writer, config_file_path)
+        configurator_module.MIGRATIONS = registry
+
+        def cold_migrate():
+            with open(config_file_path, "w") as config_file:
+                config_file.write(contents)
+            Configurator.clear_cache()
+            configurator.get_configuration(config_file_path)
+
+        results["cold migrate + rewrite"] = bench(
+            cold_migrate, max(1, iterations // 1000)
+        )
+        log_writer.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--versions", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=1000)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.iterations, args.versions, args.projects)
+
+    for name, microseconds in results.items():
+        print(f"{name:>26}: {microseconds:14.3f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark of job output streaming: a producer writes into a pipe read by an output buffer, fanned
+out to fast subscribers and to one subscriber that stalls on every chunk, with the output spilled
+to disk. Reports the producer's throughput with and without subscribers, and what they received.
+
+Usage:
+------
+    python benchmarks/output_bench.py [--megabytes N] [--subscribers N] [--stall SECONDS]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+from jorkieserver.output import OutputBuffer
+
+LINE = b"x" * 99 + b"\n"
+
+
+def run(megabytes: int, subscribers: int, stall: float) -> dict[str, tuple[float, str]]:
+    """Streams `megabytes` of output once without and once with subscribers.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    size = megabytes * 1024 * 1024
+    results = {}
+
+    def produce(write_fd: int) -> None:
+        block = LINE * 655  # About 64 KiB
+        left = size
+        while left > 0:
+            left -= os.write(write_fd, block[:left])
+        os.close(write_fd)
+
+    async def stream(spill_path: str, fast: int, slow: bool) -> float:
+        buffer = OutputBuffer(spill_path=spill_path)
+        received = [0] * fast
+
+        async def subscriber(index: int) -> None:
+            async for _, chunk in buffer.subscribe():
+                received[index] += len(chunk)
+
+        async def stalled() -> None:
+            received_slow = 0
+            async for _, chunk in buffer.subscribe():
+                received_slow += len(chunk)
+                await asyncio.sleep(stall)
+            results["slow received"] = (received_slow / size * 100, "%")
+
+        tasks = [asyncio.create_task(subscriber(i)) for i in range(fast)]
+        if slow:
+            tasks.append(asyncio.create_task(stalled()))
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        buffer.attach(read_fd)
+        producer = threading.Thread(target=produce, args=(write_fd,))
+        started = time.perf_counter()
+        producer.start()
+        await buffer.wait_eof(600)
+        elapsed = time.perf_counter() - started
+        producer.join()
+        await buffer.detach(read_fd)
+        os.close(read_fd)
+        await buffer.close()
+        await asyncio.gather(*tasks)
+        if fast:
+            results["fast complete"] = (
+                sum(count == size for count in received) / fast * 100,
+                "%",
+            )
+        return elapsed
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        elapsed = asyncio.run(stream(os.path.join(work_dir, "alone.log"), 0, False))
+        results["no subscribers"] = (megabytes / elapsed, "MiB/s")
+        elapsed = asyncio.run(
+            stream(os.path.join(work_dir, "fanout.log"), subscribers, True)
+        )
+        results[f"{subscribers} + 1 slow"] = (megabytes / elapsed, "MiB/s")
+        spilled = os.path.getsize(os.path.join(work_dir, "fanout.log"))
+        results["spilled"] = (spilled / size * 100, "%")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megabytes", type=int, default=256)
+    parser.add_argument("--subscribers", type=int, default=8)
+    parser.add_argument("--stall", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.megabytes, args.subscribers, args.stall)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
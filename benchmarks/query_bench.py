@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the query API over a scan of N results: the latency of a results page at increasing
+depths, read with a cursor (keyset pagination) next to the same page read with OFFSET (timed on
+the database alone, without the HTTP round trip of the cursor reads), the latency
+of a cached page and of the project summary with and without the cache, and the rate of an NDJSON
+export of the whole scan.
+
+Usage:
+------
+    python benchmarks/query_bench.py [--results N] [--limit N] [--requests N]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import statistics
+import tempfile
+import time
+
+from jorkieserver.api import ApiComponent
+from jorkieserver.db import Database, connect
+from jorkieserver.ingest import register_routes as register_ingest
+from jorkieserver.logging import LogWriter
+from jorkieserver.query import register_routes as register_query
+from jorkieserver.types import Components, Configuration
+
+DEPTHS = (0.0, 0.5, 0.99)
+SELECT_OFFSET = (
+    "SELECT r.id, r.scan_id, a.kind, a.value, r.data, r.received_at FROM results r "
+    "JOIN assets a ON a.project_id = r.project_id AND a.hash = r.asset_hash "
+    "WHERE r.project_id = ? AND r.scan_id = ? ORDER BY r.id LIMIT ? OFFSET ?"
+)
+
+
+class Client:
+    """Minimal keep-alive HTTP client, reading responses with a Content-Length."""
+
+    def __init__(self, address: tuple[str, int]) -> None:
+        self.socket = socket.create_connection(address)
+        self.file = self.socket.makefile("rb")
+
+    def get(self, path: str, headers: str = "") -> bytes:
+        self.socket.sendall(f"GET {path} HTTP/1.1\r\n{headers}\r\n".encode())
+        length = 0
+        while (line := self.file.readline()) != b"\r\n":
+            if not line:
+                raise ConnectionError("The server closed the connection")
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        return self.file.read(length)
+
+    def stream(self, path: str) -> int:
+        """Reads a chunked response to the end, returns the number of lines."""
+        self.socket.sendall(
+            f"GET {path} HTTP/1.1\r\nAccept: application/x-ndjson\r\n\r\n".encode()
+        )
+        while self.file.readline() != b"\r\n":
+            pass
+        lines = 0
+        while size := int(self.file.readline(), 16):
+            lines += self.file.read(size).count(b"\n")
+            self.file.readline()
+        self.file.readline()
+        return lines
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+
+def milliseconds(function, requests: int) -> float:
+    """Returns the median duration of `requests` calls of `function(i)`, in milliseconds."""
+    durations = []
+    for i in range(requests):
+        started = time.perf_counter()
+        function(i)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+def load(db: Database, results: int, batch_size: int = 10_000) -> None:
+    for start in range(0, results, batch_size):
+        db.insert_results(
+            [
+                (
+                    "bench",
+                    "scan-1",
+                    "subdomain",
+                    f"host-{i}.example.com",
+                    json.dumps({"port": 443, "status": 200}),
+                    float(i),
+                )
+                for i in range(start, min(results, start + batch_size))
+            ]
+        )
+
+
+def run(results: int, limit: int, requests: int) -> dict[str, tuple[float, str]]:
+    """Loads a scan of `results` results, and reads pages of `limit` results from it.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    measures = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        configuration = Configuration(
+            api_host="127.0.0.1",
+            api_port=0,
+            db_path=os.path.join(work_dir, "jorkie.db"),
+        )
+        components = Components()
+        components.api = ApiComponent(configuration, log_writer)
+        components.db = Database(configuration, log_writer)
+        for register in (register_ingest, register_query):
+            components.services.append(register(components, configuration, log_writer))
+        components.start()
+        load(components.db, results)
+        query = components.services[1]
+        client = None
+        connection = connect(configuration.db_path)
+        path = "/api/v1/projects/bench/scans/scan-1/results"
+        try:
+            for depth in DEPTHS:
+                # Result ids are 1 to N, the cursor of a depth is the id before it. A different
+                # page every time, so that none is served from the cache.
+                cursor = int(depth * (results - limit - requests))
+                # The server closes connections idle for longer than the API timeout, as this
+                # one is while the OFFSET reads run.
+                if client is not None:
+                    client.close()
+                client = Client(components.api.address)
+                measures[f"cursor @ {depth:.0%}"] = (
+                    milliseconds(
+                        lambda i: client.get(
+                            f"{path}?limit={limit}&cursor={cursor + i}"
+                        ),
+                        requests,
+                    ),
+                    "ms",
+                )
+                measures[f"offset @ {depth:.0%}"] = (
+                    milliseconds(
+                        lambda i: connection.execute(
+                            SELECT_OFFSET, (1, "scan-1", limit, cursor + i)
+                        ).fetchall(),
+                        requests,
+                    ),
+                    "ms",
+                )
+            client.close()
+            client = Client(components.api.address)
+            cached = f"{path}?limit={limit}&cursor={results // 2}"
+            client.get(cached)
+            measures["cached page"] = (
+                milliseconds(lambda i: client.get(cached), requests),
+                "ms",
+            )
+            summary = "/api/v1/projects/bench/summary"
+            measures["summary"] = (
+                milliseconds(
+                    lambda i: (
+                        query.cache.invalidate([("bench",)]),
+                        client.get(summary),
+                    ),
+                    max(1, requests // 10),
+                ),
+                "ms",
+            )
+            measures["summary (cached)"] = (
+                milliseconds(lambda i: client.get(summary), requests),
+                "ms",
+            )
+            started = time.perf_counter()
+            lines = client.stream(f"{path}?fields=id,value")
+            if lines != results:
+                raise RuntimeError(f"Streamed {lines} of {results} results")
+            measures["ndjson export"] = (
+                results / (time.perf_counter() - started),
+                "results/s",
+            )
+        finally:
+            connection.close()
+            if client is not None:
+                client.close()
+            components.stop()
+            log_writer.close()
+    return measures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.results, args.limit, args.requests)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
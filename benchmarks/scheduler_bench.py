@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the scheduler component with N recurring schedules: adding them, the memory they use,
+reloading them at startup, and the cost of a tick while simulating an hour of one-second ticks.
+
+Usage:
+------
+    python benchmarks/scheduler_bench.py [--schedules N] [--seconds N]
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+
+from jorkieserver.logging import LogWriter
+from jorkieserver.scheduler import Scheduler
+from jorkieserver.types import Configuration
+
+
+def rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(schedules: int, seconds: int) -> dict[str, tuple[float, str]]:
+    """Runs every phase once against a fresh schedule file.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by phase.
+    """
+    results = {}
+    rng = random.Random(0)
+    # Far enough in the future that the scheduler thread never fires on its own.
+    base = time.time() + 30 * 24 * 60 * 60
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        configuration = Configuration(
+            scheduler_path=os.path.join(work_dir, "schedules.db")
+        )
+        scheduler = Scheduler(configuration, log_writer)
+        scheduler.start()
+        rss_before = rss_mib()
+        started = time.perf_counter()
+        for i in range(schedules):
+            interval = rng.choice((300, 900, 3600, 6 * 3600, 86400))
+            scheduler.add(
+                f"project-{i % 1000}",
+                f"agent-{i % 20}",
+                interval,
+                base + rng.uniform(0, interval),
+            )
+        results["add"] = (schedules / (time.perf_counter() - started), "schedules/s")
+        results["memory"] = (
+            (rss_mib() - rss_before) * 1024 / schedules * 1000,
+            "KiB/1k",
+        )
+        scheduler.stop()
+
+        scheduler = Scheduler(configuration, log_writer)
+        started = time.perf_counter()
+        scheduler.start()
+        results["restart"] = ((time.perf_counter() - started) * 1000, "ms")
+
+        costs = []
+        fired = 0
+        for second in range(1, seconds + 1):
+            started = time.perf_counter()
+            fired += len(scheduler.tick(base + second))
+            costs.append(time.perf_counter() - started)
+        results["fires"] = (fired, "fires")
+        results["tick (mean)"] = (statistics.fmean(costs) * 1e6, "us")
+        results["tick (p99)"] = (
+            statistics.quantiles(costs, n=100)[98] * 1e6,
+            "us",
+        )
+        results["per fire"] = (sum(costs) / max(fired, 1) * 1e6, "us")
+        scheduler.stop()
+        log_writer.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--schedules", type=int, default=100_000)
+    parser.add_argument("--seconds", type=int, default=3600)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.schedules, args.seconds)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark of scope matching: compiling a scope of N rules (CIDR blocks, wildcard domains and
+ASN ranges, in and out of scope), matching result rows against it, next to a linear scan over the
+rules, and changing one rule of the compiled scope.
+
+Usage:
+------
+    python benchmarks/scope_bench.py [--rules N] [--assets N]
+"""
+
+import argparse
+import contextlib
+import ipaddress
+import os
+import random
+import time
+
+from jorkieserver.scope import ScopeMatcher, parse_rule
+
+
+def generate_rules(rng: random.Random, rules: int) -> tuple[list[str], list[str]]:
+    """Returns in-scope and out-of-scope rules, about 45% CIDR blocks (a tenth IPv6), 45% domains
+    and 10% ASN ranges, one out-of-scope rule for nine in-scope ones.
+    """
+    include, exclude = [], []
+    for i in range(rules):
+        kind = rng.random()
+        if kind < 0.4:
+            rule = f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/{rng.choice((16, 20, 24))}"
+        elif kind < 0.45:
+            rule = f"2001:db8:{rng.randrange(65536):x}::/48"
+        elif kind < 0.9:
+            rule = f"*.target-{i}.example.com" if i % 2 else f"target-{i}.example.com"
+        else:
+            first = rng.randrange(64512, 4_200_000_000)
+            rule = f"AS{first}-AS{first + rng.randrange(100)}"
+        (exclude if i % 10 == 9 else include).append(rule)
+    return include, exclude
+
+
+def generate_rows(rng: random.Random, assets: int, rules: int) -> list[tuple]:
+    """Returns `(project, scan_id, kind, value, data, received_at)` result rows of every kind."""
+    rows = []
+    for i in range(assets):
+        kind = i % 4
+        if kind == 0:
+            value = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+            rows.append(("bench", None, "ip", value, None, 0.0))
+        elif kind == 1:
+            value = f"host-{i}.target-{rng.randrange(rules)}.example.com"
+            rows.append(("bench", None, "subdomain", value, None, 0.0))
+        elif kind == 2:
+            value = f"target-{rng.randrange(rules)}.example.com"
+            rows.append(("bench", None, "domain", value, None, 0.0))
+        else:
+            value = f"AS{rng.randrange(64512, 4_200_000_000)}"
+            rows.append(("bench", None, "asn", value, None, 0.0))
+    return rows
+
+
+def linear_in_scope(rules: list[tuple], kind: str, value: str) -> bool:
+    """Matches an asset against every rule in turn, the approach the compiled scope replaces."""
+    if kind == "ip":
+        address = ipaddress.ip_address(value)
+        return any(rule[0] == "network" and address in rule[1] for rule in rules)
+    if kind == "asn":
+        asn = int(value[2:])
+        return any(rule[0] == "asn" and rule[1] <= asn <= rule[2] for rule in rules)
+    name = value.lower()
+    return any(
+        rule[0] == "domain"
+        and (name.endswith("." + rule[1]) if rule[2] else name == rule[1])
+        for rule in rules
+    )
+
+
+def compile_linear(rules: list[str]) -> list[tuple]:
+    compiled = []
+    for rule in rules:
+        parsed = parse_rule(rule)
+        if parsed[0] == "network":
+            compiled.append(("network", ipaddress.ip_network(rule, strict=False)))
+        elif parsed[0] == "asn":
+            compiled.append(parsed)
+        else:
+            compiled.append(("domain", ".".join(parsed[1]), parsed[2]))
+    return compiled
+
+
+def run(rules: int, assets: int) -> dict[str, tuple[float, str]]:
+    """Compiles a scope of `rules` rules and matches `assets` rows against it.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    rng = random.Random(0)
+    include, exclude = generate_rules(rng, rules)
+    rows = generate_rows(rng, assets, rules)
+    results = {}
+
+    started = time.perf_counter()
+    scope = ScopeMatcher(include, exclude)
+    results["compile"] = ((time.perf_counter() - started) * 1000, "ms")
+
+    started = time.perf_counter()
+    in_scope = scope.filter(rows)
+    elapsed = time.perf_counter() - started
+    results["match"] = (assets / elapsed, "assets/s")
+    results["in scope"] = (len(in_scope) / assets * 100, "%")
+
+    # The linear scan is too slow for every row, it is timed on a sample.
+    linear_include, linear_exclude = compile_linear(include), compile_linear(exclude)
+    sample = rows[: max(1, min(assets, 2_000_000 // max(rules, 1)))]
+    started = time.perf_counter()
+    for row in sample:
+        linear_in_scope(linear_include, row[2], row[3]) and not linear_in_scope(
+            linear_exclude, row[2], row[3]
+        )
+    results["linear scan"] = (len(sample) / (time.perf_counter() - started), "assets/s")
+
+    changes = [f"172.16.{i % 256}.0/24" for i in range(1000)]
+    changes += [f"*.added-{i}.example.net" for i in range(1000)]
+    started = time.perf_counter()
+    for rule in changes:
+        scope.include.add(rule)
+    for rule in changes:
+        scope.include.remove(rule)
+    results["rule change"] = (
+        (time.perf_counter() - started) / (2 * len(changes)) * 1e6,
+        "us",
+    )
+    started = time.perf_counter()
+    scope.include.add("AS64496")
+    scope.include.remove("AS64496")
+    results["ASN rule change"] = ((time.perf_counter() - started) / 2 * 1e6, "us")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rules", type=int, default=10_000)
+    parser.add_argument("--assets", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.rules, args.assets)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
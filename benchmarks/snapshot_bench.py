@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmark of scan snapshots against the row store, over two scans of N results each that share
+90% of their assets: the time to compact a scan and the size of its snapshot, then the same
+reads from the database and from the snapshots: counting the results of a scan by type, reading
+every value, counting the assets each scan has and the other lacks, and downloading a whole scan over HTTP (the
+raw snapshot file next to the NDJSON export of the results query).
+
+Usage:
+------
+    python benchmarks/snapshot_bench.py [--results N] [--repeat N]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import statistics
+import tempfile
+import time
+
+from jorkieserver.api import ApiComponent
+from jorkieserver.db import Database, connect
+from jorkieserver.ingest import register_routes as register_ingest
+from jorkieserver.logging import LogWriter
+from jorkieserver.query import register_routes as register_query
+from jorkieserver.snapshot import Snapshot, compare
+from jorkieserver.snapshot import register_routes as register_snapshot
+from jorkieserver.types import Components, Configuration
+
+SCAN_RESULTS = (
+    "FROM results r JOIN assets a ON a.project_id = r.project_id AND a.hash = r.asset_hash "
+    "WHERE r.project_id = 1 AND r.scan_id = ?"
+)
+COUNT_BY_KIND = f"SELECT a.kind, count(*) {SCAN_RESULTS} GROUP BY a.kind"
+SELECT_VALUES = f"SELECT a.value {SCAN_RESULTS} ORDER BY r.id"
+COUNT_ADDED = (
+    "SELECT count(*) FROM (SELECT asset_hash FROM results WHERE project_id = 1 AND scan_id = ? "
+    "EXCEPT SELECT asset_hash FROM results WHERE project_id = 1 AND scan_id = ?)"
+)
+
+
+def load(db: Database, scan_id: str, first: int, results: int) -> None:
+    """Inserts the results of assets `first` to `first + results`, a third of them IP addresses."""
+    for start in range(first, first + results, 10_000):
+        db.insert_results(
+            [
+                (
+                    "bench",
+                    scan_id,
+                    "ip" if i % 3 == 0 else "subdomain",
+                    (
+                        f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+                        if i % 3 == 0
+                        else f"host-{i}.example.com"
+                    ),
+                    json.dumps({"port": 443, "status": 200 + i % 5}),
+                    float(i),
+                )
+                for i in range(start, min(first + results, start + 10_000))
+            ]
+        )
+
+
+def seconds(function, repeat: int) -> float:
+    """Returns the median duration of `repeat` calls of `function()`."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def download(address: tuple[str, int], path: str, accept: str) -> int:
+    """Reads a chunked response to the end, returns the number of body bytes."""
+    with socket.create_connection(address) as client, client.makefile("rb") as file:
+        client.sendall(
+            f"GET {path} HTTP/1.1\r\nAccept: {accept}\r\nConnection: close\r\n\r\n".encode()
+        )
+        while file.readline() != b"\r\n":
+            pass
+        size = 0
+        while chunk := int(file.readline(), 16):
+            size += len(file.read(chunk))
+            file.readline()
+        return size
+
+
+def run(results: int, repeat: int) -> dict[str, tuple[float, str]]:
+    """Loads and snapshots two scans of `results` results, and times reads of both stores.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    measures = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        configuration = Configuration(
+            api_host="127.0.0.1",
+            api_port=0,
+            db_path=os.path.join(work_dir, "jorkie.db"),
+            snapshot_dir=os.path.join(work_dir, "snapshots"),
+        )
+        components = Components()
+        components.api = ApiComponent(configuration, log_writer)
+        components.db = Database(configuration, log_writer)
+        for register in (register_ingest, register_query, register_snapshot):
+            components.services.append(register(components, configuration, log_writer))
+        components.start()
+        connection = connect(configuration.db_path)
+        try:
+            load(components.db, "scan-1", 0, results)
+            load(components.db, "scan-2", results // 10, results)
+            service = components.services[2]
+            started = time.perf_counter()
+            service.compact("bench", "scan-1")
+            measures["compact"] = (
+                results / (time.perf_counter() - started),
+                "results/s",
+            )
+            service.compact("bench", "scan-2")
+            size = os.path.getsize(service.path("bench", "scan-1"))
+            measures["snapshot size"] = (size / 2**20, "MiB")
+            measures["snapshot / result"] = (size / results, "bytes")
+            measures["database size"] = (
+                os.path.getsize(configuration.db_path) / 2**20,
+                "MiB",
+            )
+
+            def open_scan(scan_id: str) -> Snapshot:
+                return Snapshot(service.path("bench", scan_id))
+
+            def snapshot_count() -> None:
+                with open_scan("scan-1") as snapshot:
+                    snapshot.count_by_kind()
+
+            def snapshot_values() -> None:
+                with open_scan("scan-1") as snapshot:
+                    for row in range(len(snapshot)):
+                        snapshot.value(row)
+
+            def snapshot_diff() -> None:
+                with open_scan("scan-2") as snapshot, open_scan("scan-1") as previous:
+                    added, removed = compare(snapshot, previous, 100)
+                    if added["added"] != results // 10:
+                        raise RuntimeError(f"Found {added['added']} added assets")
+
+            for name, row_store, snapshot, unit in (
+                (
+                    "count by type",
+                    lambda: connection.execute(COUNT_BY_KIND, ("scan-1",)).fetchall(),
+                    snapshot_count,
+                    "ms",
+                ),
+                (
+                    "value scan",
+                    lambda: connection.execute(SELECT_VALUES, ("scan-1",)).fetchall(),
+                    snapshot_values,
+                    "results/s",
+                ),
+                (
+                    "scan diff",
+                    lambda: (
+                        connection.execute(
+                            COUNT_ADDED, ("scan-2", "scan-1")
+                        ).fetchall(),
+                        connection.execute(
+                            COUNT_ADDED, ("scan-1", "scan-2")
+                        ).fetchall(),
+                    ),
+                    snapshot_diff,
+                    "ms",
+                ),
+            ):
+                for store, function in (("rows", row_store), ("snapshot", snapshot)):
+                    duration = seconds(function, repeat)
+                    measures[f"{name} ({store})"] = (
+                        results / duration if unit == "results/s" else duration * 1000,
+                        unit,
+                    )
+
+            address = components.api.address
+            scan = "/api/v1/projects/bench/scans/scan-1"
+            for name, path, accept in (
+                ("download (ndjson)", f"{scan}/results", "application/x-ndjson"),
+                ("download (raw)", f"{scan}/snapshot", "application/octet-stream"),
+            ):
+                started = time.perf_counter()
+                download(address, path, accept)
+                measures[name] = (
+                    results / (time.perf_counter() - started),
+                    "results/s",
+                )
+        finally:
+            connection.close()
+            components.stop()
+            log_writer.close()
+    return measures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.results, args.repeat)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>24}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
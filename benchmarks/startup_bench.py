@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark of server cold start: import time of `jorkieserver.server` and time-to-ready of
+`python -m jorkieserver --startup-profile`, each measured in fresh interpreter processes.
+
+Usage:
+------
+    python benchmarks/startup_bench.py [--iterations N] [--max-import-ms MS] [--max-ready-ms MS]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_PROBE = (
+    "import time; started = time.perf_counter(); import jorkieserver.server; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def measure_import() -> float:
+    """Returns the seconds a fresh interpreter spends importing `jorkieserver.server`."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip())
+
+
+def measure_ready(work_dir: str) -> tuple[float, float, dict[str, float]]:
+    """Starts the server once.
+
+    Returns:
+    --------
+        tuple[float, float, dict[str, float]]: The wall-clock seconds from spawning the process to
+        its report, the seconds to ready reported by the server, and the per-phase milliseconds of
+        the startup profile.
+    """
+    command = [
+        sys.executable,
+        "-m",
+        "jorkieserver",
+        "--startup-profile",
+        "--config",
+        os.path.join(work_dir, "config.yaml"),
+        "--log-file",
+        os.path.join(work_dir, "startup.log"),
+    ]
+    started = time.perf_counter()
+    # The server keeps serving once ready, it is stopped after reporting its startup profile.
+    process = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    phases = {}
+    try:
+        for line in process.stderr:
+            name, _, value = line.rstrip("\n").rpartition("  ")
+            if value.endswith(" ms"):
+                phases[name.strip()] = float(value[:-3])
+            if name.strip() == "ready":
+                break
+        wall = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.communicate(timeout=30)
+    if "ready" not in phases:
+        raise RuntimeError(f"The server exited with status {process.returncode}")
+    return wall, phases.pop("ready") / 1000, phases
+
+
+def run(iterations: int) -> dict[str, float]:
+    """Measures import time and time-to-ready, keeping the best of `iterations` runs.
+
+    Returns:
+    --------
+        dict[str, float]: Milliseconds, by measurement.
+    """
+    results = {
+        "import jorkieserver.server": min(measure_import() for _ in range(iterations))
+        * 1000
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        measure_ready(work_dir)  # Generates the config file.
+        runs = [measure_ready(work_dir) for _ in range(iterations)]
+    best = min(runs, key=lambda run: run[1])
+    results["time to ready"] = best[1] * 1000
+    results["process wall time"] = min(run[0] for run in runs) * 1000
+    for name, milliseconds in best[2].items():
+        results[f"  {name}"] = milliseconds
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-ready-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for name, milliseconds in results.items():
+        print(f"{name:>28}: {milliseconds:10.2f} ms")
+
+    regressions = []
+    if (
+        args.max_import_ms is not None
+        and results["import jorkieserver.server"] > args.max_import_ms
+    ):
+        regressions.append(f"import time above {args.max_import_ms} ms")
+    if args.max_ready_ms is not None and results["time to ready"] > args.max_ready_ms:
+        regressions.append(f"time to ready above {args.max_ready_ms} ms")
+    if regressions:
+        print("REGRESSION: " + ", ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite and performance regression harness: runs the benchmarks of server
+startup, `LogWriter` calls at each level, configuration load and reload, API request latency,
+ingestion, scheduler ticks and database upserts at sizes that take a few minutes on one box,
+with local stand-ins only.
+
+Results can be saved as a JSON baseline, and compared against one: the comparison fails (exit
+status 1) when a metric is worse than its baseline by more than the threshold. A metric whose
+unit is a rate ("/s") regresses when it drops, any other (durations, sizes) when it grows.
+Every case runs `--repeat` times and keeps its best values, to filter out noise.
+
+Usage:
+------
+    python benchmarks/suite.py [--cases NAME,...] [--repeat N] [--save PATH] [--compare PATH]
+                               [--threshold FRACTION]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import yaml
+
+import api_bench
+import configurator_bench
+import db_bench
+import ingest_bench
+import logging_bench
+import scheduler_bench
+import startup_bench
+from jorkieserver.configurator import Configurator, default_config_document
+from jorkieserver.logging import LogWriter
+from jorkieserver.watcher import ConfigReloader
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+BASELINE_VERSION = 1
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 3
+# Differences smaller than these are timer and scheduling noise, never regressions.
+NOISE_FLOORS = {"ns": 100.0, "us": 1.0, "ms": 0.5}
+
+Results = dict[str, tuple[float, str]]
+
+
+def bench_startup() -> Results:
+    """Import time and time to ready of `python -m jorkieserver`, in fresh processes."""
+    results = startup_bench.run(3)
+    return {
+        "import": (results["import jorkieserver.server"], "ms"),
+        "time to ready": (results["time to ready"], "ms"),
+        "Server()": (results["time to ready"] - results["  imports"], "ms"),
+    }
+
+
+def bench_logging() -> Results:
+    """The cost of a `LogWriter` call of each method, at each log level."""
+    return {
+        f"level {level} {method}": (template, "ns")
+        for level, method, _, template, _ in logging_bench.run(20_000)
+    }
+
+
+def bench_configuration() -> Results:
+    """Cold and warm configuration loads, and a reload pushed to a subscriber."""
+    results = {
+        name: (microseconds, "us")
+        for name, microseconds in configurator_bench.run(10_000).items()
+    }
+    reloads = 50
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        config_file_path = os.path.join(work_dir, "config.yaml")
+        document = default_config_document()
+        with open(config_file_path, "w") as config_file:
+            yaml.safe_dump(document, config_file, sort_keys=False)
+        configurator = Configurator(log_writer, config_file_path)
+        reloader = ConfigReloader(
+            configurator,
+            config_file_path,
+            log_writer,
+            configurator.get_configuration(config_file_path),
+        )
+        applied = []
+        reloader.subscribe(lambda configuration, changed: applied.append(changed))
+        elapsed = 0.0
+        for i in range(reloads):
+            document["dispatch"]["max_concurrency"] = 9 + i % 2
+            with open(config_file_path, "w") as config_file:
+                yaml.safe_dump(document, config_file, sort_keys=False)
+            started = time.perf_counter()
+            reloader.reload()
+            elapsed += time.perf_counter() - started
+        log_writer.close()
+    if len(applied) != reloads:
+        raise RuntimeError(f"{len(applied)} of {reloads} reloads were applied")
+    results["reload"] = (elapsed / reloads * 1000, "ms")
+    return results
+
+
+def bench_api() -> Results:
+    """Requests per second and client-side latency of a static and a streaming route."""
+    results = {}
+    for route, result in api_bench.run(16, 5000, 1).items():
+        results[f"{route} rate"] = (result["rps"], "requests/s")
+        results[f"{route} p50"] = (result["p50"], "ms")
+        results[f"{route} p99"] = (result["p99"], "ms")
+    return results
+
+
+def bench_ingest() -> Results:
+    """Ingestion rate of a gzip NDJSON upload, and the server's memory high-water mark."""
+    results = ingest_bench.run(100_000, "gzip", 5000)
+    return {
+        "rate": (results["records/s"], "records/s"),
+        "server RSS peak": (results["server RSS peak (MiB)"], "MiB"),
+    }
+
+
+def bench_scheduler() -> Results:
+    """Adding schedules, reloading them, and the cost of a tick."""
+    results = scheduler_bench.run(20_000, 600)
+    return {
+        name: results[name] for name in ("add", "restart", "tick (mean)", "tick (p99)")
+    }
+
+
+def bench_db() -> Results:
+    """Insert and upsert rates of asset batches, and point lookups."""
+    results = db_bench.run(200_000, 50_000, 20_000)
+    del results["database size"]
+    return results
+
+
+CASES = {
+    "startup": bench_startup,
+    "logging": bench_logging,
+    "configuration": bench_configuration,
+    "api": bench_api,
+    "ingest": bench_ingest,
+    "scheduler": bench_scheduler,
+    "db": bench_db,
+}
+
+
+def higher_is_better(unit: str) -> bool:
+    return unit.endswith("/s")
+
+
+def run(cases: list[str], repeat: int) -> Results:
+    """Runs each case `repeat` times, keeping the best value of every metric.
+
+    Returns:
+    --------
+        Results: The best value and its unit, by `case/metric` name.
+    """
+    results: Results = {}
+    for case in cases:
+        for _ in range(repeat):
+            with (
+                open(os.devnull, "w") as devnull,
+                contextlib.redirect_stdout(devnull),
+                contextlib.redirect_stderr(devnull),
+            ):
+                measured = CASES[case]()
+            for name, (value, unit) in measured.items():
+                key = f"{case}/{name}"
+                best = results.get(key)
+                if best is None or (
+                    value > best[0] if higher_is_better(unit) else value < best[0]
+                ):
+                    results[key] = (value, unit)
+    return results
+
+
+def save(results: Results, path: str) -> None:
+    """Writes the results, and the machine that produced them, as a JSON baseline."""
+    document = {
+        "version": BASELINE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "metrics": {
+            name: {"value": round(value, 6), "unit": unit}
+            for name, (value, unit) in sorted(results.items())
+        },
+    }
+    with open(path + ".tmp", "w") as baseline_file:
+        json.dump(document, baseline_file, indent=2)
+        baseline_file.write("\n")
+    os.replace(path + ".tmp", path)
+
+
+def load(path: str) -> Results:
+    """Reads the metrics of a JSON baseline.
+
+    Raises:
+    -------
+        ValueError: If the file is not a baseline of this version
+    """
+    with open(path) as baseline_file:
+        document = json.load(baseline_file)
+    if document.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path} is not a version {BASELINE_VERSION} baseline")
+    return {
+        name: (metric["value"], metric["unit"])
+        for name, metric in document["metrics"].items()
+    }
+
+
+def compare(
+    results: Results, baseline: Results, threshold: float
+) -> list[tuple[str, float, float, float, bool]]:
+    """Compares the results with a baseline, metric by metric.
+
+    Returns:
+    --------
+        list: `(name, baseline, current, change, regressed)` rows, `change` being the relative change
+            in the "worse" direction (positive when worse), for the metrics found in both. A metric
+            regresses when it is worse by more than `threshold` and by more than the noise floor
+            of its unit.
+    """
+    rows = []
+    for name, (value, unit) in results.items():
+        if name not in baseline or baseline[name][1] != unit:
+            continue
+        reference = baseline[name][0]
+        if reference == 0:
+            change = 0.0
+        elif higher_is_better(unit):
+            change = (reference - value) / reference
+        else:
+            change = (value - reference) / reference
+        regressed = change > threshold and abs(value - reference) > NOISE_FLOORS.get(
+            unit, 0.0
+        )
+        rows.append((name, reference, value, change, regressed))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--cases",
+        type=lambda value: value.split(","),
+        default=list(CASES),
+        help=f"Comma-separated cases among: {', '.join(CASES)}",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="Runs of each case, keeping the best (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save", nargs="?", const=BASELINE_PATH, help="Write the results as a baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=BASELINE_PATH,
+        help="Fail if a metric regressed against this baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative change counted as a regression (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    unknown = sorted(set(args.cases) - set(CASES))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    baseline = load(args.compare) if args.compare else None
+    results = run(args.cases, args.repeat)
+
+    if baseline is None:
+        for name, (value, unit) in results.items():
+            print(f"{name:>40}: {value:14.2f} {unit}")
+    else:
+        rows = compare(results, baseline, args.threshold)
+        print(f"{'metric':>40}  {'baseline':>14}  {'current':>14}  {'change':>8}")
+        for name, reference, value, change, regressed in rows:
+            unit = results[name][1]
+            print(
+                f"{name:>40}  {reference:14.2f}  {value:14.2f}  {change:+8.1%}"
+                f"  {unit}{'  REGRESSION' if regressed else ''}"
+            )
+        missing = sorted(
+            name
+            for name in baseline
+            if name.partition("/")[0] in args.cases and name not in results
+        )
+        if missing:
+            print("Not measured anymore: " + ", ".join(missing))
+    if args.save:
+        save(results, args.save)
+    if baseline is not None:
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(
+                f"REGRESSION (> {args.threshold:.0%}): " + ", ".join(regressions),
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the `--workers` mode: the API throughput of the server process alone, then of 1 to N
+API worker processes sharing its port, under the load of client processes holding keep-alive
+connections. Two loads: results pages read at random cursors of a scan (a database read each),
+and batches of NDJSON results ingested (parsed in the workers, written by the supervisor).
+Throughput can only scale up to the number of cores left to the clients.
+
+Usage:
+------
+    python benchmarks/supervisor_bench.py [--results N] [--workers N] [--clients N] [--duration S]
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import time
+
+from jorkieserver.api import ApiComponent
+from jorkieserver.db import Database
+from jorkieserver.logging import LogWriter
+from jorkieserver.startup import StartupProfile, init_services
+from jorkieserver.supervisor import Supervisor
+from jorkieserver.types import CommandOptions, Components, Configuration
+
+SERVICES = (
+    "jorkieserver.scope:register_routes",
+    "jorkieserver.ingest:register_routes",
+    "jorkieserver.query:register_routes",
+)
+PAGE_LIMIT = 50
+INGEST_RECORDS = 200  # Results by ingestion request
+
+
+class Client:
+    """Minimal keep-alive HTTP client, reading responses with a Content-Length."""
+
+    def __init__(self, port: int) -> None:
+        self.socket = socket.create_connection(("127.0.0.1", port))
+        self.file = self.socket.makefile("rb")
+
+    def request(self, method: str, path: str, body: bytes = b"") -> bytes:
+        self.socket.sendall(
+            f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        status = self.file.readline()
+        if not status.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(f"Unexpected response {status!r}")
+        length = 0
+        while (line := self.file.readline()) != b"\r\n":
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        return self.file.read(length)
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+
+def load(port: int, kind: str, results: int, seed: int, starting, counts) -> None:
+    """Sends requests of one kind on a connection from `starting` for its duration, reports how many."""
+    client = Client(port)
+    generator = random.Random(seed)
+    path = "/api/v1/projects/bench/scans/scan-1/results"
+    ingest = "/api/v1/projects/bench/results"
+    requests = 0
+    deadline = starting.get()
+    while time.monotonic() < deadline:
+        if kind == "pages":
+            cursor = generator.randrange(results - PAGE_LIMIT)
+            client.request("GET", f"{path}?limit={PAGE_LIMIT}&cursor={cursor}")
+        else:
+            body = "".join(
+                json.dumps(
+                    {
+                        "type": "subdomain",
+                        "value": f"host-{seed}-{requests}-{i}.example.com",
+                        "scan_id": "scan-2",
+                    }
+                )
+                + "\n"
+                for i in range(INGEST_RECORDS)
+            ).encode()
+            client.request("POST", ingest, body)
+        requests += 1
+    client.close()
+    counts.put(requests)
+
+
+def throughput(port: int, kind: str, results: int, clients: int, duration: float):
+    """Returns the requests per second of `clients` client processes over `duration` seconds."""
+    context = multiprocessing.get_context("spawn")
+    starting, counts = context.Queue(), context.Queue()
+    processes = [
+        context.Process(target=load, args=(port, kind, results, seed, starting, counts))
+        for seed in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    # The clients take a while to start, they all run until the same deadline.
+    time.sleep(1.0 + 0.1 * clients)
+    deadline = time.monotonic() + duration
+    for _ in processes:
+        starting.put(deadline)
+    requests = sum(counts.get(timeout=duration + 60) for _ in processes)
+    for process in processes:
+        process.join()
+    return requests / duration
+
+
+def populate(db: Database, results: int) -> None:
+    for start in range(0, results, 10_000):
+        db.insert_results(
+            [
+                (
+                    "bench",
+                    "scan-1",
+                    "subdomain",
+                    f"host-{i}.example.com",
+                    json.dumps({"port": 443}),
+                    float(i),
+                )
+                for i in range(start, min(results, start + 10_000))
+            ]
+        )
+
+
+def serve(work_dir: str, workers: int, log_writer: LogWriter):
+    """Starts the server components like `Server`, with `workers` API workers, or none."""
+    configuration = Configuration(
+        api_host="127.0.0.1",
+        api_port=0,
+        db_path=os.path.join(work_dir, "jorkie.db"),
+    )
+    components = Components()
+    components.api = ApiComponent(configuration, log_writer)
+    components.db = Database(configuration, log_writer)
+    init_services(components, configuration, log_writer, StartupProfile(), SERVICES)
+    supervisor = None
+    if workers:
+        options = CommandOptions(
+            2, os.path.join(work_dir, "server.log"), "", workers=workers
+        )
+        supervisor = Supervisor(components, configuration, options, log_writer)
+        components.services.append(supervisor)
+    components.start()
+    port = components.api.address[1] if supervisor is None else supervisor.port
+    return components, port
+
+
+def run(
+    results: int, workers: int, clients: int, duration: float
+) -> dict[str, tuple[float, str]]:
+    """Measures both loads on the server alone, then with 1 to `workers` API workers.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    measures = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        components, _ = serve(work_dir, 0, log_writer)
+        populate(components.db, results)
+        components.stop()
+        try:
+            for count in range(workers + 1):
+                components, port = serve(work_dir, count, log_writer)
+                try:
+                    name = f"{count} worker{'s' * (count > 1)}" if count else "server"
+                    for kind in ("pages", "ingest"):
+                        rate = throughput(port, kind, results, clients, duration)
+                        unit = "results/s" if kind == "ingest" else "pages/s"
+                        if kind == "ingest":
+                            rate *= INGEST_RECORDS
+                        measures[f"{kind} ({name})"] = (rate, unit)
+                        if count > 1:
+                            measures[f"{kind} speedup ({name})"] = (
+                                rate / measures[f"{kind} (1 worker)"][0],
+                                "x",
+                            )
+                finally:
+                    components.stop()
+        finally:
+            log_writer.close()
+    return measures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=2 * (os.cpu_count() or 1))
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.results, args.workers, max(1, args.clients), args.duration)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>32}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
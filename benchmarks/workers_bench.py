@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark of short agent tasks: spawning a stand-in agent process per task (cold), versus running
+the tasks on the warm worker pool. No container runtime is needed, the stand-in agent is a Python
+script doing no work, so the results measure the per-task overhead.
+
+Usage:
+------
+    python benchmarks/workers_bench.py [--tasks N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import stat
+import sys
+import tempfile
+import time
+
+from jorkieserver.dispatch import Dispatcher, Job, run_command
+from jorkieserver.logging import LogWriter
+from jorkieserver.workers import WorkerPool
+
+STAND_IN = """
+import json, sys
+if sys.argv[1:] == ["--worker"]:
+    for line in sys.stdin:
+        task = json.loads(line)
+        print(json.dumps({"id": task["id"], "returncode": 0}), flush=True)
+"""
+
+
+def run(tasks: int, concurrency: int) -> dict[str, tuple[float, str]]:
+    """Runs the tasks once cold and once on warm workers.
+
+    Returns:
+    --------
+        dict[str, tuple[float, str]]: The result and its unit, by measure.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_writer = LogWriter(2, os.path.join(work_dir, "bench.log"), work_dir)
+        agent = os.path.join(work_dir, "stand-in")
+        with open(agent, "w") as file:
+            file.write(f"#!{sys.executable}\n{STAND_IN}")
+        os.chmod(agent, os.stat(agent).st_mode | stat.S_IEXEC)
+        pool = WorkerPool(
+            lambda name: [agent, "--worker"],
+            log_writer,
+            warm=concurrency,
+            idle_timeout=60,
+            max_tasks=1000,
+            health_interval=60,
+        )
+
+        async def dispatch_all(runner) -> float:
+            dispatcher = Dispatcher(concurrency, 1e9, 1e9, log_writer, runner)
+            started = time.perf_counter()
+            for _ in range(tasks):
+                dispatcher.submit(Job("bench", "stand-in", command=[agent]))
+            await dispatcher.join()
+            return time.perf_counter() - started
+
+        async def main() -> None:
+            elapsed = await dispatch_all(run_command)
+            results["cold spawn"] = (tasks / elapsed, "tasks/s")
+            started = time.perf_counter()
+            await pool.warm_up("stand-in")
+            results["warm-up"] = ((time.perf_counter() - started) * 1000, "ms")
+            elapsed = await dispatch_all(pool.run)
+            results["warm pool"] = (tasks / elapsed, "tasks/s")
+            results["workers spawned"] = (pool.spawned, "")
+            await pool.close()
+
+        asyncio.run(main())
+        results["speedup"] = (
+            results["warm pool"][0] / results["cold spawn"][0],
+            "x",
+        )
+        log_writer.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.tasks, args.concurrency)
+
+    for name, (value, unit) in results.items():
+        print(f"{name:>18}: {value:14.2f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,8 @@
-from jorkieserver import server
+import importlib
+
+
+def __getattr__(name: str):
+    # `server` pulls in every subsystem, so it is only imported once it is used.
+    if name == "server":
+        return importlib.import_module("jorkieserver.server")
+    raise AttributeError(f"module 'jorkieserver' has no attribute '{name}'")
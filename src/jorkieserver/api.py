@@ -0,0 +1,759 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+from collections import deque
+from http import HTTPStatus
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable
+from urllib.parse import parse_qsl, unquote
+
+from jorkieserver.constants import (
+    API_LATENCY_BUCKETS,
+    API_MAX_BODY_SIZE,
+    API_MAX_HEADER_SIZE,
+)
+from jorkieserver.logging import LogWriter
+from jorkieserver.metrics import Histogram
+from jorkieserver.types import Configuration
+
+STREAM_CHUNK_SIZE = 64 * 1024
+UNMATCHED_ROUTE = "unmatched"
+FALLBACK_ROUTE = "fallback"
+
+
+class HttpError(Exception):
+    """
+    Raised by the request parser or by a handler to answer with an error status.
+    """
+
+    def __init__(self, status: int, message: str | None = None) -> None:
+        self.status = status
+        self.message = message or HTTPStatus(status).phrase
+        super().__init__(self.message)
+
+
+class Request:
+    """
+    A parsed HTTP/1.x request. The body is not read until the handler asks for it,
+    either at once with `body()` / `json()`, or chunk by chunk with `stream()`.
+    """
+
+    __slots__ = (
+        "method",
+        "path",
+        "query",
+        "version",
+        "headers",
+        "params",
+        "client",
+        "keep_alive",
+        "__reader",
+        "__writer",
+        "__timeout",
+        "__chunked",
+        "__remaining",
+        "__done",
+        "__continue",
+    )
+
+    def __init__(
+        self,
+        method: str,
+        target: str,
+        version: str,
+        headers: dict[str, str],
+        client: str,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        timeout: float,
+    ) -> None:
+        """
+        Raises:
+        -------
+            HttpError: If the framing headers are not valid
+        """
+        path, _, query = target.partition("?")
+        self.method = method
+        self.path = unquote(path)
+        self.query = dict(parse_qsl(query, keep_blank_values=True)) if query else {}
+        self.version = version
+        self.headers = headers
+        self.params: dict[str, str] = {}
+        self.client = client
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            self.keep_alive = connection != "close"
+        else:
+            self.keep_alive = connection == "keep-alive"
+        self.__reader = reader
+        self.__writer = writer
+        self.__timeout = timeout
+        self.__chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        self.__continue = headers.get("expect", "").lower() == "100-continue"
+        if self.__chunked:
+            self.__remaining = 0
+        else:
+            try:
+                self.__remaining = int(headers.get("content-length", "0"))
+            except ValueError:
+                raise HttpError(400, "Invalid Content-Length header")
+            if self.__remaining < 0:
+                raise HttpError(400, "Invalid Content-Length header")
+        self.__done = not self.__chunked and self.__remaining == 0
+
+    @property
+    def consumed(self) -> bool:
+        """Whether the whole body has been read from the connection."""
+        return self.__done
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Yields the request body in chunks of at most `STREAM_CHUNK_SIZE` bytes, decoding chunked transfer encoding.
+
+        Raises:
+        -------
+            HttpError: If the body is truncated or malformed (400), or the client is too slow (408)
+        """
+        if self.__done:
+            return
+        if self.__continue:
+            self.__continue = False
+            self.__writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        while not self.__done:
+            if self.__chunked and self.__remaining == 0:
+                line = await self.__read(self.__reader.readuntil(b"\r\n"))
+                try:
+                    size = int(line.split(b";", 1)[0], 16)
+                except ValueError:
+                    raise HttpError(400, "Invalid chunk size")
+                if size == 0:
+                    while (
+                        await self.__read(self.__reader.readuntil(b"\r\n")) != b"\r\n"
+                    ):
+                        pass  # Trailers are ignored.
+                    self.__done = True
+                    return
+                self.__remaining = size
+
+            chunk = await self.__read(
+                self.__reader.read(min(self.__remaining, STREAM_CHUNK_SIZE))
+            )
+            if not chunk:
+                raise HttpError(400, "Truncated request body")
+            self.__remaining -= len(chunk)
+            if self.__remaining == 0:
+                if self.__chunked:
+                    await self.__read(self.__reader.readexactly(2))
+                else:
+                    self.__done = True
+            yield chunk
+
+    async def body(self, limit: int = API_MAX_BODY_SIZE) -> bytes:
+        """Reads the whole request body.
+
+        Raises:
+        -------
+            HttpError: If the body is larger than `limit` bytes (413), or cannot be read
+
+        Returns:
+        --------
+            bytes: The request body.
+        """
+        chunks = []
+        size = 0
+        async for chunk in self.stream():
+            size += len(chunk)
+            if size > limit:
+                raise HttpError(413)
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def json(self, limit: int = API_MAX_BODY_SIZE):
+        """Reads and decodes a JSON request body.
+
+        Raises:
+        -------
+            HttpError: If the body is not valid JSON (400), or cannot be read
+        """
+        try:
+            return json.loads(await self.body(limit))
+        except ValueError:
+            raise HttpError(400, "Invalid JSON body")
+
+    async def drain(self, limit: int = API_MAX_BODY_SIZE) -> bool:
+        """Discards the unread part of the body, so the next request on the connection can be read.
+
+        Returns:
+        --------
+            bool: False if more than `limit` bytes were left, the connection must then be closed.
+        """
+        if not self.__chunked and self.__remaining > limit:
+            return False
+        discarded = 0
+        async for chunk in self.stream():
+            discarded += len(chunk)
+            if discarded > limit:
+                return False
+        return True
+
+    async def __read(self, awaitable: Awaitable[bytes]) -> bytes:
+        try:
+            async with asyncio.timeout(self.__timeout):
+                return await awaitable
+        except TimeoutError:
+            raise HttpError(408)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            raise HttpError(400, "Truncated request body")
+
+
+class Response:
+    """
+    An HTTP response. A `bytes` body is sent with a Content-Length header,
+    an async iterable body is streamed with chunked transfer encoding. Its chunks may be `memoryview`s
+    that are released once the next chunk is requested.
+    """
+
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(
+        self,
+        body: bytes | str | AsyncIterable[bytes | memoryview] = b"",
+        status: int = 200,
+        headers: dict[str, str] | None = None,
+        content_type: str = "text/plain; charset=utf-8",
+    ) -> None:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.status = status
+        self.headers = {"Content-Type": content_type}
+        if headers:
+            self.headers.update(headers)
+        self.body = body
+
+    @classmethod
+    def json(
+        cls, data, status: int = 200, headers: dict[str, str] | None = None
+    ) -> "Response":
+        """Returns a response with `data` encoded as JSON."""
+        return cls(
+            json.dumps(data, separators=(",", ":")).encode("utf-8"),
+            status,
+            headers,
+            "application/json",
+        )
+
+    @classmethod
+    def error(cls, error: HttpError) -> "Response":
+        """Returns the JSON response of an `HttpError`."""
+        return cls.json({"error": error.message}, error.status)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class Router:
+    """
+    Maps a method and a path to a handler. Static paths are found with a single dictionary lookup,
+    patterns with `{name}` segments are matched segment by segment against the patterns of the
+    same length, and their values are passed to the handler in `Request.params`.
+    """
+
+    def __init__(self) -> None:
+        self.__static: dict[str, tuple[str, dict[str, Handler]]] = {}
+        self.__dynamic: dict[
+            int, list[tuple[tuple[str, ...], str, dict[str, Handler]]]
+        ] = {}
+
+    def add(self, method: str, pattern: str, handler: Handler) -> None:
+        """Routes `method` requests matching `pattern` to `handler`."""
+        segments = tuple(pattern.strip("/").split("/"))
+        if not any(segment.startswith("{") for segment in segments):
+            self.__static.setdefault(pattern, (pattern, {}))[1][method] = handler
+            return
+        routes = self.__dynamic.setdefault(len(segments), [])
+        for route_segments, _, handlers in routes:
+            if route_segments == segments:
+                handlers[method] = handler
+                return
+        routes.append((segments, pattern, {method: handler}))
+
+    def route(self, method: str, pattern: str) -> Callable[[Handler], Handler]:
+        """Decorator form of `add()`."""
+
+        def decorator(handler: Handler) -> Handler:
+            self.add(method, pattern, handler)
+            return handler
+
+        return decorator
+
+    def match(self, method: str, path: str) -> tuple[Handler, dict[str, str], str]:
+        """Finds the handler of a request.
+
+        Raises:
+        -------
+            HttpError: If no route matches the path (404) or the method (405)
+
+        Returns:
+        --------
+            tuple[Handler, dict[str, str], str]: The handler, the values of the pattern segments, and the pattern.
+        """
+        static = self.__static.get(path)
+        if static is not None:
+            return self.__select(static[1], method), {}, static[0]
+
+        segments = path.strip("/").split("/")
+        for route_segments, pattern, handlers in self.__dynamic.get(len(segments), ()):
+            params = {}
+            for route_segment, segment in zip(route_segments, segments):
+                if route_segment.startswith("{"):
+                    params[route_segment[1:-1]] = segment
+                elif route_segment != segment:
+                    break
+            else:
+                return self.__select(handlers, method), params, pattern
+        raise HttpError(404)
+
+    @staticmethod
+    def __select(handlers: dict[str, Handler], method: str) -> Handler:
+        try:
+            return handlers[method]
+        except KeyError:
+            raise HttpError(405, f"Allowed methods: {', '.join(sorted(handlers))}")
+
+
+class ClientLimiter:
+    """
+    Bounds the number of requests handled at once for each client address, across all of its connections.
+    Requests over the limit wait for a slot in arrival order.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.__clients: dict[str, list] = {}  # client: [active, waiters]
+
+    def active(self, client: str) -> int:
+        entry = self.__clients.get(client)
+        return 0 if entry is None else entry[0]
+
+    async def acquire(self, client: str) -> None:
+        entry = self.__clients.get(client)
+        if entry is None:
+            entry = self.__clients[client] = [0, deque()]
+        if entry[0] < self.limit and not entry[1]:
+            entry[0] += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry[1].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation.
+                self.release(client)
+            else:
+                entry[1].remove(waiter)
+            raise
+
+    def release(self, client: str) -> None:
+        entry = self.__clients[client]
+        # Hand the slot over to the next waiter, unless the limit was lowered in the meantime.
+        while entry[1] and entry[0] <= self.limit:
+            waiter = entry[1].popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        entry[0] -= 1
+        if entry[0] == 0 and not entry[1]:
+            del self.__clients[client]
+
+
+class ApiComponent:
+    """
+    asyncio HTTP/1.1 API server, run on its own event loop thread.
+
+    Connections are kept alive between requests, and pipelined requests are answered in order.
+    Routes are registered with `route()` under `/api/v<api_version>`, and the latency of every
+    route is recorded in `histograms`. The listening address, the timeout and the per-client
+    concurrency are applied on a configuration reload.
+
+    With `reuse_port`, several processes listen on the same port and the kernel spreads the
+    connections among them. A `fallback` handler answers the requests no route matches, and a
+    `grace_period` lets the requests in progress finish when stopping, see `stop()`.
+    """
+
+    CONFIG_FIELDS = frozenset(
+        {"api_host", "api_port", "api_timeout", "api_client_concurrency"}
+    )
+
+    def __init__(self, configuration: Configuration, log_writer: LogWriter) -> None:
+        self.host = configuration.api_host
+        self.port = configuration.api_port
+        self.prefix = f"/api/v{configuration.api_version}"
+        self.timeout = configuration.api_timeout
+        self.router = Router()
+        self.histograms: dict[str, Histogram] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.reuse_port = False
+        self.fallback: Handler | None = None
+        self.grace_period = 0.0
+        self.__log = log_writer.component("API")
+        self.__limiter = ClientLimiter(configuration.api_client_concurrency)
+        self.__server: asyncio.Server | None = None
+        self.__connections: set[asyncio.StreamWriter] = set()
+        self.__busy: set[asyncio.StreamWriter] = set()
+        self.__draining = False
+        self.__thread: threading.Thread | None = None
+        self.__ready = threading.Event()
+        self.__stopping: asyncio.Event | None = None
+        self.__start_error: OSError | None = None
+        self.route("GET", "/health")(self.__health)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """The bound host and port, the port is only known once started if `api_port` is 0."""
+        if self.__server is not None and self.__server.sockets:
+            return self.__server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    def route(self, method: str, path: str) -> Callable[[Handler], Handler]:
+        """Decorator routing `method` requests on `<prefix><path>` to an async handler."""
+        return self.router.route(method, self.prefix + path)
+
+    def start(self) -> None:
+        """Starts the event loop thread and waits until the socket is listening.
+
+        Raises:
+        -------
+            OSError: If the listening socket cannot be bound
+        """
+        self.__thread = threading.Thread(
+            target=asyncio.run, args=(self.__serve(),), name="jorkie-api", daemon=True
+        )
+        self.__thread.start()
+        self.__ready.wait()
+        if self.__start_error is not None:
+            self.__thread.join()
+            raise self.__start_error
+
+    def stop(self) -> None:
+        """Closes the listening socket and the idle connections, waits up to `grace_period` seconds
+        for the requests in progress (and the first request of new connections) to be answered,
+        closes the other connections, then stops the event loop thread.
+        """
+        if self.__thread is None or not self.__thread.is_alive():
+            return
+        self.loop.call_soon_threadsafe(self.__stopping.set)
+        self.__thread.join()
+
+    def reconfigure(self, configuration: Configuration, changed: set[str]) -> None:
+        """Applies a new timeout and client concurrency, and moves the listener if its address changed.
+        The listener stays on its address if the new one cannot be bound.
+        """
+        self.timeout = configuration.api_timeout
+        self.__limiter.limit = configuration.api_client_concurrency
+        if {"api_host", "api_port"} & changed:
+            host, port = self.host, self.port
+            self.host = configuration.api_host
+            self.port = configuration.api_port
+            if self.loop is not None and self.__server is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(
+                        self.__listen(), self.loop
+                    ).result()
+                except OSError as e:
+                    self.__log.error(
+                        "Cannot listen on %s:%s, still listening on %s:%s: %s",
+                        self.host,
+                        self.port,
+                        *self.address,
+                        e,
+                    )
+                    self.host, self.port = host, port
+
+    def latency_summary(self) -> dict[str, dict]:
+        """Returns the latency summary of every route, see `Histogram.summary()`."""
+        return {
+            route: histogram.summary()
+            for route, histogram in sorted(self.histograms.items())
+        }
+
+    async def __serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.__stopping = asyncio.Event()
+        try:
+            await self.__listen()
+        except OSError as e:
+            self.__start_error = e
+            return
+        finally:
+            self.__ready.set()
+
+        await self.__stopping.wait()
+        self.__draining = True
+        # The tasks of the queued connections, referenced until they are answered.
+        accepted = []
+        if self.reuse_port:
+            # Closing a `reuse_port` socket resets the connections in its accept queue instead of
+            # passing them to the other listeners of the port, so they are accepted first. The
+            # connections the server accepted but did not set up yet fail once it is closed, one
+            # loop iteration sets them up.
+            for listener in self.__server.sockets:
+                self.loop.remove_reader(listener.fileno())
+            await asyncio.sleep(0)
+            for listener in self.__server.sockets:
+                accepted.append(await self.__accept_queued(listener.dup()))
+        self.__server.close()
+        for writer in list(self.__connections - self.__busy):
+            writer.close()
+        if self.grace_period > 0:
+            await self.__drain(self.loop.time() + self.grace_period)
+        for writer in list(self.__connections):
+            writer.close()
+        await self.__server.wait_closed()
+        self.__log.info("Stopped listening.")
+
+    async def __drain(self, deadline: float) -> None:
+        """Waits for the tasks of the connections, those the server accepted before it was closed
+        included (they start their handler after a few loop iterations), until `deadline`.
+        """
+        while tasks := asyncio.all_tasks() - {asyncio.current_task()}:
+            if self.loop.time() >= deadline:
+                self.__log.error(
+                    "Closing %d connections with requests in progress", len(self.__busy)
+                )
+                return
+            await asyncio.wait(tasks, timeout=deadline - self.loop.time())
+
+    async def __accept_queued(self, listener: socket.socket) -> list[asyncio.Task]:
+        tasks = []
+        with listener:
+            listener.setblocking(False)
+            while True:
+                try:
+                    connection, _ = listener.accept()
+                except BlockingIOError:
+                    return tasks
+                reader, writer = await asyncio.open_connection(
+                    sock=connection, limit=API_MAX_HEADER_SIZE
+                )
+                self.__connections.add(writer)
+                self.__busy.add(writer)
+                tasks.append(
+                    self.loop.create_task(self.__handle_connection(reader, writer))
+                )
+
+    async def __listen(self) -> None:
+        """Listens on `host` and `port`, then closes the previous listener. It is left open if
+        the new address cannot be bound.
+        """
+        previous = self.__server
+        try:
+            server = await self.__bind(self.host, self.port)
+        except OSError:
+            if previous is None or self.port != previous.sockets[0].getsockname()[1]:
+                raise
+            # Another host on the same port, which the previous listener holds until it is closed.
+            address = previous.sockets[0].getsockname()[:2]
+            previous.close()
+            try:
+                server = await self.__bind(self.host, self.port)
+            except OSError:
+                self.__server = await self.__bind(*address)
+                raise
+        self.__server = server
+        if previous is not None:
+            previous.close()
+        host, port = self.address
+        self.__log.info("Listening on %s:%s%s", host, port, self.prefix)
+
+    async def __bind(self, host: str, port: int) -> asyncio.Server:
+        return await asyncio.start_server(
+            self.__handle_connection,
+            host,
+            port,
+            limit=API_MAX_HEADER_SIZE,
+            reuse_address=True,
+            reuse_port=self.reuse_port or None,
+        )
+
+    async def __handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        peer = writer.get_extra_info("peername")
+        client = peer[0] if peer else "unknown"
+        self.__connections.add(writer)
+        # Busy until its first request is answered, a new connection is not idle.
+        self.__busy.add(writer)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await self.__read_request(reader, writer, client)
+                except HttpError as e:
+                    await self.__write_response(
+                        writer, Response.error(e), "HTTP/1.1", False
+                    )
+                    break
+                if request is None:
+                    break
+                keep_alive = await self.__dispatch(request, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.__connections.discard(writer)
+            self.__busy.discard(writer)
+            writer.close()
+
+    async def __read_request(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        client: str,
+    ) -> Request | None:
+        try:
+            async with asyncio.timeout(self.timeout):
+                head = await reader.readuntil(b"\r\n\r\n")
+        except TimeoutError:
+            return None  # Idle keep-alive connection.
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HttpError(400, "Truncated request head")
+            return None  # Closed by the client between requests.
+        except asyncio.LimitOverrunError:
+            raise HttpError(431)
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HttpError(400, "Invalid request line")
+        if version not in ("HTTP/1.1", "HTTP/1.0"):
+            raise HttpError(505)
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, separator, value = line.partition(":")
+            if not separator:
+                raise HttpError(400, "Invalid header line")
+            name = name.strip().lower()
+            value = value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        return Request(
+            method, target, version, headers, client, reader, writer, self.timeout
+        )
+
+    async def __dispatch(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        started = time.perf_counter()
+        try:
+            handler, request.params, route = self.router.match(
+                request.method, request.path
+            )
+        except HttpError as e:
+            route = UNMATCHED_ROUTE
+            handler = None
+            response = Response.error(e)
+            if self.fallback is not None:
+                route = FALLBACK_ROUTE
+                handler = self.fallback
+
+        self.__busy.add(writer)
+        try:
+            keep_alive = request.keep_alive and not self.__draining
+            if handler is None:
+                keep_alive = await self.__write_response(
+                    writer, response, request.version, keep_alive
+                )
+            else:
+                await self.__limiter.acquire(request.client)
+                try:
+                    try:
+                        response = await handler(request)
+                    except HttpError as e:
+                        response = Response.error(e)
+                        keep_alive = keep_alive and e.status not in (400, 408, 413)
+                    except Exception as e:
+                        self.__log.error(
+                            "Unhandled error in %s %s: %r", request.method, route, e
+                        )
+                        response = Response.error(HttpError(500))
+                    keep_alive = await self.__write_response(
+                        writer, response, request.version, keep_alive
+                    )
+                finally:
+                    self.__limiter.release(request.client)
+
+            histogram = self.histograms.get(route)
+            if histogram is None:
+                histogram = self.histograms[route] = Histogram(API_LATENCY_BUCKETS)
+            histogram.observe(time.perf_counter() - started)
+
+            if keep_alive and not request.consumed:
+                try:
+                    keep_alive = await request.drain()
+                except HttpError:
+                    keep_alive = False
+            return keep_alive
+        finally:
+            self.__busy.discard(writer)
+
+    async def __write_response(
+        self,
+        writer: asyncio.StreamWriter,
+        response: Response,
+        version: str,
+        keep_alive: bool,
+    ) -> bool:
+        body = response.body
+        headers = response.headers
+        streamed = not isinstance(body, (bytes, bytearray, memoryview))
+        if not streamed:
+            headers["Content-Length"] = str(len(body))
+        elif version == "HTTP/1.1":
+            headers["Transfer-Encoding"] = "chunked"
+        else:
+            keep_alive = False  # HTTP/1.0 streams end when the connection is closed.
+        # A response finished while stopping is the last one of its connection.
+        keep_alive = keep_alive and not self.__draining
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+
+        try:
+            phrase = HTTPStatus(response.status).phrase
+        except ValueError:
+            phrase = ""
+        head = [f"HTTP/1.1 {response.status} {phrase}"]
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        head = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1")
+        if not streamed:
+            # One write, and so usually one send() call, per response.
+            writer.write(head + body)
+            await writer.drain()
+            return keep_alive
+
+        writer.write(head)
+
+        chunked = version == "HTTP/1.1"
+        try:
+            async for chunk in body:
+                if not chunk:
+                    continue
+                # Both copy the chunk, which may be a view only valid until the next one is read.
+                if chunked:
+                    writer.write(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+                else:
+                    writer.write(bytes(chunk))
+                await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # The status line is already sent, the only way to report the error is to cut the stream.
+            self.__log.error("Response stream failed: %r", e)
+            return False
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return keep_alive
+
+    async def __health(self, request: Request) -> Response:
+        return Response.json({"status": "ok"})
@@ -0,0 +1,296 @@
+import socket
+from array import array
+from typing import Iterable, Iterator
+
+from jorkieserver.constants import ASSET_STORE_MIN_CAPACITY
+
+# `sizes` markers of the values that are not stored as UTF-8 text.
+IPV4_VALUE = -1  # The address is the `values` entry itself
+IPV6_VALUE = (
+    -2
+)  # The 16 bytes of the address are at the `values` offset of the text buffer
+
+
+class CodeTable:
+    """
+    Interns the few distinct strings of a column (asset kinds, sources), so each row stores a small
+    integer code. Code 0 stands for None.
+    """
+
+    __slots__ = ("names", "codes", "limit")
+
+    def __init__(self, limit: int) -> None:
+        self.names: list[str | None] = [None]
+        self.codes: dict[str | None, int] = {None: 0}
+        self.limit = limit
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def code(self, name: str | None) -> int:
+        """Returns the code of a string, assigning the next one if it is new.
+
+        Raises:
+        -------
+            OverflowError: If the column would hold more than `limit` distinct strings
+        """
+        code = self.codes.get(name)
+        if code is None:
+            if len(self.names) >= self.limit:
+                raise OverflowError(f"More than {self.limit} distinct values")
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class Asset:
+    """
+    A view of one row of an `AssetStore`, its fields are decoded when they are read.
+    """
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: "AssetStore", row: int) -> None:
+        self.store = store
+        self.row = row
+
+    @property
+    def kind(self) -> str:
+        return self.store.kind(self.row)
+
+    @property
+    def value(self) -> str:
+        return self.store.value(self.row)
+
+    @property
+    def source(self) -> str | None:
+        return self.store.source(self.row)
+
+    @property
+    def first_seen(self) -> float:
+        return self.store.first_seen(self.row)
+
+    @property
+    def last_seen(self) -> float:
+        return self.store.last_seen(self.row)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Asset):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return f"Asset(kind={self.kind!r}, value={self.value!r})"
+
+    def as_dict(self) -> dict:
+        return {
+            "type": self.kind,
+            "value": self.value,
+            "source": self.source,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+        }
+
+
+class AssetStore:
+    """
+    Compact in-memory set of distinct assets, stored by column in `array` buffers instead of one
+    object per asset: kinds and sources are interned as 1 and 2 byte codes, IPv4 addresses are
+    packed in the 8-byte value column, other values are UTF-8 bytes appended to a single buffer.
+    An open-addressing table of row numbers, keyed by the hash of the value and the kind, finds an
+    asset without a dictionary entry per row. A row costs about 50 bytes plus the length of its value, against
+    several hundred for a dictionary or an object with a `__dict__`.
+
+    Rows are never removed, the store is dropped as a whole.
+    """
+
+    def __init__(self) -> None:
+        self.__kinds = array("B")
+        self.__sources = array("H")
+        self.__values = array("q")  # IPv4 address, or offset in `__text`
+        self.__sizes = array("i")  # UTF-8 length, or IPV4_VALUE / IPV6_VALUE
+        self.__first_seen = array("d")
+        self.__last_seen = array("d")
+        self.__hashes = array("q")
+        self.__text = bytearray()
+        self.__kind_codes = CodeTable(256)
+        self.__source_codes = CodeTable(65536)
+        # Row number + 1 in each slot, 0 for an empty slot. Kept at most 2/3 full.
+        self.__table = array("q", bytes(8 * ASSET_STORE_MIN_CAPACITY))
+        self.__mask = ASSET_STORE_MIN_CAPACITY - 1
+
+    def __len__(self) -> int:
+        return len(self.__hashes)
+
+    def __iter__(self) -> Iterator[Asset]:
+        return (Asset(self, row) for row in range(len(self.__hashes)))
+
+    def __getitem__(self, row: int) -> Asset:
+        if not 0 <= row < len(self.__hashes):
+            raise IndexError(row)
+        return Asset(self, row)
+
+    def __contains__(self, asset: tuple[str, str]) -> bool:
+        return self.find(*asset) is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated for the columns, the text buffer and the lookup table."""
+        return len(self.__text) + sum(
+            column.buffer_info()[1] * column.itemsize
+            for column in (
+                self.__kinds,
+                self.__sources,
+                self.__values,
+                self.__sizes,
+                self.__first_seen,
+                self.__last_seen,
+                self.__hashes,
+                self.__table,
+            )
+        )
+
+    def add(
+        self, kind: str, value: str, source: str | None = None, seen_at: float = 0.0
+    ) -> bool:
+        """Adds an asset, or updates the `last_seen` time of a known one.
+
+        Returns:
+        --------
+            bool: True if the asset was new.
+
+        Raises:
+        -------
+            OverflowError: If there would be too many distinct kinds or sources
+        """
+        kind_code = self.__kind_codes.codes.get(kind)
+        if kind_code is None:
+            kind_code = self.__kind_codes.code(kind)
+        hash_ = hash(value) ^ kind_code
+        table = self.__table
+        slot = hash_ & self.__mask
+        if table[slot]:
+            slot = self.__probe(hash_, kind_code, value)
+            row = table[slot] - 1
+            if row >= 0:
+                if seen_at > self.__last_seen[row]:
+                    self.__last_seen[row] = seen_at
+                return False
+        source_code = self.__source_codes.codes.get(source)
+        if source_code is None:
+            source_code = self.__source_codes.code(source)
+        row = len(self.__hashes)
+        self.__kinds.append(kind_code)
+        self.__sources.append(source_code)
+        self.__append_value(value)
+        self.__first_seen.append(seen_at)
+        self.__last_seen.append(seen_at)
+        self.__hashes.append(hash_)
+        table[slot] = row + 1
+        if 3 * (row + 1) > 2 * len(table):
+            self.__grow()
+        return True
+
+    def update(
+        self,
+        assets: Iterable[tuple[str, str]],
+        source: str | None = None,
+        seen_at: float = 0.0,
+    ) -> int:
+        """Adds `(kind, value)` assets, returns the number of new ones."""
+        add = self.add
+        return sum(add(kind, value, source, seen_at) for kind, value in assets)
+
+    def find(self, kind: str, value: str) -> Asset | None:
+        kind_code = self.__kind_codes.codes.get(kind)
+        if kind_code is None:
+            return None
+        row = self.__table[self.__probe(hash(value) ^ kind_code, kind_code, value)] - 1
+        return None if row < 0 else Asset(self, row)
+
+    def pairs(self) -> Iterator[tuple[str, str]]:
+        """Yields the `(kind, value)` of every asset, in insertion order."""
+        names = self.__kind_codes.names
+        value = self.value
+        for row, code in enumerate(self.__kinds):
+            yield names[code], value(row)
+
+    def kind(self, row: int) -> str:
+        return self.__kind_codes.names[self.__kinds[row]]
+
+    def source(self, row: int) -> str | None:
+        return self.__source_codes.names[self.__sources[row]]
+
+    def first_seen(self, row: int) -> float:
+        return self.__first_seen[row]
+
+    def last_seen(self, row: int) -> float:
+        return self.__last_seen[row]
+
+    def value(self, row: int) -> str:
+        reference = self.__values[row]
+        size = self.__sizes[row]
+        if size == IPV4_VALUE:
+            return socket.inet_ntoa(reference.to_bytes(4, "big"))
+        if size == IPV6_VALUE:
+            return socket.inet_ntop(
+                socket.AF_INET6, bytes(self.__text[reference : reference + 16])
+            )
+        return self.__text[reference : reference + size].decode()
+
+    def __append_value(self, value: str) -> None:
+        # Only addresses that decode back to the same text are packed.
+        if value[:1].isdigit() and value.count(".") == 3:
+            try:
+                packed = socket.inet_aton(value)
+            except (OSError, ValueError):
+                # A NUL character raises ValueError.
+                packed = None
+            if packed is not None and socket.inet_ntoa(packed) == value:
+                self.__values.append(int.from_bytes(packed, "big"))
+                self.__sizes.append(IPV4_VALUE)
+                return
+        elif ":" in value:
+            try:
+                packed = socket.inet_pton(socket.AF_INET6, value)
+            except (OSError, ValueError):
+                packed = None
+            if (
+                packed is not None
+                and socket.inet_ntop(socket.AF_INET6, packed) == value
+            ):
+                self.__values.append(len(self.__text))
+                self.__sizes.append(IPV6_VALUE)
+                self.__text += packed
+                return
+        encoded = value.encode()
+        self.__values.append(len(self.__text))
+        self.__sizes.append(len(encoded))
+        self.__text += encoded
+
+    def __probe(self, hash_: int, kind_code: int, value: str) -> int:
+        """Returns the slot of the asset, or the empty slot where it belongs."""
+        table, mask = self.__table, self.__mask
+        slot = hash_ & mask
+        while True:
+            row = table[slot] - 1
+            if (
+                row < 0
+                or self.__hashes[row] == hash_
+                and self.__kinds[row] == kind_code
+                and self.value(row) == value
+            ):
+                return slot
+            slot = (slot + 1) & mask
+
+    def __grow(self) -> None:
+        capacity = 2 * len(self.__table)
+        table = array("q", bytes(8 * capacity))
+        mask = capacity - 1
+        for row, hash_ in enumerate(self.__hashes):
+            slot = hash_ & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = row + 1
+        self.__table = table
+        self.__mask = mask
@@ -1,31 +1,388 @@
-from jorkieserver.utils import file_exists, file_writable, get_file_contents
-from jorkieserver.constants import LATEST_CONFIG_VERSION
+import hashlib
+import os
+import time
+
+import yaml
+
+from jorkieserver.utils import (
+    create_directory,
+    file_writable,
+    get_file_contents,
+    prompt_user,
+    write_file_atomic,
+)
+from jorkieserver.constants import (
+    LATEST_CONFIG_VERSION,
+    CONFIG_RACY_MTIME_WINDOW,
+    LOG_COMPRESSION_METHODS,
+    LOG_LEVELS,
+    DEFAULT_LOG_ROTATE_MAX_BYTES,
+    DEFAULT_LOG_ROTATE_INTERVAL,
+    DEFAULT_LOG_RETENTION,
+    DEFAULT_LOG_COMPRESSION,
+    DEFAULT_API_HOST,
+    DEFAULT_API_PORT,
+    DEFAULT_API_VERSION,
+    DEFAULT_API_TIMEOUT,
+    DEFAULT_API_CLIENT_CONCURRENCY,
+    DEFAULT_DB_FILE,
+    DEFAULT_DB_POOL_SIZE,
+    DEFAULT_MEMBERSHIP_DIR,
+    DEFAULT_SCHEDULER_FILE,
+    DEFAULT_DISPATCH_AGENTS_DIR,
+    DEFAULT_DISPATCH_MAX_CONCURRENCY,
+    DEFAULT_DISPATCH_AGENT_RATE,
+    DEFAULT_DISPATCH_HOST_RATE,
+    DEFAULT_WORKERS_ENABLED,
+    DEFAULT_WORKERS_WARM,
+    DEFAULT_WORKERS_IDLE_TIMEOUT,
+    DEFAULT_WORKERS_MAX_TASKS,
+    DEFAULT_WORKERS_HEALTH_INTERVAL,
+    DEFAULT_OUTPUT_DIR,
+    DEFAULT_SNAPSHOT_DIR,
+    DEFAULT_NOTIFICATIONS_FILE,
+    DEFAULT_NOTIFICATIONS_WINDOW,
+    DEFAULT_NOTIFICATIONS_BATCH_SIZE,
+    DEFAULT_NOTIFICATIONS_MAX_CONNECTIONS,
+    DEFAULT_NOTIFICATIONS_MAX_ATTEMPTS,
+    DEFAULT_NOTIFICATIONS_SMTP_PORT,
+    DEFAULT_INGEST_BATCH_SIZE,
+)
 from jorkieserver.logging import LogWriter
+from jorkieserver.migrations import MIGRATIONS
+from jorkieserver.types import Configuration
+
+# The libyaml bindings are several times faster than the pure Python loader, when available.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class ConfigField:
+    """
+    A single value of the configuration file, located by its dotted path of section keys
+    and stored in the `Configuration` attribute of the same meaning.
+    """
+
+    __slots__ = (
+        "path",
+        "attribute",
+        "value_type",
+        "default",
+        "required",
+        "choices",
+        "minimum",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        attribute: str,
+        value_type: type,
+        default,
+        required: bool = False,
+        choices: tuple | None = None,
+        minimum: int | None = None,
+    ):
+        self.path = tuple(path.split("."))
+        self.attribute = attribute
+        self.value_type = value_type
+        self.default = default
+        self.required = required
+        self.choices = choices
+        self.minimum = minimum
+
+    def check(self, value) -> str | None:
+        """Returns a description of why `value` is not valid for this field, or None if it is."""
+        if not isinstance(value, self.value_type) or (
+            self.value_type is int and isinstance(value, bool)
+        ):
+            return f"expected {self.value_type.__name__}, got {type(value).__name__}"
+        if self.choices is not None and value not in self.choices:
+            return f"expected one of {', '.join(map(str, self.choices))}, got '{value}'"
+        if self.minimum is not None and value < self.minimum:
+            return f"must be at least {self.minimum}, got {value}"
+        return None
+
+
+class ConfigSchema:
+    """
+    Compiled form of a tuple of `ConfigField`s.
+    The fields are arranged into a tree of sections once, so that a parsed document is
+    validated and converted into `Configuration` values in a single walk.
+    """
+
+    def __init__(self, fields: tuple[ConfigField, ...]):
+        self.fields = fields
+        self.__tree: dict = {}
+        for field in fields:
+            node = self.__tree
+            for key in field.path[:-1]:
+                node = node.setdefault(key, {})
+                if isinstance(node, ConfigField):
+                    raise ValueError(f"'{key}' is both a section and a value.")
+            node[field.path[-1]] = field
+
+    def load(self, document: dict) -> tuple[dict, list[str]]:
+        """Validates `document` and extracts the value of every field.
+
+        Args:
+        -----
+            document (dict): The parsed configuration file.
+
+        Returns:
+        --------
+            tuple[dict, list[str]]: The `{attribute: value}` values (defaults for missing optional fields)
+            and a description of every validation error.
+        """
+        values: dict = {}
+        errors: list[str] = []
+        self.__walk(self.__tree, document, (), values, errors)
+        return values, errors
 
+    def default_document(self) -> dict:
+        """Returns a configuration document holding the default value of every field."""
+        document: dict = {}
+        for field in self.fields:
+            section = document
+            for key in field.path[:-1]:
+                section = section.setdefault(key, {})
+            section[field.path[-1]] = field.default
+        return document
+
+    def __walk(
+        self,
+        tree: dict,
+        section: dict | None,
+        path: tuple,
+        values: dict,
+        errors: list[str],
+    ) -> None:
+        for key, node in tree.items():
+            value = section.get(key) if section is not None else None
+            if isinstance(node, ConfigField):
+                if value is None:
+                    if node.required:
+                        errors.append(f"{'.'.join(node.path)}: missing required value")
+                    values[node.attribute] = node.default
+                    continue
+                error = node.check(value)
+                if error is not None:
+                    errors.append(f"{'.'.join(node.path)}: {error}")
+                values[node.attribute] = value
+            elif value is not None and not isinstance(value, dict):
+                errors.append(f"{'.'.join(path + (key,))}: expected a section")
+            else:
+                self.__walk(node, value, path + (key,), values, errors)
 
-class Configuration:
-    def __init__(self):
-        self.__config = {}
 
-    def get(self, key: str):
-        return self.__config[key]
+CONFIG_SCHEMA = ConfigSchema(
+    (
+        ConfigField("version", "version", str, LATEST_CONFIG_VERSION, required=True),
+        ConfigField("logging.level", "log_level", int, None, choices=LOG_LEVELS),
+        ConfigField("api.host", "api_host", str, DEFAULT_API_HOST),
+        ConfigField("api.port", "api_port", int, DEFAULT_API_PORT, minimum=0),
+        ConfigField("api.version", "api_version", str, DEFAULT_API_VERSION),
+        ConfigField("api.timeout", "api_timeout", int, DEFAULT_API_TIMEOUT, minimum=1),
+        ConfigField(
+            "api.client_concurrency",
+            "api_client_concurrency",
+            int,
+            DEFAULT_API_CLIENT_CONCURRENCY,
+            minimum=1,
+        ),
+        ConfigField("database.path", "db_path", str, DEFAULT_DB_FILE),
+        ConfigField(
+            "database.pool_size", "db_pool_size", int, DEFAULT_DB_POOL_SIZE, minimum=1
+        ),
+        ConfigField("membership.path", "membership_dir", str, DEFAULT_MEMBERSHIP_DIR),
+        ConfigField("scheduler.path", "scheduler_path", str, DEFAULT_SCHEDULER_FILE),
+        ConfigField(
+            "dispatch.agents_dir",
+            "dispatch_agents_dir",
+            str,
+            DEFAULT_DISPATCH_AGENTS_DIR,
+        ),
+        ConfigField(
+            "dispatch.max_concurrency",
+            "dispatch_max_concurrency",
+            int,
+            DEFAULT_DISPATCH_MAX_CONCURRENCY,
+            minimum=1,
+        ),
+        ConfigField(
+            "dispatch.agent_rate",
+            "dispatch_agent_rate",
+            int,
+            DEFAULT_DISPATCH_AGENT_RATE,
+            minimum=1,
+        ),
+        ConfigField(
+            "dispatch.host_rate",
+            "dispatch_host_rate",
+            int,
+            DEFAULT_DISPATCH_HOST_RATE,
+            minimum=1,
+        ),
+        ConfigField(
+            "workers.enabled", "workers_enabled", bool, DEFAULT_WORKERS_ENABLED
+        ),
+        ConfigField(
+            "workers.warm", "workers_warm", int, DEFAULT_WORKERS_WARM, minimum=0
+        ),
+        ConfigField(
+            "workers.idle_timeout",
+            "workers_idle_timeout",
+            int,
+            DEFAULT_WORKERS_IDLE_TIMEOUT,
+            minimum=1,
+        ),
+        ConfigField(
+            "workers.max_tasks",
+            "workers_max_tasks",
+            int,
+            DEFAULT_WORKERS_MAX_TASKS,
+            minimum=1,
+        ),
+        ConfigField(
+            "workers.health_interval",
+            "workers_health_interval",
+            int,
+            DEFAULT_WORKERS_HEALTH_INTERVAL,
+            minimum=1,
+        ),
+        ConfigField("output.path", "output_dir", str, DEFAULT_OUTPUT_DIR),
+        ConfigField("snapshots.path", "snapshot_dir", str, DEFAULT_SNAPSHOT_DIR),
+        ConfigField(
+            "notifications.path",
+            "notifications_path",
+            str,
+            DEFAULT_NOTIFICATIONS_FILE,
+        ),
+        ConfigField(
+            "notifications.window",
+            "notifications_window",
+            int,
+            DEFAULT_NOTIFICATIONS_WINDOW,
+            minimum=0,
+        ),
+        ConfigField(
+            "notifications.batch_size",
+            "notifications_batch_size",
+            int,
+            DEFAULT_NOTIFICATIONS_BATCH_SIZE,
+            minimum=1,
+        ),
+        ConfigField(
+            "notifications.max_connections",
+            "notifications_max_connections",
+            int,
+            DEFAULT_NOTIFICATIONS_MAX_CONNECTIONS,
+            minimum=1,
+        ),
+        ConfigField(
+            "notifications.max_attempts",
+            "notifications_max_attempts",
+            int,
+            DEFAULT_NOTIFICATIONS_MAX_ATTEMPTS,
+            minimum=1,
+        ),
+        ConfigField(
+            "notifications.webhook_url", "notifications_webhook_url", str, None
+        ),
+        ConfigField("notifications.smtp.host", "notifications_smtp_host", str, None),
+        ConfigField(
+            "notifications.smtp.port",
+            "notifications_smtp_port",
+            int,
+            DEFAULT_NOTIFICATIONS_SMTP_PORT,
+            minimum=1,
+        ),
+        ConfigField(
+            "notifications.smtp.sender", "notifications_smtp_sender", str, None
+        ),
+        ConfigField(
+            "notifications.smtp.recipients", "notifications_smtp_recipients", str, None
+        ),
+        ConfigField(
+            "ingest.batch_size",
+            "ingest_batch_size",
+            int,
+            DEFAULT_INGEST_BATCH_SIZE,
+            minimum=1,
+        ),
+        ConfigField(
+            "logging.rotation.max_bytes",
+            "log_rotate_max_bytes",
+            int,
+            DEFAULT_LOG_ROTATE_MAX_BYTES,
+            minimum=0,
+        ),
+        ConfigField(
+            "logging.rotation.interval",
+            "log_rotate_interval",
+            int,
+            DEFAULT_LOG_ROTATE_INTERVAL,
+            minimum=0,
+        ),
+        ConfigField(
+            "logging.rotation.retention",
+            "log_retention",
+            int,
+            DEFAULT_LOG_RETENTION,
+            minimum=0,
+        ),
+        ConfigField(
+            "logging.rotation.compression",
+            "log_compression",
+            str,
+            DEFAULT_LOG_COMPRESSION,
+            choices=LOG_COMPRESSION_METHODS,
+        ),
+    )
+)
 
-    def set(self, key: str, value: str):
-        self.__config[key] = value
 
-    def save(self, config_file_path: str):
-        pass
+def default_config_document() -> dict:
+    """Returns the contents of a freshly generated configuration file."""
+    return CONFIG_SCHEMA.default_document()
 
 
 class Configurator:
+    """
+    Loads, validates and caches the configuration file.
+
+    Snapshots are cached per file path and keyed on the file's modification time and SHA-256
+    digest, so `get_configuration()` on an unchanged file costs a `stat()` and a dict lookup,
+    and the `configuration` property costs an attribute lookup.
+
+    File timestamps are coarser than the time it takes to rewrite a file, so an mtime that was
+    still within `CONFIG_RACY_MTIME_WINDOW` of the time it was cached is not trusted on its own,
+    and the contents are hashed again.
+    """
+
+    # {config file path: (st_mtime_ns, sha256 hex digest, Configuration, mtime trusted)}
+    __cache: dict[str, tuple[int, str, Configuration, bool]] = {}
+
     def __init__(self, log_writer: LogWriter, config_file_path: str):
         self.__log_writer = log_writer
-        self.__config = None
+        self.__config_file_path = config_file_path
+        self.__config: Configuration | None = None
+
+    @property
+    def configuration(self) -> Configuration | None:
+        """The snapshot returned by the last `get_configuration()` call."""
+        return self.__config
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drops every cached snapshot, forcing the next `get_configuration()` to re-read the file."""
+        cls.__cache.clear()
 
     def get_configuration(self, config_file_path: str) -> Configuration:
         """Attempts to read the configuration file and return a Configuration object.
         Logic:
         ------
+            If the configuration file is unchanged since the last call (same mtime or same hash), the cached snapshot is returned.
             If the configuration file does not exist, a default configuration file is generated.
             If the configuration file is not writable, a critical error is logged and the program exits.
             If the configuration file is not valid, a critical error is logged and the program exits.
@@ -42,73 +399,262 @@ class Configurator:
         --------
             Configuration: The configuration object containing the configuration values.
         """
-        config_file_exists: bool = file_exists(config_file_path)
+        try:
+            config_file_mtime: int | None = os.stat(config_file_path).st_mtime_ns
+        except OSError:
+            config_file_mtime = None
 
-        if config_file_exists:
-            self.__log_writer.debug("Config file exists.", component="CONFIGURATOR")
-            config_file_contents: str = get_file_contents(
-                config_file_path, log_writer=self.__log_writer
+        if config_file_mtime is not None:
+            configuration = self.__read_config(
+                config_file_path, config_file_mtime, strict=True
             )
+            if configuration is not None:
+                return configuration
 
-            config_is_valid: bool = self.__validate_config(config_file_contents)
-            if config_is_valid:
-                self.__log_writer.debug(
-                    "Config file is valid.", component="CONFIGURATOR"
-                )
-                # Get version of config
-                config_version: str = self.__get_config_version(config_file_contents)
-                if config_version == LATEST_CONFIG_VERSION:
-                    self.__log_writer.debug(
-                        "Config file is of the latest version.",
-                        component="CONFIGURATOR",
-                    )
-                    configuration: Configuration = __load_config(config_file_contents)
-                    self.__log_writer.info(
-                        "Configuration loaded successfully.", component="CONFIGURATOR"
-                    )
-                    return configuration
-                else:
-                    # Config is of an older version. Migrates the current configuration to the latest version.
-                    self.__log_writer.info(
-                        "Config file contains an older configuration version.",
-                        component="CONFIGURATOR",
-                    )
-                    # If manual intervention is required, the program exits.
-                    self.__migrate_config(config_file_contents, config_file_path)
-            else:
-                # Configuration file exists, but is invalid.
-                self.__log_writer.error(
+            # Configuration file exists, but is invalid.
+            self.__log_writer.error(
+                f"Config file '{config_file_path}' is not valid",
+                component="CONFIGURATOR",
+            )
+
+            # Prompt user to regenerate the configuration file. if user agrees, generate default config.
+            # If user doesn't agree or 30 second timeout occurrs, log critical error and exit.
+            question: str = f"""Config file exists, but is not valid.
+            Do you want the current configuration file ({config_file_path}) regenerated?"""
+            try:
+                regenerate: bool = prompt_user(question=question, timeout=30)
+            except (EOFError, OSError):
+                regenerate = False
+            if not regenerate:
+                self.__log_writer.critical(
                     f"Config file '{config_file_path}' is not valid",
                     component="CONFIGURATOR",
                 )
 
-                # Prompt user to regenerate the configuration file. if user agrees, generate default config.
-                # If user doesn't agree or 30 second timeout occurrs, log critical error and exit.
-                question: str = """Config file exists, but is not valid.
-                Do you want the current configuration file ({config_file_path}) regenerated?"""
-                prompt_user_yes_no(questin=question, timeout=30)
+        # Config file doesn't exist at `config_file_path` or has to be regenerated. Generate default config.
+        config_file_contents = self.__generate_config_file(config_file_path)
+        configuration = self.__load_config(default_config_document(), config_file_path)
+        return self.__store(
+            config_file_path,
+            os.stat(config_file_path).st_mtime_ns,
+            hashlib.sha256(config_file_contents.encode("utf-8")).hexdigest(),
+            configuration,
+        )
+
+    def reload_configuration(self, config_file_path: str) -> Configuration | None:
+        """Re-reads the configuration file for a hot reload.
+        Unlike `get_configuration()`, this never prompts, regenerates the file or exits.
+
+        Args:
+        -----
+            config_file_path (str): The path to the configuration file.
+
+        Returns:
+        --------
+            Configuration | None: The (possibly cached) snapshot, or None if the file is missing or not valid.
+        """
+        try:
+            config_file_mtime = os.stat(config_file_path).st_mtime_ns
+        except OSError:
+            self.__log_writer.error(
+                f"Config file '{config_file_path}' could not be read, keeping the current configuration.",
+                component="CONFIGURATOR",
+            )
+            return None
+        configuration = self.__read_config(
+            config_file_path, config_file_mtime, strict=False
+        )
+        if configuration is None:
+            self.__log_writer.error(
+                f"Config file '{config_file_path}' is not valid, keeping the current configuration.",
+                component="CONFIGURATOR",
+            )
+        return configuration
+
+    def __read_config(
+        self, config_file_path: str, config_file_mtime: int, strict: bool
+    ) -> Configuration | None:
+        """Returns the cached snapshot if the file is unchanged, otherwise parses, migrates and validates it.
 
+        Args:
+        -----
+            config_file_path (str): The path to the configuration file.
+            config_file_mtime (int): The `st_mtime_ns` of the configuration file.
+            strict (bool): Exit if the file cannot be read, instead of returning None.
+
+        Returns:
+        --------
+            Configuration | None: The snapshot, or None if the file is not valid.
+        """
+        cached = Configurator.__cache.get(config_file_path)
+        if cached is not None and cached[0] == config_file_mtime and cached[3]:
+            self.__config = cached[2]
+            return cached[2]
+
+        self.__log_writer.debug("Config file exists.", component="CONFIGURATOR")
+        if strict:
+            config_file_contents: str = get_file_contents(
+                config_file_path, log_writer=self.__log_writer
+            )
         else:
-            # Config file doesn't exist at `config_file_path`. Generate default config.
-            self.__generate_config_file(config_file_path)
+            try:
+                with open(config_file_path, "r") as config_file:
+                    config_file_contents = config_file.read()
+            except OSError:
+                return None
+        digest = hashlib.sha256(config_file_contents.encode("utf-8")).hexdigest()
+        if cached is not None and cached[1] == digest:
+            # Touched, but not modified.
+            return self.__store(config_file_path, config_file_mtime, digest, cached[2])
+
+        document: dict | None = self.__parse_config(config_file_contents)
+        if document is None:
+            return None
+        if document.get("version") != LATEST_CONFIG_VERSION:
+            # Config is of an older version. Migrates the current configuration to the latest version.
+            self.__log_writer.info(
+                "Config file contains an older configuration version.",
+                component="CONFIGURATOR",
+            )
+            # If manual intervention is required, the program exits.
+            migrated = self.__migrate_config(document, config_file_path, strict)
+            if migrated is None:
+                return None
+            document, migrated_contents = migrated
+            if migrated_contents is not None:
+                # Cache the snapshot under the migrated file, so the next lookup doesn't parse it again.
+                config_file_mtime = os.stat(config_file_path).st_mtime_ns
+                digest = hashlib.sha256(migrated_contents.encode("utf-8")).hexdigest()
+        configuration = self.__load_config(document, config_file_path)
+        if configuration is None:
+            return None
+        self.__log_writer.info(
+            "Configuration loaded successfully.", component="CONFIGURATOR"
+        )
+        return self.__store(config_file_path, config_file_mtime, digest, configuration)
+
+    def __store(
+        self,
+        config_file_path: str,
+        config_file_mtime: int,
+        digest: str,
+        configuration: Configuration,
+    ) -> Configuration:
+        Configurator.__cache[config_file_path] = (
+            config_file_mtime,
+            digest,
+            configuration,
+            time.time_ns() - config_file_mtime >= CONFIG_RACY_MTIME_WINDOW,
+        )
+        self.__config = configuration
+        return configuration
 
-    def __validate_config(self, config_file_contents: str) -> bool:
-        # TODO: Implement configuration validation logic.
-        return True
+    def __generate_config_file(self, config_file_path: str) -> str:
+        """Writes the default configuration to `config_file_path`, exiting if the file is not writable.
 
-    def __get_config_version(self, config_file_contents: str) -> str:
-        # TODO: Implement configuration version extraction logic.
-        return "implement"
+        Returns:
+        --------
+            str: The contents written to the configuration file.
+        """
+        config_dir = os.path.dirname(config_file_path)
+        if config_dir:
+            create_directory(config_dir, "CONFIGURATOR")
+        if not file_writable(config_file_path):
+            self.__log_writer.critical(
+                f"Config file '{config_file_path}' is not writable",
+                component="CONFIGURATOR",
+            )
+        config_file_contents = yaml.dump(
+            default_config_document(), Dumper=YamlDumper, sort_keys=False
+        )
+        with open(config_file_path, "w") as config_file:
+            config_file.write(config_file_contents)
+        self.__log_writer.info(
+            f"Generated default config file '{config_file_path}'.",
+            component="CONFIGURATOR",
+        )
+        return config_file_contents
 
-    def __load_config(self, file_contents: str) -> Configuration:
-        # TODO: Implement configuration loading logic.
-        return Configuration()
+    def __parse_config(self, config_file_contents: str) -> dict | None:
+        """Parses the configuration file once. Returns None if it is not a YAML mapping."""
+        try:
+            document = yaml.load(config_file_contents, Loader=YamlLoader)
+        except yaml.YAMLError as e:
+            self.__log_writer.error(
+                "Config file is not valid YAML: %s", "CONFIGURATOR", e
+            )
+            return None
+        if not isinstance(document, dict):
+            self.__log_writer.error(
+                "Config file does not contain a mapping.", "CONFIGURATOR"
+            )
+            return None
+        return document
 
-    def __migrate_config(self, file_contents: str, file_path: str) -> None:
-        # TODO: Implement config migration logic.
-        pass
+    def __load_config(
+        self, document: dict, config_file_path: str
+    ) -> Configuration | None:
+        """Validates the parsed document against `CONFIG_SCHEMA` and builds the snapshot.
+        Returns None, after logging every validation error, if the document is not valid.
+        """
+        values, errors = CONFIG_SCHEMA.load(document)
+        for error in errors:
+            self.__log_writer.error("Invalid config value %s", "CONFIGURATOR", error)
+        if errors:
+            return None
+        return Configuration(config_file=config_file_path, **values)
 
+    def __migrate_config(
+        self, document: dict, file_path: str, strict: bool
+    ) -> tuple[dict, str | None] | None:
+        """Migrates a parsed configuration document to `LATEST_CONFIG_VERSION` and writes it back atomically.
 
-class Configuration:
-    def __init__(self):
-        self.__config = {}
+        Args:
+        -----
+            document (dict): The parsed configuration file.
+            file_path (str): The path to the configuration file.
+            strict (bool): Exit if the migration requires user input, instead of returning None.
+
+        Returns:
+        --------
+            tuple[dict, str | None] | None: The migrated document and the contents written to `file_path`
+            (None if the file could not be written), or None if the document cannot be migrated.
+        """
+        version = str(document.get("version"))
+        try:
+            path = MIGRATIONS.path(version, LATEST_CONFIG_VERSION)
+        except LookupError as e:
+            self.__log_writer.error(str(e), component="CONFIGURATOR")
+            return None
+
+        for migration in path:
+            if migration.requires_input:
+                message = (
+                    f"Migrating config file '{file_path}' from version {migration.source} "
+                    f"to {migration.target} requires manual changes: {migration.description}"
+                )
+                if not strict:
+                    self.__log_writer.error(message, component="CONFIGURATOR")
+                    return None
+                self.__log_writer.critical(message, component="CONFIGURATOR")
+
+        migrated = MIGRATIONS.apply(document, path)
+        contents = yaml.dump(migrated, Dumper=YamlDumper, sort_keys=False)
+        try:
+            write_file_atomic(file_path, contents)
+        except OSError as e:
+            self.__log_writer.error(
+                "Migrated configuration could not be saved to '%s', using it in memory only: %s",
+                "CONFIGURATOR",
+                file_path,
+                e,
+            )
+            return migrated, None
+        self.__log_writer.info(
+            "Migrated config file '%s' from version %s to %s.",
+            "CONFIGURATOR",
+            file_path,
+            version,
+            LATEST_CONFIG_VERSION,
+        )
+        return migrated, contents
@@ -15,7 +15,235 @@ DEFAULT_CONFIG_DIR = user_config_dir("jorkie-server", "jorkle")
 DEFAULT_LOG_DIR = user_log_dir("jorkie-server", "jorkle")
 DEFAULT_DATA_DIR = user_data_dir("jorkie-server", "jorkle")
 DEFAULT_LOG_LEVEL = 1  # 1=INFO
+LOG_LEVELS = (0, 1, 2, 3)  # DEBUG, INFO, ERROR, CRITICAL
 DEFAULT_LOG_FILE = f"{DEFAULT_LOG_DIR}/{LAUNCH_TIMESTAMP}.log"
 DEFAULT_CONFIG_FILE = f"{DEFAULT_CONFIG_DIR}/config.yaml"
 
 LATEST_CONFIG_VERSION = "0.1.0"
+
+LOG_OVERFLOW_POLICIES = ("block", "drop-oldest", "sample")
+DEFAULT_LOG_OVERFLOW_POLICY = "block"
+DEFAULT_LOG_QUEUE_SIZE = 8192  # Maximum number of pending records in async mode
+DEFAULT_LOG_BATCH_SIZE = 512  # Maximum number of records written per flush
+DEFAULT_LOG_FLUSH_INTERVAL = 0.1  # Seconds the flush thread waits for new records
+DEFAULT_LOG_SAMPLE_RATE = 10  # Keep 1 in N overflowing records with the "sample" policy
+
+LOG_COMPRESSION_METHODS = ("none", "gzip", "zstd")
+DEFAULT_LOG_ROTATE_MAX_BYTES = 100 * 1024 * 1024  # 0 disables size-based rotation
+DEFAULT_LOG_ROTATE_INTERVAL = 24 * 60 * 60  # Seconds, 0 disables time-based rotation
+DEFAULT_LOG_RETENTION = 14  # Number of rotated segments to keep
+DEFAULT_LOG_COMPRESSION = "gzip"
+
+LOG_FORMATS = ("text", "json")
+DEFAULT_LOG_FORMAT = "text"
+DEFAULT_LOG_INDEX_BLOCK_SIZE = (
+    64 * 1024
+)  # Bytes of JSON-lines log covered by one index block
+
+DEFAULT_CONFIG_POLL_INTERVAL = (
+    1.0  # Seconds between config file checks when inotify is unavailable
+)
+DEFAULT_CONFIG_RELOAD_DELAY = (
+    0.05  # Seconds to wait for a burst of config file events to settle
+)
+CONFIG_RACY_MTIME_WINDOW = 1_000_000_000  # Nanoseconds, see `Configurator`
+
+DEFAULT_API_HOST = "127.0.0.1"
+DEFAULT_API_PORT = 8080
+DEFAULT_API_VERSION = "1"  # Routes are served under /api/v<version>
+DEFAULT_API_TIMEOUT = (
+    30  # Seconds a client may take to send a request, or stay idle between requests
+)
+DEFAULT_API_CLIENT_CONCURRENCY = (
+    16  # Requests handled at once for a single client address
+)
+API_MAX_HEADER_SIZE = 64 * 1024  # Bytes, larger request heads are rejected with 431
+API_MAX_BODY_SIZE = (
+    1024 * 1024
+)  # Bytes buffered by `Request.body()`, use `Request.stream()` for more
+API_LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)  # Upper bounds in seconds of the per-route latency histogram buckets
+
+DEFAULT_DB_FILE = f"{DEFAULT_DATA_DIR}/jorkie.db"
+DEFAULT_DB_POOL_SIZE = 4  # Read connections, writes go through a single connection
+DB_CACHED_STATEMENTS = 256  # Compiled statements kept per connection
+DB_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Durable at checkpoints, WAL keeps the database consistent
+    "busy_timeout": 5000,  # Milliseconds
+    "temp_store": "MEMORY",
+    "cache_size": -64 * 1024,  # KiB of page cache per connection
+    "mmap_size": 256 * 1024 * 1024,
+}
+
+DEFAULT_MEMBERSHIP_DIR = f"{DEFAULT_DATA_DIR}/membership"
+MEMBERSHIP_BITS_PER_ASSET = 12  # Bloom filter size, about 1.5% false positives
+MEMBERSHIP_FLUSH_THRESHOLD = (
+    100_000  # Assets added in memory before merging them into the sorted file
+)
+MEMBERSHIP_DIFF_TTL = (
+    24
+    * 3600.0  # Seconds the diff of a scan that is never compacted is kept after its last result
+)
+
+QUERY_PAGE_SIZE = 100  # Rows of a query page when the request has no `limit`
+QUERY_MAX_PAGE_SIZE = 10_000  # Largest `limit` of a query page
+QUERY_STREAM_CHUNK = 1000  # Rows read from the database at once when streaming NDJSON
+QUERY_CACHE_SIZE = 1024  # Query responses kept in memory
+QUERY_CACHE_TTL = 60.0  # Seconds a cached query response is served for, at most
+
+ASSET_STORE_MIN_CAPACITY = (
+    64  # Lookup table slots of an empty `AssetStore`, a power of 2
+)
+
+DEFAULT_SCHEDULER_FILE = f"{DEFAULT_DATA_DIR}/schedules.db"
+SCHEDULER_MIN_INTERVAL = 1.0  # Seconds, shortest interval of a recurring schedule
+SCHEDULER_LAG_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    30.0,
+    60.0,
+    300.0,
+)
+SCHEDULER_MAX_SLEEP = 60.0  # Seconds the scheduler thread sleeps at most, so wall clock changes are noticed
+
+SCOPE_CACHE_SIZE = 1024  # Projects whose compiled scope is kept in memory
+SCOPE_IP_KINDS = frozenset(
+    {"ip", "ipv4", "ipv6", "address"}
+)  # Asset types matched as IP addresses against the CIDR rules
+SCOPE_NETWORK_KINDS = frozenset(
+    {"cidr", "network"}
+)  # Asset types matched as CIDR blocks, in scope if a rule covers the whole block
+
+DEFAULT_DISPATCH_AGENTS_DIR = (
+    f"{DEFAULT_DATA_DIR}/agents"  # Agent executables, by agent name
+)
+DEFAULT_DISPATCH_MAX_CONCURRENCY = 8  # Agent runs at once, across every project
+DEFAULT_DISPATCH_AGENT_RATE = 60  # Runs started per minute for one agent type
+DEFAULT_DISPATCH_HOST_RATE = 30  # Runs started per minute against one target host
+DISPATCH_RATE_BURST = 5  # Runs a rate limit lets start at once after being idle
+DISPATCH_RATE_LIMITS = 1024  # Rate limits kept before those that are idle are dropped
+DISPATCH_MAX_SCAN = 256  # Queued jobs examined per dispatch pass while looking for one that is not rate limited
+
+DEFAULT_WORKERS_ENABLED = (
+    False  # Agents must implement the worker protocol, see `WorkerPool`
+)
+DEFAULT_WORKERS_WARM = 2  # Workers started ahead of use for every agent type
+DEFAULT_WORKERS_IDLE_TIMEOUT = 300  # Seconds an idle worker is kept
+DEFAULT_WORKERS_MAX_TASKS = 100  # Tasks a worker runs before it is replaced
+DEFAULT_WORKERS_HEALTH_INTERVAL = (
+    30  # Seconds between two health checks of the idle workers
+)
+WORKER_PING_TIMEOUT = 5.0  # Seconds a worker has to answer a health check
+
+DEFAULT_OUTPUT_DIR = (
+    f"{DEFAULT_DATA_DIR}/output"  # Spilled agent output, one file per job
+)
+OUTPUT_BUFFER_SIZE = 1024 * 1024  # Bytes of recent output kept in memory for every job
+OUTPUT_READ_CHUNK = 64 * 1024  # Maximum bytes handed to an output subscriber at once
+OUTPUT_RETAINED_JOBS = 64  # Finished jobs whose output buffer is kept in memory
+OUTPUT_EOF_TIMEOUT = (
+    1.0  # Seconds to wait for the output pipe to close once the agent exited
+)
+
+DEFAULT_SNAPSHOT_DIR = (
+    f"{DEFAULT_DATA_DIR}/snapshots"  # Columnar snapshots of finished scans, by project
+)
+SNAPSHOT_COMPACT_CHUNK = (
+    10_000  # Results read from the database at once while compacting
+)
+SNAPSHOT_READ_CHUNK = (
+    1024 * 1024
+)  # Bytes of a snapshot file sent at once when downloading
+
+DEFAULT_NOTIFICATIONS_FILE = (
+    f"{DEFAULT_DATA_DIR}/notifications.db"  # Outbox of the undelivered notifications
+)
+DEFAULT_NOTIFICATIONS_WINDOW = (
+    30  # Seconds the events of a project are collected into one notification
+)
+DEFAULT_NOTIFICATIONS_BATCH_SIZE = 500  # Events listed in one notification at most
+DEFAULT_NOTIFICATIONS_MAX_CONNECTIONS = 4  # Deliveries in flight at once
+DEFAULT_NOTIFICATIONS_MAX_ATTEMPTS = (
+    10  # Delivery attempts before a notification is dropped
+)
+DEFAULT_NOTIFICATIONS_SMTP_PORT = 25
+NOTIFICATIONS_RETRY_DELAY = (
+    5.0  # Seconds before the first retry, doubled on every attempt
+)
+NOTIFICATIONS_MAX_RETRY_DELAY = 3600.0  # Seconds between two attempts at most
+NOTIFICATIONS_TIMEOUT = 10.0  # Seconds a delivery may take
+NOTIFICATIONS_LATENCY_SAMPLES = 1024  # Recent delivery latencies kept for the stats
+
+PROFILER_INTERVAL = 0.01  # Seconds between two stack samples of the profiler
+PROFILER_DEFAULT_DURATION = 30  # Seconds profiled when no duration is given
+PROFILER_MAX_DURATION = 3600  # Seconds a profile may last at most
+PROFILER_MAX_DEPTH = 256  # Frames kept from the top of a sampled stack
+PROFILER_MODES = ("wall", "cpu")
+PROFILER_FORMATS = ("collapsed", "pstats")
+
+METRICS_BATCH_BUCKETS = (
+    1,
+    10,
+    100,
+    500,
+    1000,
+    5000,
+    10_000,
+    50_000,
+)  # Rows per ingest batch
+
+INGEST_CONTENT_ENCODINGS = ("identity", "gzip", "deflate", "zstd")
+DEFAULT_INGEST_BATCH_SIZE = 5000  # Records written per database transaction
+INGEST_MAX_PENDING_BATCHES = (
+    2  # Batches of one request queued for the database before reading pauses
+)
+INGEST_MAX_RECORD_SIZE = 1024 * 1024  # Bytes, longer NDJSON lines are rejected with 413
+INGEST_DECOMPRESS_STEP = (
+    256 * 1024
+)  # Maximum bytes decompressed at once from a compressed body
+INGEST_MAX_REPORTED_ERRORS = 10  # Rejected records described in the ingest response
+
+DEFAULT_API_WORKERS = (
+    0  # API worker processes of `--workers`, 0 serves the API from the server process
+)
+SUPERVISOR_READY_TIMEOUT = (
+    30.0  # Seconds a new API worker process has to start listening
+)
+SUPERVISOR_DRAIN_TIMEOUT = (
+    5.0  # Seconds a stopping API worker waits for its requests in progress
+)
+SUPERVISOR_STOP_TIMEOUT = (
+    10.0  # Seconds a stopping API worker has to exit before it is killed
+)
+SUPERVISOR_RESPAWN_DELAY = 0.5  # Seconds before a crashed API worker is replaced
+SUPERVISOR_RESPAWN_MAX_DELAY = (
+    30.0  # Seconds, the respawn delay doubles with every quick crash up to this one
+)
+SUPERVISOR_STABLE_AFTER = (
+    10.0  # Seconds an API worker must run for its respawn delay to be reset
+)
+SUPERVISOR_INVALIDATE_TIMEOUT = 1.0  # Seconds an ingested batch waits for the API workers to drop their cached queries
+SUPERVISOR_CLIENT_CONCURRENCY = 1024  # Proxied requests handled at once by the supervisor, the workers limit each client
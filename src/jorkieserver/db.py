@@ -0,0 +1,512 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from jorkieserver.constants import DB_CACHED_STATEMENTS, DB_PRAGMAS
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Configuration
+from jorkieserver.utils import create_directory
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS assets_project_hash ON assets (project_id, hash);
+CREATE INDEX IF NOT EXISTS assets_project_kind ON assets (project_id, kind);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    asset_hash INTEGER NOT NULL,
+    scan_id TEXT,
+    data TEXT,
+    received_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_project ON results (project_id, asset_hash);
+CREATE INDEX IF NOT EXISTS results_project_scan ON results (project_id, scan_id);
+CREATE TABLE IF NOT EXISTS scope_rules (
+    project_id INTEGER NOT NULL,
+    rule TEXT NOT NULL,
+    excluded INTEGER NOT NULL,
+    PRIMARY KEY (project_id, rule, excluded)
+) WITHOUT ROWID;
+"""
+
+# Statements are module constants, so every execution reuses the compiled statement from the
+# connection's statement cache (`cached_statements`) instead of preparing it again.
+SELECT_PROJECT = "SELECT id FROM projects WHERE name = ?"
+INSERT_PROJECT = "INSERT OR IGNORE INTO projects (name) VALUES (?)"
+INSERT_ASSET = (
+    "INSERT OR IGNORE INTO assets (project_id, hash, kind, value, first_seen, last_seen) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+UPSERT_ASSET = (
+    "INSERT INTO assets (project_id, hash, kind, value, first_seen, last_seen) "
+    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (project_id, hash) "
+    "DO UPDATE SET last_seen = excluded.last_seen, seen_count = seen_count + 1"
+)
+SELECT_ASSET = (
+    "SELECT id, kind, value, first_seen, last_seen, seen_count FROM assets "
+    "WHERE project_id = ? AND hash = ?"
+)
+INSERT_RESULT = (
+    "INSERT INTO results (project_id, asset_hash, scan_id, data, received_at) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+COUNT_RESULTS = "SELECT COUNT(*) FROM results"
+COUNT_PROJECT_RESULTS = "SELECT COUNT(*) FROM results WHERE project_id = ?"
+COUNT_PROJECT_ASSETS = "SELECT COUNT(*) FROM assets WHERE project_id = ?"
+SELECT_SCOPE_RULES = "SELECT rule, excluded FROM scope_rules WHERE project_id = ?"
+INSERT_SCOPE_RULE = (
+    "INSERT OR IGNORE INTO scope_rules (project_id, rule, excluded) VALUES (?, ?, ?)"
+)
+DELETE_SCOPE_RULE = (
+    "DELETE FROM scope_rules WHERE project_id = ? AND rule = ? AND excluded = ?"
+)
+
+COUNT_PROJECT_KINDS = (
+    "SELECT kind, COUNT(*) FROM assets WHERE project_id = ? GROUP BY kind ORDER BY kind"
+)
+SELECT_LATEST_RESULT = "SELECT MAX(id) FROM results WHERE project_id = ?"
+SELECT_RESULT_SCAN = "SELECT scan_id FROM results WHERE id = ?"
+SUMMARIZE_SCAN = (
+    "SELECT COUNT(*), MIN(received_at), MAX(received_at) FROM results "
+    "WHERE project_id = ? AND scan_id IS ?"
+)
+
+# Columns of the paginated queries, by API field name. Pages are read in the order of an index,
+# after the last row of the previous page (keyset pagination), so reading a page costs the same
+# however deep it is: assets in `(kind, id)` order, with `assets_project_kind`, and the results
+# of a scan in `id` order, with `results_project_scan`.
+ASSET_FIELDS = {
+    "id": "id",
+    "type": "kind",
+    "value": "value",
+    "first_seen": "first_seen",
+    "last_seen": "last_seen",
+    "seen_count": "seen_count",
+}
+RESULT_FIELDS = {
+    "id": "r.id",
+    "scan_id": "r.scan_id",
+    "type": "a.kind",
+    "value": "a.value",
+    "data": "r.data",
+    "received_at": "r.received_at",
+}
+SELECT_ASSETS_OF_KIND = (
+    "SELECT kind, id, {columns} FROM assets "
+    "WHERE project_id = ? AND kind = ? AND id > ? ORDER BY id LIMIT ?"
+)
+SELECT_ASSETS_AFTER_KIND = (
+    "SELECT kind, id, {columns} FROM assets "
+    "WHERE project_id = ? AND kind > ? ORDER BY kind, id LIMIT ?"
+)
+SELECT_SCAN_RESULTS = (
+    "SELECT r.id, {columns} FROM results r "
+    "WHERE r.project_id = ? AND r.scan_id = ? AND r.id > ? ORDER BY r.id LIMIT ?"
+)
+SELECT_SCAN_RESULTS_WITH_ASSETS = (
+    "SELECT r.id, {columns} FROM results r "
+    "JOIN assets a ON a.project_id = r.project_id AND a.hash = r.asset_hash "
+    "WHERE r.project_id = ? AND r.scan_id = ? AND r.id > ? ORDER BY r.id LIMIT ?"
+)
+
+
+def asset_hash(kind: str, value: str) -> int:
+    """Returns the 64-bit dedup key of an asset, stored in the unique `(project_id, hash)` index.
+
+    A signed 64-bit integer keeps the index entries small. Two distinct assets of one project
+    collide with a probability of about n²/2⁶⁵, i.e. 3·10⁻⁶ for 10M assets.
+    """
+    digest = hashlib.blake2b(f"{kind}\0{value}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Opens a connection with the engine settings of `DB_PRAGMAS`, in autocommit mode."""
+    connection = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=DB_CACHED_STATEMENTS,
+    )
+    for pragma, value in DB_PRAGMAS.items():
+        connection.execute(f"PRAGMA {pragma} = {value}")
+    return connection
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of read connections. In WAL mode readers don't block the writer, nor each other.
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        self.__connections: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(size):
+            connection = connect(path)
+            connection.execute("PRAGMA query_only = 1")
+            self.__connections.put(connection)
+        self.size = size
+
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        """Context manager lending a connection, waits if every connection is in use."""
+        connection = self.__connections.get()
+        try:
+            yield connection
+        finally:
+            self.__connections.put(connection)
+
+    def close(self) -> None:
+        for _ in range(self.size):
+            self.__connections.get().close()
+
+
+class Database:
+    """
+    SQLite storage engine of the server data, in WAL mode. The database file is opened by `start()`.
+
+    Writes go through a single writer connection, one transaction per call, while lookups use the
+    pool of read connections. Assets (domains, IPs, ASNs, ...) are deduplicated per project: each
+    is stored once under its `asset_hash()` in the unique `(project_id, hash)` index, so inserting
+    an asset that was already seen costs a single index probe.
+
+    Result rows are `(project, scan_id, kind, value, data, received_at)` tuples, where `data`
+    is the JSON encoding of the remaining fields of the reported record, or None.
+    """
+
+    def __init__(self, configuration: Configuration, log_writer: LogWriter) -> None:
+        self.path = configuration.db_path
+        self.pool_size = configuration.db_pool_size
+        self.__log = log_writer.component("DB")
+        self.__writer: sqlite3.Connection | None = None
+        self.__readers: ConnectionPool | None = None
+        self.__lock = threading.Lock()
+        self.__projects: dict[str, int] = {}
+
+    def start(self) -> None:
+        """Opens (or creates) the database file and the connection pool."""
+        create_directory(os.path.dirname(os.path.abspath(self.path)), "DB")
+        self.__writer = connect(self.path)
+        self.__writer.executescript(SCHEMA)
+        self.__readers = ConnectionPool(self.path, self.pool_size)
+        self.__log.info(
+            "Opened database '%s' (%d read connections)", self.path, self.pool_size
+        )
+
+    def stop(self) -> None:
+        """Checkpoints the write-ahead log and closes every connection."""
+        with self.__lock:
+            if self.__writer is None:
+                return
+            self.__readers.close()
+            self.__writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.__writer.close()
+            self.__writer = None
+
+    def project_id(self, project: str) -> int:
+        """Returns the id of a project, creating it on first use."""
+        project_id = self.__projects.get(project)
+        if project_id is None:
+            with self.__lock:
+                self.__writer.execute(INSERT_PROJECT, (project,))
+                project_id = self.__writer.execute(
+                    SELECT_PROJECT, (project,)
+                ).fetchone()[0]
+            self.__projects[project] = project_id
+        return project_id
+
+    def insert_assets(
+        self, project: str, assets: Iterable[tuple[str, str]], seen_at: float
+    ) -> int:
+        """Inserts the assets that the project has not seen yet, in a single transaction.
+
+        Args:
+        -----
+            project (str): The project the assets belong to.
+            assets (Iterable[tuple[str, str]]): `(kind, value)` pairs.
+            seen_at (float): The `time.time()` value the new assets were first seen at.
+
+        Returns:
+        --------
+            int: The number of new assets.
+        """
+        project_id = self.project_id(project)
+        rows = (
+            (project_id, asset_hash(kind, value), kind, value, seen_at, seen_at)
+            for kind, value in assets
+        )
+        with self.__transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(INSERT_ASSET, rows)
+            return connection.total_changes - before
+
+    def upsert_assets(
+        self, project: str, assets: Iterable[tuple[str, str]], seen_at: float
+    ) -> int:
+        """Inserts new assets, and updates `last_seen` and `seen_count` of the known ones.
+
+        Args:
+        -----
+            project (str): The project the assets belong to.
+            assets (Iterable[tuple[str, str]]): `(kind, value)` pairs.
+            seen_at (float): The `time.time()` value the assets were seen at.
+
+        Returns:
+        --------
+            int: The number of assets inserted or updated.
+        """
+        project_id = self.project_id(project)
+        rows = (
+            (project_id, asset_hash(kind, value), kind, value, seen_at, seen_at)
+            for kind, value in assets
+        )
+        with self.__transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(UPSERT_ASSET, rows)
+            return connection.total_changes - before
+
+    def lookup_asset(self, project: str, kind: str, value: str) -> dict | None:
+        """Returns an asset of a project, or None if the project has never seen it."""
+        project_id = self.__find_project(project)
+        if project_id is None:
+            return None
+        with self.__readers.acquire() as connection:
+            row = connection.execute(
+                SELECT_ASSET, (project_id, asset_hash(kind, value))
+            ).fetchone()
+        if row is None or row[1] != kind or row[2] != value:
+            return None
+        return dict(
+            zip(("id", "kind", "value", "first_seen", "last_seen", "seen_count"), row)
+        )
+
+    def count_assets(self, project: str) -> int:
+        """Returns the number of distinct assets of a project."""
+        project_id = self.__find_project(project)
+        if project_id is None:
+            return 0
+        with self.__readers.acquire() as connection:
+            return connection.execute(COUNT_PROJECT_ASSETS, (project_id,)).fetchone()[0]
+
+    def insert_results(self, rows: list[tuple]) -> int:
+        """Stores reported results, and upserts the assets they are about, in a single transaction.
+
+        Args:
+        -----
+            rows (list[tuple]): `(project, scan_id, kind, value, data, received_at)` tuples.
+
+        Returns:
+        --------
+            int: The number of results stored.
+        """
+        assets = []
+        results = []
+        for project, scan_id, kind, value, data, received_at in rows:
+            project_id = self.__projects.get(project)
+            if project_id is None:
+                project_id = self.project_id(project)
+            hash_ = asset_hash(kind, value)
+            assets.append((project_id, hash_, kind, value, received_at, received_at))
+            results.append((project_id, hash_, scan_id, data, received_at))
+        with self.__transaction() as connection:
+            connection.executemany(UPSERT_ASSET, assets)
+            connection.executemany(INSERT_RESULT, results)
+        return len(results)
+
+    def count_results(self, project: str | None = None) -> int:
+        """Returns the number of stored results, of one project or of every project."""
+        if project is None:
+            with self.__readers.acquire() as connection:
+                return connection.execute(COUNT_RESULTS).fetchone()[0]
+        project_id = self.__find_project(project)
+        if project_id is None:
+            return 0
+        with self.__readers.acquire() as connection:
+            return connection.execute(COUNT_PROJECT_RESULTS, (project_id,)).fetchone()[
+                0
+            ]
+
+    def select_assets(
+        self,
+        project: str,
+        fields: Iterable[str],
+        after: tuple[str, int] = ("", 0),
+        limit: int = 100,
+        kind: str | None = None,
+    ) -> list[tuple]:
+        """Returns a page of the assets of a project, in `(kind, id)` order.
+
+        Args:
+        -----
+            project (str): The project the assets belong to.
+            fields (Iterable[str]): The `ASSET_FIELDS` to select.
+            after (tuple[str, int]): The `(kind, id)` of the last asset of the previous page.
+            limit (int): The maximum number of assets.
+            kind (str | None): Only select the assets of this kind.
+
+        Returns:
+        --------
+            list[tuple]: `(kind, id, *fields)` rows.
+
+        Raises:
+        -------
+            KeyError: If a field is unknown
+        """
+        project_id = self.__find_project(project)
+        if project_id is None:
+            return []
+        columns = ", ".join(ASSET_FIELDS[field] for field in fields) or "NULL"
+        after_kind, after_id = after
+        with self.__readers.acquire() as connection:
+            if kind is not None:
+                if after_kind > kind:
+                    return []
+                return connection.execute(
+                    SELECT_ASSETS_OF_KIND.format(columns=columns),
+                    (project_id, kind, after_id if after_kind == kind else 0, limit),
+                ).fetchall()
+            # The rest of the kind of the cursor, then the kinds after it.
+            rows = connection.execute(
+                SELECT_ASSETS_OF_KIND.format(columns=columns),
+                (project_id, after_kind, after_id, limit),
+            ).fetchall()
+            if len(rows) < limit:
+                rows += connection.execute(
+                    SELECT_ASSETS_AFTER_KIND.format(columns=columns),
+                    (project_id, after_kind, limit - len(rows)),
+                ).fetchall()
+        return rows
+
+    def select_results(
+        self,
+        project: str,
+        scan_id: str,
+        fields: Iterable[str],
+        after: int = 0,
+        limit: int = 100,
+    ) -> list[tuple]:
+        """Returns a page of the results of a scan, in `id` order.
+
+        Args:
+        -----
+            project (str): The project the scan belongs to.
+            scan_id (str): The scan the results were reported by.
+            fields (Iterable[str]): The `RESULT_FIELDS` to select.
+            after (int): The id of the last result of the previous page.
+            limit (int): The maximum number of results.
+
+        Returns:
+        --------
+            list[tuple]: `(id, *fields)` rows.
+
+        Raises:
+        -------
+            KeyError: If a field is unknown
+        """
+        project_id = self.__find_project(project)
+        if project_id is None:
+            return []
+        fields = list(fields)
+        columns = ", ".join(RESULT_FIELDS[field] for field in fields) or "NULL"
+        statement = (
+            SELECT_SCAN_RESULTS_WITH_ASSETS
+            if "type" in fields or "value" in fields
+            else SELECT_SCAN_RESULTS
+        )
+        with self.__readers.acquire() as connection:
+            return connection.execute(
+                statement.format(columns=columns), (project_id, scan_id, after, limit)
+            ).fetchall()
+
+    def summarize_project(self, project: str) -> dict | None:
+        """Returns the asset counts of a project by kind, and its latest scan, or None if the project does not exist."""
+        project_id = self.__find_project(project)
+        if project_id is None:
+            return None
+        with self.__readers.acquire() as connection:
+            kinds = dict(connection.execute(COUNT_PROJECT_KINDS, (project_id,)))
+            results = connection.execute(
+                COUNT_PROJECT_RESULTS, (project_id,)
+            ).fetchone()[0]
+            latest = connection.execute(SELECT_LATEST_RESULT, (project_id,)).fetchone()[
+                0
+            ]
+            latest_scan = None
+            if latest is not None:
+                scan_id = connection.execute(SELECT_RESULT_SCAN, (latest,)).fetchone()[
+                    0
+                ]
+                count, first, last = connection.execute(
+                    SUMMARIZE_SCAN, (project_id, scan_id)
+                ).fetchone()
+                latest_scan = {
+                    "scan_id": scan_id,
+                    "results": count,
+                    "first_received_at": first,
+                    "last_received_at": last,
+                }
+        return {
+            "project": project,
+            "assets": sum(kinds.values()),
+            "kinds": kinds,
+            "results": results,
+            "latest_scan": latest_scan,
+        }
+
+    def scope_rules(self, project: str) -> list[tuple[str, bool]]:
+        """Returns the `(rule, excluded)` scope rules of a project."""
+        project_id = self.__find_project(project)
+        if project_id is None:
+            return []
+        with self.__readers.acquire() as connection:
+            rows = connection.execute(SELECT_SCOPE_RULES, (project_id,)).fetchall()
+        return [(rule, bool(excluded)) for rule, excluded in rows]
+
+    def change_scope_rules(
+        self, project: str, rules: Iterable[tuple[str, bool]], add: bool
+    ) -> None:
+        """Adds (or removes) `(rule, excluded)` scope rules of a project, in a single transaction."""
+        project_id = self.project_id(project)
+        with self.__transaction() as connection:
+            connection.executemany(
+                INSERT_SCOPE_RULE if add else DELETE_SCOPE_RULE,
+                ((project_id, rule, excluded) for rule, excluded in rules),
+            )
+
+    def __find_project(self, project: str) -> int | None:
+        project_id = self.__projects.get(project)
+        if project_id is None:
+            with self.__readers.acquire() as connection:
+                row = connection.execute(SELECT_PROJECT, (project,)).fetchone()
+            if row is None:
+                return None
+            project_id = self.__projects[project] = row[0]
+        return project_id
+
+    @contextmanager
+    def __transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.__lock:
+            connection = self.__writer
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
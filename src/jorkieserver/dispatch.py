@@ -0,0 +1,603 @@
+import asyncio
+import concurrent.futures
+import heapq
+import ipaddress
+import itertools
+import os
+import re
+import threading
+from typing import Awaitable, Callable
+from urllib.parse import urlsplit
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.constants import (
+    DISPATCH_MAX_SCAN,
+    DISPATCH_RATE_BURST,
+    DISPATCH_RATE_LIMITS,
+    OUTPUT_EOF_TIMEOUT,
+)
+from jorkieserver.logging import LogWriter
+from jorkieserver.output import OutputBuffer, OutputStore
+from jorkieserver.scope import ScopeService
+from jorkieserver.types import Components, Configuration
+from jorkieserver.workers import WorkerPool
+
+AGENT_NAME = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.-]*")
+
+
+class Job:
+    """
+    One run of a Jorkie Agent. Times are `loop.time()` values of the dispatcher's event loop.
+    """
+
+    __slots__ = (
+        "id",
+        "project",
+        "agent",
+        "target",
+        "command",
+        "enqueued_at",
+        "started_at",
+        "finished_at",
+        "returncode",
+        "output",
+    )
+
+    __ids = itertools.count(1)
+
+    def __init__(
+        self,
+        project: str,
+        agent: str,
+        target: str | None = None,
+        command: list[str] | None = None,
+    ) -> None:
+        self.id = next(Job.__ids)
+        self.project = project
+        self.agent = agent
+        self.target = target
+        self.command = command
+        self.enqueued_at: float | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.returncode: int | None = None
+        self.output: OutputBuffer | None = None
+
+    @property
+    def wait(self) -> float | None:
+        """Seconds the job spent queued, or None if it has not started."""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "project": self.project,
+            "agent": self.agent,
+            "target": self.target,
+            "wait": self.wait,
+            "returncode": self.returncode,
+        }
+
+
+class TokenBucket:
+    """
+    Rate limit of `rate` runs per second, allowing bursts of up to `burst` runs.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Returns the seconds until a run may start, 0 if it may start now."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        """Returns True if the bucket is full again, then it is the same as a new one."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+def target_host(target: str) -> str:
+    """Returns the host of an agent target, which its rate limit applies to: the network of an
+    address or CIDR block, the lower-cased host name of a URL or of a `host[:port][/path]` target.
+    """
+    try:
+        return str(ipaddress.ip_network(target, strict=False))
+    except ValueError:
+        pass
+    try:
+        host = urlsplit(target if "://" in target else "//" + target).hostname
+    except ValueError:
+        host = None
+    if not host:
+        return target.lower()
+    try:
+        return str(ipaddress.ip_network(host))
+    except ValueError:
+        return host.rstrip(".")
+
+
+async def run_command(job: Job) -> int:
+    """Runs the command of a job in a child process, returns its exit code.
+    Its stdout and stderr are read into `job.output`, if set. A cancelled run kills the process.
+    """
+    if job.output is None:
+        process = await asyncio.create_subprocess_exec(
+            *job.command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            return await process.wait()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+
+    read_fd, write_fd = os.pipe()
+    try:
+        os.set_blocking(read_fd, False)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *job.command,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=write_fd,
+                stderr=write_fd,
+            )
+        finally:
+            os.close(write_fd)
+        job.output.attach(read_fd)
+        try:
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+        # Children of the agent may still hold the pipe open.
+        await job.output.wait_eof(OUTPUT_EOF_TIMEOUT)
+        return returncode
+    finally:
+        await job.output.detach(read_fd)
+        os.close(read_fd)
+
+
+class Dispatcher:
+    """
+    Runs queued jobs on the running event loop, without a thread per job.
+
+    Projects share the `max_concurrency` run slots by weighted fair queuing: a job is tagged with
+    a virtual finish time `max(virtual time, finish of the project's previous job) + 1 / weight`,
+    and free slots go to the smallest tag, so a project with a huge backlog only gets its share.
+    A job also waits for a token of its agent type's and of its target host's `TokenBucket`.
+    At most `DISPATCH_MAX_SCAN` rate-limited jobs are skipped per pass, then the pass is retried
+    once the first of their limits allows a new run.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        agent_rate: float,
+        host_rate: float,
+        log_writer: LogWriter,
+        runner: Callable[[Job], Awaitable[int]] = run_command,
+    ) -> None:
+        """
+        Args:
+        -----
+            max_concurrency (int): Jobs running at once.
+            agent_rate (float): Runs started per second for one agent type.
+            host_rate (float): Runs started per second against one target host.
+            log_writer (LogWriter): The log writer.
+            runner (Callable[[Job], Awaitable[int]]): Runs a job and returns its exit code, `run_command()` by default.
+        """
+        self.max_concurrency = max_concurrency
+        self.agent_rate = agent_rate
+        self.host_rate = host_rate
+        self.running: dict[int, asyncio.Task] = {}
+        self.__runner = runner
+        self.__log = log_writer.component("DISPATCH")
+        self.__queue: list[tuple[float, float, int, Job]] = []
+        self.__sequence = itertools.count()
+        self.__virtual_time = 0.0
+        self.__finish_tags: dict[str, float] = {}
+        self.__weights: dict[str, float] = {}
+        self.__agent_buckets: dict[str, TokenBucket] = {}
+        self.__host_buckets: dict[str, TokenBucket] = {}
+        self.__rate_limits = DISPATCH_RATE_LIMITS
+        self.__timer: asyncio.TimerHandle | None = None
+        self.__subscribers: list[Callable[[Job], None]] = []
+        self.__stats: dict[str, list] = {}
+
+    def __len__(self) -> int:
+        """Number of queued jobs."""
+        return len(self.__queue)
+
+    def set_weight(self, project: str, weight: float) -> None:
+        """Sets the share of the run slots of a project, relative to the others (1 by default)."""
+        if not weight > 0:
+            raise ValueError("The weight must be positive")
+        self.__weights[project] = weight
+
+    def set_limits(
+        self, max_concurrency: int, agent_rate: float, host_rate: float
+    ) -> None:
+        """Applies new limits, to the existing rate limits too."""
+        self.max_concurrency = max_concurrency
+        self.agent_rate = agent_rate
+        self.host_rate = host_rate
+        for bucket in self.__agent_buckets.values():
+            bucket.rate = agent_rate
+        for bucket in self.__host_buckets.values():
+            bucket.rate = host_rate
+        self.dispatch()
+
+    def subscribe(self, callback: Callable[[Job], None]) -> None:
+        """Registers `callback(job)` to be called on the event loop every time a job finishes."""
+        self.__subscribers.append(callback)
+
+    def submit(self, job: Job) -> Job:
+        """Queues a job, must be called from the event loop."""
+        loop = asyncio.get_running_loop()
+        job.enqueued_at = loop.time()
+        start = max(self.__virtual_time, self.__finish_tags.get(job.project, 0.0))
+        finish = start + 1 / self.__weights.get(job.project, 1.0)
+        self.__finish_tags[job.project] = finish
+        heapq.heappush(self.__queue, (finish, start, next(self.__sequence), job))
+        self.dispatch()
+        return job
+
+    def dispatch(self) -> None:
+        """Starts queued jobs while there are free run slots."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        skipped = []
+        retry = None
+        if len(self.__host_buckets) > self.__rate_limits:
+            self.__drop_idle_buckets(now)
+        while (
+            self.__queue
+            and len(self.running) < self.max_concurrency
+            and len(skipped) < DISPATCH_MAX_SCAN
+        ):
+            entry = heapq.heappop(self.__queue)
+            job = entry[3]
+            agent_bucket = self.__bucket(
+                self.__agent_buckets, job.agent, self.agent_rate, now
+            )
+            delay = agent_bucket.delay(now)
+            host_bucket = None
+            if job.target is not None:
+                host_bucket = self.__bucket(
+                    self.__host_buckets, target_host(job.target), self.host_rate, now
+                )
+                delay = max(delay, host_bucket.delay(now))
+            if delay > 0:
+                skipped.append(entry)
+                retry = delay if retry is None else min(retry, delay)
+                continue
+            agent_bucket.take()
+            if host_bucket is not None:
+                host_bucket.take()
+            self.__virtual_time = entry[1]
+            job.started_at = now
+            self.running[job.id] = loop.create_task(self.__run(job))
+        for entry in skipped:
+            heapq.heappush(self.__queue, entry)
+        if retry is not None and self.__timer is None:
+            self.__timer = loop.call_later(retry, self.__retry)
+
+    def stats(self) -> dict[str, dict]:
+        """Returns the started jobs, and their mean and maximum queue wait in seconds, by project."""
+        return {
+            project: {
+                "started": started,
+                "mean_wait": wait / started,
+                "max_wait": max_wait,
+            }
+            for project, (started, wait, max_wait) in sorted(self.__stats.items())
+        }
+
+    async def join(self) -> None:
+        """Waits until every queued job has run."""
+        while self.__queue or self.running:
+            await asyncio.gather(*self.running.values(), return_exceptions=True)
+            if self.__queue and not self.running:
+                await asyncio.sleep(0.001)
+
+    async def cancel(self) -> None:
+        """Forgets the queued jobs, and cancels the running ones."""
+        self.__queue.clear()
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        tasks = list(self.running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def __bucket(
+        buckets: dict[str, TokenBucket], key: str, rate: float, now: float
+    ) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, DISPATCH_RATE_BURST, now)
+        return bucket
+
+    def __drop_idle_buckets(self, now: float) -> None:
+        """Forgets the host rate limits that are full, next swept once twice as many are kept."""
+        for host, bucket in list(self.__host_buckets.items()):
+            if bucket.idle(now):
+                del self.__host_buckets[host]
+        self.__rate_limits = max(DISPATCH_RATE_LIMITS, 2 * len(self.__host_buckets))
+
+    def __retry(self) -> None:
+        self.__timer = None
+        self.dispatch()
+
+    async def __run(self, job: Job) -> None:
+        stats = self.__stats.setdefault(job.project, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += job.wait
+        stats[2] = max(stats[2], job.wait)
+        try:
+            job.returncode = await self.__runner(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.__log.error(
+                "Job %d (%s on %s) failed: %r", job.id, job.agent, job.project, e
+            )
+        finally:
+            job.finished_at = asyncio.get_running_loop().time()
+            del self.running[job.id]
+        for callback in self.__subscribers:
+            try:
+                callback(job)
+            except Exception as e:
+                self.__log.error("Dispatch subscriber %r failed: %r", callback, e)
+        self.dispatch()
+
+
+class DispatchComponent:
+    """
+    Runs a `Dispatcher` on its own event loop thread. Jobs are submitted from any thread, and
+    run the executable named after their agent in `dispatch_agents_dir`, with the arguments
+    `--project <project>` and `--target <target>` (if the job has one). If `workers_enabled` is set,
+    jobs run on warm workers instead, started as `<executable> --worker`, see `WorkerPool`.
+    The output of every job is kept in `outputs`, see `OutputStore`.
+    """
+
+    CONFIG_FIELDS = frozenset(
+        {
+            "dispatch_agents_dir",
+            "dispatch_max_concurrency",
+            "dispatch_agent_rate",
+            "dispatch_host_rate",
+            "workers_enabled",
+            "workers_warm",
+            "workers_idle_timeout",
+            "workers_max_tasks",
+            "workers_health_interval",
+            "output_dir",
+        }
+    )
+
+    def __init__(
+        self,
+        configuration: Configuration,
+        log_writer: LogWriter,
+        runner: Callable[[Job], Awaitable[int]] | None = None,
+    ) -> None:
+        self.agents_dir = configuration.dispatch_agents_dir
+        self.workers_enabled = configuration.workers_enabled
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.outputs = OutputStore(configuration.output_dir)
+        self.workers = WorkerPool(
+            self.worker_command,
+            log_writer,
+            configuration.workers_warm,
+            configuration.workers_idle_timeout,
+            configuration.workers_max_tasks,
+            configuration.workers_health_interval,
+        )
+        self.dispatcher = Dispatcher(
+            configuration.dispatch_max_concurrency,
+            configuration.dispatch_agent_rate / 60,
+            configuration.dispatch_host_rate / 60,
+            log_writer,
+            runner or self.__run_job,
+        )
+        self.__log = log_writer.component("DISPATCH")
+        self.__thread: threading.Thread | None = None
+        self.__ready = threading.Event()
+        self.__stopping: asyncio.Event | None = None
+
+    def start(self) -> None:
+        """Starts the event loop thread."""
+        self.__thread = threading.Thread(
+            target=asyncio.run,
+            args=(self.__serve(),),
+            name="jorkie-dispatch",
+            daemon=True,
+        )
+        self.__thread.start()
+        self.__ready.wait()
+
+    def stop(self) -> None:
+        """Cancels the queued and running jobs, then stops the event loop thread."""
+        if self.__thread is None or not self.__thread.is_alive():
+            return
+        self.loop.call_soon_threadsafe(self.__stopping.set)
+        self.__thread.join()
+
+    def reconfigure(self, configuration: Configuration, changed: set[str]) -> None:
+        self.agents_dir = configuration.dispatch_agents_dir
+        self.workers_enabled = configuration.workers_enabled
+        self.workers.warm = configuration.workers_warm
+        self.workers.idle_timeout = configuration.workers_idle_timeout
+        self.workers.max_tasks = configuration.workers_max_tasks
+        self.workers.health_interval = configuration.workers_health_interval
+        self.outputs.directory = configuration.output_dir
+        limits = (
+            configuration.dispatch_max_concurrency,
+            configuration.dispatch_agent_rate / 60,
+            configuration.dispatch_host_rate / 60,
+        )
+        self.loop.call_soon_threadsafe(self.dispatcher.set_limits, *limits)
+
+    def command(self, agent: str, project: str, target: str | None = None) -> list[str]:
+        """Returns the command line running an agent.
+
+        Raises:
+        -------
+            ValueError: If the agent name is not a plain file name
+        """
+        if not AGENT_NAME.fullmatch(agent):
+            raise ValueError(f"Invalid agent name '{agent}'")
+        command = [os.path.join(self.agents_dir, agent), "--project", project]
+        if target is not None:
+            command += ["--target", target]
+        return command
+
+    def worker_command(self, agent: str) -> list[str]:
+        """Returns the command line starting a worker of an agent type."""
+        return [os.path.join(self.agents_dir, agent), "--worker"]
+
+    def submit(self, project: str, agent: str, target: str | None = None) -> Job:
+        """Queues a run of an agent, from any thread.
+
+        Raises:
+        -------
+            ValueError: If the agent name is not a plain file name
+        """
+        job = Job(project, agent, target, self.command(agent, project, target))
+        self.loop.call_soon_threadsafe(self.dispatcher.submit, job)
+        return job
+
+    def call(self, function: Callable, *args) -> concurrent.futures.Future:
+        """Calls a `Dispatcher` method on the event loop thread, from any thread.
+
+        Returns:
+        --------
+            concurrent.futures.Future: The future of the result, see `asyncio.wrap_future()`.
+        """
+
+        async def call():
+            return function(*args)
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop)
+
+    async def __serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.__stopping = asyncio.Event()
+        self.workers.start()
+        self.__ready.set()
+        await self.__stopping.wait()
+        await self.dispatcher.cancel()
+        await self.workers.close()
+        self.__log.info("Stopped dispatching.")
+
+    async def __run_job(self, job: Job) -> int:
+        job.output = self.outputs.create(job)
+        try:
+            if self.workers_enabled:
+                return await self.workers.run(job)
+            return await run_command(job)
+        finally:
+            await job.output.close()
+            self.outputs.release(job)
+
+
+class DispatchService:
+    """
+    Job routes of the API component, and the runs of the schedules fired by the scheduler component.
+    With a scope service, jobs whose target is out of the project's scope are refused.
+    """
+
+    def __init__(
+        self,
+        component: DispatchComponent,
+        log_writer: LogWriter,
+        scope: ScopeService | None = None,
+    ) -> None:
+        self.component = component
+        self.scope = scope
+        self.__log = log_writer.component("DISPATCH")
+
+    def schedule_fired(self, schedule) -> None:
+        try:
+            self.component.submit(schedule.project, schedule.agent)
+        except ValueError as e:
+            self.__log.error("Cannot run schedule %d: %s", schedule.id, e)
+
+    async def create(self, request: Request) -> Response:
+        document = await request.json()
+        if not isinstance(document, dict) or not isinstance(document.get("agent"), str):
+            raise HttpError(400, "Expected an object with an 'agent' string")
+        target = document.get("target")
+        if not isinstance(target, (str, type(None))):
+            raise HttpError(400, "'target' must be a string")
+        project = request.params["project_id"]
+        if target is not None and self.scope is not None:
+            matcher = await asyncio.get_running_loop().run_in_executor(
+                None, self.scope.matcher, project
+            )
+            if not matcher.target_in_scope(target):
+                raise HttpError(403, f"'{target}' is out of the scope of {project}")
+        try:
+            job = self.component.submit(project, document["agent"], target)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return Response.json(job.as_dict(), 202)
+
+    async def set_weight(self, request: Request) -> Response:
+        document = await request.json()
+        weight = document.get("weight") if isinstance(document, dict) else None
+        if not isinstance(weight, (int, float)) or not weight > 0:
+            raise HttpError(400, "Expected an object with a positive 'weight'")
+        await asyncio.wrap_future(
+            self.component.call(
+                self.component.dispatcher.set_weight,
+                request.params["project_id"],
+                weight,
+            )
+        )
+        return Response(status=204)
+
+    async def stats(self, request: Request) -> Response:
+        dispatcher = self.component.dispatcher
+        stats = await asyncio.wrap_future(self.component.call(dispatcher.stats))
+        return Response.json(
+            {
+                "queued": len(dispatcher),
+                "running": len(dispatcher.running),
+                "projects": stats,
+            }
+        )
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> DispatchService:
+    """Runs the schedules fired by the scheduler component, and adds the job routes to the API component."""
+    service = DispatchService(
+        components.dispatcher, log_writer, components.service(ScopeService)
+    )
+    if components.scheduler is not None:
+        components.scheduler.subscribe(service.schedule_fired)
+    components.api.route("POST", "/projects/{project_id}/jobs")(service.create)
+    components.api.route("PUT", "/projects/{project_id}/weight")(service.set_weight)
+    components.api.route("GET", "/jobs/stats")(service.stats)
+    return service
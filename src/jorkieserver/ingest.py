@@ -0,0 +1,417 @@
+import asyncio
+import json
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.constants import (
+    INGEST_CONTENT_ENCODINGS,
+    INGEST_DECOMPRESS_STEP,
+    INGEST_MAX_PENDING_BATCHES,
+    INGEST_MAX_RECORD_SIZE,
+    INGEST_MAX_REPORTED_ERRORS,
+)
+from jorkieserver.logging import LogWriter
+from jorkieserver.rotation import zstandard
+from jorkieserver.scope import ScopeMatcher, ScopeService
+from jorkieserver.types import Components, Configuration
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_DICT_ID_SIZES = (0, 1, 2, 4)
+ZSTD_CONTENT_SIZE_SIZES = (0, 2, 4, 8)  # The first is 1 in single segment frames
+
+
+class ZstdBlockSplitter:
+    """
+    Cuts a zstd frame, received in arbitrary chunks, into its header, its whole blocks and its
+    checksum. A block decompresses to at most 128 KiB, whatever its compression ratio, where
+    python-zstandard has no bound on the output of a `decompress()` call.
+    Data that is not a zstd frame (a skippable frame) is passed through as it comes.
+    """
+
+    def __init__(self) -> None:
+        self.__buffer = bytearray()
+        self.__state = "header"
+        self.__checksum = False
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        """Yields the header, blocks and checksum of the frame completed by `chunk`."""
+        self.__buffer += chunk
+        while size := self.__next_size():
+            unit = bytes(self.__buffer[:size])
+            del self.__buffer[:size]
+            yield unit
+
+    def __next_size(self) -> int:
+        """Returns the size of the next part of the frame, or 0 until it is fully buffered."""
+        buffer = self.__buffer
+        if self.__state == "header":
+            if len(buffer) < 5:
+                return 0
+            if buffer[:4] != ZSTD_MAGIC:
+                self.__state = "other"
+                return len(buffer)
+            descriptor = buffer[4]
+            single_segment = descriptor >> 5 & 1
+            size = (
+                5
+                + (not single_segment)
+                + ZSTD_DICT_ID_SIZES[descriptor & 3]
+                + (ZSTD_CONTENT_SIZE_SIZES[descriptor >> 6] or single_segment)
+            )
+            self.__checksum = bool(descriptor >> 2 & 1)
+            self.__state = "block"
+        elif self.__state == "block":
+            if len(buffer) < 3:
+                return 0
+            header = int.from_bytes(buffer[:3], "little")
+            # A RLE block is a single byte repeated, the others store their size.
+            size = 3 + (1 if header >> 1 & 3 == 1 else header >> 3)
+            if len(buffer) >= size and header & 1:
+                self.__state = "checksum" if self.__checksum else "end"
+        elif self.__state == "checksum":
+            size = 4
+            if len(buffer) >= size:
+                self.__state = "end"
+        else:
+            # After the frame, or not a zstd frame.
+            size = len(buffer)
+        return size if len(buffer) >= size else 0
+
+
+class StreamDecoder:
+    """
+    Incrementally decompresses a request body and splits it into NDJSON lines.
+    At most `INGEST_DECOMPRESS_STEP` bytes are decompressed at once (a zstd body is
+    decompressed one block at a time), and only the incomplete last line is carried
+    over between chunks.
+    """
+
+    def __init__(
+        self, encoding: str, max_line_size: int = INGEST_MAX_RECORD_SIZE
+    ) -> None:
+        """
+        Raises:
+        -------
+            HttpError: If the content encoding is not supported (415)
+        """
+        if encoding not in INGEST_CONTENT_ENCODINGS or (
+            encoding == "zstd" and zstandard is None
+        ):
+            raise HttpError(415, f"Unsupported content encoding '{encoding}'")
+        self.max_line_size = max_line_size
+        self.__pending = b""
+        self.__zlib = None
+        self.__zstd = None
+        self.__zstd_blocks = None
+        if encoding in ("gzip", "deflate"):
+            # 32 + MAX_WBITS accepts both the gzip and the zlib header.
+            self.__zlib = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        elif encoding == "zstd":
+            self.__zstd = zstandard.ZstdDecompressor().decompressobj()
+            self.__zstd_blocks = ZstdBlockSplitter()
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        """Yields the complete lines of the body received so far.
+
+        Raises:
+        -------
+            HttpError: If the compressed data is corrupt (400) or a line is too long (413)
+        """
+        try:
+            if self.__zlib is not None:
+                yield from self.__split(
+                    self.__zlib.decompress(chunk, INGEST_DECOMPRESS_STEP)
+                )
+                while self.__zlib.unconsumed_tail:
+                    yield from self.__split(
+                        self.__zlib.decompress(
+                            self.__zlib.unconsumed_tail, INGEST_DECOMPRESS_STEP
+                        )
+                    )
+            elif self.__zstd is not None:
+                for block in self.__zstd_blocks.feed(chunk):
+                    if self.__zstd.eof:
+                        break
+                    yield from self.__split(self.__zstd.decompress(block))
+            else:
+                yield from self.__split(chunk)
+        except zlib.error as e:
+            raise HttpError(400, f"Corrupt compressed body: {e}")
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise HttpError(400, f"Corrupt compressed body: {e}")
+            raise
+
+    def finish(self) -> Iterator[bytes]:
+        """Yields the last line, once the whole body was fed.
+
+        Raises:
+        -------
+            HttpError: If the compressed data is truncated (400)
+        """
+        if (self.__zlib is not None and not self.__zlib.eof) or (
+            self.__zstd is not None and not self.__zstd.eof
+        ):
+            raise HttpError(400, "Truncated compressed body")
+        if self.__pending:
+            yield self.__pending
+            self.__pending = b""
+
+    def __split(self, data: bytes) -> Iterator[bytes]:
+        if not data:
+            return
+        lines = (self.__pending + data).split(b"\n")
+        self.__pending = lines.pop()
+        if len(self.__pending) > self.max_line_size:
+            raise HttpError(413, "Record too large")
+        yield from lines
+
+
+class IngestReport:
+    """
+    Counts the accepted and rejected records of one ingest request.
+    """
+
+    __slots__ = ("accepted", "rejected", "out_of_scope", "errors", "line")
+
+    def __init__(self) -> None:
+        self.accepted = 0
+        self.rejected = 0
+        self.out_of_scope = 0
+        self.errors: list[str] = []
+        self.line = 0
+
+    def reject(self, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < INGEST_MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {self.line}: {reason}")
+
+    def as_dict(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "out_of_scope": self.out_of_scope,
+            "errors": self.errors,
+        }
+
+
+def parse_records(
+    lines: Iterable[bytes], project: str, received_at: float, report: IngestReport
+) -> Iterator[tuple]:
+    """Decodes NDJSON result records into database rows, counting invalid records in `report`.
+
+    Every record is a JSON object with a "type" and a "value" string, and an optional "scan_id".
+    Its other fields are stored as JSON in the `data` column.
+
+    Args:
+    -----
+        lines (Iterable[bytes]): NDJSON lines, blank lines are skipped.
+        project (str): The project the results belong to.
+        received_at (float): The `time.time()` value stored with every row.
+        report (IngestReport): Receives the rejected records.
+
+    Returns:
+    --------
+        Iterator[tuple]: `(project, scan_id, kind, value, data, received_at)` rows.
+    """
+    for line in lines:
+        report.line += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            kind = record.pop("type")
+            value = record.pop("value")
+        except ValueError:
+            report.reject("invalid JSON")
+            continue
+        except (KeyError, AttributeError, TypeError):
+            report.reject("expected an object with a 'type' and a 'value'")
+            continue
+        if not isinstance(kind, str) or not isinstance(value, str):
+            report.reject("'type' and 'value' must be strings")
+            continue
+        scan_id = record.pop("scan_id", None)
+        yield (
+            project,
+            None if scan_id is None else str(scan_id),
+            kind,
+            value,
+            json.dumps(record, separators=(",", ":")) if record else None,
+            received_at,
+        )
+
+
+class BatchWriter:
+    """
+    Hands batches of rows to the database thread. Once `max_pending` batches are queued,
+    `submit()` waits for the oldest to be written, which stops reading the request body
+    and lets TCP flow control slow the client down.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[list[tuple]], int],
+        executor: ThreadPoolExecutor,
+        max_pending: int = INGEST_MAX_PENDING_BATCHES,
+    ) -> None:
+        self.written = 0
+        self.__write = write
+        self.__executor = executor
+        self.__max_pending = max_pending
+        self.__pending: list[asyncio.Future] = []
+
+    async def submit(self, batch: list[tuple]) -> None:
+        if len(self.__pending) >= self.__max_pending:
+            self.written += await self.__pending.pop(0)
+        loop = asyncio.get_running_loop()
+        self.__pending.append(
+            loop.run_in_executor(self.__executor, self.__write, batch)
+        )
+
+    async def finish(self) -> int:
+        """Waits until every submitted batch is written.
+
+        Returns:
+        --------
+            int: The number of rows written.
+        """
+        pending, self.__pending = self.__pending, []
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            self.written += result
+        return self.written
+
+
+class IngestService:
+    """
+    Bulk result ingestion: `POST /projects/{project_id}/results` takes an NDJSON body, optionally
+    compressed (Content-Encoding: gzip, deflate or zstd) and usually sent with chunked transfer
+    encoding. The body is decoded chunk by chunk through a generator pipeline, and the rows are
+    written in transactions of `ingest_batch_size` rows by a single database thread.
+    Subscribers receive every committed batch on that thread, see `subscribe()`.
+    With a `scope`, the results out of the project's scope are counted but not stored.
+    """
+
+    CONFIG_FIELDS = frozenset({"ingest_batch_size"})
+
+    def __init__(
+        self,
+        write: Callable[[list[tuple]], int],
+        configuration: Configuration,
+        log_writer: LogWriter,
+        scope: Callable[[str], ScopeMatcher] | None = None,
+    ) -> None:
+        self.batch_size = configuration.ingest_batch_size
+        self.__write = write
+        self.__scope = scope
+        self.__log = log_writer.component("INGEST")
+        self.__executor = ThreadPoolExecutor(1, thread_name_prefix="jorkie-ingest")
+        self.__subscribers: list[Callable[[list[tuple]], None]] = []
+
+    def subscribe(self, callback: Callable[[list[tuple]], None]) -> None:
+        """Registers `callback(rows)` to be called with every batch of rows once it is committed.
+        Callbacks run on the database thread, in commit order.
+        """
+        self.__subscribers.append(callback)
+
+    def reconfigure(self, configuration: Configuration, changed: set[str]) -> None:
+        self.batch_size = configuration.ingest_batch_size
+
+    async def ingest(self, request: Request) -> Response:
+        project = request.params["project_id"]
+        encoding = request.headers.get("content-encoding", "identity").lower()
+        decoder = StreamDecoder(encoding)
+        report = IngestReport()
+        writer = BatchWriter(self.__write_batch, self.__executor)
+        received_at = time.time()
+        started = time.perf_counter()
+        batch_size = self.batch_size
+        batch: list[tuple] = []
+        scope = None
+        if self.__scope is not None:
+            # Compiling the scope may read the database, on the database thread.
+            scope = await asyncio.get_running_loop().run_in_executor(
+                self.__executor, self.__scope, project
+            )
+
+        async def submit(batch: list[tuple]) -> None:
+            if scope is not None:
+                in_scope = scope.filter(batch)
+                report.out_of_scope += len(batch) - len(in_scope)
+                batch = in_scope
+            if batch:
+                await writer.submit(batch)
+
+        try:
+            async for chunk in request.stream():
+                for row in parse_records(
+                    decoder.feed(chunk), project, received_at, report
+                ):
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        await submit(batch)
+                        batch = []
+            for row in parse_records(decoder.finish(), project, received_at, report):
+                batch.append(row)
+            if batch:
+                await submit(batch)
+        finally:
+            # Never answer while batches of this request are still being written.
+            try:
+                report.accepted = await writer.finish()
+            except Exception as e:
+                self.__log.error(
+                    "Failed to store results of project %s: %r", project, e
+                )
+                raise HttpError(500, "Failed to store the results")
+
+        self.__log.info(
+            "Ingested %d results of project %s in %.2f s (%d rejected, %d out of scope)",
+            report.accepted,
+            project,
+            time.perf_counter() - started,
+            report.rejected,
+            report.out_of_scope,
+        )
+        return Response.json(report.as_dict())
+
+    def submit(self, rows: list[tuple]) -> Future:
+        """Writes a batch of rows parsed elsewhere on the database thread, like the batches of
+        `ingest()`, returns the future number of rows written.
+        """
+        return self.__executor.submit(self.__write_batch, rows)
+
+    def stop(self) -> None:
+        self.__executor.shutdown()
+
+    def __write_batch(self, rows: list[tuple]) -> int:
+        written = self.__write(rows)
+        for callback in self.__subscribers:
+            try:
+                callback(rows)
+            except Exception as e:
+                self.__log.error("Ingest subscriber %r failed: %r", callback, e)
+        return written
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> IngestService:
+    """Adds the ingestion route to the API component, writing to the database component
+    the results in the scope of the scope service, if there is one.
+    """
+    scope = components.service(ScopeService)
+    service = IngestService(
+        components.db.insert_results,
+        configuration,
+        log_writer,
+        None if scope is None else scope.matcher,
+    )
+    components.api.route("POST", "/projects/{project_id}/results")(service.ingest)
+    return service
@@ -0,0 +1,124 @@
+from jorkieserver.api import Request, Response
+from jorkieserver.constants import METRICS_BATCH_BUCKETS
+from jorkieserver.ingest import IngestService
+from jorkieserver.logging import LogWriter
+from jorkieserver.metrics import COUNTER, HISTOGRAM, Family, Gauge, MetricsRegistry
+from jorkieserver.notifications import NotificationService
+from jorkieserver.query import QueryService
+from jorkieserver.types import Components, Configuration
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsService:
+    """
+    `GET /metrics` serves the metrics registry in the Prometheus text format, outside of the
+    versioned API prefix where scrapers expect it.
+    """
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+
+    async def metrics(self, request: Request) -> Response:
+        return Response(self.registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def instrument(components: Components, log_writer: LogWriter) -> None:
+    """Registers the metrics of the components and services in `components.metrics`."""
+    registry = components.metrics
+    registry.gauge(
+        "jorkie_log_queue_depth",
+        "Log records waiting to be written.",
+        function=lambda: log_writer.queue_depth,
+    )
+    registry.gauge(
+        "jorkie_log_dropped_records",
+        "Log records dropped by the log queue overflow policy.",
+        function=lambda: log_writer.dropped,
+    )
+    if components.api is not None:
+        registry.register(
+            "jorkie_api_request_duration_seconds",
+            HISTOGRAM,
+            "Time to handle and answer an API request, by route.",
+            Family("route", None, components.api.histograms),
+        )
+    if components.scheduler is not None:
+        registry.register(
+            "jorkie_scheduler_lag_seconds",
+            HISTOGRAM,
+            "Delay between the fire time of a schedule and its firing.",
+            components.scheduler.lag,
+        )
+    if components.dispatcher is not None:
+        dispatcher = components.dispatcher.dispatcher
+        registry.gauge(
+            "jorkie_dispatch_queued_jobs",
+            "Jobs waiting for a run slot.",
+            function=lambda: len(dispatcher),
+        )
+        registry.gauge(
+            "jorkie_dispatch_running_jobs",
+            "Jobs running.",
+            function=lambda: len(dispatcher.running),
+        )
+    ingest = components.service(IngestService)
+    if ingest is not None:
+        rows = registry.counter("jorkie_ingest_rows_total", "Rows ingested.")
+        batches = registry.histogram(
+            "jorkie_db_batch_rows",
+            "Rows written per ingest database transaction.",
+            METRICS_BATCH_BUCKETS,
+        )
+
+        # Called on the database thread, the only writer of these metrics.
+        def record_batch(written: list[tuple]) -> None:
+            rows.inc(len(written))
+            batches.observe(len(written))
+
+        ingest.subscribe(record_batch)
+    queries = components.service(QueryService)
+    if queries is not None:
+        cache = queries.cache
+        registry.gauge(
+            "jorkie_query_cache_entries",
+            "Query responses in the cache.",
+            function=lambda: len(cache),
+        )
+        # Counted by the cache, read when collected.
+        for key in ("hits", "misses"):
+            registry.register(
+                f"jorkie_query_cache_{key}_total",
+                COUNTER,
+                f"Query cache {key}.",
+                Gauge(lambda key=key: getattr(cache, key)),
+            )
+    notifications = components.service(NotificationService)
+    if notifications is not None:
+        for key, help in (
+            ("queued", "Notification events waiting to be sent."),
+            ("outbox", "Notifications waiting for delivery in the outbox."),
+        ):
+            registry.gauge(
+                f"jorkie_notifications_{key}",
+                help,
+                function=lambda key=key: notifications.stats()[key],
+            )
+        # Counted by the notification service, read when collected.
+        for key in ("delivered", "retried", "dropped"):
+            registry.register(
+                f"jorkie_notifications_{key}_total",
+                COUNTER,
+                f"Notifications {key}.",
+                Gauge(lambda key=key: getattr(notifications, key)),
+            )
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> MetricsService:
+    """Registers the metrics of the components, and adds the `/metrics` route to the API component."""
+    instrument(components, log_writer)
+    service = MetricsService(components.metrics)
+    components.api.router.add("GET", "/metrics", service.metrics)
+    return service
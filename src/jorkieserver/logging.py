@@ -1,24 +1,338 @@
+import atexit
+import json
 import logging
 import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
 from logging import Logger
+from typing import Callable, TextIO
 
+from jorkieserver.constants import (
+    LOG_FORMATS,
+    LOG_OVERFLOW_POLICIES,
+    DEFAULT_LOG_FORMAT,
+    DEFAULT_LOG_OVERFLOW_POLICY,
+    DEFAULT_LOG_QUEUE_SIZE,
+    DEFAULT_LOG_BATCH_SIZE,
+    DEFAULT_LOG_FLUSH_INTERVAL,
+    DEFAULT_LOG_SAMPLE_RATE,
+)
+from jorkieserver.rotation import RotatingLogFile
 from jorkieserver.utils import base64_encode, create_directory
 
+LOGGER_NAME = "jorkieserver"
+
+
+class LogQueue:
+    """
+    Bounded ring buffer holding log records until the `LogFlusher` thread writes them.
+
+    Each record is a `(created, level, prefix, component, message, agent_id, scan_id)` tuple.
+    When the buffer is full the `overflow_policy` decides what happens to a new record:
+
+        block:       the caller waits until the flush thread has made room.
+        drop-oldest: the oldest pending record is discarded.
+        sample:      only 1 in `sample_rate` overflowing records is kept (replacing the oldest).
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_LOG_QUEUE_SIZE,
+        overflow_policy: str = DEFAULT_LOG_OVERFLOW_POLICY,
+        sample_rate: int = DEFAULT_LOG_SAMPLE_RATE,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError(f"Invalid log queue capacity '{capacity}'.")
+        if overflow_policy not in LOG_OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid log overflow policy '{overflow_policy}'.")
+
+        self.capacity = capacity
+        self.overflow_policy = overflow_policy
+        self.sample_rate = max(1, sample_rate)
+        self.dropped = 0
+        self.closed = False
+        self.__records: deque = deque()
+        self.__overflowed = 0
+        self.__unfinished = 0
+        self.__lock = threading.Lock()
+        self.__not_empty = threading.Condition(self.__lock)
+        self.__not_full = threading.Condition(self.__lock)
+        self.__all_done = threading.Condition(self.__lock)
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    def put(self, record: tuple, force: bool = False) -> bool:
+        """Adds a record to the buffer, applying the overflow policy if the buffer is full.
+
+        Args:
+        -----
+            record (tuple): The `(created, level, prefix, component, message, agent_id, scan_id)` record to enqueue.
+            force (bool): Enqueue the record even if the buffer is full, bypassing the overflow policy.
+
+        Returns:
+        --------
+            bool: True if the record was accepted, false if it was dropped or the queue is closed.
+        """
+        with self.__lock:
+            if self.closed:
+                return False
+
+            if len(self.__records) >= self.capacity and not force:
+                match self.overflow_policy:
+                    case "block":
+                        while len(self.__records) >= self.capacity and not self.closed:
+                            self.__not_full.wait()
+                        if self.closed:
+                            return False
+                    case "drop-oldest":
+                        self.__discard_oldest()
+                    case "sample":
+                        self.__overflowed += 1
+                        if self.__overflowed % self.sample_rate:
+                            self.dropped += 1
+                            return False
+                        self.__discard_oldest()
+
+            self.__records.append(record)
+            self.__unfinished += 1
+            self.__not_empty.notify()
+            return True
+
+    def get_batch(self, max_records: int, timeout: float) -> list:
+        """Removes up to `max_records` records, waiting at most `timeout` seconds for the first one.
+
+        Args:
+        -----
+            max_records (int): The maximum number of records to return.
+            timeout (float): Seconds to wait when the buffer is empty.
+
+        Returns:
+        --------
+            list: The removed records, oldest first. Empty if the timeout elapsed.
+        """
+        with self.__lock:
+            if not self.__records and not self.closed:
+                self.__not_empty.wait(timeout)
+            count = min(max_records, len(self.__records))
+            batch = [self.__records.popleft() for _ in range(count)]
+            if batch:
+                self.__not_full.notify_all()
+            return batch
+
+    def task_done(self, count: int) -> None:
+        """Marks `count` records returned by `get_batch()` as written."""
+        with self.__lock:
+            self.__unfinished -= count
+            if self.__unfinished <= 0:
+                self.__unfinished = 0
+                self.__all_done.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Waits until every accepted record has been written.
+
+        Returns:
+        --------
+            bool: True if the buffer was fully flushed, false if the timeout elapsed first.
+        """
+        with self.__lock:
+            return self.__all_done.wait_for(lambda: self.__unfinished == 0, timeout)
+
+    def close(self) -> None:
+        """Stops accepting records and wakes up any waiting producers or consumers."""
+        with self.__lock:
+            self.closed = True
+            self.__not_empty.notify_all()
+            self.__not_full.notify_all()
+
+    def __discard_oldest(self) -> None:
+        # Caller must hold the lock.
+        self.__records.popleft()
+        self.__unfinished -= 1
+        self.dropped += 1
+
+
+class LogFlusher(threading.Thread):
+    """
+    Background thread that drains a `LogQueue` and writes each batch of records
+    to the log file under a single lock acquisition and to the console with a single write per stream.
+    """
+
+    def __init__(
+        self,
+        queue: LogQueue,
+        log_file: TextIO,
+        batch_size: int = DEFAULT_LOG_BATCH_SIZE,
+        flush_interval: float = DEFAULT_LOG_FLUSH_INTERVAL,
+        log_format: str = DEFAULT_LOG_FORMAT,
+    ) -> None:
+        super().__init__(name="jorkie-log-flusher", daemon=True)
+        self.queue = queue
+        self.log_file = log_file
+        self.format_line = (
+            format_json_line if log_format == "json" else format_text_line
+        )
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.__reported_drops = 0
+
+    def run(self) -> None:
+        while True:
+            batch = self.queue.get_batch(self.batch_size, self.flush_interval)
+            if batch:
+                self.write_batch(batch)
+                self.queue.task_done(len(batch))
+            elif self.queue.closed:
+                break
+
+    def write_batch(self, batch: list) -> None:
+        """Formats and writes a batch of records to the log file, STDOUT and STDERR.
+
+        Args:
+        -----
+            batch (list): `(created, level, prefix, component, message, agent_id, scan_id)` records, oldest first.
+        """
+        if self.queue.dropped != self.__reported_drops:
+            dropped = self.queue.dropped - self.__reported_drops
+            self.__reported_drops = self.queue.dropped
+            notice = f"{dropped} log records dropped (overflow policy: {self.queue.overflow_policy})."
+            batch = [
+                (
+                    time.time(),
+                    logging.ERROR,
+                    "ERROR: [COMPONENT: LOGGING] ",
+                    "LOGGING",
+                    notice,
+                    None,
+                    None,
+                ),
+                *batch,
+            ]
+
+        format_line = self.format_line
+        file_lines = []
+        stdout_lines = []
+        stderr_lines = []
+        for record in batch:
+            file_lines.append(format_line(record))
+            if record[1] >= logging.ERROR:
+                stderr_lines.append(f"{record[2]}{record[4]}\n")
+            else:
+                stdout_lines.append(f"{record[2]}{record[4]}\n")
+
+        try:
+            self.log_file.writelines(file_lines)
+            self.log_file.flush()
+        except (OSError, ValueError):
+            # The log file was closed or became unwritable, keep the console output going.
+            pass
+        if stdout_lines:
+            sys.stdout.write("".join(stdout_lines))
+            sys.stdout.flush()
+        if stderr_lines:
+            sys.stderr.write("".join(stderr_lines))
+            sys.stderr.flush()
+
+
+def format_timestamp(created: float) -> str:
+    """Formats a `time.time()` value the same way as `logging`'s default `%(asctime)s`."""
+    return f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))},{int(created % 1 * 1000):03d}"
+
+
+def format_text_line(record: tuple) -> str:
+    """Formats a queued record as a `"%(asctime)s - %(message)s"` log file line."""
+    return f"{format_timestamp(record[0])} - {record[2]}{record[4]}\n"
+
+
+def format_json_line(record: tuple) -> str:
+    """Formats a queued record as a JSON-lines log file line.
+
+    Fields:
+    -------
+        timestamp (str): ISO 8601 UTC timestamp with millisecond precision.
+        level (str): DEBUG, INFO, ERROR or CRITICAL.
+        component (str): The component that wrote the message.
+        message (str): The message without the level and component prefix.
+        agent_id (str | None): The agent the message relates to.
+        scan_id (str | None): The scan the message relates to.
+    """
+    created, level, _, component, message, agent_id, scan_id = record
+    return (
+        json.dumps(
+            {
+                "timestamp": datetime.fromtimestamp(created, timezone.utc).isoformat(
+                    timespec="milliseconds"
+                ),
+                "level": logging.getLevelName(level),
+                "component": component,
+                "message": message,
+                "agent_id": agent_id,
+                "scan_id": scan_id,
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+    )
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    `logging` formatter used in synchronous mode when the log format is "json".
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        return format_json_line(
+            (
+                record.created,
+                record.levelno,
+                "",
+                getattr(record, "component", record.name),
+                getattr(record, "body", None) or record.getMessage(),
+                getattr(record, "agent_id", None),
+                getattr(record, "scan_id", None),
+            )
+        )[:-1]
+
 
 class LogWriter:
     """
     Contains several merthods to log messages at different log levels.
+
+    When `async_mode` is enabled, records are placed on a bounded `LogQueue` and written
+    in batches by a `LogFlusher` thread instead of on the caller's thread.
+    When `log_format` is "json", the log file is written as JSON lines and every rotated
+    segment gets a sidecar index that `LogStore` uses to answer queries.
     """
 
-    def __init__(self, log_level: int, log_file: str, log_dir: str) -> None:
+    def __init__(
+        self,
+        log_level: int,
+        log_file: str,
+        log_dir: str,
+        async_mode: bool = False,
+        queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+        overflow_policy: str = DEFAULT_LOG_OVERFLOW_POLICY,
+        log_format: str = DEFAULT_LOG_FORMAT,
+    ) -> None:
         self.level = log_level
         self.file = log_file
+        self.async_mode = async_mode
+        self.format = log_format
         self.__log_dir = create_directory(log_dir, "LOGGING")
+        self.__queue: LogQueue | None = None
+        self.__flusher: LogFlusher | None = None
+        self.__queue_size = queue_size
+        self.__overflow_policy = overflow_policy
+        self.__components: dict[str, ComponentLogger] = {}
+        self.__log_file: RotatingLogFile | None = None
         self.logger = self.__init_logger()
 
     def __init_logger(self) -> Logger:
         """
         Initializes the logger with the specified log level and log file.
+        In async mode, the log queue and the flush thread are started instead of the root logging handler.
 
         Raises:
             FileNotFoundError: The log file could not be found
@@ -32,11 +346,31 @@ class LogWriter:
         """
         try:
             log_level = self.__get_log_level(self.level)
-            logging.basicConfig(
-                filename=self.file,
-                level=log_level,
-                format="%(asctime)s - %(message)s",
-            )
+            if self.format not in LOG_FORMATS:
+                raise ValueError(f"Invalid log format '{self.format}'.")
+            self.__log_file = RotatingLogFile(self.file)
+            if self.format == "json":
+                # Only the JSON format is indexed, the "text" format never loads the log store.
+                from jorkieserver.logstore import write_segment_index
+
+                self.__log_file.on_rotate = write_segment_index
+            if self.async_mode:
+                self.__init_async_logging()
+            else:
+                handler = logging.StreamHandler(self.__log_file)
+                if self.format == "json":
+                    handler.setFormatter(JsonLinesFormatter())
+                else:
+                    handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+                # A dedicated logger instead of `logging.basicConfig()`, which is a no-op
+                # whenever the root logger already has a handler.
+                logger = logging.getLogger(LOGGER_NAME)
+                for previous_handler in list(logger.handlers):
+                    logger.removeHandler(previous_handler)
+                logger.addHandler(handler)
+                logger.setLevel(log_level)
+                logger.propagate = False
+            atexit.register(self.close)
         except FileNotFoundError:
             print(
                 f"FATAL: [COMPONENT: LOGGING] The log file '{self.file}' could not be found.",
@@ -51,7 +385,7 @@ class LogWriter:
             sys.exit(1)
         except ValueError:
             print(
-                f"FATAL: [COMPONENT: LOGGING] Invalid log level '{self.level}'.",
+                f"FATAL: [COMPONENT: LOGGING] Invalid log level '{self.level}', log format or log queue settings.",
                 file=sys.stderr,
             )
             sys.exit(1)
@@ -61,7 +395,7 @@ class LogWriter:
                 file=sys.stderr,
             )
             print(
-                f"FATAL: [COMPONENT: LOGGING] Exception Details (base64 encoded): {base64_encode(str(e), "LOGGING")}",
+                f"FATAL: [COMPONENT: LOGGING] Exception Details (base64 encoded): {base64_encode(str(e), 'LOGGING')}",
                 file=sys.stderr,
             )
             print(
@@ -69,68 +403,249 @@ class LogWriter:
             )
             sys.exit(1)
 
-        return logging.getLogger()
+        return logging.getLogger(LOGGER_NAME)
+
+    def __init_async_logging(self) -> None:
+        """Creates the log queue and starts the flush thread."""
+        self.__queue = LogQueue(self.__queue_size, self.__overflow_policy)
+        self.__flusher = LogFlusher(
+            self.__queue, self.__log_file, log_format=self.format
+        )
+        self.__flusher.start()
+
+    @property
+    def log_dir(self) -> str:
+        """The directory of the log files."""
+        return self.__log_dir
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of records waiting to be written, always 0 in synchronous mode."""
+        return 0 if self.__queue is None else len(self.__queue)
+
+    @property
+    def dropped(self) -> int:
+        """Number of records dropped by the overflow policy of the log queue."""
+        return 0 if self.__queue is None else self.__queue.dropped
+
+    def configure_rotation(
+        self, max_bytes: int, interval: int, retention: int, compression: str
+    ) -> None:
+        """Applies the log rotation settings from the configuration file to the log file.
+
+        Args:
+        -----
+            max_bytes (int): Rotate once the log file would exceed this size, 0 disables size-based rotation.
+            interval (int): Rotate once the log file is older than this many seconds, 0 disables time-based rotation.
+            retention (int): Number of rotated segments to keep, 0 keeps every segment.
+            compression (str): Compression of rotated segments ("none", "gzip" or "zstd").
+        """
+        try:
+            self.__log_file.configure(max_bytes, interval, retention, compression)
+        except ValueError as e:
+            self.error("Invalid log rotation settings: %s", "LOGGING", e)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Blocks until every queued record has been written. A no-op in synchronous mode.
+
+        Args:
+        -----
+            timeout (float | None): Maximum number of seconds to wait, or None to wait indefinitely.
+
+        Returns:
+        --------
+            bool: True if all records were written, false if the timeout elapsed first.
+        """
+        if self.__queue is None:
+            return True
+        return self.__queue.join(timeout)
+
+    def close(self) -> None:
+        """Flushes all queued records, stops the flush thread, closes the log file
+        and waits for rotated segments to be compressed."""
+        if self.__queue is not None and self.__flusher is not None:
+            self.__queue.close()
+            self.__flusher.join()
+        if self.__log_file is not None:
+            self.__log_file.close()
+        atexit.unregister(self.close)
+
+    def emit(
+        self,
+        level: int,
+        prefix: str,
+        component: str,
+        message: str,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+        force: bool = False,
+    ) -> None:
+        """Queues (async mode) or writes (sync mode) an already formatted message.
+        Callers are expected to have checked the log level first.
+
+        Args:
+        -----
+            level (int): The `logging` level of the message (`logging.DEBUG` ... `logging.CRITICAL`).
+            prefix (str): The level and component prefix of text lines, e.g. "INFO: [COMPONENT: API] ".
+            component (str): The component that wrote the message.
+            message (str): The formatted message, without the prefix.
+            agent_id (str | None): The agent the message relates to, if any.
+            scan_id (str | None): The scan the message relates to, if any.
+            force (bool): Bypass the async overflow policy, used for critical messages.
+        """
+        if self.__queue is not None:
+            if not self.__queue.closed:
+                # Records rejected by the overflow policy are counted and reported by the flush thread.
+                self.__queue.put(
+                    (time.time(), level, prefix, component, message, agent_id, scan_id),
+                    force,
+                )
+            else:
+                # The flush thread has been stopped, only the console is still available.
+                print(
+                    prefix + message,
+                    file=sys.stderr if level >= logging.ERROR else sys.stdout,
+                )
+            return
+        line = prefix + message
+        self.logger.log(
+            level,
+            line,
+            extra={
+                "component": component,
+                "body": message,
+                "agent_id": agent_id,
+                "scan_id": scan_id,
+            },
+        )
+        print(line, file=sys.stderr if level >= logging.ERROR else sys.stdout)
+
+    def set_level(self, log_level: int) -> None:
+        """Changes the log level (0=DEBUG, 1=INFO, 2=ERROR, 3=CRITICAL) of a running LogWriter."""
+        self.level = log_level
+        self.logger.setLevel(self.__get_log_level(log_level))
+
+    def component(self, component: str) -> "ComponentLogger":
+        """Returns the cached `ComponentLogger` bound to `component`, creating it on first use.
+
+        Args:
+        -----
+            component (str): The name of the component, e.g. "CONFIGURATOR".
+
+        Returns:
+        --------
+            ComponentLogger: Logger with the level and component prefixes already built.
+        """
+        try:
+            return self.__components[component]
+        except KeyError:
+            component_logger = ComponentLogger(self, component)
+            self.__components[component] = component_logger
+            return component_logger
 
-    def debug(self, message: str, component: str) -> None:
+    def debug(
+        self,
+        message: str | Callable[[], str],
+        component: str,
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ) -> None:
         """Verifies that the log level is equal to 0 (DEBUG).
         If the current log level is equal to 0 (DEBUG), then a log entry is written to the log file and a message is printed to STDOUT.
+        The message is only formatted once the level check has passed.
 
 
         Args:
         -----
-            message (str): debug message
+            message (str | Callable[[], str]): debug message, `%`-style template, or callable returning the message
             component (str): The component that called `debug()` function
+            *args: Values substituted into the `message` template
+            agent_id (str | None): The agent the message relates to, if any
+            scan_id (str | None): The scan the message relates to, if any
         """
         if self.level == 0:
-            message = f"DEBUG: [COMPONENT: {component}] {message}"
-            self.logger.debug(message)
-            print(message, file=sys.stdout)
+            self.component(component).debug(
+                message, *args, agent_id=agent_id, scan_id=scan_id
+            )
 
-    def info(self, message: str, component: str) -> None:
+    def info(
+        self,
+        message: str | Callable[[], str],
+        component: str,
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ) -> None:
         """Verifies that the log level is less than or equal to 1 (INFO).
         If the current log level is less than or equal to 1 (INFO), then a log entry is written to the log file and a message is printed to STDOUT.
+        The message is only formatted once the level check has passed.
 
 
         Args:
         -----
-            message: info message
+            message: info message, `%`-style template, or callable returning the message
             component (str): The component that called `info()` function
+            *args: Values substituted into the `message` template
+            agent_id (str | None): The agent the message relates to, if any
+            scan_id (str | None): The scan the message relates to, if any
         """
         if self.level <= 1:
-            message = f"INFO: [COMPONENT: {component}] {message}"
-            self.logger.info(message)
-            print(message, file=sys.stdout)
+            self.component(component).info(
+                message, *args, agent_id=agent_id, scan_id=scan_id
+            )
 
-    def error(self, message: str, component: str):
+    def error(
+        self,
+        message: str | Callable[[], str],
+        component: str,
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ):
         """Verifies that the log level is less than or equal to 2 (ERROR).
         If the current log level is less than or equal to 2 (ERROR), then a log entry is written to the log file and a message is printed to STDERR.
+        The message is only formatted once the level check has passed.
 
 
         Args:
         -----
-            message: error message
+            message: error message, `%`-style template, or callable returning the message
             component (str): The component that called `error()` function
+            *args: Values substituted into the `message` template
+            agent_id (str | None): The agent the message relates to, if any
+            scan_id (str | None): The scan the message relates to, if any
         """
         if self.level <= 2:
-            message = f"ERROR: [COMPONENT: {component}] {message}"
-            self.logger.error(message)
-            print(message, file=sys.stderr)
+            self.component(component).error(
+                message, *args, agent_id=agent_id, scan_id=scan_id
+            )
 
-    def critical(self, message: str, component: str):
+    def critical(
+        self,
+        message: str | Callable[[], str],
+        component: str,
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ):
         """Verifies that the log level is less than or equal to 3 (CRITICAL).
         If the current log level is less than or equal to 3 (CRITICAL), then a log entry is written to the log file, a message is printed to STDERR, and the application exits with an exit status of 1.
+        In async mode, every pending record is flushed before exiting.
 
 
         Args:
         -----
-            message: critical message
+            message: critical message, `%`-style template, or callable returning the message
             component (str): The component that called `critical()` function
+            *args: Values substituted into the `message` template
+            agent_id (str | None): The agent the message relates to, if any
+            scan_id (str | None): The scan the message relates to, if any
         """
         if self.level <= 3:
-            message = f"CRITICAL: [COMPONENT: {component}] {message} - Exiting."
-            print(message, file=sys.stderr)
-            self.logger.critical(message)
-            sys.exit(1)
+            self.component(component).critical(
+                message, *args, agent_id=agent_id, scan_id=scan_id
+            )
 
     def __get_log_level(self, log_level: int):
         match log_level:
@@ -144,3 +659,121 @@ class LogWriter:
                 return logging.CRITICAL
             case _:
                 return logging.DEBUG
+
+
+def render_message(message: str | Callable[[], str], args: tuple) -> str:
+    """Builds the final message text from a template and its arguments, or from a callable.
+
+    Args:
+    -----
+        message (str | Callable[[], str]): A plain message, a `%`-style template, or a callable returning the message.
+        args (tuple): Values substituted into the template. Ignored if empty.
+
+    Returns:
+    --------
+        str: The formatted message.
+    """
+    if callable(message):
+        message = message()
+    if args:
+        return message % args
+    return message
+
+
+class ComponentLogger:
+    """
+    A `LogWriter` bound to a single component.
+    The level and component prefixes are built once, so a call only pays for the level check
+    and, if the level is enabled, for formatting the message itself.
+
+    Obtain instances through `LogWriter.component()` rather than creating them directly.
+    """
+
+    __slots__ = (
+        "writer",
+        "component",
+        "debug_prefix",
+        "info_prefix",
+        "error_prefix",
+        "critical_prefix",
+    )
+
+    def __init__(self, writer: LogWriter, component: str) -> None:
+        self.writer = writer
+        self.component = component
+        self.debug_prefix = f"DEBUG: [COMPONENT: {component}] "
+        self.info_prefix = f"INFO: [COMPONENT: {component}] "
+        self.error_prefix = f"ERROR: [COMPONENT: {component}] "
+        self.critical_prefix = f"CRITICAL: [COMPONENT: {component}] "
+
+    def debug(
+        self,
+        message: str | Callable[[], str],
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ) -> None:
+        if self.writer.level == 0:
+            self.writer.emit(
+                logging.DEBUG,
+                self.debug_prefix,
+                self.component,
+                render_message(message, args),
+                agent_id,
+                scan_id,
+            )
+
+    def info(
+        self,
+        message: str | Callable[[], str],
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ) -> None:
+        if self.writer.level <= 1:
+            self.writer.emit(
+                logging.INFO,
+                self.info_prefix,
+                self.component,
+                render_message(message, args),
+                agent_id,
+                scan_id,
+            )
+
+    def error(
+        self,
+        message: str | Callable[[], str],
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ) -> None:
+        if self.writer.level <= 2:
+            self.writer.emit(
+                logging.ERROR,
+                self.error_prefix,
+                self.component,
+                render_message(message, args),
+                agent_id,
+                scan_id,
+            )
+
+    def critical(
+        self,
+        message: str | Callable[[], str],
+        *args,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+    ) -> None:
+        """Writes a critical message, flushes any queued records and exits with an exit status of 1."""
+        if self.writer.level <= 3:
+            self.writer.emit(
+                logging.CRITICAL,
+                self.critical_prefix,
+                self.component,
+                f"{render_message(message, args)} - Exiting.",
+                agent_id,
+                scan_id,
+                force=True,
+            )
+            self.writer.close()
+            sys.exit(1)
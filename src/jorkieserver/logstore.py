@@ -0,0 +1,294 @@
+import gzip
+import json
+import mmap
+import os
+from datetime import datetime
+from typing import BinaryIO, Iterator
+
+from jorkieserver.constants import DEFAULT_LOG_INDEX_BLOCK_SIZE
+from jorkieserver.rotation import INDEX_SUFFIX, list_segments, zstandard
+
+LOG_INDEX_VERSION = 1
+INDEXED_FIELDS = {
+    "components": "component",
+    "levels": "level",
+    "agents": "agent_id",
+    "scans": "scan_id",
+}
+
+
+def open_segment(segment_path: str) -> BinaryIO:
+    """Opens a plain, gzip or zstd log segment for binary reading.
+
+    Args:
+    -----
+        segment_path (str): The path of the log segment.
+
+    Returns:
+    --------
+        BinaryIO: A readable (and forward-seekable) file object yielding the uncompressed contents.
+
+    Raises:
+    -------
+        RuntimeError: If the segment is compressed with zstd and `zstandard` is not installed
+    """
+    if segment_path.endswith(".gz"):
+        return gzip.open(segment_path, "rb")
+    if segment_path.endswith(".zst"):
+        # Segments rotated while it was installed, rotation now falls back to gzip.
+        if zstandard is None:
+            raise RuntimeError(
+                f"Cannot read the log segment {segment_path}: "
+                "the zstandard package is not installed"
+            )
+        return zstandard.ZstdDecompressor().stream_reader(open(segment_path, "rb"))
+    return open(segment_path, "rb")
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """Converts the ISO 8601 `timestamp` field of a JSON log line to a `time.time()` value."""
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def build_segment_index(
+    segment_path: str, block_size: int = DEFAULT_LOG_INDEX_BLOCK_SIZE
+) -> dict:
+    """Scans a JSON-lines log segment once and builds its index.
+
+    The segment is split into blocks of about `block_size` bytes on line boundaries.
+    Each block is stored as `[start offset, end offset, first timestamp, last timestamp]`,
+    and every indexed field maps each of its values to the ids of the blocks containing it.
+    Lines that are not JSON (e.g. written in the "text" format) are skipped.
+
+    Args:
+    -----
+        segment_path (str): The path of the log segment.
+        block_size (int): Approximate number of bytes covered by one block.
+
+    Returns:
+    --------
+        dict: The segment index.
+    """
+    blocks: list[list] = []
+    postings: dict[str, dict[str, list[int]]] = {key: {} for key in INDEXED_FIELDS}
+    offset = 0
+    with open_segment(segment_path) as segment:
+        for line in segment:
+            if not blocks or offset - blocks[-1][0] >= block_size:
+                if blocks:
+                    blocks[-1][1] = offset
+                blocks.append([offset, offset, None, None])
+            block_id = len(blocks) - 1
+            block = blocks[-1]
+            offset += len(line)
+
+            try:
+                entry = json.loads(line)
+                created = parse_timestamp(entry["timestamp"])
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            if block[2] is None or created < block[2]:
+                block[2] = created
+            if block[3] is None or created > block[3]:
+                block[3] = created
+            for key, field in INDEXED_FIELDS.items():
+                value = entry.get(field)
+                if value is None:
+                    continue
+                block_ids = postings[key].setdefault(str(value), [])
+                if not block_ids or block_ids[-1] != block_id:
+                    block_ids.append(block_id)
+    if blocks:
+        blocks[-1][1] = offset
+
+    first_timestamps = [block[2] for block in blocks if block[2] is not None]
+    last_timestamps = [block[3] for block in blocks if block[3] is not None]
+    return {
+        "version": LOG_INDEX_VERSION,
+        "start": min(first_timestamps, default=None),
+        "end": max(last_timestamps, default=None),
+        "size": offset,
+        "blocks": blocks,
+        **postings,
+    }
+
+
+def index_path_for(segment_path: str) -> str:
+    """Returns the sidecar index path of a segment, regardless of its compression suffix."""
+    for suffix in (".gz", ".zst"):
+        if segment_path.endswith(suffix):
+            segment_path = segment_path[: -len(suffix)]
+    return segment_path + INDEX_SUFFIX
+
+
+def write_segment_index(segment_path: str) -> None:
+    """Builds the index of a rotated, uncompressed segment and writes it next to the segment.
+    Used as the `RotatingLogFile.on_rotate` hook when logging in the "json" format.
+
+    Args:
+    -----
+        segment_path (str): The path of the rotated segment.
+    """
+    index = build_segment_index(segment_path)
+    index_path = index_path_for(segment_path)
+    with open(index_path + ".tmp", "w") as index_file:
+        json.dump(index, index_file, separators=(",", ":"))
+    os.replace(index_path + ".tmp", index_path)
+
+
+def load_segment_index(segment_path: str) -> dict | None:
+    """Reads the sidecar index of a segment.
+
+    Returns:
+    --------
+        dict | None: The segment index, or None if it is missing, unreadable or of another version.
+    """
+    try:
+        with open(index_path_for(segment_path)) as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != LOG_INDEX_VERSION:
+        return None
+    return index
+
+
+class LogStore:
+    """
+    Query API over a JSON-lines log file and its rotated segments.
+
+    Rotated segments are searched through their sidecar index: segments outside the requested
+    time range are skipped entirely, and only the blocks that contain the requested component,
+    level, agent or scan are read. Uncompressed segments are read through `mmap`, compressed
+    segments are decompressed up to the last matching block. The active log file has no sidecar
+    index yet, so it is indexed in memory on every query.
+    """
+
+    def __init__(self, log_file_path: str) -> None:
+        self.log_file_path = log_file_path
+
+    def query(
+        self,
+        component: str | None = None,
+        level: str | None = None,
+        agent_id: str | None = None,
+        scan_id: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> Iterator[dict]:
+        """Yields the log entries matching every given filter, oldest segment first.
+
+        Args:
+        -----
+            component (str | None): Only entries written by this component.
+            level (str | None): Only entries of this level, e.g. "ERROR".
+            agent_id (str | None): Only entries related to this agent.
+            scan_id (str | None): Only entries related to this scan.
+            since (float | None): Only entries written at or after this `time.time()` value.
+            until (float | None): Only entries written at or before this `time.time()` value.
+
+        Returns:
+        --------
+            Iterator[dict]: The decoded JSON log entries.
+        """
+        filters = {
+            "components": component,
+            "levels": level,
+            "agents": agent_id,
+            "scans": scan_id,
+        }
+        for segment_path in self.segments():
+            index = load_segment_index(segment_path)
+            if index is None:
+                index = build_segment_index(segment_path)
+            if not self.__in_time_range(index["start"], index["end"], since, until):
+                continue
+            block_ids = self.__select_blocks(index, filters, since, until)
+            if not block_ids:
+                continue
+            ranges = [index["blocks"][block_id][:2] for block_id in block_ids]
+            for chunk in self.__read_ranges(segment_path, ranges):
+                for line in chunk.splitlines():
+                    entry = self.__match(line, filters, since, until)
+                    if entry is not None:
+                        yield entry
+
+    def segments(self) -> list[str]:
+        """Returns the rotated segments followed by the active log file, oldest first."""
+        segment_paths = [path for _, path in list_segments(self.log_file_path)]
+        if os.path.exists(self.log_file_path):
+            segment_paths.append(self.log_file_path)
+        return segment_paths
+
+    def __select_blocks(
+        self,
+        index: dict,
+        filters: dict,
+        since: float | None,
+        until: float | None,
+    ) -> list[int]:
+        candidates: set[int] | None = None
+        for key, value in filters.items():
+            if value is None:
+                continue
+            block_ids = set(index[key].get(str(value), ()))
+            candidates = block_ids if candidates is None else candidates & block_ids
+        if candidates is None:
+            candidates = set(range(len(index["blocks"])))
+        return sorted(
+            block_id
+            for block_id in candidates
+            if self.__in_time_range(
+                index["blocks"][block_id][2], index["blocks"][block_id][3], since, until
+            )
+        )
+
+    def __read_ranges(
+        self, segment_path: str, ranges: list[list[int]]
+    ) -> Iterator[bytes]:
+        if segment_path.endswith((".gz", ".zst")):
+            with open_segment(segment_path) as segment:
+                for start, end in ranges:
+                    segment.seek(start)
+                    yield segment.read(end - start)
+            return
+
+        with open(segment_path, "rb") as segment:
+            if os.fstat(segment.fileno()).st_size == 0:
+                return
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for start, end in ranges:
+                    yield mapped[start:end]
+
+    def __match(
+        self, line: bytes, filters: dict, since: float | None, until: float | None
+    ) -> dict | None:
+        try:
+            entry = json.loads(line)
+            created = parse_timestamp(entry["timestamp"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        for key, field in INDEXED_FIELDS.items():
+            if filters[key] is not None and str(entry.get(field)) != str(filters[key]):
+                return None
+        if since is not None and created < since:
+            return None
+        if until is not None and created > until:
+            return None
+        return entry
+
+    @staticmethod
+    def __in_time_range(
+        start: float | None,
+        end: float | None,
+        since: float | None,
+        until: float | None,
+    ) -> bool:
+        if start is None or end is None:
+            return False
+        if since is not None and end < since:
+            return False
+        if until is not None and start > until:
+            return False
+        return True
@@ -0,0 +1,413 @@
+import heapq
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Callable, Iterable, Iterator
+from urllib.parse import quote
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.assets import AssetStore
+from jorkieserver.constants import (
+    MEMBERSHIP_BITS_PER_ASSET,
+    MEMBERSHIP_DIFF_TTL,
+    MEMBERSHIP_FLUSH_THRESHOLD,
+    QUERY_MAX_PAGE_SIZE,
+    QUERY_PAGE_SIZE,
+)
+from jorkieserver.db import asset_hash
+from jorkieserver.ingest import IngestService
+from jorkieserver.logging import LogWriter
+from jorkieserver.snapshot import SnapshotService
+from jorkieserver.types import Components, Configuration
+from jorkieserver.utils import create_directory
+
+BLOOM_HEADER = struct.Struct("<8sQQ")  # magic, capacity, count
+BLOOM_MAGIC = b"JKBLOOM1"
+UNSIGNED_64 = (1 << 64) - 1
+SIGNED_OFFSET = 1 << 63
+WRITE_CHUNK = 1 << 20  # Hashes written at once when merging a sorted set
+
+
+class BloomFilter:
+    """
+    Blocked Bloom filter over 64-bit asset hashes. The high half of a hash selects one 64-bit word,
+    five 6-bit fields of the low half select the bits set in it, so a check is a single array
+    access and mask comparison. There are no false negatives.
+    """
+
+    __slots__ = ("capacity", "count", "words")
+
+    def __init__(
+        self, capacity: int, words: array | None = None, count: int = 0
+    ) -> None:
+        self.capacity = capacity
+        self.count = count
+        if words is None:
+            words = array(
+                "Q", bytes(8 * max(1, capacity * MEMBERSHIP_BITS_PER_ASSET // 64))
+            )
+        self.words = words
+
+    def add(self, hash_: int) -> None:
+        hash_ &= UNSIGNED_64
+        self.words[(hash_ >> 32) % len(self.words)] |= (
+            1 << (hash_ & 63)
+            | 1 << (hash_ >> 6 & 63)
+            | 1 << (hash_ >> 12 & 63)
+            | 1 << (hash_ >> 18 & 63)
+            | 1 << (hash_ >> 24 & 63)
+        )
+        self.count += 1
+
+    def might_contain(self, hash_: int) -> bool:
+        hash_ &= UNSIGNED_64
+        mask = (
+            1 << (hash_ & 63)
+            | 1 << (hash_ >> 6 & 63)
+            | 1 << (hash_ >> 12 & 63)
+            | 1 << (hash_ >> 18 & 63)
+            | 1 << (hash_ >> 24 & 63)
+        )
+        return self.words[(hash_ >> 32) % len(self.words)] & mask == mask
+
+    def save(self, path: str) -> None:
+        with open(path + ".tmp", "wb") as file:
+            file.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.capacity, self.count))
+            self.words.tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter | None":
+        """Returns the filter saved at `path`, or None if it is missing or not valid."""
+        try:
+            with open(path, "rb") as file:
+                magic, capacity, count = BLOOM_HEADER.unpack(
+                    file.read(BLOOM_HEADER.size)
+                )
+                words = array("Q")
+                words.frombytes(file.read())
+        except (OSError, struct.error, ValueError):
+            return None
+        if magic != BLOOM_MAGIC or not words:
+            return None
+        return cls(capacity, words, count)
+
+
+class SortedHashSet:
+    """
+    Immutable set of 64-bit hashes, stored sorted in a file and read through `mmap`, so only the
+    pages that are probed are loaded. A fence table of up to 2¹⁶ buckets, indexed by the top bits
+    of a hash, narrows each lookup to a binary search over about 64 hashes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.__file = None
+        self.__mmap = None
+        self.__values: memoryview | array = array("q")
+        if os.path.exists(path) and os.path.getsize(path) >= 8:
+            self.__file = open(path, "rb")
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__values = memoryview(self.__mmap).cast("q")
+        count = len(self.__values)
+        bits = min(16, (count // 64).bit_length())
+        self.__shift = 64 - bits
+        self.__fences = array(
+            "q",
+            (
+                bisect_left(self.__values, (bucket << self.__shift) - SIGNED_OFFSET)
+                for bucket in range(1 << bits)
+            ),
+        )
+        self.__fences.append(count)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.__values)
+
+    def __contains__(self, hash_: int) -> bool:
+        bucket = (hash_ + SIGNED_OFFSET) >> self.__shift
+        end = self.__fences[bucket + 1]
+        index = bisect_left(self.__values, hash_, self.__fences[bucket], end)
+        return index < end and self.__values[index] == hash_
+
+    def close(self) -> None:
+        if self.__mmap is not None:
+            self.__values.release()
+            self.__mmap.close()
+            self.__file.close()
+            self.__mmap = None
+
+    @staticmethod
+    def write(path: str, hashes: Iterable[int]) -> None:
+        """Atomically replaces the file at `path` with `hashes`, which must be sorted."""
+        with open(path + ".tmp", "wb") as file:
+            chunk = array("q")
+            for hash_ in hashes:
+                chunk.append(hash_)
+                if len(chunk) >= WRITE_CHUNK:
+                    chunk.tofile(file)
+                    chunk = array("q")
+            chunk.tofile(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+
+class ProjectMembership:
+    """
+    The assets a project has already seen. Recently added hashes are kept in a set in memory,
+    older ones in a `SortedHashSet` file, and a `BloomFilter` over both answers "new" for most
+    new assets without touching either. `flush()` merges the recent hashes into the file.
+    """
+
+    def __init__(self, directory: str, project: str) -> None:
+        base = os.path.join(directory, quote(project, safe=""))
+        self.directory = directory
+        self.set_path = base + ".set"
+        self.bloom_path = base + ".bloom"
+        self.__sorted = SortedHashSet(self.set_path)
+        self.__added: set[int] = set()
+        bloom = BloomFilter.load(self.bloom_path)
+        if bloom is None or bloom.count != len(self.__sorted):
+            bloom = self.__build_bloom(max(1024, 2 * len(self.__sorted)))
+        self.__bloom = bloom
+
+    def __len__(self) -> int:
+        return len(self.__sorted) + len(self.__added)
+
+    def __contains__(self, hash_: int) -> bool:
+        return self.__bloom.might_contain(hash_) and (
+            hash_ in self.__added or hash_ in self.__sorted
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of hashes not merged into the sorted file yet."""
+        return len(self.__added)
+
+    def classify(self, hash_: int) -> bool:
+        """Records an asset hash.
+
+        Returns:
+        --------
+            bool: True if the project had never seen it.
+        """
+        if hash_ in self:
+            return False
+        self.__added.add(hash_)
+        if self.__bloom.count >= self.__bloom.capacity:
+            self.__bloom = self.__build_bloom(2 * self.__bloom.capacity)
+        else:
+            self.__bloom.add(hash_)
+        return True
+
+    def flush(self) -> None:
+        """Merges the recent hashes into the sorted file, and saves the Bloom filter."""
+        if not self.__added and os.path.exists(self.bloom_path):
+            return
+        create_directory(self.directory, "MEMBERSHIP")
+        merged = heapq.merge(iter(self.__sorted), sorted(self.__added))
+        SortedHashSet.write(self.set_path, merged)
+        self.__sorted.close()
+        self.__sorted = SortedHashSet(self.set_path)
+        self.__added.clear()
+        self.__bloom.save(self.bloom_path)
+
+    def close(self) -> None:
+        self.__sorted.close()
+
+    def __build_bloom(self, capacity: int) -> BloomFilter:
+        bloom = BloomFilter(capacity)
+        for hash_ in self.__sorted:
+            bloom.add(hash_)
+        for hash_ in self.__added:
+            bloom.add(hash_)
+        return bloom
+
+
+class MembershipStore:
+    """
+    Classifies ingested results as new or known discoveries of their project, while they are ingested,
+    and keeps the new assets of every scan so its diff is ready as soon as the scan ends. A scan can
+    discover millions of assets, its diff is held in a compact `AssetStore`.
+    A scan ends with `finish_scan()`, when it is compacted into a snapshot. The diff of a scan that
+    is never compacted is dropped `diff_ttl` seconds after its last result, and results without a
+    scan have no diff.
+    Projects are loaded on first use from `directory`, where their membership files are persisted.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        log_writer: LogWriter,
+        flush_threshold: int = MEMBERSHIP_FLUSH_THRESHOLD,
+        diff_ttl: float = MEMBERSHIP_DIFF_TTL,
+    ) -> None:
+        self.directory = directory
+        self.flush_threshold = flush_threshold
+        self.diff_ttl = diff_ttl
+        self.__log = log_writer.component("MEMBERSHIP")
+        self.__projects: dict[str, ProjectMembership] = {}
+        # By time of their last result, the least recently observed first.
+        self.__diffs: dict[tuple[str, str], tuple[AssetStore, float]] = {}
+        self.__lock = threading.Lock()
+        self.__subscribers: list[
+            Callable[[str, str | None, list[tuple[str, str]]], None]
+        ] = []
+
+    def subscribe(
+        self, callback: Callable[[str, str | None, list[tuple[str, str]]], None]
+    ) -> None:
+        """Registers `callback(project, scan_id, assets)` to be called with the `(kind, value)`
+        assets first discovered by every ingested batch, on the ingesting thread.
+        """
+        self.__subscribers.append(callback)
+
+    def project(self, project: str) -> ProjectMembership:
+        membership = self.__projects.get(project)
+        if membership is None:
+            membership = self.__projects[project] = ProjectMembership(
+                self.directory, project
+            )
+        return membership
+
+    def classify(self, project: str, kind: str, value: str) -> bool:
+        """Records an asset of a project, returns True if it is a new discovery."""
+        with self.__lock:
+            return self.project(project).classify(asset_hash(kind, value))
+
+    def observe(self, rows: list[tuple]) -> None:
+        """Classifies a batch of ingested `(project, scan_id, kind, value, data, received_at)` rows,
+        see `IngestService.subscribe()`.
+        """
+        discovered: dict[tuple[str, str | None], list[tuple[str, str]]] = {}
+        now = time.monotonic()
+        with self.__lock:
+            touched = set()
+            scans = set()
+            for project, scan_id, kind, value, _, received_at in rows:
+                membership = self.__projects.get(project) or self.project(project)
+                if scan_id is not None:
+                    scans.add((project, scan_id))
+                if membership.classify(asset_hash(kind, value)):
+                    discovered.setdefault((project, scan_id), []).append((kind, value))
+                    if scan_id is not None:
+                        diff, _ = self.__diffs.get((project, scan_id), (None, None))
+                        if diff is None:
+                            diff = AssetStore()
+                            self.__diffs[(project, scan_id)] = (diff, now)
+                        diff.add(kind, value, seen_at=received_at)
+                touched.add(membership)
+            for membership in touched:
+                if membership.pending >= self.flush_threshold:
+                    membership.flush()
+            # A scan sending known assets only is still running.
+            for key in scans:
+                entry = self.__diffs.pop(key, None)
+                if entry is not None:
+                    self.__diffs[key] = (entry[0], now)
+            expired = []
+            for key, (_, observed_at) in self.__diffs.items():
+                if observed_at > now - self.diff_ttl:
+                    break
+                expired.append(key)
+        for project, scan_id in expired:
+            self.finish_scan(project, scan_id)
+        for (project, scan_id), assets in discovered.items():
+            for callback in self.__subscribers:
+                try:
+                    callback(project, scan_id, assets)
+                except Exception as e:
+                    self.__log.error("Membership subscriber %r failed: %r", callback, e)
+
+    def scan_diff(
+        self, project: str, scan_id: str, after: int = 0, limit: int = QUERY_PAGE_SIZE
+    ) -> list[tuple[str, str]]:
+        """Returns up to `limit` of the `(kind, value)` assets first discovered by a scan so far,
+        from the `after`-th one, in discovery order.
+        """
+        with self.__lock:
+            diff, _ = self.__diffs.get((project, scan_id), (None, None))
+            if diff is None:
+                return []
+            return [
+                (diff.kind(row), diff.value(row))
+                for row in range(after, min(len(diff), after + limit))
+            ]
+
+    def finish_scan(self, project: str, scan_id: str) -> AssetStore:
+        """Returns the assets first discovered by a finished scan, forgets its diff and persists the project."""
+        with self.__lock:
+            diff, _ = self.__diffs.pop((project, scan_id), (AssetStore(), None))
+            if project in self.__projects:
+                self.__projects[project].flush()
+        self.__log.info(
+            "Scan %s of project %s discovered %d new assets",
+            scan_id,
+            project,
+            len(diff),
+        )
+        return diff
+
+    def stop(self) -> None:
+        """Persists and closes every loaded project."""
+        with self.__lock:
+            for membership in self.__projects.values():
+                membership.flush()
+                membership.close()
+            self.__projects.clear()
+
+    async def new_assets(self, request: Request) -> Response:
+        """Lists the assets first discovered by a scan that is not finished yet, a page at a time
+        like the query routes: `{"items": [...], "next": cursor}`.
+        """
+        project = request.params["project_id"]
+        scan_id = request.params["scan_id"]
+        try:
+            after = int(request.query.get("cursor") or 0)
+        except ValueError:
+            after = -1
+        if after < 0:
+            raise HttpError(400, "Invalid cursor")
+        limit = request.query.get("limit")
+        try:
+            limit = QUERY_PAGE_SIZE if limit is None else int(limit)
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= QUERY_MAX_PAGE_SIZE:
+            raise HttpError(400, f"The limit must be from 1 to {QUERY_MAX_PAGE_SIZE}")
+        rows = self.scan_diff(project, scan_id, after, limit)
+        return Response.json(
+            {
+                "project": project,
+                "scan_id": scan_id,
+                "items": [{"type": kind, "value": value} for kind, value in rows],
+                "next": str(after + len(rows)) if len(rows) == limit else None,
+            }
+        )
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> MembershipStore:
+    """Classifies every ingested result, finishes the scans once they are compacted into a
+    snapshot, and adds the scan diff route to the API component.
+    """
+    store = MembershipStore(configuration.membership_dir, log_writer)
+    components.service(IngestService).subscribe(store.observe)
+    snapshots = components.service(SnapshotService)
+    if snapshots is not None:
+        snapshots.subscribe(store.finish_scan)
+    components.api.route("GET", "/projects/{project_id}/scans/{scan_id}/new")(
+        store.new_assets
+    )
+    return store
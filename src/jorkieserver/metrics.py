@@ -0,0 +1,225 @@
+import math
+from bisect import bisect_left
+from typing import Callable
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+
+class Counter:
+    """
+    A monotonically increasing value.
+
+    Metrics take no lock: each one is written by a single thread (the one owning what it measures)
+    and may be read from any thread, which sees the last value written.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: int | float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """
+    A value that goes up and down. A gauge with a `function` reports its result when collected,
+    for values already kept elsewhere (e.g. a queue length).
+    """
+
+    __slots__ = ("value", "function")
+
+    def __init__(self, function: Callable[[], float] | None = None) -> None:
+        self.value = 0
+        self.function = function
+
+    def set(self, value: int | float) -> None:
+        self.value = value
+
+    def inc(self, amount: int | float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: int | float = 1) -> None:
+        self.value -= amount
+
+    def get(self) -> int | float:
+        return self.value if self.function is None else self.function()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Recording is a bisect and two additions,
+    percentiles are estimated as the upper bound of the bucket they fall in.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total", "maximum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the estimated value below which `fraction` (0 to 1) of the observations fall."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                if bucket == len(self.buckets):
+                    return self.maximum
+                return min(self.buckets[bucket], self.maximum)
+        return self.maximum
+
+    def summary(self) -> dict:
+        """Returns the count, mean, p50, p99 and maximum value."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.maximum,
+        }
+
+
+class Family:
+    """
+    The metrics of one name, by value of its label. `children` may be a dict owned by a component,
+    e.g. the latency histograms of the API routes.
+    """
+
+    __slots__ = ("label", "factory", "children")
+
+    def __init__(
+        self, label: str, factory: Callable[[], object], children: dict | None = None
+    ) -> None:
+        self.label = label
+        self.factory = factory
+        self.children = {} if children is None else children
+
+    def labels(self, value: str):
+        """Returns the metric of a label value, created on first use."""
+        metric = self.children.get(value)
+        if metric is None:
+            metric = self.children[value] = self.factory()
+        return metric
+
+
+class MetricsRegistry:
+    """
+    The metrics of the server, rendered in the Prometheus text exposition format by `render()`.
+
+    Components keep the metric objects they record into (looking them up once, not per record),
+    and register them here by name. A metric has at most one label, see `Family`.
+    """
+
+    def __init__(self) -> None:
+        self.__metrics: dict[str, tuple[str, str, object]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__metrics
+
+    def register(self, name: str, kind: str, help: str, metric):
+        """Registers a metric or a `Family` under a name, replacing any previous one, and returns it."""
+        self.__metrics[name] = (kind, help, metric)
+        return metric
+
+    def counter(self, name: str, help: str, label: str | None = None):
+        """Returns the counter of a name, or its `Family` if it has a label, created on first use."""
+        return self.__get(name, COUNTER, help, label, Counter)
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        label: str | None = None,
+        function: Callable[[], float] | None = None,
+    ):
+        """Returns the gauge of a name, or its `Family` if it has a label, created on first use."""
+        if function is not None:
+            return self.register(name, GAUGE, help, Gauge(function))
+        return self.__get(name, GAUGE, help, label, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        buckets: tuple[float, ...],
+        label: str | None = None,
+    ):
+        """Returns the histogram of a name, or its `Family` if it has a label, created on first use."""
+        return self.__get(name, HISTOGRAM, help, label, lambda: Histogram(buckets))
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, (kind, help, metric) in sorted(self.__metrics.items()):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if isinstance(metric, Family):
+                for value, child in sorted(metric.children.items()):
+                    render_metric(
+                        lines, name, child, f'{metric.label}="{escape(value)}"'
+                    )
+            else:
+                render_metric(lines, name, metric, "")
+        lines.append("")
+        return "\n".join(lines)
+
+    def __get(self, name, kind, help, label, factory):
+        entry = self.__metrics.get(name)
+        if entry is not None:
+            return entry[2]
+        metric = factory() if label is None else Family(label, factory)
+        return self.register(name, kind, help, metric)
+
+
+def render_metric(lines: list[str], name: str, metric, labels: str) -> None:
+    """Appends the sample lines of a metric with the given `key="value"` labels."""
+    if isinstance(metric, Histogram):
+        separator = "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(metric.buckets, metric.counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels}{separator}le="{format_value(bound)}"}} {cumulative}'
+            )
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {metric.count}')
+        labels = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{labels} {format_value(metric.total)}")
+        lines.append(f"{name}_count{labels} {metric.count}")
+        return
+    try:
+        value = metric.get() if isinstance(metric, Gauge) else metric.value
+    except Exception:
+        value = math.nan
+    labels = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}{labels} {format_value(value)}")
+
+
+def format_value(value: int | float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if math.isnan(value):
+            return "NaN"
+        return repr(value)
+    return str(value)
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
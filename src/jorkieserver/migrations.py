@@ -0,0 +1,136 @@
+import copy
+from collections import deque
+from typing import Callable
+
+
+class Migration:
+    """
+    A single step transforming a configuration document from one version to another.
+    """
+
+    __slots__ = ("source", "target", "transform", "requires_input", "description")
+
+    def __init__(
+        self,
+        source: str,
+        target: str,
+        transform: Callable[[dict], dict | None],
+        requires_input: bool = False,
+        description: str = "",
+    ):
+        self.source = source
+        self.target = target
+        self.transform = transform
+        self.requires_input = requires_input
+        self.description = description
+
+    def __repr__(self) -> str:
+        return f"Migration({self.source!r} -> {self.target!r})"
+
+
+class MigrationRegistry:
+    """
+    Registry of configuration migrations.
+
+    The shortest chain of migrations from a version to the target version is found with a
+    breadth-first search the first time it is requested, and memoized per `(source, target)`
+    pair, so a boot only pays for applying the transforms.
+    """
+
+    def __init__(self) -> None:
+        self.__migrations: dict[str, list[Migration]] = {}
+        self.__paths: dict[tuple[str, str], tuple[Migration, ...]] = {}
+
+    def register(
+        self,
+        source: str,
+        target: str,
+        requires_input: bool = False,
+        description: str = "",
+    ) -> Callable:
+        """Decorator registering `transform(document) -> document` as the migration from `source` to `target`.
+        The transform may modify the document in place and return None. The "version" key is set by the registry.
+
+        Args:
+        -----
+            source (str): The configuration version the migration applies to.
+            target (str): The configuration version the migration produces.
+            requires_input (bool): The migration needs the user to edit the file, the server exits instead of applying it.
+            description (str): What the user has to do, or what the migration changes.
+        """
+
+        def decorator(transform: Callable[[dict], dict | None]) -> Callable:
+            migration = Migration(
+                source, target, transform, requires_input, description
+            )
+            self.__migrations.setdefault(source, []).append(migration)
+            self.__paths.clear()
+            return transform
+
+        return decorator
+
+    def path(self, source: str, target: str) -> tuple[Migration, ...]:
+        """Returns the shortest chain of migrations from `source` to `target`.
+
+        Raises:
+        -------
+            LookupError: If no chain of registered migrations leads from `source` to `target`
+
+        Returns:
+        --------
+            tuple[Migration, ...]: The migrations to apply, in order. Empty if `source` is `target`.
+        """
+        try:
+            return self.__paths[(source, target)]
+        except KeyError:
+            pass
+
+        previous: dict[str, Migration | None] = {source: None}
+        pending = deque([source])
+        while pending and target not in previous:
+            version = pending.popleft()
+            for migration in self.__migrations.get(version, ()):
+                if migration.target not in previous:
+                    previous[migration.target] = migration
+                    pending.append(migration.target)
+        if target not in previous:
+            raise LookupError(
+                f"No migration path from config version '{source}' to '{target}'."
+            )
+
+        chain = []
+        version = target
+        while previous[version] is not None:
+            chain.append(previous[version])
+            version = previous[version].source
+        path = tuple(reversed(chain))
+        self.__paths[(source, target)] = path
+        return path
+
+    def apply(self, document: dict, path: tuple[Migration, ...]) -> dict:
+        """Applies a chain of migrations to a copy of `document`.
+
+        Args:
+        -----
+            document (dict): The parsed configuration file. It is not modified.
+            path (tuple[Migration, ...]): The chain returned by `path()`.
+
+        Returns:
+        --------
+            dict: The migrated document.
+        """
+        document = copy.deepcopy(document)
+        for migration in path:
+            result = migration.transform(document)
+            if result is not None:
+                document = result
+            document["version"] = migration.target
+        return document
+
+
+# Migrations between released configuration versions are registered here, e.g.:
+#
+#   @MIGRATIONS.register("0.1.0", "0.2.0")
+#   def rename_log_section(document: dict) -> None:
+#       document["logs"] = document.pop("logging", {})
+MIGRATIONS = MigrationRegistry()
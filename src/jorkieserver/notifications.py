@@ -0,0 +1,484 @@
+import asyncio
+import json
+import os
+import random
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from email.message import EmailMessage
+from urllib.parse import urlsplit
+
+from jorkieserver.api import Request, Response
+from jorkieserver.constants import (
+    NOTIFICATIONS_LATENCY_SAMPLES,
+    NOTIFICATIONS_MAX_RETRY_DELAY,
+    NOTIFICATIONS_RETRY_DELAY,
+    NOTIFICATIONS_TIMEOUT,
+)
+from jorkieserver.db import connect
+from jorkieserver.dispatch import Job
+from jorkieserver.logging import LogWriter
+from jorkieserver.membership import MembershipStore
+from jorkieserver.types import Components, Configuration
+from jorkieserver.utils import create_directory
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_next_attempt ON outbox (next_attempt);
+"""
+
+INSERT_NOTIFICATION = (
+    "INSERT INTO outbox (channel, payload, created_at, next_attempt) "
+    "VALUES (?, ?, ?, ?)"
+)
+SELECT_DUE = (
+    "SELECT id, channel, payload, created_at, attempts FROM outbox "
+    "WHERE next_attempt <= ? ORDER BY next_attempt LIMIT ?"
+)
+SELECT_NEXT_ATTEMPT = "SELECT MIN(next_attempt) FROM outbox WHERE next_attempt > ?"
+UPDATE_ATTEMPT = "UPDATE outbox SET attempts = ?, next_attempt = ? WHERE id = ?"
+DELETE_NOTIFICATION = "DELETE FROM outbox WHERE id = ?"
+
+EVENT_JOB_FAILED = "job_failed"
+EVENT_NEW_ASSET = "new_asset"
+EVENT_NAMES = {EVENT_JOB_FAILED: "failed jobs", EVENT_NEW_ASSET: "new assets"}
+
+
+class DeliveryError(Exception):
+    """
+    A notification channel refused a notification.
+    """
+
+
+class Event:
+    """
+    Something a project's users are notified of, e.g. a failed job or a newly discovered asset.
+    """
+
+    __slots__ = ("project", "kind", "subject", "at")
+
+    def __init__(
+        self, project: str, kind: str, subject: str, at: float | None = None
+    ) -> None:
+        self.project = project
+        self.kind = kind
+        self.subject = subject
+        self.at = time.time() if at is None else at
+
+    def as_dict(self) -> dict:
+        return {"kind": self.kind, "subject": self.subject, "at": self.at}
+
+
+def render(notification: dict) -> tuple[str, str]:
+    """Returns the subject line and the text of a notification of the events of a project."""
+    counts: dict[str, int] = {}
+    for event in notification["events"]:
+        counts[event["kind"]] = counts.get(event["kind"], 0) + 1
+    summary = ", ".join(
+        f"{count} {EVENT_NAMES.get(kind, kind)}" for kind, count in counts.items()
+    )
+    subject = f"[jorkie] {notification['project']}: {summary}"
+    lines = [f"- {event['subject']}" for event in notification["events"]]
+    return subject, "\n".join([subject, "", *lines])
+
+
+class WebhookChannel:
+    """
+    POSTs notifications as JSON to an HTTP(S) webhook, in the `{"text": ...}` form of Slack
+    incoming webhooks, along with the `project` and its `events`.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid webhook URL '{url}'")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    async def send(self, notification: dict) -> None:
+        """Delivers a notification.
+
+        Raises:
+        -------
+            DeliveryError: If the webhook does not answer with a 2xx status
+            OSError: If the webhook can't be reached
+        """
+        body = json.dumps({"text": render(notification)[1], **notification}).encode()
+        reader, writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl
+        )
+        try:
+            writer.write(
+                f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+        finally:
+            writer.close()
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise DeliveryError(f"Invalid response {status_line[:80]!r}")
+        if not 200 <= status < 300:
+            raise DeliveryError(f"HTTP {status}")
+
+
+class SmtpChannel:
+    """
+    Emails notifications through an SMTP relay, to comma-separated `recipients`.
+    """
+
+    def __init__(self, host: str, port: int, sender: str, recipients: str) -> None:
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = [r.strip() for r in recipients.split(",") if r.strip()]
+        if not self.recipients:
+            raise ValueError("No notification recipients")
+
+    async def send(self, notification: dict) -> None:
+        """Delivers a notification, on a thread of the default executor.
+
+        Raises:
+        -------
+            OSError: If the relay can't be reached or refuses the message (`smtplib.SMTPException`)
+        """
+        subject, text = render(notification)
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content(text)
+        await asyncio.get_running_loop().run_in_executor(None, self.__send, message)
+
+    def __send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=NOTIFICATIONS_TIMEOUT) as smtp:
+            smtp.send_message(message)
+
+
+def channels_for(configuration: Configuration) -> dict:
+    """Returns the notification channels configured, by name."""
+    channels = {}
+    if configuration.notifications_webhook_url:
+        channels["webhook"] = WebhookChannel(configuration.notifications_webhook_url)
+    if configuration.notifications_smtp_host:
+        channels["email"] = SmtpChannel(
+            configuration.notifications_smtp_host,
+            configuration.notifications_smtp_port,
+            configuration.notifications_smtp_sender or "jorkie@localhost",
+            configuration.notifications_smtp_recipients or "",
+        )
+    return channels
+
+
+class NotificationService:
+    """
+    Notifies the users of a project of its failed jobs and new discoveries, on its own event loop
+    thread.
+
+    Events are published from any thread into an async queue. The events of a project are
+    coalesced for `notifications_window` seconds, then sent as one notification per channel
+    listing up to `notifications_batch_size` events (a project reaching that many events is sent
+    right away). Notifications are written to an SQLite outbox (`notifications_path`) before
+    they are delivered, and deleted once delivered, so they survive restarts. Failed deliveries
+    are retried with exponential backoff and jitter, up to `notifications_max_attempts` attempts.
+    At most `notifications_max_connections` deliveries are in flight at once.
+    """
+
+    CONFIG_FIELDS = frozenset(
+        {
+            "notifications_window",
+            "notifications_batch_size",
+            "notifications_max_connections",
+            "notifications_max_attempts",
+            "notifications_webhook_url",
+            "notifications_smtp_host",
+            "notifications_smtp_port",
+            "notifications_smtp_sender",
+            "notifications_smtp_recipients",
+        }
+    )
+
+    def __init__(
+        self, configuration: Configuration, log_writer: LogWriter, channels=None
+    ) -> None:
+        self.path = configuration.notifications_path
+        self.window = configuration.notifications_window
+        self.batch_size = configuration.notifications_batch_size
+        self.max_connections = configuration.notifications_max_connections
+        self.max_attempts = configuration.notifications_max_attempts
+        self.channels = channels_for(configuration) if channels is None else channels
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.delivered = 0
+        self.retried = 0
+        self.dropped = 0
+        self.__log = log_writer.component("NOTIFY")
+        self.__queue: asyncio.Queue | None = None
+        self.__queued = 0  # Events in the queue
+        self.__pending: dict[str, list[Event]] = {}
+        self.__timers: dict[str, asyncio.TimerHandle] = {}
+        self.__pending_events = 0
+        self.__outbox = 0
+        self.__in_flight: dict[int, asyncio.Task] = {}
+        self.__latencies: deque[float] = deque(maxlen=NOTIFICATIONS_LATENCY_SAMPLES)
+        self.__connection = None
+        self.__wakeup: asyncio.Event | None = None
+        self.__stopping: asyncio.Event | None = None
+        self.__thread: threading.Thread | None = None
+        self.__ready = threading.Event()
+
+    def reconfigure(self, configuration: Configuration, changed: set[str]) -> None:
+        self.window = configuration.notifications_window
+        self.batch_size = configuration.notifications_batch_size
+        self.max_connections = configuration.notifications_max_connections
+        self.max_attempts = configuration.notifications_max_attempts
+        try:
+            self.channels = channels_for(configuration)
+        except ValueError as e:
+            self.__log.error("Keeping the previous notification channels: %s", e)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.__wakeup.set)
+
+    def start(self) -> None:
+        """Opens the outbox and starts the event loop thread."""
+        self.__thread = threading.Thread(
+            target=asyncio.run,
+            args=(self.__serve(),),
+            name="jorkie-notify",
+            daemon=True,
+        )
+        self.__thread.start()
+        self.__ready.wait()
+
+    def stop(self) -> None:
+        """Writes the coalesced events to the outbox, then stops the event loop thread."""
+        if self.__thread is None or not self.__thread.is_alive():
+            return
+        self.loop.call_soon_threadsafe(self.__stopping.set)
+        self.__thread.join()
+
+    def publish(self, events: list[Event]) -> None:
+        """Queues events for notification, from any thread."""
+        if self.loop is not None and events:
+            self.loop.call_soon_threadsafe(self.__put, events)
+
+    def job_finished(self, job: Job) -> None:
+        """Publishes the failure of a job, see `Dispatcher.subscribe()`."""
+        if job.returncode == 0:
+            return
+        reason = (
+            "failed to run"
+            if job.returncode is None
+            else f"exited with {job.returncode}"
+        )
+        target = f" on {job.target}" if job.target else ""
+        self.publish(
+            [Event(job.project, EVENT_JOB_FAILED, f"{job.agent}{target} {reason}")]
+        )
+
+    def assets_discovered(
+        self, project: str, scan_id: str | None, assets: list[tuple[str, str]]
+    ) -> None:
+        """Publishes newly discovered assets, see `MembershipStore.subscribe()`."""
+        now = time.time()
+        self.publish(
+            [
+                Event(project, EVENT_NEW_ASSET, f"{kind} {value}", now)
+                for kind, value in assets
+            ]
+        )
+
+    def stats(self) -> dict:
+        """Returns the queue depths, the delivery counters and the recent delivery latencies."""
+        latencies = sorted(self.__latencies)
+        return {
+            "queued": self.__queued + self.__pending_events,
+            "outbox": self.__outbox,
+            "in_flight": len(self.__in_flight),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p99": latencies[len(latencies) * 99 // 100] if latencies else None,
+        }
+
+    async def get_stats(self, request: Request) -> Response:
+        return Response.json(self.stats())
+
+    def __put(self, events: list[Event]) -> None:
+        self.__queued += len(events)
+        self.__queue.put_nowait(events)
+
+    async def __serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.__queue = asyncio.Queue()
+        self.__wakeup = asyncio.Event()
+        self.__stopping = asyncio.Event()
+        create_directory(os.path.dirname(self.path) or ".", "NOTIFICATIONS")
+        self.__connection = connect(self.path)
+        self.__connection.executescript(SCHEMA)
+        self.__outbox = self.__connection.execute(
+            "SELECT COUNT(*) FROM outbox"
+        ).fetchone()[0]
+        tasks = [
+            self.loop.create_task(self.__collect()),
+            self.loop.create_task(self.__deliver()),
+        ]
+        self.__ready.set()
+        await self.__stopping.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while not self.__queue.empty():
+            self.__coalesce(self.__queue.get_nowait())
+        for project in list(self.__pending):
+            self.__flush(project)
+        # Interrupted deliveries stay in the outbox, they are retried on the next start.
+        in_flight = list(self.__in_flight.values())
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        self.__connection.close()
+
+    async def __collect(self) -> None:
+        while True:
+            self.__coalesce(await self.__queue.get())
+
+    def __coalesce(self, events: list[Event]) -> None:
+        self.__queued -= len(events)
+        for event in events:
+            pending = self.__pending.get(event.project)
+            if pending is None:
+                pending = self.__pending[event.project] = []
+                self.__timers[event.project] = self.loop.call_later(
+                    self.window, self.__flush, event.project
+                )
+            pending.append(event)
+            self.__pending_events += 1
+            if len(pending) >= self.batch_size:
+                self.__flush(event.project)
+
+    def __flush(self, project: str) -> None:
+        events = self.__pending.pop(project)
+        self.__timers.pop(project).cancel()
+        self.__pending_events -= len(events)
+        rows = []
+        for start in range(0, len(events), self.batch_size):
+            batch = events[start : start + self.batch_size]
+            payload = json.dumps(
+                {"project": project, "events": [event.as_dict() for event in batch]}
+            )
+            created_at = min(event.at for event in batch)
+            rows.extend(
+                (channel, payload, created_at, created_at) for channel in self.channels
+            )
+        if not rows:
+            return
+        try:
+            self.__connection.execute("BEGIN")
+            self.__connection.executemany(INSERT_NOTIFICATION, rows)
+            self.__connection.execute("COMMIT")
+        except Exception as e:
+            if self.__connection.in_transaction:
+                self.__connection.execute("ROLLBACK")
+            self.__log.error(
+                "Dropped %d notifications of project %s: %r", len(rows), project, e
+            )
+            return
+        self.__outbox += len(rows)
+        self.__wakeup.set()
+
+    async def __deliver(self) -> None:
+        while True:
+            self.__wakeup.clear()
+            now = time.time()
+            free = self.max_connections - len(self.__in_flight)
+            if free > 0:
+                due = self.__connection.execute(
+                    SELECT_DUE, (now, free + len(self.__in_flight))
+                ).fetchall()
+                for row in due:
+                    if row[0] in self.__in_flight:
+                        continue
+                    if len(self.__in_flight) >= self.max_connections:
+                        break
+                    task = self.loop.create_task(self.__attempt(*row))
+                    self.__in_flight[row[0]] = task
+            # Sleeps until a delivery ends, a notification is added, or the next retry is due.
+            next_attempt = self.__connection.execute(
+                SELECT_NEXT_ATTEMPT, (now,)
+            ).fetchone()[0]
+            timeout = None if next_attempt is None else next_attempt - now
+            try:
+                async with asyncio.timeout(timeout):
+                    await self.__wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def __attempt(
+        self, id: int, channel: str, payload: str, created_at: float, attempts: int
+    ) -> None:
+        try:
+            sender = self.channels.get(channel)
+            if sender is None:
+                raise DeliveryError(f"Channel '{channel}' is not configured anymore")
+            async with asyncio.timeout(NOTIFICATIONS_TIMEOUT):
+                await sender.send(json.loads(payload))
+        except (OSError, DeliveryError, TimeoutError) as e:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self.__connection.execute(DELETE_NOTIFICATION, (id,))
+                self.__outbox -= 1
+                self.dropped += 1
+                self.__log.error(
+                    "Dropped notification %d after %d attempts: %r", id, attempts, e
+                )
+            else:
+                delay = min(
+                    NOTIFICATIONS_MAX_RETRY_DELAY,
+                    NOTIFICATIONS_RETRY_DELAY * 2 ** (attempts - 1),
+                )
+                self.__connection.execute(
+                    UPDATE_ATTEMPT,
+                    (attempts, time.time() + delay * random.uniform(0.5, 1.0), id),
+                )
+                self.retried += 1
+                self.__log.debug(
+                    "Notification %d failed, retrying in %.0f s: %r", id, delay, e
+                )
+        else:
+            self.__connection.execute(DELETE_NOTIFICATION, (id,))
+            self.__outbox -= 1
+            self.delivered += 1
+            self.__latencies.append(time.time() - created_at)
+        finally:
+            del self.__in_flight[id]
+            self.__wakeup.set()
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> NotificationService:
+    """Notifies of failed jobs and new discoveries, and adds the notification stats route."""
+    service = NotificationService(configuration, log_writer)
+    if components.dispatcher is not None:
+        components.dispatcher.dispatcher.subscribe(service.job_finished)
+    membership = components.service(MembershipStore)
+    if membership is not None:
+        membership.subscribe(service.assets_discovered)
+    components.api.route("GET", "/notifications/stats")(service.get_stats)
+    return service
@@ -0,0 +1,392 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, AsyncIterator, BinaryIO
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.constants import (
+    LAUNCH_TIMESTAMP,
+    OUTPUT_BUFFER_SIZE,
+    OUTPUT_READ_CHUNK,
+    OUTPUT_RETAINED_JOBS,
+)
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Components, Configuration
+from jorkieserver.utils import create_directory
+
+if TYPE_CHECKING:
+    from jorkieserver.dispatch import Job
+
+
+class OutputBuffer:
+    """
+    The output of one job, in a ring buffer of `capacity` bytes filled straight from the agent's
+    pipe with `os.readv()`, and addressed by absolute byte offsets.
+
+    Any number of subscribers, on any event loop, read it with `subscribe()`. Each reads at its
+    own pace: a subscriber falling more than `capacity` bytes behind skips the overwritten bytes,
+    it never holds back the agent nor the other subscribers.
+
+    With a `spill_path`, the whole output is appended to that file by a background task, which
+    writes the unspilled part of the ring without copying it. Reading the pipe pauses if the
+    spill falls `capacity` bytes behind, so the file misses nothing.
+    """
+
+    def __init__(
+        self, capacity: int = OUTPUT_BUFFER_SIZE, spill_path: str | None = None
+    ) -> None:
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.written = 0  # End offset of the output
+        self.reserved = 0  # End offset of the region being written, see `subscribe()`
+        self.spilled = 0  # End offset of the output written to `spill_path`
+        self.closed = False
+        self.spill_error: OSError | None = None
+        self.__ring = bytearray(capacity)
+        self.__view = memoryview(self.__ring)
+        self.__loop = asyncio.get_running_loop()
+        self.__waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.__lock = threading.Lock()
+        self.__fds: set[int] = set()
+        self.__paused = False
+        self.__eof = asyncio.Event()
+        self.__progress = asyncio.Event()  # Set when the spill frees space
+        self.__spill_wakeup = asyncio.Event()
+        self.__spill_task = None
+        if spill_path is not None:
+            self.__spill_task = self.__loop.create_task(self.__spill())
+
+    def read_from(self, fd: int) -> int | None:
+        """Reads available bytes from a non-blocking file descriptor into the ring.
+
+        Returns:
+        --------
+            int | None: The number of bytes read, 0 at end of file, or None if the ring is full of unspilled output.
+
+        Raises:
+        -------
+            BlockingIOError: If no bytes are available
+        """
+        space = self.capacity
+        if self.spill_path is not None:
+            space -= self.written - self.spilled
+            if space == 0:
+                return None
+        start = self.written % self.capacity
+        end = min(self.capacity, start + space)
+        buffers = [self.__view[start:end]]
+        if end - start < space:
+            buffers.append(self.__view[: space - (end - start)])
+        self.reserved = self.written + space
+        try:
+            count = os.readv(fd, buffers)
+        except BaseException:
+            self.reserved = self.written
+            raise
+        self.__commit(count)
+        return count
+
+    async def write(self, data: bytes) -> None:
+        """Appends output produced in the server, waiting for the spill to free space if needed."""
+        view = memoryview(data)
+        while view:
+            space = self.capacity
+            if self.spill_path is not None:
+                space -= self.written - self.spilled
+            if space == 0:
+                await self.__wait_progress()
+                continue
+            chunk = view[:space]
+            start = self.written % self.capacity
+            first = min(len(chunk), self.capacity - start)
+            self.reserved = self.written + len(chunk)
+            self.__view[start : start + first] = chunk[:first]
+            self.__view[: len(chunk) - first] = chunk[first:]
+            self.__commit(len(chunk))
+            view = view[len(chunk) :]
+
+    def attach(self, fd: int) -> None:
+        """Reads a non-blocking file descriptor into the ring whenever it is readable, until end of file."""
+        self.__eof.clear()
+        self.__fds.add(fd)
+        if not self.__paused:
+            self.__loop.add_reader(fd, self.__on_readable, fd)
+
+    async def detach(self, fd: int) -> None:
+        """Reads what is left in a file descriptor without waiting for more, and stops reading it."""
+        if fd not in self.__fds:
+            return
+        self.__loop.remove_reader(fd)
+        self.__fds.discard(fd)
+        while True:
+            try:
+                count = self.read_from(fd)
+            except BlockingIOError:
+                return
+            if count == 0:
+                return
+            if count is None:
+                await self.__wait_progress()
+
+    async def wait_eof(self, timeout: float) -> bool:
+        """Waits until an attached file descriptor reaches end of file, returns False on timeout."""
+        try:
+            async with asyncio.timeout(timeout):
+                await self.__eof.wait()
+            return True
+        except TimeoutError:
+            return False
+
+    async def close(self) -> None:
+        """Marks the output as complete, and waits until it is spilled."""
+        for fd in list(self.__fds):
+            await self.detach(fd)
+        self.closed = True
+        self.__notify()
+        if self.__spill_task is not None:
+            self.__spill_wakeup.set()
+            await self.__spill_task
+
+    async def subscribe(self, offset: int = 0) -> AsyncIterator[tuple[int, bytes]]:
+        """Yields `(offset, chunk)` pairs of the output from `offset` on, until it is closed.
+        Safe to use from any event loop. Overwritten bytes are skipped, a gap in the offsets.
+        """
+        loop = asyncio.get_running_loop()
+        capacity = self.capacity
+        while True:
+            written = self.written
+            if offset < written:
+                start = max(offset, written - capacity)
+                end = min(written, start + OUTPUT_READ_CHUNK)
+                data = self.__copy(start, end)
+                # The producer may have overwritten the start of the copy meanwhile.
+                valid = self.reserved - capacity
+                if valid > start:
+                    if valid >= end:
+                        offset = valid
+                        continue
+                    data = data[valid - start :]
+                    start = valid
+                yield start, data
+                offset = end
+                continue
+            if self.closed:
+                if offset < self.written:
+                    continue
+                return
+            future = loop.create_future()
+            with self.__lock:
+                if offset >= self.written and not self.closed:
+                    self.__waiters.append((loop, future))
+                else:
+                    future.set_result(None)
+            await future
+
+    def __copy(self, start: int, end: int) -> bytes:
+        first = start % self.capacity
+        last = first + end - start
+        if last <= self.capacity:
+            return bytes(self.__view[first:last])
+        return bytes(self.__view[first:]) + bytes(self.__view[: last - self.capacity])
+
+    def __commit(self, count: int) -> None:
+        self.written += count
+        self.reserved = self.written
+        self.__notify()
+        self.__spill_wakeup.set()
+
+    def __notify(self) -> None:
+        with self.__lock:
+            waiters, self.__waiters = self.__waiters, []
+        for loop, future in waiters:
+            if loop is self.__loop:
+                _wake(future)
+            else:
+                loop.call_soon_threadsafe(_wake, future)
+
+    def __on_readable(self, fd: int) -> None:
+        try:
+            count = self.read_from(fd)
+        except BlockingIOError:
+            return
+        if count is None:
+            # Full of unspilled output, resumed by the spill task.
+            self.__paused = True
+            for attached in self.__fds:
+                self.__loop.remove_reader(attached)
+        elif count == 0:
+            self.__loop.remove_reader(fd)
+            self.__fds.discard(fd)
+            self.__eof.set()
+
+    async def __wait_progress(self) -> None:
+        self.__progress.clear()
+        await self.__progress.wait()
+
+    async def __spill(self) -> None:
+        try:
+            file: BinaryIO = await self.__loop.run_in_executor(
+                None, open, self.spill_path, "ab"
+            )
+        except OSError as e:
+            self.__stop_spilling(e)
+            return
+        try:
+            while True:
+                await self.__spill_wakeup.wait()
+                self.__spill_wakeup.clear()
+                while self.spilled < self.written:
+                    start, end = self.spilled, self.written
+                    first = start % self.capacity
+                    last = first + end - start
+                    # Unspilled bytes are never overwritten, so the ring is written without a copy.
+                    chunks = [self.__view[first : min(last, self.capacity)]]
+                    if last > self.capacity:
+                        chunks.append(self.__view[: last - self.capacity])
+                    try:
+                        await self.__loop.run_in_executor(None, file.writelines, chunks)
+                    except OSError as e:
+                        self.__stop_spilling(e)
+                        return
+                    self.spilled = end
+                    self.__resume()
+                if self.closed:
+                    return
+        finally:
+            await self.__loop.run_in_executor(None, file.close)
+
+    def __stop_spilling(self, error: OSError) -> None:
+        # Keep the job running, its output is only kept in the ring from now on.
+        self.spill_error = error
+        self.spill_path = None
+        self.spilled = self.written
+        self.__resume()
+
+    def __resume(self) -> None:
+        """Wakes up the writers and the paused pipe readers waiting for the spill."""
+        self.__progress.set()
+        if self.__paused:
+            self.__paused = False
+            for fd in self.__fds:
+                self.__loop.add_reader(fd, self.__on_readable, fd)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class OutputStore:
+    """
+    The output buffers of the running jobs, and of the last `OUTPUT_RETAINED_JOBS` finished ones.
+    Every output is spilled to `<directory>/<launch timestamp>-<job id>.log`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        capacity: int = OUTPUT_BUFFER_SIZE,
+        retained: int = OUTPUT_RETAINED_JOBS,
+    ) -> None:
+        self.directory = directory
+        self.capacity = capacity
+        self.retained = retained
+        self.__buffers: dict[int, OutputBuffer] = {}
+        self.__finished: OrderedDict[int, None] = OrderedDict()
+
+    def path(self, job_id: int) -> str:
+        return os.path.join(self.directory, f"{LAUNCH_TIMESTAMP}-{job_id}.log")
+
+    def create(self, job: "Job") -> OutputBuffer:
+        """Returns a new output buffer for a job, must be called from the dispatcher's event loop."""
+        if not self.__buffers:
+            create_directory(self.directory, "OUTPUT")
+        buffer = self.__buffers[job.id] = OutputBuffer(self.capacity, self.path(job.id))
+        return buffer
+
+    def get(self, job_id: int) -> OutputBuffer | None:
+        """Returns the output buffer of a running or recently finished job, from any thread."""
+        return self.__buffers.get(job_id)
+
+    def release(self, job: "Job") -> None:
+        """Marks a job as finished, forgetting the buffers of older finished jobs."""
+        self.__finished[job.id] = None
+        while len(self.__finished) > self.retained:
+            job_id, _ = self.__finished.popitem(last=False)
+            self.__buffers.pop(job_id, None)
+
+
+class OutputService:
+    """
+    `GET /jobs/{job_id}/output` streams the output of a job from an offset (0 by default) until the
+    job finishes: as plain text, or as server-sent events with `Accept: text/event-stream`.
+    Events carry complete lines, and their id is the offset to resume from (`Last-Event-ID`).
+    Outputs evicted from memory are served from their spill file.
+    """
+
+    def __init__(self, store: OutputStore) -> None:
+        self.store = store
+
+    async def output(self, request: Request) -> Response:
+        try:
+            job_id = int(request.params["job_id"])
+            offset = int(
+                request.query.get("offset") or request.headers.get("last-event-id") or 0
+            )
+        except ValueError:
+            raise HttpError(400, "Invalid job id or offset")
+        buffer = self.store.get(job_id)
+        if buffer is None:
+            path = self.store.path(job_id)
+            if not os.path.exists(path):
+                raise HttpError(404)
+            return Response(read_file(path, offset))
+        if "text/event-stream" in request.headers.get("accept", ""):
+            return Response(
+                events(buffer, offset),
+                headers={"Cache-Control": "no-cache"},
+                content_type="text/event-stream",
+            )
+        return Response(chunk async for _, chunk in buffer.subscribe(offset))
+
+
+async def events(buffer: OutputBuffer, offset: int) -> AsyncIterator[bytes]:
+    """Yields the output of a buffer as server-sent events of complete lines."""
+    partial = b""
+    async for start, chunk in buffer.subscribe(offset):
+        if start > offset:
+            partial = b""
+            yield b"event: dropped\ndata: %d\n\n" % (start - offset)
+        offset = start + len(chunk)
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()
+        if lines:
+            yield sse_event(lines, offset - len(partial))
+    if partial:
+        yield sse_event([partial], offset)
+    yield b"event: end\ndata: %d\n\n" % offset
+
+
+def sse_event(lines: list[bytes], event_id: int) -> bytes:
+    return b"id: %d\n%b\n\n" % (
+        event_id,
+        b"\n".join(b"data: " + line.rstrip(b"\r") for line in lines),
+    )
+
+
+async def read_file(path: str, offset: int) -> AsyncIterator[bytes]:
+    loop = asyncio.get_running_loop()
+    with open(path, "rb") as file:
+        file.seek(offset)
+        while chunk := await loop.run_in_executor(None, file.read, OUTPUT_READ_CHUNK):
+            yield chunk
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> OutputService:
+    """Adds the job output route to the API component."""
+    service = OutputService(components.dispatcher.outputs)
+    components.api.route("GET", "/jobs/{job_id}/output")(service.output)
+    return service
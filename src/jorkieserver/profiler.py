@@ -0,0 +1,349 @@
+import asyncio
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Callable, Iterable
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.constants import (
+    PROFILER_DEFAULT_DURATION,
+    PROFILER_FORMATS,
+    PROFILER_INTERVAL,
+    PROFILER_MAX_DEPTH,
+    PROFILER_MAX_DURATION,
+    PROFILER_MODES,
+)
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Components, Configuration
+
+# A function, as `pstats` identifies it.
+FunctionKey = tuple[str, int, str]
+
+
+class Profile:
+    """
+    The stacks sampled by a `SamplingProfiler`: how many times each `(root, stack)` was seen,
+    where `root` names the thread or the asyncio task and `stack` lists its functions outermost first.
+    """
+
+    def __init__(self, mode: str, interval: float) -> None:
+        self.mode = mode
+        self.interval = interval
+        self.samples: Counter[tuple[str, tuple[FunctionKey, ...]]] = Counter()
+        self.started = time.time()
+        self.duration = 0.0
+
+    def collapsed(self) -> str:
+        """Returns the samples in the collapsed stack format of flame graph tools, one stack per line."""
+        lines = []
+        for (root, stack), count in sorted(self.samples.items()):
+            frames = [root.replace(";", ":")]
+            frames.extend(
+                f"{name} ({os.path.basename(file)}:{line})"
+                for file, line, name in stack
+            )
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def stats(self) -> dict:
+        """Returns the samples as the statistics dict `pstats.Stats` loads, a sample counting as
+        `interval` seconds and as one call.
+        """
+        stats: dict[FunctionKey, list] = {}
+        for (_, stack), count in self.samples.items():
+            seconds = count * self.interval
+            seen = set()
+            for depth, function in enumerate(stack):
+                entry = stats.get(function)
+                if entry is None:
+                    entry = stats[function] = [0, 0, 0.0, 0.0, {}]
+                leaf = depth == len(stack) - 1
+                if function not in seen:
+                    seen.add(function)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += seconds
+                if leaf:
+                    entry[2] += seconds
+                if depth:
+                    caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                    caller[0] += count
+                    caller[1] += count
+                    caller[2] += seconds if leaf else 0.0
+                    caller[3] += seconds
+        return {
+            function: (cc, nc, tt, ct, {k: tuple(v) for k, v in callers.items()})
+            for function, (cc, nc, tt, ct, callers) in stats.items()
+        }
+
+    def write(self, path: str, format: str) -> None:
+        """Writes the profile to a file, in "collapsed" or "pstats" format."""
+        if format == "pstats":
+            with open(path, "wb") as file:
+                marshal.dump(self.stats(), file)
+        else:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.collapsed())
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread, and of the asyncio tasks of `loops()`, every `interval`
+    seconds from a thread of its own. It only runs between `start()` and `stop()`, so it costs
+    nothing the rest of the time.
+
+    In "wall" mode every thread is sampled, waiting or not. In "cpu" mode only the threads the
+    kernel reports as running are, read from `/proc` (on other systems, "cpu" samples like "wall").
+    Tasks are sampled where they are suspended, so they show what the event loops wait on.
+    """
+
+    def __init__(
+        self,
+        mode: str = "wall",
+        interval: float = PROFILER_INTERVAL,
+        loops: Callable[[], Iterable[asyncio.AbstractEventLoop]] = tuple,
+    ) -> None:
+        if mode not in PROFILER_MODES:
+            raise ValueError(f"Invalid profiler mode '{mode}'")
+        self.mode = mode
+        self.interval = interval
+        self.loops = loops
+        self.profile: Profile | None = None
+        self.__stopping = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start(self) -> None:
+        self.profile = Profile(self.mode, self.interval)
+        self.__stopping.clear()
+        self.__thread = threading.Thread(
+            target=self.__run, name="jorkie-profiler", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self) -> Profile:
+        """Stops sampling, and returns the profile."""
+        self.__stopping.set()
+        if self.__thread is not None:
+            self.__thread.join()
+        return self.profile
+
+    def sample(self) -> None:
+        """Records the current stack of every thread and task once."""
+        samples = self.profile.samples
+        own = threading.get_ident()
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            thread = threads.get(ident)
+            if (
+                self.mode == "cpu"
+                and thread is not None
+                and not _is_running(thread.native_id)
+            ):
+                continue
+            name = thread.name if thread is not None else f"thread-{ident}"
+            samples[(f"thread:{name}", _stack(frame))] += 1
+        for loop in self.loops():
+            if loop is None or loop.is_closed():
+                continue
+            try:
+                tasks = asyncio.all_tasks(loop)
+            except RuntimeError:
+                continue
+            for task in tasks:
+                # Racing with the loop's thread, a task may finish while its stack is read.
+                frames = task.get_stack(limit=PROFILER_MAX_DEPTH)
+                if frames:
+                    stack = tuple(_key(frame) for frame in frames)
+                    samples[(f"task:{task.get_name()}", stack)] += 1
+
+    def __run(self) -> None:
+        started = time.perf_counter()
+        while not self.__stopping.wait(self.interval):
+            self.sample()
+        self.profile.duration = time.perf_counter() - started
+
+
+def _key(frame: FrameType) -> FunctionKey:
+    code = frame.f_code
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def _stack(frame: FrameType | None) -> tuple[FunctionKey, ...]:
+    stack = []
+    while frame is not None and len(stack) < PROFILER_MAX_DEPTH:
+        stack.append(_key(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _is_running(native_id: int) -> bool:
+    try:
+        with open(f"/proc/self/task/{native_id}/stat", "rb") as file:
+            # The state follows the command name, which is in parentheses.
+            return file.read().rpartition(b")")[2].split()[0] == b"R"
+    except (OSError, IndexError):
+        return True
+
+
+class ProfilerService:
+    """
+    Takes sampling profiles of the running server on demand, written to `directory` (the log
+    directory): `POST /admin/profile` starts one for `seconds` (query parameters `seconds`,
+    `mode` and `format`), `DELETE /admin/profile` ends it early, and `GET /admin/profile` tells
+    whether one is running and where the last one was written. `toggle()` (on SIGUSR2) starts a
+    default profile, or ends the running one. The admin routes only answer loopback clients.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        log_writer: LogWriter,
+        loops: Callable[[], Iterable[asyncio.AbstractEventLoop]] = tuple,
+    ) -> None:
+        self.directory = directory
+        self.loops = loops
+        self.last_path: str | None = None
+        self.__log = log_writer.component("PROFILER")
+        self.__profiler: SamplingProfiler | None = None
+        self.__format = "collapsed"
+        self.__timer: threading.Timer | None = None
+        self.__lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.__profiler is not None
+
+    def start_profile(
+        self,
+        seconds: float = PROFILER_DEFAULT_DURATION,
+        mode: str = "wall",
+        format: str = "collapsed",
+    ) -> None:
+        """Starts a profile, written once `seconds` are over.
+
+        Raises:
+        -------
+            ValueError: If the duration, mode or format is not valid
+            RuntimeError: If a profile is already running
+        """
+        if not 0 < seconds <= PROFILER_MAX_DURATION:
+            raise ValueError(
+                f"The duration must be within 0 and {PROFILER_MAX_DURATION} s"
+            )
+        if format not in PROFILER_FORMATS:
+            raise ValueError(f"Invalid profile format '{format}'")
+        with self.__lock:
+            if self.__profiler is not None:
+                raise RuntimeError("A profile is already running")
+            self.__profiler = SamplingProfiler(mode, loops=self.loops)
+            self.__format = format
+            self.__profiler.start()
+            self.__timer = threading.Timer(seconds, self.stop_profile)
+            self.__timer.daemon = True
+            self.__timer.start()
+        self.__log.info("Profiling for %.0f s (%s, %s)", seconds, mode, format)
+
+    def stop_profile(self) -> str | None:
+        """Ends the running profile and writes it, returns its path (None if none was running)."""
+        with self.__lock:
+            profiler, self.__profiler = self.__profiler, None
+            if profiler is None:
+                return None
+            self.__timer.cancel()
+            profile = profiler.stop()
+            extension = "pstats" if self.__format == "pstats" else "collapsed"
+            path = os.path.join(
+                self.directory,
+                f"profile-{time.strftime('%Y-%m-%dT%H-%M-%S')}-{profile.mode}.{extension}",
+            )
+            try:
+                profile.write(path, self.__format)
+            except OSError as e:
+                self.__log.error("Failed to write the profile to %s: %r", path, e)
+                return None
+            self.last_path = path
+        self.__log.info(
+            "Wrote a %.1f s profile (%d samples) to %s",
+            profile.duration,
+            sum(profile.samples.values()),
+            path,
+        )
+        return path
+
+    def toggle(self) -> None:
+        """Starts a default profile, or ends the running one."""
+        if self.running:
+            self.stop_profile()
+            return
+        try:
+            self.start_profile()
+        except RuntimeError:
+            pass
+
+    def stop(self) -> None:
+        self.stop_profile()
+
+    async def get_profile(self, request: Request) -> Response:
+        check_local(request)
+        return Response.json({"running": self.running, "last": self.last_path})
+
+    async def post_profile(self, request: Request) -> Response:
+        check_local(request)
+        try:
+            seconds = float(request.query.get("seconds", PROFILER_DEFAULT_DURATION))
+            self.start_profile(
+                seconds,
+                request.query.get("mode", "wall"),
+                request.query.get("format", "collapsed"),
+            )
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        except RuntimeError as e:
+            raise HttpError(409, str(e))
+        return Response.json({"running": True, "seconds": seconds}, 202)
+
+    async def delete_profile(self, request: Request) -> Response:
+        check_local(request)
+        # Writing the profile may take a while, keep the API loop serving meanwhile.
+        path = await asyncio.get_running_loop().run_in_executor(None, self.stop_profile)
+        if path is None:
+            raise HttpError(409, "No profile is running")
+        return Response.json({"path": path})
+
+
+def check_local(request: Request) -> None:
+    """Answers 403 to the requests of other hosts than this one.
+
+    Raises:
+    -------
+        HttpError: If the client is not a loopback address (403)
+    """
+    if request.client not in ("127.0.0.1", "::1"):
+        raise HttpError(403)
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> ProfilerService:
+    """Adds the profiling routes to the API component."""
+
+    def loops():
+        services = (components.api, components.dispatcher, *components.services)
+        return [getattr(service, "loop", None) for service in services]
+
+    service = ProfilerService(log_writer.log_dir, log_writer, loops)
+    components.api.route("GET", "/admin/profile")(service.get_profile)
+    components.api.route("POST", "/admin/profile")(service.post_profile)
+    components.api.route("DELETE", "/admin/profile")(service.delete_profile)
+    return service
@@ -0,0 +1,343 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Hashable, Iterable
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.constants import (
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    QUERY_MAX_PAGE_SIZE,
+    QUERY_PAGE_SIZE,
+    QUERY_STREAM_CHUNK,
+)
+from jorkieserver.db import ASSET_FIELDS, RESULT_FIELDS, Database
+from jorkieserver.ingest import IngestService
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Components, Configuration
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Reads a page of rows: `fetch(after, limit)`, `after` being the cursor of the previous page.
+Fetch = Callable[[object, int], list[tuple]]
+
+
+class QueryCache:
+    """
+    LRU cache of query responses, each served for `ttl` seconds at most. Entries are tagged with
+    the data they were computed from (a project, a scan of a project), and `invalidate()` drops
+    the entries of a tag as soon as that data changes. A response computed while its data was
+    changing is not cached: `put()` is given the `generation()` of its tags read before the query.
+    """
+
+    def __init__(
+        self,
+        size: int = QUERY_CACHE_SIZE,
+        ttl: float = QUERY_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__clock = clock
+        self.__entries: OrderedDict[Hashable, tuple[float, object, tuple]] = (
+            OrderedDict()
+        )
+        self.__tagged: dict[Hashable, set] = {}
+        self.__generations: dict[Hashable, int] = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: Hashable):
+        """Returns the cached value of a key, or None."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                if entry[0] > self.__clock():
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.__remove(key)
+            self.misses += 1
+            return None
+
+    def generation(self, tags: tuple) -> tuple[int, ...]:
+        """Returns the number of times each tag was invalidated."""
+        with self.__lock:
+            return tuple(self.__generations.get(tag, 0) for tag in tags)
+
+    def put(
+        self, key: Hashable, value, tags: tuple, generation: tuple[int, ...]
+    ) -> None:
+        """Caches a value computed from the data of `tags`, unless a tag was invalidated since `generation`."""
+        with self.__lock:
+            if generation != tuple(self.__generations.get(tag, 0) for tag in tags):
+                return
+            if key in self.__entries:
+                self.__remove(key)
+            self.__entries[key] = (self.__clock() + self.ttl, value, tags)
+            for tag in tags:
+                self.__tagged.setdefault(tag, set()).add(key)
+            while len(self.__entries) > self.size:
+                self.__remove(next(iter(self.__entries)))
+
+    def invalidate(self, tags: Iterable[Hashable]) -> int:
+        """Drops the entries of the tags, returns how many were dropped."""
+        dropped = 0
+        with self.__lock:
+            for tag in tags:
+                self.__generations[tag] = self.__generations.get(tag, 0) + 1
+                for key in self.__tagged.pop(tag, ()):
+                    if key in self.__entries:
+                        self.__remove(key)
+                        dropped += 1
+        return dropped
+
+    def __remove(self, key: Hashable) -> None:
+        _, _, tags = self.__entries.pop(key)
+        for tag in tags:
+            keys = self.__tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__tagged[tag]
+
+
+class QueryService:
+    """
+    Read-only queries of the data of a project, for the Console:
+
+    - `GET /projects/{project_id}/assets` lists the assets, optionally of one `type`
+    - `GET /projects/{project_id}/scans/{scan_id}/results` lists the results of a scan
+    - `GET /projects/{project_id}/summary` counts the assets by type, and summarizes the latest scan
+
+    Lists are paginated with a cursor rather than an offset: a page is `{"items": [...], "next": cursor}`
+    and the following one is read with `?cursor=<next>`, in the same time however deep it is.
+    `fields` selects a comma-separated subset of the fields, and `limit` the page size. With
+    `Accept: application/x-ndjson`, the whole list (or `limit` items) is streamed one item per line.
+
+    Pages and summaries are cached in a `QueryCache`. Every batch of ingested results invalidates
+    the responses of its project, apart from the result pages of the project's other scans.
+    """
+
+    def __init__(
+        self, db: Database, log_writer: LogWriter, cache: QueryCache | None = None
+    ) -> None:
+        self.db = db
+        self.cache = QueryCache() if cache is None else cache
+        self.__log = log_writer.component("QUERY")
+
+    def invalidate(self, rows: list[tuple]) -> None:
+        """Drops the cached responses about ingested `(project, scan_id, ...)` rows, see `IngestService.subscribe()`."""
+        tags = set()
+        for row in rows:
+            tags.add((row[0],))
+            tags.add((row[0], row[1]))
+        dropped = self.cache.invalidate(tags)
+        if dropped:
+            self.__log.debug("Dropped %d cached responses", dropped)
+
+    async def assets(self, request: Request) -> Response:
+        project = request.params["project_id"]
+        fields = parse_fields(request, ASSET_FIELDS)
+        kind = request.query.get("type") or None
+        cursor = request.query.get("cursor")
+        after = ("", 0)
+        if cursor:
+            after_kind, _, after_id = cursor.rpartition(":")
+            try:
+                after = (after_kind, int(after_id))
+            except ValueError:
+                raise HttpError(400, "Invalid cursor")
+
+        def fetch(after: tuple[str, int], limit: int) -> list[tuple]:
+            return self.db.select_assets(project, fields, after, limit, kind)
+
+        return await self.__list(
+            request,
+            ("assets", project, tuple(fields), kind),
+            ((project,),),
+            fetch,
+            after,
+            lambda row: (row[0], row[1]),
+            lambda after: f"{after[0]}:{after[1]}",
+            2,
+            fields,
+        )
+
+    async def results(self, request: Request) -> Response:
+        project = request.params["project_id"]
+        scan_id = request.params["scan_id"]
+        fields = parse_fields(request, RESULT_FIELDS)
+        try:
+            after = int(request.query.get("cursor") or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid cursor")
+
+        def fetch(after: int, limit: int) -> list[tuple]:
+            return self.db.select_results(project, scan_id, fields, after, limit)
+
+        return await self.__list(
+            request,
+            ("results", project, scan_id, tuple(fields)),
+            ((project, scan_id),),
+            fetch,
+            after,
+            lambda row: row[0],
+            str,
+            1,
+            fields,
+        )
+
+    async def summary(self, request: Request) -> Response:
+        project = request.params["project_id"]
+        key = ("summary", project)
+        body = self.cache.get(key)
+        if body is None:
+            tags = ((project,),)
+            generation = self.cache.generation(tags)
+            summary = await asyncio.get_running_loop().run_in_executor(
+                None, self.db.summarize_project, project
+            )
+            if summary is None:
+                raise HttpError(404, f"Unknown project '{project}'")
+            body = json.dumps(summary, separators=(",", ":")).encode("utf-8")
+            self.cache.put(key, body, tags, generation)
+        return Response(body, content_type="application/json")
+
+    async def __list(
+        self,
+        request: Request,
+        key: tuple,
+        tags: tuple,
+        fetch: Fetch,
+        after,
+        cursor_of: Callable[[tuple], object],
+        format_cursor: Callable[[object], str],
+        skip: int,
+        fields: list[str],
+    ) -> Response:
+        """Answers a list query with a page, or an NDJSON stream.
+
+        Args:
+        -----
+            request (Request): The query.
+            key (tuple): Identifies the query, along with the cursor and the limit, in the cache.
+            tags (tuple): The cache tags of the data the query reads.
+            fetch (Fetch): Reads a page of rows.
+            after: The cursor to read from.
+            cursor_of (Callable[[tuple], object]): Returns the cursor after a row.
+            format_cursor (Callable[[object], str]): Returns the text of a cursor.
+            skip (int): Number of leading row values that are the cursor, not fields.
+            fields (list[str]): The names of the other row values.
+        """
+        limit = request.query.get("limit")
+        try:
+            limit = None if limit is None else int(limit)
+        except ValueError:
+            limit = 0
+        if limit is not None and not 0 < limit <= QUERY_MAX_PAGE_SIZE:
+            raise HttpError(400, f"The limit must be from 1 to {QUERY_MAX_PAGE_SIZE}")
+
+        if NDJSON_CONTENT_TYPE in request.headers.get("accept", ""):
+            return Response(
+                stream(fetch, after, limit, cursor_of, skip, fields),
+                content_type=NDJSON_CONTENT_TYPE,
+            )
+
+        limit = limit or QUERY_PAGE_SIZE
+        key += (after, limit)
+        body = self.cache.get(key)
+        if body is None:
+            generation = self.cache.generation(tags)
+            rows = await asyncio.get_running_loop().run_in_executor(
+                None, fetch, after, limit
+            )
+            page = {
+                "items": [item(row, skip, fields) for row in rows],
+                "next": (
+                    format_cursor(cursor_of(rows[-1])) if len(rows) == limit else None
+                ),
+            }
+            body = json.dumps(page, separators=(",", ":")).encode("utf-8")
+            self.cache.put(key, body, tags, generation)
+        return Response(body, content_type="application/json")
+
+
+def parse_fields(request: Request, known: dict[str, str]) -> list[str]:
+    """Returns the fields of the `fields` query parameter, every known field by default.
+
+    Raises:
+    -------
+        HttpError: If a field is unknown (400)
+    """
+    fields = request.query.get("fields")
+    if not fields:
+        return list(known)
+    fields = list(dict.fromkeys(field.strip() for field in fields.split(",")))
+    unknown = [field for field in fields if field not in known]
+    if unknown:
+        raise HttpError(
+            400,
+            f"Unknown fields: {', '.join(unknown)} (expected some of {', '.join(known)})",
+        )
+    return fields
+
+
+def item(row: tuple, skip: int, fields: list[str]) -> dict:
+    item = dict(zip(fields, row[skip:]))
+    data = item.get("data")
+    if data is not None:
+        item["data"] = json.loads(data)
+    return item
+
+
+async def stream(
+    fetch: Fetch,
+    after,
+    limit: int | None,
+    cursor_of: Callable[[tuple], object],
+    skip: int,
+    fields: list[str],
+) -> AsyncIterator[bytes]:
+    """Yields the items after a cursor as NDJSON, reading `QUERY_STREAM_CHUNK` rows at once.
+    Every chunk is a page query of its own, so no read connection is held while the client reads.
+    """
+    loop = asyncio.get_running_loop()
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = (
+            QUERY_STREAM_CHUNK
+            if remaining is None
+            else min(QUERY_STREAM_CHUNK, remaining)
+        )
+        rows = await loop.run_in_executor(None, fetch, after, size)
+        if rows:
+            yield "".join(
+                json.dumps(item(row, skip, fields), separators=(",", ":")) + "\n"
+                for row in rows
+            ).encode("utf-8")
+        if len(rows) < size:
+            return
+        after = cursor_of(rows[-1])
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> QueryService:
+    """Adds the query routes to the API component, and invalidates their cache on ingestion."""
+    service = QueryService(components.db, log_writer)
+    components.service(IngestService).subscribe(service.invalidate)
+    components.api.route("GET", "/projects/{project_id}/assets")(service.assets)
+    components.api.route("GET", "/projects/{project_id}/scans/{scan_id}/results")(
+        service.results
+    )
+    components.api.route("GET", "/projects/{project_id}/summary")(service.summary)
+    return service
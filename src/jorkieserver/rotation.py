@@ -0,0 +1,265 @@
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable
+
+from jorkieserver.constants import (
+    LOG_COMPRESSION_METHODS,
+    DEFAULT_LOG_RETENTION,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+INDEX_SUFFIX = ".idx"
+
+
+class LogCompressor(threading.Thread):
+    """
+    Background thread that runs the rotation hook on rotated log segments, compresses them,
+    and removes segments beyond the retention count, keeping file I/O off the logging path.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(name="jorkie-log-compressor", daemon=True)
+        self.__jobs: queue.Queue = queue.Queue()
+
+    def submit(
+        self,
+        log_file_path: str,
+        segment_path: str,
+        compression: str,
+        retention: int,
+        on_rotate: Callable[[str], None] | None = None,
+    ) -> None:
+        """Schedules `segment_path` for compression and the segments of `log_file_path` for pruning.
+
+        Args:
+        -----
+            log_file_path (str): The path of the active log file the segment was rotated from.
+            segment_path (str): The path of the rotated segment.
+            compression (str): One of `LOG_COMPRESSION_METHODS`.
+            retention (int): Number of rotated segments to keep, 0 keeps every segment.
+            on_rotate (Callable[[str], None] | None): Called with the uncompressed segment path before compression.
+        """
+        self.__jobs.put(
+            (log_file_path, segment_path, compression, retention, on_rotate)
+        )
+
+    def stop(self) -> None:
+        """Finishes every pending job, then stops the thread."""
+        self.__jobs.put(None)
+        self.join()
+
+    def run(self) -> None:
+        while True:
+            job = self.__jobs.get()
+            if job is None:
+                break
+            log_file_path, segment_path, compression, retention, on_rotate = job
+            try:
+                if on_rotate is not None:
+                    on_rotate(segment_path)
+                compress_segment(segment_path, compression)
+                prune_segments(log_file_path, retention)
+            except OSError as e:
+                print(
+                    f"ERROR: [COMPONENT: LOGGING] Failed to compress or prune log segment '{segment_path}': {e}",
+                    file=sys.stderr,
+                )
+
+
+def compress_segment(segment_path: str, compression: str) -> str:
+    """Compresses a rotated log segment and removes the uncompressed copy.
+
+    Args:
+    -----
+        segment_path (str): The path of the rotated segment.
+        compression (str): One of `LOG_COMPRESSION_METHODS`. "zstd" falls back to "gzip" if `zstandard` is not installed.
+
+    Returns:
+    --------
+        str: The path of the resulting segment.
+    """
+    if compression == "zstd" and zstandard is None:
+        compression = "gzip"
+    if compression not in COMPRESSION_SUFFIXES:
+        return segment_path
+
+    compressed_path = segment_path + COMPRESSION_SUFFIXES[compression]
+    with open(segment_path, "rb") as source:
+        if compression == "gzip":
+            # Imported here, compression runs on the compressor thread, off the startup path.
+            import gzip
+            import shutil
+
+            with gzip.open(compressed_path, "wb") as target:
+                shutil.copyfileobj(source, target)
+        else:
+            with open(compressed_path, "wb") as target:
+                zstandard.ZstdCompressor().copy_stream(source, target)
+    os.remove(segment_path)
+    return compressed_path
+
+
+def list_segments(log_file_path: str) -> list[tuple[int, str]]:
+    """Lists the rotated segments of `log_file_path` (`<log file>.<index>[.gz|.zst]`).
+    Sidecar index files (`<log file>.<index>.idx`) are not included.
+
+    Args:
+    -----
+        log_file_path (str): The path of the active log file.
+
+    Returns:
+    --------
+        list[tuple[int, str]]: `(index, path)` pairs, oldest segment first.
+    """
+    log_dir = os.path.dirname(os.path.abspath(log_file_path))
+    prefix = os.path.basename(log_file_path) + "."
+    segments = []
+    for name in os.listdir(log_dir):
+        if not name.startswith(prefix) or name.endswith(INDEX_SUFFIX):
+            continue
+        index = name[len(prefix) :].split(".", 1)[0]
+        if index.isdigit():
+            segments.append((int(index), os.path.join(log_dir, name)))
+    segments.sort()
+    return segments
+
+
+def prune_segments(log_file_path: str, retention: int) -> None:
+    """Removes the oldest rotated segments so that at most `retention` remain. 0 keeps every segment."""
+    if retention <= 0:
+        return
+    segments = list_segments(log_file_path)
+    for index, segment_path in segments[: max(0, len(segments) - retention)]:
+        os.remove(segment_path)
+        index_path = f"{log_file_path}.{index}{INDEX_SUFFIX}"
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+
+class RotatingLogFile:
+    """
+    File-like object used as the log file stream of `LogWriter`.
+    Rolls the file over to `<log file>.<index>` when it exceeds `max_bytes` or is older than
+    `interval` seconds, and hands the rotated segment to a `LogCompressor` thread.
+
+    `on_rotate`, if set, is called on the compressor thread with the path of each rotated
+    segment before it is compressed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 0,
+        interval: int = 0,
+        retention: int = DEFAULT_LOG_RETENTION,
+        compression: str = "none",
+    ) -> None:
+        self.path = path
+        self.on_rotate: Callable[[str], None] | None = None
+        self.__lock = threading.Lock()
+        self.__compressor: LogCompressor | None = None
+        self.__stream = open(path, "a", encoding="utf-8")
+        self.__size = self.__stream.tell()
+        self.__opened_at = time.time()
+        self.__next_index = self.__find_next_index()
+        self.configure(max_bytes, interval, retention, compression)
+
+    @property
+    def closed(self) -> bool:
+        return self.__stream.closed
+
+    def configure(
+        self, max_bytes: int, interval: int, retention: int, compression: str
+    ) -> None:
+        """Updates the rotation settings. Takes effect on the next write.
+
+        Args:
+        -----
+            max_bytes (int): Rotate once the file would exceed this size, 0 disables size-based rotation.
+            interval (int): Rotate once the file is older than this many seconds, 0 disables time-based rotation.
+            retention (int): Number of rotated segments to keep, 0 keeps every segment.
+            compression (str): One of `LOG_COMPRESSION_METHODS`.
+
+        Raises:
+        -------
+            ValueError: If a setting is negative or the compression method is unknown
+        """
+        if max_bytes < 0 or interval < 0 or retention < 0:
+            raise ValueError("Log rotation settings must not be negative.")
+        if compression not in LOG_COMPRESSION_METHODS:
+            raise ValueError(f"Invalid log compression method '{compression}'.")
+        with self.__lock:
+            self.max_bytes = max_bytes
+            self.interval = interval
+            self.retention = retention
+            self.compression = compression
+
+    def write(self, text: str) -> int:
+        with self.__lock:
+            if self.__stream.closed:
+                return 0
+            if self.__should_rollover(len(text)):
+                self.__rollover()
+            written = self.__stream.write(text)
+            self.__size += written
+            return written
+
+    def writelines(self, lines: list[str]) -> None:
+        """Writes several lines under one lock acquisition, rolling over between lines when needed."""
+        with self.__lock:
+            if self.__stream.closed:
+                return
+            for line in lines:
+                if self.__should_rollover(len(line)):
+                    self.__rollover()
+                self.__size += self.__stream.write(line)
+
+    def flush(self) -> None:
+        with self.__lock:
+            if not self.__stream.closed:
+                self.__stream.flush()
+
+    def close(self) -> None:
+        """Closes the active file and waits for pending compressions to finish."""
+        with self.__lock:
+            self.__stream.close()
+            compressor, self.__compressor = self.__compressor, None
+        if compressor is not None:
+            compressor.stop()
+
+    def __should_rollover(self, incoming: int) -> bool:
+        # The size is tracked in characters, which is exact for the ASCII log lines and close enough otherwise.
+        if self.max_bytes and self.__size and self.__size + incoming > self.max_bytes:
+            return True
+        if self.interval and time.time() - self.__opened_at >= self.interval:
+            return True
+        return False
+
+    def __rollover(self) -> None:
+        # Caller must hold the lock. Only a rename happens here, compression runs on the compressor thread.
+        self.__stream.close()
+        segment_path = f"{self.path}.{self.__next_index}"
+        self.__next_index += 1
+        os.replace(self.path, segment_path)
+        self.__stream = open(self.path, "a", encoding="utf-8")
+        self.__size = 0
+        self.__opened_at = time.time()
+
+        if self.__compressor is None:
+            self.__compressor = LogCompressor()
+            self.__compressor.start()
+        self.__compressor.submit(
+            self.path, segment_path, self.compression, self.retention, self.on_rotate
+        )
+
+    def __find_next_index(self) -> int:
+        segments = list_segments(self.path)
+        return segments[-1][0] + 1 if segments else 1
@@ -0,0 +1,375 @@
+import heapq
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.constants import (
+    SCHEDULER_LAG_BUCKETS,
+    SCHEDULER_MAX_SLEEP,
+    SCHEDULER_MIN_INTERVAL,
+)
+from jorkieserver.db import connect
+from jorkieserver.logging import LogWriter
+from jorkieserver.metrics import Histogram
+from jorkieserver.types import Components, Configuration
+from jorkieserver.utils import create_directory
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    interval REAL NOT NULL,
+    next_fire REAL NOT NULL,
+    last_fired REAL
+);
+"""
+
+SELECT_SCHEDULES = (
+    "SELECT id, project, agent, interval, next_fire, last_fired FROM schedules "
+    "ORDER BY next_fire"
+)
+INSERT_SCHEDULE = (
+    "INSERT INTO schedules (project, agent, interval, next_fire) VALUES (?, ?, ?, ?)"
+)
+DELETE_SCHEDULE = "DELETE FROM schedules WHERE id = ?"
+UPDATE_FIRED = "UPDATE schedules SET next_fire = ?, last_fired = ? WHERE id = ?"
+
+
+class Schedule:
+    """
+    A recurring run of a Jorkie Agent on a project, every `interval` seconds.
+    Fire times are `time.time()` values.
+    """
+
+    __slots__ = ("id", "project", "agent", "interval", "next_fire", "last_fired")
+
+    def __init__(
+        self,
+        id: int,
+        project: str,
+        agent: str,
+        interval: float,
+        next_fire: float,
+        last_fired: float | None = None,
+    ) -> None:
+        self.id = id
+        # Thousands of schedules share a few projects and agents.
+        self.project = sys.intern(project)
+        self.agent = sys.intern(agent)
+        self.interval = interval
+        self.next_fire = next_fire
+        self.last_fired = last_fired
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def is_finite_number(value) -> bool:
+    """Returns True for an int or float other than a bool, infinity or NaN."""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+class Scheduler:
+    """
+    Fires recurring schedules from a min-heap of `(next_fire, id)` entries on its own thread.
+    Schedules are persisted in an SQLite file (`scheduler_path`) opened by `start()`.
+
+    Adding a schedule and firing the earliest one cost O(log n). Removed schedules
+    leave stale heap entries behind, skipped when popped and dropped when the heap is rebuilt.
+
+    Fires missed while the server was down are recovered at startup: the schedules are loaded in
+    `next_fire` order, which is already a valid heap, and only the overdue ones at its top are
+    popped. A schedule fires once for all the runs it missed, then resumes on its interval.
+    """
+
+    def __init__(self, configuration: Configuration, log_writer: LogWriter) -> None:
+        self.path = configuration.scheduler_path
+        self.lag = Histogram(SCHEDULER_LAG_BUCKETS)  # Seconds from fire time to firing
+        self.__log = log_writer.component("SCHEDULER")
+        self.__schedules: dict[int, Schedule] = {}
+        self.__projects: dict[str, set[int]] = {}
+        self.__heap: list[tuple[float, int]] = []
+        self.__stale = 0
+        self.__subscribers: list[Callable[[Schedule], None]] = []
+        self.__connection: sqlite3.Connection | None = None
+        self.__condition = threading.Condition()
+        self.__thread: threading.Thread | None = None
+        self.__stopping = False
+
+    def __len__(self) -> int:
+        return len(self.__schedules)
+
+    @property
+    def next_fire(self) -> float | None:
+        """The earliest fire time of a schedule, or None if there are no schedules."""
+        with self.__condition:
+            self.__drop_stale()
+            return self.__heap[0][0] if self.__heap else None
+
+    def start(self) -> None:
+        """Opens (or creates) the schedule file, loads the schedules and starts the scheduler thread."""
+        create_directory(os.path.dirname(os.path.abspath(self.path)), "SCHEDULER")
+        started = time.perf_counter()
+        self.__connection = connect(self.path)
+        self.__connection.executescript(SCHEMA)
+        for row in self.__connection.execute(SELECT_SCHEDULES):
+            schedule = Schedule(*row)
+            self.__schedules[schedule.id] = schedule
+            self.__projects.setdefault(schedule.project, set()).add(schedule.id)
+            self.__heap.append((schedule.next_fire, schedule.id))
+        self.__log.info(
+            "Loaded %d schedules in %.3f s",
+            len(self.__heap),
+            time.perf_counter() - started,
+        )
+        self.__stopping = False
+        self.__thread = threading.Thread(
+            target=self.__run, name="jorkie-scheduler", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stops the scheduler thread and closes the schedule file."""
+        if self.__thread is None:
+            return
+        with self.__condition:
+            self.__stopping = True
+            self.__condition.notify()
+        self.__thread.join()
+        self.__thread = None
+        self.__connection.close()
+        self.__connection = None
+
+    def subscribe(self, callback: Callable[[Schedule], None]) -> None:
+        """Registers `callback(schedule)` to be called on the scheduler thread every time a schedule fires."""
+        self.__subscribers.append(callback)
+
+    def add(
+        self,
+        project: str,
+        agent: str,
+        interval: float,
+        first_fire: float | None = None,
+    ) -> Schedule:
+        """Adds a recurring schedule.
+
+        Args:
+        -----
+            project (str): The project the agent runs on.
+            agent (str): The agent to run.
+            interval (float): Seconds between two runs, at least `SCHEDULER_MIN_INTERVAL`.
+            first_fire (float | None): The `time.time()` value of the first run, one interval from now by default.
+
+        Returns:
+        --------
+            Schedule: The added schedule.
+
+        Raises:
+        -------
+            ValueError: If the interval is too short, or a value is not a finite number
+        """
+        if not is_finite_number(interval) or not interval >= SCHEDULER_MIN_INTERVAL:
+            raise ValueError(
+                f"The interval must be at least {SCHEDULER_MIN_INTERVAL} seconds"
+            )
+        if first_fire is None:
+            first_fire = time.time() + interval
+        elif not is_finite_number(first_fire):
+            raise ValueError("The first fire time must be a finite number")
+        with self.__condition:
+            schedule_id = self.__connection.execute(
+                INSERT_SCHEDULE, (project, agent, interval, first_fire)
+            ).lastrowid
+            schedule = Schedule(schedule_id, project, agent, interval, first_fire)
+            self.__schedules[schedule_id] = schedule
+            self.__projects.setdefault(schedule.project, set()).add(schedule_id)
+            heapq.heappush(self.__heap, (first_fire, schedule_id))
+            if self.__heap[0][1] == schedule_id:
+                self.__condition.notify()
+        return schedule
+
+    def remove(self, schedule_id: int) -> bool:
+        """Removes a schedule, returns False if it does not exist."""
+        with self.__condition:
+            schedule = self.__schedules.pop(schedule_id, None)
+            if schedule is None:
+                return False
+            self.__connection.execute(DELETE_SCHEDULE, (schedule_id,))
+            self.__projects[schedule.project].discard(schedule_id)
+            self.__stale += 1
+            if self.__stale > len(self.__heap) // 2:
+                self.__heap = [
+                    entry for entry in self.__heap if self.__is_current(entry)
+                ]
+                heapq.heapify(self.__heap)
+                self.__stale = 0
+        return True
+
+    def get(self, schedule_id: int) -> Schedule | None:
+        return self.__schedules.get(schedule_id)
+
+    def schedules(self, project: str) -> list[Schedule]:
+        """Returns the schedules of a project, by id."""
+        with self.__condition:
+            return [
+                self.__schedules[schedule_id]
+                for schedule_id in sorted(self.__projects.get(project, ()))
+            ]
+
+    def tick(self, now: float | None = None) -> list[Schedule]:
+        """Fires every schedule due at `now` (the current time by default), and persists their next fire time.
+
+        Returns:
+        --------
+            list[Schedule]: The fired schedules, in fire time order.
+        """
+        if now is None:
+            now = time.time()
+        fired = []
+        with self.__condition:
+            heap = self.__heap
+            while heap and heap[0][0] <= now:
+                entry = heapq.heappop(heap)
+                if not self.__is_current(entry):
+                    self.__stale -= 1
+                    continue
+                schedule = self.__schedules[entry[1]]
+                try:
+                    missed = math.floor((now - schedule.next_fire) / schedule.interval)
+                except (OverflowError, ValueError, ZeroDivisionError) as e:
+                    # Stored before the values were checked, it would stop every tick.
+                    self.__log.error(
+                        "Removing schedule %d with an invalid fire time: %r",
+                        schedule.id,
+                        e,
+                    )
+                    del self.__schedules[schedule.id]
+                    self.__projects[schedule.project].discard(schedule.id)
+                    self.__connection.execute(DELETE_SCHEDULE, (schedule.id,))
+                    continue
+                self.lag.observe(now - entry[0])
+                if missed:
+                    self.__log.info(
+                        "Schedule %d (%s on %s) missed %d runs",
+                        schedule.id,
+                        schedule.agent,
+                        schedule.project,
+                        missed,
+                    )
+                schedule.last_fired = now
+                schedule.next_fire += (missed + 1) * schedule.interval
+                heapq.heappush(heap, (schedule.next_fire, schedule.id))
+                fired.append(schedule)
+            if fired:
+                self.__connection.execute("BEGIN")
+                self.__connection.executemany(
+                    UPDATE_FIRED, [(s.next_fire, s.last_fired, s.id) for s in fired]
+                )
+                self.__connection.execute("COMMIT")
+        for schedule in fired:
+            for callback in self.__subscribers:
+                try:
+                    callback(schedule)
+                except Exception as e:
+                    self.__log.error("Schedule subscriber %r failed: %r", callback, e)
+        return fired
+
+    def __is_current(self, entry: tuple[float, int]) -> bool:
+        schedule = self.__schedules.get(entry[1])
+        return schedule is not None and schedule.next_fire == entry[0]
+
+    def __drop_stale(self) -> None:
+        while self.__heap and not self.__is_current(self.__heap[0]):
+            heapq.heappop(self.__heap)
+            self.__stale -= 1
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__stopping:
+                    self.__drop_stale()
+                    delay = (
+                        self.__heap[0][0] - time.time()
+                        if self.__heap
+                        else SCHEDULER_MAX_SLEEP
+                    )
+                    if delay <= 0:
+                        break
+                    self.__condition.wait(min(delay, SCHEDULER_MAX_SLEEP))
+                if self.__stopping:
+                    return
+            try:
+                self.tick()
+            except Exception as e:
+                self.__log.error("Scheduler tick failed: %r", e)
+                with self.__condition:
+                    self.__condition.wait(SCHEDULER_MIN_INTERVAL)
+
+
+class ScheduleService:
+    """
+    Schedule routes of the API component, on top of the scheduler component.
+    """
+
+    def __init__(self, scheduler: Scheduler) -> None:
+        self.scheduler = scheduler
+
+    async def create(self, request: Request) -> Response:
+        document = await request.json()
+        if not isinstance(document, dict) or not isinstance(document.get("agent"), str):
+            raise HttpError(400, "Expected an object with an 'agent' string")
+        interval = document.get("interval")
+        first_fire = document.get("first_fire")
+        if not is_finite_number(interval) or not (
+            first_fire is None or is_finite_number(first_fire)
+        ):
+            raise HttpError(400, "'interval' and 'first_fire' must be finite numbers")
+        try:
+            schedule = self.scheduler.add(
+                request.params["project_id"], document["agent"], interval, first_fire
+            )
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return Response.json(schedule.as_dict(), 201)
+
+    async def list(self, request: Request) -> Response:
+        return Response.json(
+            [
+                schedule.as_dict()
+                for schedule in self.scheduler.schedules(request.params["project_id"])
+            ]
+        )
+
+    async def delete(self, request: Request) -> Response:
+        try:
+            schedule_id = int(request.params["schedule_id"])
+        except ValueError:
+            raise HttpError(404)
+        schedule = self.scheduler.get(schedule_id)
+        if schedule is None or schedule.project != request.params["project_id"]:
+            raise HttpError(404)
+        self.scheduler.remove(schedule_id)
+        return Response(status=204)
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> ScheduleService:
+    """Adds the schedule routes to the API component."""
+    service = ScheduleService(components.scheduler)
+    components.api.route("POST", "/projects/{project_id}/schedules")(service.create)
+    components.api.route("GET", "/projects/{project_id}/schedules")(service.list)
+    components.api.route("DELETE", "/projects/{project_id}/schedules/{schedule_id}")(
+        service.delete
+    )
+    return service
@@ -0,0 +1,652 @@
+import asyncio
+import ipaddress
+import socket
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.constants import SCOPE_CACHE_SIZE, SCOPE_IP_KINDS, SCOPE_NETWORK_KINDS
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Components, Configuration
+
+IPV4_BITS = 32
+IPV6_BITS = 128
+MAX_ASN = 2**32 - 1
+
+# Trie node: [network, prefix length, child for bit 0, child for bit 1, is a rule]
+NETWORK, LENGTH, TERMINAL = 0, 1, 4
+
+
+def parse_address(value: str) -> tuple[int, int] | None:
+    """Returns the `(bits, address)` of an IPv4 or IPv6 address, or None if it is not one."""
+    try:
+        if ":" in value:
+            return IPV6_BITS, int.from_bytes(socket.inet_pton(socket.AF_INET6, value))
+        return IPV4_BITS, int.from_bytes(socket.inet_pton(socket.AF_INET, value))
+    except (OSError, ValueError):
+        return None
+
+
+def parse_network(value: str) -> tuple[int, int, int] | None:
+    """Returns the `(bits, network, prefix length)` of a CIDR block (or of a single address),
+    host bits cleared, or None if it is not one.
+    """
+    address, _, length = value.partition("/")
+    parsed = parse_address(address)
+    if parsed is None:
+        return None
+    bits, network = parsed
+    if not length:
+        return bits, network, bits
+    if not length.isdigit() or int(length) > bits:
+        return None
+    length = int(length)
+    host_bits = bits - length
+    return bits, network >> host_bits << host_bits, length
+
+
+def parse_asn(value: str) -> int | None:
+    """Returns the number of an "AS13335" (or "13335") autonomous system, or None."""
+    if value[:2] in ("AS", "as", "As", "aS"):
+        value = value[2:]
+    if not value.isdigit() or int(value) > MAX_ASN:
+        return None
+    return int(value)
+
+
+def domain_labels(value: str) -> list[str] | None:
+    """Returns the labels of a domain name, lower-cased, or None if it is not one."""
+    if " " in value or "/" in value:
+        return None
+    labels = value.lower().rstrip(".").split(".")
+    return labels if all(labels) else None
+
+
+def parse_rule(rule: str) -> tuple:
+    """Parses a scope rule.
+
+    Args:
+    -----
+        rule (str): A CIDR block or an IP address ("10.0.0.0/8", "2001:db8::1"), an ASN or an
+            ASN range ("AS13335", "AS64512-AS65534"), a domain name ("example.com") or a wildcard
+            domain ("*.example.com", matching every name below example.com but not itself).
+
+    Returns:
+    --------
+        tuple: `("network", bits, network, length)`, `("asn", first, last)` or
+            `("domain", labels, wildcard)`.
+
+    Raises:
+    -------
+        ValueError: If the rule is none of these
+    """
+    rule = rule.strip()
+    network = parse_network(rule)
+    if network is not None:
+        return ("network", *network)
+    first, _, last = rule.partition("-")
+    first_asn = parse_asn(first.strip())
+    if first_asn is not None:
+        last_asn = parse_asn(last.strip()) if last else first_asn
+        if last_asn is None or last_asn < first_asn:
+            raise ValueError(f"Invalid ASN range '{rule}'")
+        return ("asn", first_asn, last_asn)
+    wildcard = rule.startswith("*.")
+    labels = domain_labels(rule[2:] if wildcard else rule)
+    if labels is None or "*" in labels:
+        raise ValueError(f"Invalid scope rule '{rule}'")
+    return ("domain", tuple(labels), wildcard)
+
+
+def normalize_rule(rule: str) -> str:
+    """Returns the canonical form of a scope rule, the one stored, see `parse_rule()`.
+
+    Raises:
+    -------
+        ValueError: If the rule is not valid
+    """
+    parsed = parse_rule(rule)
+    if parsed[0] == "network":
+        _, bits, network, length = parsed
+        address = (
+            ipaddress.IPv4Address if bits == IPV4_BITS else ipaddress.IPv6Address
+        )(network)
+        return f"{address}/{length}"
+    if parsed[0] == "asn":
+        _, first, last = parsed
+        return f"AS{first}" if first == last else f"AS{first}-AS{last}"
+    _, labels, wildcard = parsed
+    return ("*." if wildcard else "") + ".".join(labels)
+
+
+class PrefixTrie:
+    """
+    Path-compressed binary (Patricia) trie of the CIDR blocks of one address family. A lookup
+    follows one path from the root, comparing a whole compressed prefix per node, so it costs at
+    most one step per branching node whatever the number of blocks.
+
+    Nodes only change by single assignments (of a child or of the rule flag), with new nodes
+    linked in once complete, so lookups need no lock while a single writer changes the blocks.
+    """
+
+    def __init__(self, bits: int) -> None:
+        self.bits = bits
+        self.root: list = [0, 0, None, None, False]
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def contains(self, address: int) -> bool:
+        """Returns whether a block contains the address."""
+        bits = self.bits
+        node = self.root
+        while node is not None:
+            network, length, zero, one, terminal = node
+            if length and (address ^ network) >> (bits - length):
+                return False
+            if terminal:
+                return True
+            if length == bits:
+                return False
+            node = one if address >> (bits - 1 - length) & 1 else zero
+        return False
+
+    def covers(self, network: int, length: int) -> bool:
+        """Returns whether a block contains the whole `network/length` block."""
+        bits = self.bits
+        node = self.root
+        while node is not None and node[LENGTH] <= length:
+            node_length = node[LENGTH]
+            if node_length and (network ^ node[NETWORK]) >> (bits - node_length):
+                return False
+            if node[TERMINAL]:
+                return True
+            if node_length == length:
+                return False
+            node = node[2 + (network >> (bits - 1 - node_length) & 1)]
+        return False
+
+    def overlaps(self, network: int, length: int) -> bool:
+        """Returns whether a block contains, or is contained in, the `network/length` block."""
+        if not self.size:
+            return False
+        bits = self.bits
+        node = self.root
+        while node is not None:
+            node_length = node[LENGTH]
+            common = min(node_length, length)
+            if common and (network ^ node[NETWORK]) >> (bits - common):
+                return False
+            if node[TERMINAL] or node_length >= length:
+                # A rule on the path, or a non-empty subtree below the block.
+                return True
+            node = node[2 + (network >> (bits - 1 - node_length) & 1)]
+        return False
+
+    def insert(self, network: int, length: int) -> bool:
+        """Adds a block, returns False if it was already there."""
+        bits = self.bits
+        node = self.root
+        while True:
+            if node[LENGTH] == length:
+                if node[TERMINAL]:
+                    return False
+                node[TERMINAL] = True
+                self.size += 1
+                return True
+            slot = 2 + (network >> (bits - 1 - node[LENGTH]) & 1)
+            child = node[slot]
+            if child is None:
+                node[slot] = [network, length, None, None, True]
+                self.size += 1
+                return True
+            limit = min(child[LENGTH], length)
+            common = limit - ((child[NETWORK] ^ network) >> (bits - limit)).bit_length()
+            if common == child[LENGTH]:
+                node = child
+                continue
+            prefix = network >> (bits - common) << (bits - common) if common else 0
+            branch = [prefix, common, None, None, common == length]
+            branch[2 + (child[NETWORK] >> (bits - 1 - common) & 1)] = child
+            if common != length:
+                branch[2 + (network >> (bits - 1 - common) & 1)] = [
+                    network,
+                    length,
+                    None,
+                    None,
+                    True,
+                ]
+            node[slot] = branch
+            self.size += 1
+            return True
+
+    def remove(self, network: int, length: int) -> bool:
+        """Removes a block, returns False if it was not there."""
+        bits = self.bits
+        path = []
+        node = self.root
+        while node is not None and node[LENGTH] < length:
+            if node[LENGTH] and (network ^ node[NETWORK]) >> (bits - node[LENGTH]):
+                return False
+            slot = 2 + (network >> (bits - 1 - node[LENGTH]) & 1)
+            path.append((node, slot))
+            node = node[slot]
+        if (
+            node is None
+            or node[LENGTH] != length
+            or node[NETWORK] != network
+            or not node[TERMINAL]
+        ):
+            return False
+        self.size -= 1
+        if not path:
+            node[TERMINAL] = False
+            return True
+        # Replace the node by its only child, or unlink it, and merge its parent if it was a
+        # branch of two nodes that now has one.
+        parent, slot = path[-1]
+        children = [child for child in node[2:4] if child is not None]
+        if len(children) == 2:
+            node[TERMINAL] = False
+            return True
+        parent[slot] = children[0] if children else None
+        if len(path) > 1 and not parent[TERMINAL]:
+            remaining = [child for child in parent[2:4] if child is not None]
+            if len(remaining) == 1:
+                grandparent, parent_slot = path[-2]
+                grandparent[parent_slot] = remaining[0]
+        return True
+
+
+class DomainTrie:
+    """
+    Trie of domain names keyed by their labels in reverse order ("com", "example", "www"), so a
+    lookup walks the labels of a name once, from the top-level domain down, whatever the number
+    of rules. A node is a dict of its child labels, plus the "" key for an exact name rule and
+    the "*" key for a wildcard rule (neither is a valid label).
+    """
+
+    def __init__(self) -> None:
+        self.root: dict = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def contains(self, labels: list[str]) -> bool:
+        """Returns whether a rule matches the name of the labels (not reversed)."""
+        node = self.root
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[i])
+            if node is None:
+                return False
+            if i and "*" in node:
+                return True
+        return "" in node
+
+    def insert(self, labels: tuple[str, ...], wildcard: bool) -> bool:
+        """Adds a rule, returns False if it was already there."""
+        node = self.root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        marker = "*" if wildcard else ""
+        if marker in node:
+            return False
+        node[marker] = True
+        self.size += 1
+        return True
+
+    def remove(self, labels: tuple[str, ...], wildcard: bool) -> bool:
+        """Removes a rule, returns False if it was not there."""
+        path = []
+        node = self.root
+        for label in reversed(labels):
+            child = node.get(label)
+            if child is None:
+                return False
+            path.append((node, label))
+            node = child
+        marker = "*" if wildcard else ""
+        if node.pop(marker, None) is None:
+            return False
+        self.size -= 1
+        for parent, label in reversed(path):
+            if parent[label]:
+                break
+            del parent[label]
+        return True
+
+
+class AsnTable:
+    """
+    ASN ranges merged into sorted, disjoint intervals: a lookup is one bisection. Changing a rule
+    rebuilds the table, which is cheap for the few ASN rules a scope has, and swaps it in one
+    assignment so lookups need no lock.
+    """
+
+    def __init__(self) -> None:
+        self.ranges: set[tuple[int, int]] = set()
+        self.__table: tuple[list[int], list[int]] = ([], [])
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def contains(self, asn: int) -> bool:
+        starts, ends = self.__table
+        i = bisect_right(starts, asn) - 1
+        return i >= 0 and asn <= ends[i]
+
+    def insert(self, first: int, last: int) -> bool:
+        if (first, last) in self.ranges:
+            return False
+        self.ranges.add((first, last))
+        self.__rebuild()
+        return True
+
+    def remove(self, first: int, last: int) -> bool:
+        if (first, last) not in self.ranges:
+            return False
+        self.ranges.discard((first, last))
+        self.__rebuild()
+        return True
+
+    def __rebuild(self) -> None:
+        starts, ends = [], []
+        for first, last in sorted(self.ranges):
+            if ends and first <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], last)
+            else:
+                starts.append(first)
+                ends.append(last)
+        self.__table = (starts, ends)
+
+
+class RuleSet:
+    """
+    The compiled rules of one list of a scope (in-scope or out-of-scope).
+    """
+
+    def __init__(self, rules: Iterable[str] = ()) -> None:
+        self.networks = {
+            IPV4_BITS: PrefixTrie(IPV4_BITS),
+            IPV6_BITS: PrefixTrie(IPV6_BITS),
+        }
+        self.domains = DomainTrie()
+        self.asns = AsnTable()
+        self.size = 0
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, rule: str) -> bool:
+        """Compiles a rule in, returns False if it was already there.
+
+        Raises:
+        -------
+            ValueError: If the rule is not valid
+        """
+        added = self.__apply(parse_rule(rule), "insert")
+        self.size += added
+        return added
+
+    def remove(self, rule: str) -> bool:
+        """Removes a rule, returns False if it was not there.
+
+        Raises:
+        -------
+            ValueError: If the rule is not valid
+        """
+        removed = self.__apply(parse_rule(rule), "remove")
+        self.size -= removed
+        return removed
+
+    def __apply(self, parsed: tuple, operation: str) -> bool:
+        kind = parsed[0]
+        if kind == "network":
+            _, bits, network, length = parsed
+            return getattr(self.networks[bits], operation)(network, length)
+        if kind == "asn":
+            return getattr(self.asns, operation)(parsed[1], parsed[2])
+        return getattr(self.domains, operation)(parsed[1], parsed[2])
+
+
+class ScopeMatcher:
+    """
+    The compiled scope of a project: an asset is in scope if an in-scope rule matches it and no
+    out-of-scope rule does. A scope without in-scope rules puts every asset in scope that no
+    out-of-scope rule matches, so projects without a scope keep every result.
+
+    IP assets are matched against CIDR blocks, ASN assets against ASN ranges, and any other asset
+    (domains, subdomains, hosts) by its name against the domain rules. A CIDR block asset is in
+    scope if an in-scope block covers it and no out-of-scope block overlaps it. Assets whose value
+    cannot be parsed are matched by no rule.
+    """
+
+    def __init__(
+        self, include: Iterable[str] = (), exclude: Iterable[str] = ()
+    ) -> None:
+        self.include = RuleSet(include)
+        self.exclude = RuleSet(exclude)
+
+    def in_scope(self, kind: str, value: str) -> bool:
+        # The value is parsed once, then looked up in both rule sets.
+        include, exclude = self.include, self.exclude
+        if kind in SCOPE_IP_KINDS:
+            parsed = parse_address(value)
+            if parsed is None:
+                return not include.size
+            bits, address = parsed
+            if include.size and not include.networks[bits].contains(address):
+                return False
+            return not exclude.networks[bits].contains(address)
+        if kind in SCOPE_NETWORK_KINDS:
+            parsed = parse_network(value)
+            if parsed is None:
+                return not include.size
+            bits, network, length = parsed
+            if include.size and not include.networks[bits].covers(network, length):
+                return False
+            return not exclude.networks[bits].overlaps(network, length)
+        if kind == "asn":
+            asn = parse_asn(value)
+            if asn is None:
+                return not include.size
+            if include.size and not include.asns.contains(asn):
+                return False
+            return not exclude.asns.contains(asn)
+        labels = domain_labels(value)
+        if labels is None:
+            return not include.size
+        if include.size and not include.domains.contains(labels):
+            return False
+        return not exclude.domains.contains(labels)
+
+    def filter(self, rows: list[tuple]) -> list[tuple]:
+        """Returns the in-scope `(project, scan_id, kind, value, ...)` result rows."""
+        in_scope = self.in_scope
+        return [row for row in rows if in_scope(row[2], row[3])]
+
+    def target_in_scope(self, target: str) -> bool:
+        """Returns whether an agent target (an address, a CIDR block, an ASN or a name) is in scope."""
+        if "/" in target:
+            return self.in_scope("cidr", target)
+        if parse_address(target) is not None:
+            return self.in_scope("ip", target)
+        if parse_asn(target) is not None:
+            return self.in_scope("asn", target)
+        return self.in_scope("domain", target)
+
+
+class ScopeService:
+    """
+    Project scopes: the rules are stored in the database, and compiled into a `ScopeMatcher` per
+    project on first use, of which the `SCOPE_CACHE_SIZE` most recently used are kept. Adding or
+    removing rules updates the cached matcher in place, rule by rule, without recompiling it.
+
+    `GET /projects/{project_id}/scope` lists the rules, `POST` adds and `DELETE` removes the rules
+    of an `{"include": [...], "exclude": [...]}` body, and `GET /projects/{project_id}/scope/check`
+    tells whether the asset of the `type` and `value` query parameters is in scope.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], list[tuple[str, bool]]],
+        store: Callable[[str, list[tuple[str, bool]], bool], None],
+        log_writer: LogWriter,
+        cache_size: int = SCOPE_CACHE_SIZE,
+    ) -> None:
+        self.cache_size = cache_size
+        self.__load = load
+        self.__store = store
+        self.__log = log_writer.component("SCOPE")
+        self.__matchers: OrderedDict[str, ScopeMatcher] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__subscribers: list[Callable[[str], None]] = []
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """Registers `callback(project)` to be called once the rules of a project changed."""
+        self.__subscribers.append(callback)
+
+    def forget(self, project: str) -> None:
+        """Drops the compiled scope of a project, its rules are read again on next use."""
+        with self.__lock:
+            self.__matchers.pop(project, None)
+
+    def matcher(self, project: str) -> ScopeMatcher:
+        """Returns the compiled scope of a project."""
+        with self.__lock:
+            matcher = self.__matchers.get(project)
+            if matcher is not None:
+                self.__matchers.move_to_end(project)
+                return matcher
+            rules = self.__load(project)
+            matcher = ScopeMatcher(
+                (rule for rule, excluded in rules if not excluded),
+                (rule for rule, excluded in rules if excluded),
+            )
+            self.__matchers[project] = matcher
+            if len(self.__matchers) > self.cache_size:
+                self.__matchers.popitem(last=False)
+            return matcher
+
+    def in_scope(self, project: str, kind: str, value: str) -> bool:
+        return self.matcher(project).in_scope(kind, value)
+
+    def add_rules(
+        self, project: str, include: list[str] = (), exclude: list[str] = ()
+    ) -> None:
+        """Adds rules to the scope of a project.
+
+        Raises:
+        -------
+            ValueError: If a rule is not valid, in which case none is added
+        """
+        self.__change(project, include, exclude, True)
+
+    def remove_rules(
+        self, project: str, include: list[str] = (), exclude: list[str] = ()
+    ) -> None:
+        """Removes rules from the scope of a project.
+
+        Raises:
+        -------
+            ValueError: If a rule is not valid, in which case none is removed
+        """
+        self.__change(project, include, exclude, False)
+
+    def rules(self, project: str) -> dict[str, list[str]]:
+        rules = self.__load(project)
+        return {
+            "include": [rule for rule, excluded in rules if not excluded],
+            "exclude": [rule for rule, excluded in rules if excluded],
+        }
+
+    async def get_scope(self, request: Request) -> Response:
+        rules = await asyncio.get_running_loop().run_in_executor(
+            None, self.rules, request.params["project_id"]
+        )
+        return Response.json(rules)
+
+    async def post_scope(self, request: Request) -> Response:
+        return await self.__change_route(request, True)
+
+    async def delete_scope(self, request: Request) -> Response:
+        return await self.__change_route(request, False)
+
+    async def check(self, request: Request) -> Response:
+        kind = request.query.get("type")
+        value = request.query.get("value")
+        if not kind or not value:
+            raise HttpError(400, "Expected the 'type' and 'value' query parameters")
+        matcher = await asyncio.get_running_loop().run_in_executor(
+            None, self.matcher, request.params["project_id"]
+        )
+        return Response.json({"in_scope": matcher.in_scope(kind, value)})
+
+    async def __change_route(self, request: Request, add: bool) -> Response:
+        document = await request.json()
+        if not isinstance(document, dict) or not all(
+            isinstance(document.get(key, []), list)
+            and all(isinstance(rule, str) for rule in document.get(key, []))
+            for key in ("include", "exclude")
+        ):
+            raise HttpError(
+                400, "Expected an object with 'include' and 'exclude' lists"
+            )
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                self.__change,
+                request.params["project_id"],
+                document.get("include", []),
+                document.get("exclude", []),
+                add,
+            )
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return Response(status=204)
+
+    def __change(
+        self, project: str, include: list[str], exclude: list[str], add: bool
+    ) -> None:
+        changes = [(normalize_rule(rule), False) for rule in include]
+        changes += [(normalize_rule(rule), True) for rule in exclude]
+        with self.__lock:
+            self.__store(project, changes, add)
+            matcher = self.__matchers.get(project)
+            if matcher is not None:
+                for rule, excluded in changes:
+                    rules = matcher.exclude if excluded else matcher.include
+                    if add:
+                        rules.add(rule)
+                    else:
+                        rules.remove(rule)
+        self.__log.info(
+            "%s %d scope rules of project %s",
+            "Added" if add else "Removed",
+            len(changes),
+            project,
+        )
+        for callback in self.__subscribers:
+            try:
+                callback(project)
+            except Exception as e:
+                self.__log.error("Scope subscriber %r failed: %r", callback, e)
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> ScopeService:
+    """Adds the scope routes to the API component, storing the rules in the database component."""
+    db = components.db
+    service = ScopeService(db.scope_rules, db.change_scope_rules, log_writer)
+    components.api.route("GET", "/projects/{project_id}/scope")(service.get_scope)
+    components.api.route("POST", "/projects/{project_id}/scope")(service.post_scope)
+    components.api.route("DELETE", "/projects/{project_id}/scope")(service.delete_scope)
+    components.api.route("GET", "/projects/{project_id}/scope/check")(service.check)
+    return service
@@ -1,10 +1,20 @@
 #!/usr/bin/env python3
 
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
 import sys
+import signal
 import argparse
+import threading
+from typing import TYPE_CHECKING
 
 from jorkieserver.types import CommandOptions, Configuration, Components
 from jorkieserver.logging import LogWriter
+from jorkieserver.configurator import Configurator
+from jorkieserver.metrics import MetricsRegistry
+from jorkieserver.startup import StartupProfile, boot_components, init_services
 from jorkieserver.constants import (
     APPLICATION_NAME,
     APPLICATION_DESCRIPTION,
@@ -13,8 +23,21 @@ from jorkieserver.constants import (
     DEFAULT_LOG_LEVEL,
     DEFAULT_LOG_FILE,
     DEFAULT_CONFIG_FILE,
+    DEFAULT_LOG_FORMAT,
+    DEFAULT_LOG_OVERFLOW_POLICY,
+    DEFAULT_LOG_QUEUE_SIZE,
+    DEFAULT_API_WORKERS,
+    SUPERVISOR_CLIENT_CONCURRENCY,
+    LOG_FORMATS,
+    LOG_OVERFLOW_POLICIES,
 )
 
+if TYPE_CHECKING:
+    from jorkieserver.supervisor import Supervisor
+    from jorkieserver.watcher import ConfigReloader, ConfigWatcher
+
+IMPORT_FINISHED = time.perf_counter()
+
 
 class Server:
     """
@@ -27,15 +50,87 @@ class Server:
         """
         Initialize the Server object,
         parses cmd-line arguments by calling the `__parse_args()` method,
-        loads (or initializes) the configuration by calling the `__load_config()` method,
         initializes the logging by calling the `__init_logging()` method,
-        and initializes the asynchranous sub-components by calling `__init_components()`.
+        loads (or initializes) the configuration by calling the `__load_config()` method,
+        applies the logging section of the configuration by calling `__configure_logging()`,
+        initializes the asynchranous sub-components by calling `__init_components()`,
+        and starts watching the configuration file by calling `__init_config_watcher()`.
+        Every phase is timed in `startup_profile`, and reported on stderr with `--startup-profile`.
         """
 
-        self.cmd_opts = self.__parse_args()
-        self.config = self.__load_config()
-        self.log_writer = self.__init_logging()
-        self.components = self.__init_components()
+        self.__stopping = threading.Event()
+        self.supervisor: "Supervisor | None" = None
+        self.startup_profile = StartupProfile(IMPORT_STARTED)
+        self.metrics = MetricsRegistry()
+        self.__config_reloads = self.metrics.counter(
+            "jorkie_config_reloads_total", "Configuration reloads applied."
+        )
+        self.startup_profile.record("imports", IMPORT_FINISHED - IMPORT_STARTED)
+        with self.startup_profile.phase("arguments"):
+            self.cmd_opts = self.__parse_args()
+        with self.startup_profile.phase("logging"):
+            self.log_writer = self.__init_logging()
+        with self.startup_profile.phase("configuration"):
+            self.config = self.__load_config()
+            self.__configure_logging()
+        with self.startup_profile.phase("components"):
+            self.components = self.__init_components()
+        with self.startup_profile.phase("config watcher"):
+            self.config_reloader, self.config_watcher = self.__init_config_watcher()
+        self.startup_profile.mark_ready()
+        self.__record_startup()
+        self.log_writer.debug(
+            "Ready in %.1f ms", "MAIN", self.startup_profile.total * 1000
+        )
+        if self.cmd_opts.startup_profile:
+            sys.stderr.write(self.startup_profile.report())
+
+    def run(self) -> None:
+        """
+        Starts the sub-components and serves until SIGINT or SIGTERM is received (or `stop()` is called),
+        then stops the sub-components and the configuration watcher. SIGUSR2 toggles a sampling profile,
+        and with `--workers`, SIGHUP restarts the API worker processes one at a time.
+        """
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: self.stop())
+            self.__install_profiler_signal()
+            if self.supervisor is not None and hasattr(signal, "SIGHUP"):
+                signal.signal(
+                    signal.SIGHUP,
+                    lambda *_: self.supervisor.reconfigure(self.config, set()),
+                )
+        try:
+            self.components.start()
+        except OSError as e:
+            self.log_writer.critical("Failed to start the server: %s", "MAIN", e)
+        self.log_writer.info("Server started", "MAIN")
+
+        while not self.__stopping.wait(1):
+            pass
+
+        self.log_writer.info("Stopping the server", "MAIN")
+        self.components.stop()
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        self.log_writer.flush()
+
+    def stop(self) -> None:
+        """Makes `run()` return. Safe to call from any thread or signal handler."""
+        self.__stopping.set()
+
+    def __install_profiler_signal(self) -> None:
+        """SIGUSR2 starts a sampling profile of the server, or ends the running one."""
+        from jorkieserver.profiler import ProfilerService
+
+        profiler = self.components.service(ProfilerService)
+        if profiler is None or not hasattr(signal, "SIGUSR2"):
+            return
+        # Writing a profile takes a while and a lock, so not in the signal handler itself.
+        signal.signal(
+            signal.SIGUSR2,
+            lambda *_: threading.Thread(target=profiler.toggle, daemon=True).start(),
+        )
 
     def __parse_args(self) -> CommandOptions:
         cli_arg_parser = argparse.ArgumentParser(
@@ -66,6 +161,74 @@ class Server:
             dest="log_file",
         )
 
+        cli_arg_parser.add_argument(
+            "--log-async",
+            default=False,
+            required=False,
+            action="store_true",
+            help="Write log records from a background thread instead of the calling thread",
+            dest="log_async",
+        )
+
+        cli_arg_parser.add_argument(
+            "--log-overflow",
+            default=DEFAULT_LOG_OVERFLOW_POLICY,
+            choices=LOG_OVERFLOW_POLICIES,
+            required=False,
+            action="store",
+            help="What to do when the async log queue is full",
+            dest="log_overflow",
+        )
+
+        cli_arg_parser.add_argument(
+            "--log-queue-size",
+            default=DEFAULT_LOG_QUEUE_SIZE,
+            required=False,
+            action="store",
+            type=int,
+            help="Maximum number of pending log records in async mode",
+            dest="log_queue_size",
+        )
+
+        cli_arg_parser.add_argument(
+            "--log-format",
+            default=DEFAULT_LOG_FORMAT,
+            choices=LOG_FORMATS,
+            required=False,
+            action="store",
+            help="Log file format (text lines or indexed JSON lines)",
+            dest="log_format",
+        )
+
+        cli_arg_parser.add_argument(
+            "--watch-config",
+            default=False,
+            required=False,
+            action="store_true",
+            help="Reload the configuration file whenever it changes",
+            dest="watch_config",
+        )
+
+        cli_arg_parser.add_argument(
+            "--startup-profile",
+            default=False,
+            required=False,
+            action="store_true",
+            help="Print how long each startup phase took",
+            dest="startup_profile",
+        )
+
+        cli_arg_parser.add_argument(
+            "--workers",
+            "-w",
+            default=DEFAULT_API_WORKERS,
+            required=False,
+            action="store",
+            type=int,
+            help="Serve the API from N worker processes sharing the port, 0 serves it from the server process",
+            dest="workers",
+        )
+
         cli_arg_parser.add_argument(
             "--config",
             "-c",
@@ -82,26 +245,123 @@ class Server:
             parsed_cli_args.log_level,
             parsed_cli_args.log_file,
             parsed_cli_args.config_file,
+            parsed_cli_args.log_async,
+            parsed_cli_args.log_overflow,
+            parsed_cli_args.log_queue_size,
+            parsed_cli_args.log_format,
+            parsed_cli_args.watch_config,
+            parsed_cli_args.startup_profile,
+            max(0, parsed_cli_args.workers),
         )
 
         return cli_args
 
     def __load_config(self) -> Configuration:
-        return Configuration()  # TODO: Implement configuration functionality
+        self.__configurator = Configurator(self.log_writer, self.cmd_opts.config_file)
+        return self.__configurator.get_configuration(self.cmd_opts.config_file)
 
     def __init_logging(self) -> LogWriter:
         log_writer = LogWriter(
-            self.cmd_opts.log_level, self.cmd_opts.log_file, DEFAULT_LOG_DIR
+            self.cmd_opts.log_level,
+            self.cmd_opts.log_file,
+            DEFAULT_LOG_DIR,
+            async_mode=self.cmd_opts.log_async,
+            queue_size=self.cmd_opts.log_queue_size,
+            overflow_policy=self.cmd_opts.log_overflow,
+            log_format=self.cmd_opts.log_format,
         )
         log_writer.debug("Logging initialized", "MAIN")
         return log_writer
 
+    def __configure_logging(self) -> None:
+        if self.config.log_level is not None:
+            self.log_writer.set_level(self.config.log_level)
+        self.log_writer.configure_rotation(
+            self.config.log_rotate_max_bytes,
+            self.config.log_rotate_interval,
+            self.config.log_retention,
+            self.config.log_compression,
+        )
+
     def __init_components(self) -> Components:
-        return Components()  # TODO: Implement component initialization functionality
+        configuration = self.__components_configuration(self.config)
+        components = boot_components(
+            configuration, self.log_writer, self.startup_profile
+        )
+        components.metrics = self.metrics
+        init_services(components, configuration, self.log_writer, self.startup_profile)
+        if self.cmd_opts.workers:
+            from jorkieserver.supervisor import Supervisor
+
+            self.supervisor = Supervisor(
+                components, self.config, self.cmd_opts, self.log_writer
+            )
+            components.services.append(self.supervisor)
+        return components
+
+    def __components_configuration(self, configuration: Configuration) -> Configuration:
+        """With `--workers`, the workers listen on the API address, and the server process serves
+        the requests they forward on an internal one. The workers limit the requests of each client,
+        the server process sees them all coming from the loopback address.
+        """
+        if not self.cmd_opts.workers:
+            return configuration
+        return configuration.replace(
+            api_host="127.0.0.1",
+            api_port=0,
+            api_client_concurrency=SUPERVISOR_CLIENT_CONCURRENCY,
+        )
+
+    def __init_config_watcher(
+        self,
+    ) -> tuple["ConfigReloader", "ConfigWatcher | None"]:
+        from jorkieserver.watcher import ConfigReloader, ConfigWatcher
+
+        config_reloader = ConfigReloader(
+            self.__configurator, self.cmd_opts.config_file, self.log_writer, self.config
+        )
+        config_reloader.subscribe(self.__apply_configuration)
+        if not self.cmd_opts.watch_config:
+            return config_reloader, None
+
+        config_watcher = ConfigWatcher(
+            self.cmd_opts.config_file, config_reloader.reload, self.log_writer
+        )
+        config_watcher.start()
+        self.log_writer.debug("Watching the configuration file", "MAIN")
+        return config_reloader, config_watcher
+
+    def __apply_configuration(
+        self, configuration: Configuration, changed: set[str]
+    ) -> None:
+        # Readers pick up the new snapshot on their next attribute access, no locking needed.
+        self.config = configuration
+        if any(field.startswith("log_") for field in changed):
+            self.__configure_logging()
+        if self.supervisor is None:
+            self.components.reconfigure(configuration, changed)
+        else:
+            # The internal API address stays, the workers restart on the new one.
+            self.components.reconfigure(
+                self.__components_configuration(configuration),
+                changed - {"api_host", "api_port", "api_client_concurrency"},
+            )
+            self.supervisor.reconfigure(configuration, changed)
+        self.__config_reloads.inc()
+
+    def __record_startup(self) -> None:
+        phases = self.metrics.gauge(
+            "jorkie_startup_phase_seconds", "Duration of each startup phase.", "phase"
+        )
+        for name, seconds in self.startup_profile.phases:
+            phases.labels(name).set(seconds)
+        self.metrics.gauge(
+            "jorkie_startup_seconds", "Time from process start to ready."
+        ).set(self.startup_profile.total)
 
 
 def main() -> None:
-    Server()
+    Server().run()
     sys.exit(0)
 
 
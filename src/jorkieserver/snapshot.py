@@ -0,0 +1,502 @@
+import asyncio
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import AsyncIterator, Callable, Iterator
+from urllib.parse import quote, unquote
+
+from jorkieserver.api import HttpError, Request, Response
+from jorkieserver.assets import CodeTable
+from jorkieserver.constants import (
+    QUERY_MAX_PAGE_SIZE,
+    QUERY_PAGE_SIZE,
+    QUERY_STREAM_CHUNK,
+    SNAPSHOT_COMPACT_CHUNK,
+    SNAPSHOT_READ_CHUNK,
+)
+from jorkieserver.db import Database, asset_hash
+from jorkieserver.logging import LogWriter
+from jorkieserver.query import NDJSON_CONTENT_TYPE
+from jorkieserver.types import Components, Configuration
+from jorkieserver.utils import create_directory
+
+SNAPSHOT_HEADER = struct.Struct("<8sI")  # magic, metadata length
+SNAPSHOT_MAGIC = b"JKSNAP01"
+SNAPSHOT_SUFFIX = ".jks"
+SNAPSHOT_CONTENT_TYPE = "application/octet-stream"
+
+# The columns of a snapshot, in file order, with their `array` typecodes. A string column is an
+# offsets column of N + 1 entries and the UTF-8 text of every row back to back.
+SNAPSHOT_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("id", "q"),
+    ("received_at", "d"),
+    ("kind", "H"),  # Codes into the `kinds` dictionary of the metadata
+    ("hash", "q"),  # `asset_hash()` of the row's asset
+    ("value_offsets", "Q"),
+    ("values", "B"),
+    ("data_offsets", "Q"),
+    ("data", "B"),  # JSON text, empty for None
+    ("assets", "q"),  # Distinct asset hashes, sorted
+)
+
+
+class SnapshotWriter:
+    """
+    Collects the results of a scan column by column, and writes them as a snapshot file.
+    """
+
+    def __init__(self) -> None:
+        self.kinds = CodeTable(1 << 16)
+        self.columns: dict[str, array] = {
+            name: array(typecode) for name, typecode in SNAPSHOT_COLUMNS
+        }
+        self.columns["value_offsets"].append(0)
+        self.columns["data_offsets"].append(0)
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def append(
+        self, id: int, kind: str, value: str, data: str | None, received_at: float
+    ) -> None:
+        columns = self.columns
+        columns["id"].append(id)
+        columns["received_at"].append(received_at)
+        columns["kind"].append(self.kinds.code(kind))
+        columns["hash"].append(asset_hash(kind, value))
+        columns["values"].frombytes(value.encode("utf-8"))
+        columns["value_offsets"].append(len(columns["values"]))
+        if data is not None:
+            columns["data"].frombytes(data.encode("utf-8"))
+        columns["data_offsets"].append(len(columns["data"]))
+
+    def write(self, path: str, project: str, scan_id: str) -> int:
+        """Atomically writes the snapshot to `path`, returns its size in bytes.
+
+        Raises:
+        -------
+            FileExistsError: If `path` exists, even if it was created by another process meanwhile
+        """
+        self.columns["assets"] = array("q", sorted(set(self.columns["hash"])))
+        layout = {}
+        offset = 0
+        for name, _ in SNAPSHOT_COLUMNS:
+            column = self.columns[name]
+            layout[name] = [column.typecode, offset, len(column)]
+            offset += padded(len(column) * column.itemsize)
+        metadata = {
+            "version": 1,
+            "project": project,
+            "scan_id": scan_id,
+            "rows": len(self),
+            "created": time.time(),
+            "kinds": self.kinds.names,
+            "columns": layout,
+        }
+        # Column offsets are relative to the end of the header, which is padded to 8 bytes so
+        # every column is aligned for its `memoryview.cast()`. The padded length is stored.
+        encoded = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+        encoded += b" " * (
+            padded(SNAPSHOT_HEADER.size + len(encoded))
+            - SNAPSHOT_HEADER.size
+            - len(encoded)
+        )
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(encoded)))
+            file.write(encoded)
+            for name, _ in SNAPSHOT_COLUMNS:
+                column = self.columns[name]
+                column.tofile(file)
+                size = len(column) * column.itemsize
+                file.write(b"\0" * (padded(size) - size))
+            file.flush()
+            os.fsync(file.fileno())
+            size = file.tell()
+        # Unlike a rename, a link never replaces the snapshot another process published first.
+        try:
+            os.link(temporary, path)
+        finally:
+            os.unlink(temporary)
+        return size
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file through `mmap`: every column is a `memoryview` of the mapped
+    file, so reading a column only loads its pages, straight from the page cache, and nothing is
+    decoded until a row's value is asked for.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self.__mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__buffer = memoryview(self.__mmap)
+        self.__columns: dict[str, memoryview] = {}
+        try:
+            if len(self.__mmap) < SNAPSHOT_HEADER.size:
+                raise ValueError(f"{path} is not a snapshot")
+            magic, length = SNAPSHOT_HEADER.unpack_from(self.__mmap)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a snapshot")
+            base = SNAPSHOT_HEADER.size + length
+            metadata = json.loads(self.__buffer[SNAPSHOT_HEADER.size : base].tobytes())
+            for name, (typecode, offset, count) in metadata["columns"].items():
+                end = base + offset + count * array(typecode).itemsize
+                if end > len(self.__mmap):
+                    raise ValueError(f"{path} is truncated")
+                self.__columns[name] = self.__buffer[base + offset : end].cast(typecode)
+        except Exception:
+            self.close()
+            raise
+        self.project: str = metadata["project"]
+        self.scan_id: str = metadata["scan_id"]
+        self.created: float = metadata["created"]
+        self.kinds: list[str | None] = metadata["kinds"]
+        self.size = len(self.__mmap)
+        self.__rows: int = metadata["rows"]
+
+    def __len__(self) -> int:
+        return self.__rows
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __contains__(self, asset: tuple[str, str]) -> bool:
+        return self.has_hash(asset_hash(*asset))
+
+    def column(self, name: str) -> memoryview:
+        """Returns a column of `SNAPSHOT_COLUMNS`, valid until the snapshot is closed."""
+        return self.__columns[name]
+
+    def kind(self, row: int) -> str:
+        return self.kinds[self.__columns["kind"][row]]
+
+    def value(self, row: int) -> str:
+        offsets = self.__columns["value_offsets"]
+        return str(self.__columns["values"][offsets[row] : offsets[row + 1]], "utf-8")
+
+    def data(self, row: int) -> str | None:
+        """Returns the JSON text of a row's data, or None."""
+        offsets = self.__columns["data_offsets"]
+        start, end = offsets[row], offsets[row + 1]
+        return str(self.__columns["data"][start:end], "utf-8") if end > start else None
+
+    def record(self, row: int) -> dict:
+        """Returns a row as the item of the results query."""
+        data = self.data(row)
+        return {
+            "id": self.__columns["id"][row],
+            "scan_id": self.scan_id,
+            "type": self.kind(row),
+            "value": self.value(row),
+            "data": None if data is None else json.loads(data),
+            "received_at": self.__columns["received_at"][row],
+        }
+
+    def ndjson(self, start: int, stop: int) -> bytes:
+        """Returns the rows from `start` to `stop` as NDJSON."""
+        return "".join(
+            json.dumps(self.record(row), separators=(",", ":")) + "\n"
+            for row in range(start, min(stop, self.__rows))
+        ).encode("utf-8")
+
+    def has_hash(self, hash_: int) -> bool:
+        assets = self.__columns["assets"]
+        index = bisect_left(assets, hash_)
+        return index < len(assets) and assets[index] == hash_
+
+    def count_by_kind(self) -> dict[str, int]:
+        return {
+            self.kinds[code]: count
+            for code, count in sorted(Counter(self.__columns["kind"]).items())
+        }
+
+    def missing_from(self, other: "Snapshot") -> set[int]:
+        """Returns the hashes of the assets of this snapshot that `other` does not have."""
+        missing = set(self.__columns["assets"])
+        missing.difference_update(other.column("assets"))
+        return missing
+
+    def first_rows(self, hashes: set[int]) -> Iterator[int]:
+        """Yields the first row of each asset of `hashes`, in row order."""
+        hashes = set(hashes)
+        if not hashes:
+            return
+        for row, hash_ in enumerate(self.__columns["hash"]):
+            if hash_ in hashes:
+                hashes.discard(hash_)
+                yield row
+                if not hashes:
+                    return
+
+    def chunks(self, size: int = SNAPSHOT_READ_CHUNK) -> Iterator[memoryview]:
+        """Yields the whole file in slices of the mapping, each valid until the next one is read."""
+        for start in range(0, self.size, size):
+            with self.__buffer[start : start + size] as chunk:
+                yield chunk
+
+    def close(self) -> None:
+        if self.__mmap is not None:
+            for column in self.__columns.values():
+                column.release()
+            self.__columns.clear()
+            self.__buffer.release()
+            self.__mmap.close()
+            self.__mmap = None
+
+
+class SnapshotService:
+    """
+    Compacts the results of finished scans into immutable columnar snapshots, one file per scan
+    under `directory`, and serves them:
+
+    - `POST /projects/{project_id}/scans/{scan_id}/snapshot` compacts a scan (409 if it already was)
+    - `GET /projects/{project_id}/scans/{scan_id}/snapshot` downloads the snapshot file, or with
+      `Accept: application/x-ndjson` its results as the results query would stream them
+    - `GET /projects/{project_id}/scans/{scan_id}/snapshot/diff?against=<scan_id>` counts the assets
+      the scan added and removed since another snapshotted scan, and lists the first `limit` of each
+    - `GET /projects/{project_id}/snapshots` lists the snapshotted scans of a project
+
+    A snapshot is not updated by results ingested after it was taken: compacting a scan marks it
+    finished, see `subscribe()`.
+    """
+
+    def __init__(self, directory: str, db: Database, log_writer: LogWriter) -> None:
+        self.directory = directory
+        self.db = db
+        self.__log = log_writer.component("SNAPSHOT")
+        self.__lock = threading.Lock()
+        self.__subscribers: list[Callable[[str, str], None]] = []
+
+    def subscribe(self, callback: Callable[[str, str], None]) -> None:
+        """Registers `callback(project, scan_id)` to be called once a scan is compacted."""
+        self.__subscribers.append(callback)
+
+    def compacted(self, project: str, scan_id: str) -> None:
+        """Tells the subscribers a scan was compacted, by this service or another process's."""
+        for callback in self.__subscribers:
+            try:
+                callback(project, scan_id)
+            except Exception as e:
+                self.__log.error("Snapshot subscriber %r failed: %r", callback, e)
+
+    def path(self, project: str, scan_id: str) -> str:
+        return os.path.join(
+            self.directory,
+            quote(project, safe=""),
+            quote(scan_id, safe="") + SNAPSHOT_SUFFIX,
+        )
+
+    def compact(self, project: str, scan_id: str) -> dict | None:
+        """Writes the snapshot of a scan, reading its results `SNAPSHOT_COMPACT_CHUNK` at a time.
+
+        Returns:
+        --------
+            dict | None: The number of rows, assets and bytes of the snapshot, or None if the scan has no results.
+
+        Raises:
+        -------
+            FileExistsError: If the scan already has a snapshot
+        """
+        path = self.path(project, scan_id)
+        with self.__lock:
+            if os.path.exists(path):
+                raise FileExistsError(path)
+            started = time.perf_counter()
+            writer = SnapshotWriter()
+            after = 0
+            while True:
+                rows = self.db.select_results(
+                    project,
+                    scan_id,
+                    ("type", "value", "data", "received_at"),
+                    after,
+                    SNAPSHOT_COMPACT_CHUNK,
+                )
+                for row in rows:
+                    writer.append(*row)
+                if len(rows) < SNAPSHOT_COMPACT_CHUNK:
+                    break
+                after = rows[-1][0]
+            if not len(writer):
+                return None
+            create_directory(os.path.dirname(path), "SNAPSHOT")
+            size = writer.write(path, project, scan_id)
+        self.__log.info(
+            "Compacted %d results of scan %s of project %s into %d bytes in %.2fs",
+            len(writer),
+            scan_id,
+            project,
+            size,
+            time.perf_counter() - started,
+        )
+        self.compacted(project, scan_id)
+        return {
+            "project": project,
+            "scan_id": scan_id,
+            "rows": len(writer),
+            "assets": len(writer.columns["assets"]),
+            "bytes": size,
+        }
+
+    def open(self, project: str, scan_id: str) -> Snapshot:
+        """Returns the snapshot of a scan, to be closed by the caller.
+
+        Raises:
+        -------
+            HttpError: If the scan has no snapshot (404)
+        """
+        try:
+            return Snapshot(self.path(project, scan_id))
+        except FileNotFoundError:
+            raise HttpError(404, f"No snapshot of scan '{scan_id}'")
+
+    async def create_snapshot(self, request: Request) -> Response:
+        project = request.params["project_id"]
+        scan_id = request.params["scan_id"]
+        try:
+            report = await asyncio.get_running_loop().run_in_executor(
+                None, self.compact, project, scan_id
+            )
+        except FileExistsError:
+            raise HttpError(409, f"Scan '{scan_id}' already has a snapshot")
+        if report is None:
+            raise HttpError(404, f"No results of scan '{scan_id}'")
+        return Response.json(report, 201)
+
+    async def snapshot(self, request: Request) -> Response:
+        snapshot = self.open(request.params["project_id"], request.params["scan_id"])
+        if NDJSON_CONTENT_TYPE in request.headers.get("accept", ""):
+            return Response(stream_records(snapshot), content_type=NDJSON_CONTENT_TYPE)
+        return Response(
+            stream_file(snapshot),
+            headers={"X-Snapshot-Rows": str(len(snapshot))},
+            content_type=SNAPSHOT_CONTENT_TYPE,
+        )
+
+    async def diff(self, request: Request) -> Response:
+        project = request.params["project_id"]
+        scan_id = request.params["scan_id"]
+        against = request.query.get("against")
+        if not against:
+            raise HttpError(400, "The scan to compare with is missing (?against=)")
+        limit = request.query.get("limit")
+        try:
+            limit = QUERY_PAGE_SIZE if limit is None else int(limit)
+        except ValueError:
+            limit = -1
+        if not 0 <= limit <= QUERY_MAX_PAGE_SIZE:
+            raise HttpError(400, f"The limit must be from 0 to {QUERY_MAX_PAGE_SIZE}")
+        with (
+            self.open(project, scan_id) as snapshot,
+            self.open(project, against) as previous,
+        ):
+            added, removed = await asyncio.get_running_loop().run_in_executor(
+                None, compare, snapshot, previous, limit
+            )
+        return Response.json(
+            {
+                "project": project,
+                "scan_id": scan_id,
+                "against": against,
+                **added,
+                **removed,
+            }
+        )
+
+    async def list_snapshots(self, request: Request) -> Response:
+        project = request.params["project_id"]
+        directory = os.path.join(self.directory, quote(project, safe=""))
+        try:
+            names = sorted(os.listdir(directory))
+        except FileNotFoundError:
+            names = []
+        return Response.json(
+            {
+                "project": project,
+                "snapshots": [
+                    {
+                        "scan_id": unquote(name[: -len(SNAPSHOT_SUFFIX)]),
+                        "bytes": os.path.getsize(os.path.join(directory, name)),
+                    }
+                    for name in names
+                    if name.endswith(SNAPSHOT_SUFFIX)
+                ],
+            }
+        )
+
+
+def padded(size: int) -> int:
+    """Returns `size` rounded up to a multiple of 8."""
+    return (size + 7) & ~7
+
+
+def compare(snapshot: Snapshot, previous: Snapshot, limit: int) -> tuple[dict, dict]:
+    """Returns the assets of `snapshot` that `previous` does not have, and those it lost, as
+    `{"added": count, "new": [first `limit` assets]}` and `{"removed": count, "gone": [...]}`.
+    """
+    reports = []
+    for name, items, source, other in (
+        ("added", "new", snapshot, previous),
+        ("removed", "gone", previous, snapshot),
+    ):
+        missing = source.missing_from(other)
+        rows = itertools.islice(source.first_rows(missing), limit)
+        reports.append(
+            {
+                name: len(missing),
+                items: [
+                    {"type": source.kind(row), "value": source.value(row)}
+                    for row in rows
+                ],
+            }
+        )
+    return reports[0], reports[1]
+
+
+async def stream_file(snapshot: Snapshot) -> AsyncIterator[bytes]:
+    """Yields the snapshot file from its mapping, and closes the snapshot."""
+    try:
+        for chunk in snapshot.chunks():
+            yield chunk
+    finally:
+        snapshot.close()
+
+
+async def stream_records(snapshot: Snapshot) -> AsyncIterator[bytes]:
+    """Yields the rows of a snapshot as NDJSON, `QUERY_STREAM_CHUNK` rows at once, and closes the snapshot."""
+    loop = asyncio.get_running_loop()
+    try:
+        for start in range(0, len(snapshot), QUERY_STREAM_CHUNK):
+            yield await loop.run_in_executor(
+                None, snapshot.ndjson, start, start + QUERY_STREAM_CHUNK
+            )
+    finally:
+        snapshot.close()
+
+
+def register_routes(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> SnapshotService:
+    """Adds the snapshot routes to the API component."""
+    service = SnapshotService(configuration.snapshot_dir, components.db, log_writer)
+    route = "/projects/{project_id}/scans/{scan_id}/snapshot"
+    components.api.route("POST", route)(service.create_snapshot)
+    components.api.route("GET", route)(service.snapshot)
+    components.api.route("GET", route + "/diff")(service.diff)
+    components.api.route("GET", "/projects/{project_id}/snapshots")(
+        service.list_snapshots
+    )
+    return service
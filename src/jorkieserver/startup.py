@@ -0,0 +1,165 @@
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Components, Configuration
+
+# Factories of the `Components` attributes, as "module:callable" so a component's module (and its
+# dependencies) is only imported by the boot thread that creates it. A factory is called with
+# `(configuration, log_writer)` and returns the component, background serving starts in `Components.start()`.
+COMPONENT_FACTORIES: dict[str, str] = {
+    "api": "jorkieserver.api:ApiComponent",
+    "db": "jorkieserver.db:Database",
+    "scheduler": "jorkieserver.scheduler:Scheduler",
+    "dispatcher": "jorkieserver.dispatch:DispatchComponent",
+}
+
+# Services built on top of the components once they all exist, as "module:callable". A service
+# factory is called with `(components, configuration, log_writer)` and returns the service,
+# which is added to `Components.services`.
+COMPONENT_SERVICES: tuple[str, ...] = (
+    "jorkieserver.scope:register_routes",
+    "jorkieserver.ingest:register_routes",
+    "jorkieserver.query:register_routes",
+    "jorkieserver.snapshot:register_routes",
+    "jorkieserver.membership:register_routes",
+    "jorkieserver.scheduler:register_routes",
+    "jorkieserver.dispatch:register_routes",
+    "jorkieserver.output:register_routes",
+    "jorkieserver.notifications:register_routes",
+    "jorkieserver.profiler:register_routes",
+    "jorkieserver.instrumentation:register_routes",
+)
+
+
+class StartupProfile:
+    """
+    Records how long each startup phase takes, for the `--startup-profile` report.
+    Phases may overlap (components boot concurrently), so their durations don't add up to the total.
+    """
+
+    def __init__(self, started: float | None = None) -> None:
+        self.started = time.perf_counter() if started is None else started
+        self.phases: list[tuple[str, float]] = []
+        self.ready: float | None = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Context manager recording the time spent in its block as phase `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    def mark_ready(self) -> None:
+        """Marks the server as ready to serve."""
+        self.ready = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        """Seconds from `started` to ready (or to now, if not ready yet)."""
+        end = time.perf_counter() if self.ready is None else self.ready
+        return end - self.started
+
+    def report(self) -> str:
+        """Returns the timing breakdown as a table, one phase per line."""
+        width = max([len(name) for name, _ in self.phases] + [len("ready")])
+        lines = [
+            f"{name:<{width}}  {seconds * 1000:9.2f} ms"
+            for name, seconds in self.phases
+        ]
+        lines.append(f"{'ready':<{width}}  {self.total * 1000:9.2f} ms")
+        return "\n".join(lines) + "\n"
+
+
+def resolve_factory(factory: str | Callable) -> Callable:
+    """Imports the callable referenced by a "module:callable" string, callables are returned as is."""
+    if callable(factory):
+        return factory
+    module_name, _, attribute = factory.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def boot_components(
+    configuration: Configuration,
+    log_writer: LogWriter,
+    profile: StartupProfile,
+    factories: dict[str, str | Callable] | None = None,
+) -> Components:
+    """Imports and creates every component concurrently, one thread per component.
+
+    Args:
+    -----
+        configuration (Configuration): The configuration snapshot the components start with.
+        log_writer (LogWriter): Log writer handed to every component.
+        profile (StartupProfile): Receives one "component:<name>" phase per component.
+        factories (dict[str, str | Callable] | None): Component factories by attribute name, `COMPONENT_FACTORIES` by default.
+
+    Returns:
+    --------
+        Components: The created components. If one fails to initialize, a critical error is logged and the program exits.
+    """
+    if factories is None:
+        factories = COMPONENT_FACTORIES
+    components = Components()
+    if not factories:
+        return components
+
+    def boot(name: str, factory: str | Callable):
+        started = time.perf_counter()
+        component = resolve_factory(factory)(configuration, log_writer)
+        profile.record(f"component:{name}", time.perf_counter() - started)
+        return component
+
+    with ThreadPoolExecutor(
+        max_workers=len(factories), thread_name_prefix="jorkie-boot"
+    ) as executor:
+        futures = {
+            name: executor.submit(boot, name, factory)
+            for name, factory in factories.items()
+        }
+        for name, future in futures.items():
+            try:
+                setattr(components, name, future.result())
+            except Exception as e:
+                log_writer.critical(
+                    "Failed to start component '%s': %s", "MAIN", name, e
+                )
+    return components
+
+
+def init_services(
+    components: Components,
+    configuration: Configuration,
+    log_writer: LogWriter,
+    profile: StartupProfile,
+    factories: tuple[str | Callable, ...] = COMPONENT_SERVICES,
+) -> None:
+    """Builds the services on top of the created components, see `COMPONENT_SERVICES`.
+
+    Args:
+    -----
+        components (Components): The created components, receive the services.
+        configuration (Configuration): The configuration snapshot the services start with.
+        log_writer (LogWriter): Log writer handed to every service.
+        profile (StartupProfile): Receives one "service:<factory>" phase per service.
+        factories (tuple[str | Callable, ...]): Service factories, `COMPONENT_SERVICES` by default.
+    """
+    for factory in factories:
+        started = time.perf_counter()
+        try:
+            service = resolve_factory(factory)(components, configuration, log_writer)
+        except Exception as e:
+            log_writer.critical(
+                "Failed to initialize service '%s': %s", "MAIN", factory, e
+            )
+        components.services.append(service)
+        name = factory if isinstance(factory, str) else factory.__name__
+        profile.record(f"service:{name}", time.perf_counter() - started)
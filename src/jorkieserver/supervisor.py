@@ -0,0 +1,678 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Connection
+from typing import AsyncIterator, Callable
+from urllib.parse import quote, urlencode
+
+from jorkieserver.api import ApiComponent, HttpError, Request, Response
+from jorkieserver.constants import (
+    API_MAX_HEADER_SIZE,
+    SUPERVISOR_DRAIN_TIMEOUT,
+    SUPERVISOR_INVALIDATE_TIMEOUT,
+    SUPERVISOR_READY_TIMEOUT,
+    SUPERVISOR_RESPAWN_DELAY,
+    SUPERVISOR_RESPAWN_MAX_DELAY,
+    SUPERVISOR_STABLE_AFTER,
+    SUPERVISOR_STOP_TIMEOUT,
+)
+from jorkieserver.db import Database
+from jorkieserver.ingest import IngestService
+from jorkieserver.logging import LogWriter
+from jorkieserver.metrics import COUNTER, Gauge
+from jorkieserver.profiler import check_local
+from jorkieserver.query import QueryService
+from jorkieserver.scope import ScopeService
+from jorkieserver.snapshot import SnapshotService
+from jorkieserver.startup import StartupProfile, init_services
+from jorkieserver.types import CommandOptions, Components, Configuration
+
+# Services of an API worker process, see `init_services()`. The routes they don't serve are
+# forwarded to the supervisor.
+WORKER_SERVICES: tuple[str, ...] = (
+    "jorkieserver.supervisor:register_worker_scope",
+    "jorkieserver.supervisor:register_worker_ingest",
+    "jorkieserver.query:register_routes",
+    "jorkieserver.snapshot:register_routes",
+    "jorkieserver.supervisor:register_worker_proxy",
+)
+
+# Routes of the supervisor restricted to local clients, see `check_local()`. The proxy checks the
+# client itself, its requests all come from a local address.
+LOCAL_ROUTES: tuple[str, ...] = ("/admin/",)
+
+# Connection-level headers, which are not forwarded by the proxy.
+HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "transfer-encoding",
+        "content-length",
+        "expect",
+        "upgrade",
+    }
+)
+
+
+class WorkerProcess:
+    """
+    An API worker process of the supervisor, and its end of their pipe.
+    """
+
+    __slots__ = (
+        "index",
+        "process",
+        "connection",
+        "started",
+        "connected",
+        "ready",
+        "stopping",
+        "lock",
+    )
+
+    def __init__(
+        self, index: int, process: multiprocessing.Process, connection: Connection
+    ) -> None:
+        self.index = index
+        self.process = process
+        self.connection = connection
+        self.started = time.time()
+        self.connected = False
+        self.ready = threading.Event()
+        self.stopping = False
+        self.lock = threading.Lock()
+
+    def send(self, message: tuple) -> None:
+        """Sends a message to the worker, unless it exited."""
+        with self.lock:
+            try:
+                self.connection.send(message)
+            except (OSError, ValueError):
+                pass
+
+    def as_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "pid": self.process.pid,
+            "started": self.started,
+            "ready": self.ready.is_set(),
+        }
+
+
+class Supervisor:
+    """
+    `--workers N` mode: the server process keeps the scheduler, the dispatcher, the database writer
+    and every other shared state, and serves the API on an internal loopback address, while N API
+    worker processes listen on the configured address with SO_REUSEPORT, so the kernel spreads the
+    connections among them. The workers parse the ingested results and answer the queries and
+    snapshot reads themselves, and forward every other request to the supervisor's API.
+
+    A worker hands its parsed result batches to the supervisor through a pipe, where they are
+    written by the ingest service's database thread like the batches of the supervisor itself.
+    The supervisor tells the workers which cached query responses and project scopes to drop.
+
+    A worker that exits is replaced after a delay that doubles while it keeps crashing, and
+    `restart()` replaces the workers one at a time, each once its replacement is listening, so the
+    port is never left without a listener. `GET /workers` lists the workers, and
+    `POST /workers/restart` starts a restart.
+    """
+
+    def __init__(
+        self,
+        components: Components,
+        configuration: Configuration,
+        options: CommandOptions,
+        log_writer: LogWriter,
+    ) -> None:
+        self.count = options.workers
+        self.configuration = configuration
+        self.options = options
+        self.respawns = 0
+        self.port: int | None = None
+        self.__api = components.api
+        self.__ingest: IngestService | None = components.service(IngestService)
+        self.__snapshots: SnapshotService | None = components.service(SnapshotService)
+        self.__log = log_writer.component("SUPERVISOR")
+        self.__context = multiprocessing.get_context("spawn")
+        self.__workers: list[WorkerProcess | None] = [None] * self.count
+        self.__delays = [SUPERVISOR_RESPAWN_DELAY] * self.count
+        self.__lock = threading.Lock()
+        self.__restart_lock = threading.Lock()
+        self.__stopping = threading.Event()
+        self.__socket: socket.socket | None = None
+        self.__address: tuple[str, int] | None = None
+        self.__sequence = itertools.count()
+        self.__acknowledgements: dict[int, threading.Semaphore] = {}
+        if self.__ingest is not None:
+            self.__ingest.subscribe(self.__invalidate)
+        scope = components.service(ScopeService)
+        if scope is not None:
+            scope.subscribe(lambda project: self.broadcast(("scope", project)))
+        components.api.route("GET", "/workers")(self.list_workers)
+        components.api.route("POST", "/workers/restart")(self.restart_workers)
+        components.metrics.gauge(
+            "jorkie_api_workers",
+            "API worker processes listening.",
+            function=lambda: sum(worker.ready.is_set() for worker in self.workers()),
+        )
+        components.metrics.register(
+            "jorkie_api_worker_respawns_total",
+            COUNTER,
+            "API worker processes replaced after they exited.",
+            Gauge(lambda: self.respawns),
+        )
+
+    def start(self) -> None:
+        """Reserves the listening port and starts the workers, waits until they listen.
+
+        Raises:
+        -------
+            OSError: If the port cannot be reserved, or no worker started listening
+        """
+        self.__reserve()
+        with self.__lock:
+            workers = [self.__spawn(index) for index in range(self.count)]
+        ready = [
+            worker.ready.wait(SUPERVISOR_READY_TIMEOUT) for worker in workers
+        ].count(True)
+        if not ready:
+            raise OSError(f"No API worker is listening on port {self.port}")
+        self.__log.info(
+            "%d of %d API workers listening on %s:%d",
+            ready,
+            self.count,
+            self.configuration.api_host,
+            self.port,
+        )
+
+    def stop(self) -> None:
+        """Stops the workers, giving them `SUPERVISOR_STOP_TIMEOUT` seconds to answer their requests."""
+        self.__stopping.set()
+        with self.__lock:
+            workers = [worker for worker in self.__workers if worker is not None]
+        for worker in workers:
+            worker.stopping = True
+            worker.send(("stop",))
+        for worker in workers:
+            self.__join(worker)
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
+
+    def restart(self) -> None:
+        """Replaces the workers one at a time, each once its replacement listens."""
+        with self.__restart_lock:
+            if self.__socket is None:
+                return
+            self.__reserve()
+            self.__log.info("Restarting %d API workers", self.count)
+            for index in range(self.count):
+                if self.__stopping.is_set():
+                    return
+                with self.__lock:
+                    previous = self.__workers[index]
+                    worker = self.__spawn(index)
+                if not worker.ready.wait(SUPERVISOR_READY_TIMEOUT):
+                    self.__log.error(
+                        "API worker %d did not start listening, keeping the previous one",
+                        index,
+                    )
+                    with self.__lock:
+                        self.__workers[index] = previous
+                    worker.stopping = True
+                    worker.send(("stop",))
+                    self.__join(worker)
+                    continue
+                if previous is not None:
+                    previous.stopping = True
+                    previous.send(("stop",))
+                    self.__join(previous)
+            self.__log.info("Restarted %d API workers", self.count)
+
+    def reconfigure(self, configuration: Configuration, changed: set[str]) -> None:
+        """Restarts the workers with a new configuration, in the background."""
+        self.configuration = configuration
+        threading.Thread(
+            target=self.restart, name="jorkie-supervisor-restart", daemon=True
+        ).start()
+
+    def workers(self) -> list[WorkerProcess]:
+        with self.__lock:
+            return [worker for worker in self.__workers if worker is not None]
+
+    def broadcast(self, message: tuple) -> None:
+        """Sends a message to every worker that is reading its pipe."""
+        for worker in self.workers():
+            if worker.connected:
+                worker.send(message)
+
+    async def list_workers(self, request: Request) -> Response:
+        return Response.json(
+            {
+                "port": self.port,
+                "respawns": self.respawns,
+                "workers": [worker.as_dict() for worker in self.workers()],
+            }
+        )
+
+    async def restart_workers(self, request: Request) -> Response:
+        # Answered right away, the worker forwarding this request is about to be replaced.
+        self.reconfigure(self.configuration, set())
+        return Response.json({"restarting": self.count}, 202)
+
+    def __reserve(self) -> None:
+        """Binds (without listening) a socket to the worker address, which keeps the port of the
+        `api_port` 0 of tests for the workers, and the port busy between two workers.
+        """
+        host, port = self.configuration.api_host, self.configuration.api_port
+        if self.__socket is not None:
+            if self.__address == (host, port):
+                return
+            self.__socket.close()
+        self.__address = (host, port)
+        family, kind, protocol, _, address = socket.getaddrinfo(
+            host, port, type=socket.SOCK_STREAM
+        )[0]
+        self.__socket = socket.socket(family, kind, protocol)
+        self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.__socket.bind(address)
+        self.port = self.__socket.getsockname()[1]
+
+    def __spawn(self, index: int) -> WorkerProcess:
+        """Starts the worker of a slot, the caller holds the lock."""
+        connection, child = self.__context.Pipe()
+        process = self.__context.Process(
+            target=run_worker,
+            args=(
+                index,
+                self.configuration.replace(api_port=self.port),
+                self.options,
+                child,
+                self.__api.address,
+            ),
+            name=f"jorkie-api-{index}",
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        worker = self.__workers[index] = WorkerProcess(index, process, connection)
+        threading.Thread(
+            target=self.__serve,
+            args=(worker,),
+            name=f"jorkie-supervisor-{index}",
+            daemon=True,
+        ).start()
+        self.__log.debug("Started API worker %d (pid %d)", index, process.pid)
+        return worker
+
+    def __serve(self, worker: WorkerProcess) -> None:
+        """Answers the messages of a worker until it exits, then replaces it unless it was stopped."""
+        while True:
+            try:
+                message = worker.connection.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == "hello":
+                worker.connected = True
+            elif kind == "ready":
+                worker.ready.set()
+            elif kind == "write":
+                # Answered from the database thread, which waits for the invalidations below.
+                self.__ingest.submit(message[2]).add_done_callback(
+                    lambda future, id=message[1]: self.__answer(worker, id, future)
+                )
+            elif kind == "invalidated":
+                acknowledgement = self.__acknowledgements.get(message[1])
+                if acknowledgement is not None:
+                    acknowledgement.release()
+            elif kind == "compacted":
+                if self.__snapshots is not None:
+                    self.__snapshots.compacted(message[1], message[2])
+        worker.connected = False
+        worker.process.join()
+        worker.connection.close()
+        if worker.stopping or self.__stopping.is_set():
+            self.__log.debug("API worker %d stopped", worker.index)
+            return
+        self.__log.error(
+            "API worker %d (pid %d) exited with code %s",
+            worker.index,
+            worker.process.pid,
+            worker.process.exitcode,
+        )
+        self.__respawn(worker)
+
+    def __respawn(self, worker: WorkerProcess) -> None:
+        index = worker.index
+        if time.time() - worker.started >= SUPERVISOR_STABLE_AFTER:
+            self.__delays[index] = SUPERVISOR_RESPAWN_DELAY
+        delay = self.__delays[index]
+        self.__delays[index] = min(2 * delay, SUPERVISOR_RESPAWN_MAX_DELAY)
+        if self.__stopping.wait(delay):
+            return
+        with self.__lock:
+            if self.__workers[index] is not worker:
+                return  # Replaced by a restart meanwhile.
+            self.respawns += 1
+            self.__spawn(index)
+
+    def __join(self, worker: WorkerProcess) -> None:
+        worker.process.join(SUPERVISOR_STOP_TIMEOUT)
+        if worker.process.is_alive():
+            self.__log.error(
+                "API worker %d did not stop in time, killing it", worker.index
+            )
+            worker.process.kill()
+            worker.process.join()
+
+    def __answer(self, worker: WorkerProcess, id: int, future: Future) -> None:
+        error = future.exception()
+        if error is None:
+            worker.send(("result", id, future.result()))
+        else:
+            worker.send(("error", id, repr(error)))
+
+    def __invalidate(self, rows: list[tuple]) -> None:
+        """Tells the workers which projects and scans an ingested batch changed, on the database
+        thread, and waits until they dropped their cached queries: once a batch is answered, no
+        worker serves results older than it.
+        """
+        workers = [worker for worker in self.workers() if worker.connected]
+        if not workers:
+            return
+        sequence = next(self.__sequence)
+        acknowledgement = self.__acknowledgements[sequence] = threading.Semaphore(0)
+        changed = list({(row[0], row[1]) for row in rows})
+        try:
+            for worker in workers:
+                worker.send(("invalidate", sequence, changed))
+            deadline = time.monotonic() + SUPERVISOR_INVALIDATE_TIMEOUT
+            for _ in workers:
+                if not acknowledgement.acquire(
+                    timeout=max(0.0, deadline - time.monotonic())
+                ):
+                    self.__log.error(
+                        "API workers did not drop their cached queries in time"
+                    )
+                    break
+        finally:
+            del self.__acknowledgements[sequence]
+
+
+class SupervisorClient:
+    """
+    The worker end of the pipe to the supervisor: `call()` sends a request and waits for its
+    answer, and the supervisor's other messages are passed to the callbacks of `handle()`.
+    """
+
+    def __init__(self, connection: Connection, upstream: tuple[str, int]) -> None:
+        self.upstream = upstream
+        self.stopping = threading.Event()
+        self.__connection = connection
+        self.__handlers: dict[str, Callable] = {"stop": self.stopping.set}
+        self.__pending: dict[int, Future] = {}
+        self.__ids = itertools.count()
+        self.__lock = threading.Lock()
+        self.__closed = False
+
+    def handle(self, kind: str, callback: Callable) -> None:
+        """Registers `callback(*arguments)` for the `(kind, *arguments)` messages of the supervisor."""
+        self.__handlers[kind] = callback
+
+    def connect(self) -> None:
+        """Starts reading the supervisor's messages."""
+        threading.Thread(
+            target=self.__read, name="jorkie-supervisor-client", daemon=True
+        ).start()
+        self.send(("hello", os.getpid()))
+
+    def send(self, message: tuple) -> None:
+        with self.__lock:
+            self.__connection.send(message)
+
+    def call(self, kind: str, *arguments):
+        """Sends a request to the supervisor, returns its answer.
+
+        Raises:
+        -------
+            ConnectionError: If the supervisor exited
+            RuntimeError: If the request failed in the supervisor
+        """
+        future = Future()
+        with self.__lock:
+            if self.__closed:
+                raise ConnectionError("The supervisor exited")
+            id = next(self.__ids)
+            self.__pending[id] = future
+            self.__connection.send((kind, id, *arguments))
+        return future.result()
+
+    def write(self, rows: list[tuple]) -> int:
+        """Writes a batch of ingested rows in the supervisor's database, see `IngestService.write()`."""
+        return self.call("write", rows)
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def __read(self) -> None:
+        while True:
+            try:
+                message = self.__connection.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == "result":
+                self.__pending.pop(message[1]).set_result(message[2])
+            elif kind == "error":
+                self.__pending.pop(message[1]).set_exception(RuntimeError(message[2]))
+            elif kind in self.__handlers:
+                self.__handlers[kind](*message[1:])
+        # Without a supervisor, the worker stops.
+        self.stopping.set()
+        with self.__lock:
+            self.__closed = True
+            pending, self.__pending = self.__pending, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError("The supervisor exited"))
+
+
+class SupervisorProxy:
+    """
+    Forwards the requests no route of a worker matches to the supervisor's API, one connection per
+    request. Streamed responses are passed on chunk by chunk. The requests for the `local`
+    path prefixes are only forwarded for local clients.
+    """
+
+    def __init__(
+        self, upstream: tuple[str, int], timeout: float, local: tuple[str, ...] = ()
+    ) -> None:
+        self.upstream = upstream
+        self.timeout = timeout
+        self.local = local
+
+    async def forward(self, request: Request) -> Response:
+        """
+        Raises:
+        -------
+            HttpError: If the supervisor cannot be reached (502), or a remote client requests
+                a local route (403)
+        """
+        if request.path.startswith(self.local):
+            check_local(request)
+        body = await request.body()
+        target = quote(request.path)
+        if request.query:
+            target += "?" + urlencode(request.query)
+        head = [f"{request.method} {target} HTTP/1.1"]
+        head.extend(
+            f"{name}: {value}"
+            for name, value in request.headers.items()
+            if name not in HOP_HEADERS and name != "x-forwarded-for"
+        )
+        head.append(f"X-Forwarded-For: {request.client}")
+        head.append(f"Content-Length: {len(body)}")
+        head.append("Connection: close")
+        try:
+            reader, writer = await asyncio.open_connection(
+                *self.upstream, limit=API_MAX_HEADER_SIZE
+            )
+        except OSError as e:
+            raise HttpError(502, f"The supervisor is not reachable: {e}")
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            async with asyncio.timeout(self.timeout):
+                response = await reader.readuntil(b"\r\n\r\n")
+        except (OSError, TimeoutError, asyncio.IncompleteReadError) as e:
+            writer.close()
+            raise HttpError(502, f"The supervisor did not answer: {e!r}")
+
+        lines = response.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ")[1])
+        headers = {}
+        for line in lines[1:]:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+        content_type = headers.pop("content-type", "text/plain; charset=utf-8")
+        forwarded = {
+            name: value for name, value in headers.items() if name not in HOP_HEADERS
+        }
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            return Response(
+                read_chunks(reader, writer), status, forwarded, content_type
+            )
+        try:
+            if "content-length" in headers:
+                body = await reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await reader.read()
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise HttpError(502, f"The supervisor did not answer: {e!r}")
+        finally:
+            writer.close()
+        return Response(body, status, forwarded, content_type)
+
+
+async def read_chunks(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> AsyncIterator[bytes]:
+    """Yields the chunks of a chunked response body, and closes its connection."""
+    try:
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            yield await reader.readexactly(size)
+            await reader.readexactly(2)
+    finally:
+        writer.close()
+
+
+def worker_log_file(log_file: str, index: int) -> str:
+    """Returns the log file of a worker: `server.log` is `server.worker-1.log` for worker 1."""
+    root, extension = os.path.splitext(log_file)
+    return f"{root}.worker-{index}{extension}"
+
+
+def register_worker_scope(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> ScopeService:
+    """Compiles the project scopes of the ingested results, the scope routes are served by the supervisor."""
+    db = components.db
+    service = ScopeService(db.scope_rules, db.change_scope_rules, log_writer)
+    components.service(SupervisorClient).handle("scope", service.forget)
+    return service
+
+
+def register_worker_ingest(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> IngestService:
+    """Adds the ingestion route, parsing the results in the worker and writing them through the supervisor."""
+    scope = components.service(ScopeService)
+    service = IngestService(
+        components.service(SupervisorClient).write,
+        configuration,
+        log_writer,
+        None if scope is None else scope.matcher,
+    )
+    components.api.route("POST", "/projects/{project_id}/results")(service.ingest)
+    return service
+
+
+def register_worker_proxy(
+    components: Components, configuration: Configuration, log_writer: LogWriter
+) -> SupervisorProxy:
+    """Forwards the unrouted requests to the supervisor, drops the query responses it invalidates,
+    and tells it which scans were compacted.
+    """
+    client = components.service(SupervisorClient)
+    queries = components.service(QueryService)
+    snapshots = components.service(SnapshotService)
+    if snapshots is not None:
+        snapshots.subscribe(
+            lambda project, scan_id: client.send(("compacted", project, scan_id))
+        )
+
+    def invalidate(sequence: int, rows: list[tuple]) -> None:
+        if queries is not None:
+            queries.invalidate(rows)
+        client.send(("invalidated", sequence))
+
+    client.handle("invalidate", invalidate)
+    proxy = SupervisorProxy(
+        client.upstream,
+        configuration.api_timeout,
+        tuple(components.api.prefix + route for route in LOCAL_ROUTES),
+    )
+    components.api.fallback = proxy.forward
+    return proxy
+
+
+def run_worker(
+    index: int,
+    configuration: Configuration,
+    options: CommandOptions,
+    connection: Connection,
+    upstream: tuple[str, int],
+) -> None:
+    """Main function of an API worker process, serves until the supervisor stops it or exits."""
+    # Ctrl-C reaches the whole process group, the supervisor stops the workers in order.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    log_file = worker_log_file(options.log_file, index)
+    log_writer = LogWriter(
+        options.log_level,
+        log_file,
+        os.path.dirname(os.path.abspath(log_file)),
+        async_mode=options.log_async,
+        queue_size=options.log_queue_size,
+        overflow_policy=options.log_overflow,
+        log_format=options.log_format,
+    )
+    client = SupervisorClient(connection, upstream)
+    signal.signal(signal.SIGTERM, lambda *_: client.stopping.set())
+    components = Components()
+    components.api = ApiComponent(configuration, log_writer)
+    components.api.reuse_port = True
+    components.api.grace_period = SUPERVISOR_DRAIN_TIMEOUT
+    components.db = Database(configuration, log_writer)
+    components.services.append(client)
+    init_services(
+        components, configuration, log_writer, StartupProfile(), WORKER_SERVICES
+    )
+    client.connect()
+    try:
+        components.start()
+    except OSError as e:
+        log_writer.critical("API worker %d failed to start: %s", "MAIN", index, e)
+    client.send(("ready", os.getpid()))
+    client.stopping.wait()
+    # The API first, its requests in progress may still write through the supervisor.
+    components.api.stop()
+    components.stop()
+    client.close()
+    log_writer.close()
@@ -1,43 +1,301 @@
 #!/usr/bin/env python3
 
+from jorkieserver.constants import (
+    LATEST_CONFIG_VERSION,
+    DEFAULT_LOG_FORMAT,
+    DEFAULT_LOG_OVERFLOW_POLICY,
+    DEFAULT_LOG_QUEUE_SIZE,
+    DEFAULT_LOG_ROTATE_MAX_BYTES,
+    DEFAULT_LOG_ROTATE_INTERVAL,
+    DEFAULT_LOG_RETENTION,
+    DEFAULT_LOG_COMPRESSION,
+    DEFAULT_API_HOST,
+    DEFAULT_API_PORT,
+    DEFAULT_API_VERSION,
+    DEFAULT_API_TIMEOUT,
+    DEFAULT_API_CLIENT_CONCURRENCY,
+    DEFAULT_DB_FILE,
+    DEFAULT_DB_POOL_SIZE,
+    DEFAULT_MEMBERSHIP_DIR,
+    DEFAULT_SCHEDULER_FILE,
+    DEFAULT_DISPATCH_AGENTS_DIR,
+    DEFAULT_DISPATCH_MAX_CONCURRENCY,
+    DEFAULT_DISPATCH_AGENT_RATE,
+    DEFAULT_DISPATCH_HOST_RATE,
+    DEFAULT_WORKERS_ENABLED,
+    DEFAULT_WORKERS_WARM,
+    DEFAULT_WORKERS_IDLE_TIMEOUT,
+    DEFAULT_WORKERS_MAX_TASKS,
+    DEFAULT_WORKERS_HEALTH_INTERVAL,
+    DEFAULT_OUTPUT_DIR,
+    DEFAULT_SNAPSHOT_DIR,
+    DEFAULT_NOTIFICATIONS_FILE,
+    DEFAULT_NOTIFICATIONS_WINDOW,
+    DEFAULT_NOTIFICATIONS_BATCH_SIZE,
+    DEFAULT_NOTIFICATIONS_MAX_CONNECTIONS,
+    DEFAULT_NOTIFICATIONS_MAX_ATTEMPTS,
+    DEFAULT_NOTIFICATIONS_SMTP_PORT,
+    DEFAULT_INGEST_BATCH_SIZE,
+    DEFAULT_API_WORKERS,
+)
+from jorkieserver.metrics import MetricsRegistry
+
 
 class CommandOptions:
     """
     Holds command line options that were specified at command execution.
     """
 
-    def __init__(self, log_level: int, log_file: str, config_file: str):
+    __slots__ = (
+        "log_level",
+        "log_file",
+        "config_file",
+        "log_async",
+        "log_overflow",
+        "log_queue_size",
+        "log_format",
+        "watch_config",
+        "startup_profile",
+        "workers",
+    )
+
+    def __init__(
+        self,
+        log_level: int,
+        log_file: str,
+        config_file: str,
+        log_async: bool = False,
+        log_overflow: str = DEFAULT_LOG_OVERFLOW_POLICY,
+        log_queue_size: int = DEFAULT_LOG_QUEUE_SIZE,
+        log_format: str = DEFAULT_LOG_FORMAT,
+        watch_config: bool = False,
+        startup_profile: bool = False,
+        workers: int = DEFAULT_API_WORKERS,
+    ):
         self.log_level = log_level
         self.log_file = log_file
         self.config_file = config_file
+        self.log_async = log_async
+        self.log_overflow = log_overflow
+        self.log_queue_size = log_queue_size
+        self.log_format = log_format
+        self.watch_config = watch_config
+        self.startup_profile = startup_profile
+        self.workers = workers
 
 
 class Configuration:
     """
-    A placeholder for configuration until a configuration module is implemented.
+    Immutable snapshot of the values loaded from the configuration file by the `Configurator`.
+    Snapshots can be shared freely between components, use `replace()` to derive a modified copy.
     """
 
-    def __init__(self):
-        self.api_host = None
-        self.api_port = None
-        self.api_version = None
-        self.api_key = None
-        self.api_secret = None
-        self.api_timeout = None
-        self.log_level = None
-        self.log_file = None
-        self.config_file = None
+    __slots__ = (
+        "version",
+        "api_host",
+        "api_port",
+        "api_version",
+        "api_key",
+        "api_secret",
+        "api_timeout",
+        "api_client_concurrency",
+        "db_path",
+        "db_pool_size",
+        "membership_dir",
+        "scheduler_path",
+        "dispatch_agents_dir",
+        "dispatch_max_concurrency",
+        "dispatch_agent_rate",
+        "dispatch_host_rate",
+        "workers_enabled",
+        "workers_warm",
+        "workers_idle_timeout",
+        "workers_max_tasks",
+        "workers_health_interval",
+        "output_dir",
+        "snapshot_dir",
+        "notifications_path",
+        "notifications_window",
+        "notifications_batch_size",
+        "notifications_max_connections",
+        "notifications_max_attempts",
+        "notifications_webhook_url",
+        "notifications_smtp_host",
+        "notifications_smtp_port",
+        "notifications_smtp_sender",
+        "notifications_smtp_recipients",
+        "ingest_batch_size",
+        "log_level",
+        "log_file",
+        "log_rotate_max_bytes",
+        "log_rotate_interval",
+        "log_retention",
+        "log_compression",
+        "config_file",
+    )
+
+    DEFAULTS = {
+        "version": LATEST_CONFIG_VERSION,
+        "api_host": DEFAULT_API_HOST,
+        "api_port": DEFAULT_API_PORT,
+        "api_version": DEFAULT_API_VERSION,
+        "api_timeout": DEFAULT_API_TIMEOUT,
+        "api_client_concurrency": DEFAULT_API_CLIENT_CONCURRENCY,
+        "db_path": DEFAULT_DB_FILE,
+        "db_pool_size": DEFAULT_DB_POOL_SIZE,
+        "membership_dir": DEFAULT_MEMBERSHIP_DIR,
+        "scheduler_path": DEFAULT_SCHEDULER_FILE,
+        "dispatch_agents_dir": DEFAULT_DISPATCH_AGENTS_DIR,
+        "dispatch_max_concurrency": DEFAULT_DISPATCH_MAX_CONCURRENCY,
+        "dispatch_agent_rate": DEFAULT_DISPATCH_AGENT_RATE,
+        "dispatch_host_rate": DEFAULT_DISPATCH_HOST_RATE,
+        "workers_enabled": DEFAULT_WORKERS_ENABLED,
+        "workers_warm": DEFAULT_WORKERS_WARM,
+        "workers_idle_timeout": DEFAULT_WORKERS_IDLE_TIMEOUT,
+        "workers_max_tasks": DEFAULT_WORKERS_MAX_TASKS,
+        "workers_health_interval": DEFAULT_WORKERS_HEALTH_INTERVAL,
+        "output_dir": DEFAULT_OUTPUT_DIR,
+        "snapshot_dir": DEFAULT_SNAPSHOT_DIR,
+        "notifications_path": DEFAULT_NOTIFICATIONS_FILE,
+        "notifications_window": DEFAULT_NOTIFICATIONS_WINDOW,
+        "notifications_batch_size": DEFAULT_NOTIFICATIONS_BATCH_SIZE,
+        "notifications_max_connections": DEFAULT_NOTIFICATIONS_MAX_CONNECTIONS,
+        "notifications_max_attempts": DEFAULT_NOTIFICATIONS_MAX_ATTEMPTS,
+        "notifications_smtp_port": DEFAULT_NOTIFICATIONS_SMTP_PORT,
+        "ingest_batch_size": DEFAULT_INGEST_BATCH_SIZE,
+        "log_rotate_max_bytes": DEFAULT_LOG_ROTATE_MAX_BYTES,
+        "log_rotate_interval": DEFAULT_LOG_ROTATE_INTERVAL,
+        "log_retention": DEFAULT_LOG_RETENTION,
+        "log_compression": DEFAULT_LOG_COMPRESSION,
+    }
+
+    def __init__(self, **values):
+        """
+        Args:
+        -----
+            **values: Initial value of each field. Missing fields get their value from `DEFAULTS`, or None.
+
+        Raises:
+        -------
+            TypeError: If a value is given for an unknown field
+        """
+        unknown = set(values) - set(self.__slots__)
+        if unknown:
+            raise TypeError(
+                f"Unknown configuration fields: {', '.join(sorted(unknown))}"
+            )
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name, self.DEFAULTS.get(name)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Configuration snapshots are immutable, use replace().")
+
+    def __delattr__(self, name):
+        raise AttributeError("Configuration snapshots are immutable, use replace().")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Configuration):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self) -> str:
+        return (
+            f"Configuration(version={self.version!r}, config_file={self.config_file!r})"
+        )
+
+    def __getstate__(self) -> dict:
+        return self.as_dict()
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def replace(self, **changes) -> "Configuration":
+        """Returns a new snapshot with `changes` applied on top of this one."""
+        return Configuration(**{**self.as_dict(), **changes})
+
+    def as_dict(self) -> dict:
+        """Returns the snapshot as a `{field: value}` dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
 
 
 class Components:
     """
-    A placeholder for components until a compoennts initiaization module is implemented.
+    Holds the live sub-components of the server.
+
+    A component that supports hot configuration reload declares the `Configuration` fields it
+    uses in a `CONFIG_FIELDS` frozenset and implements `reconfigure(configuration, changed)`.
+    A component that serves in the background implements `start()` and `stop()`.
+    `services` holds the objects built on top of the components (e.g. the API routes of a feature),
+    they are reconfigured like the components, started after them and stopped before them.
+    `metrics` is the registry the components and services register their metrics in, see
+    `MetricsRegistry`. The `Server` replaces it with its own.
     """
 
+    __slots__ = ("api", "db", "scheduler", "dispatcher", "services", "metrics")
+
     def __init__(self):
         self.api = None
         self.db = None
         self.scheduler = None
+        self.dispatcher = None
+        self.services: list = []
+        self.metrics = MetricsRegistry()
+
+    def reconfigure(self, configuration: Configuration, changed: set[str]) -> None:
+        """Pushes a new configuration snapshot to every component using one of the `changed` fields.
+
+        Args:
+        -----
+            configuration (Configuration): The new configuration snapshot.
+            changed (set[str]): The names of the fields that changed.
+        """
+        for component in (
+            self.api,
+            self.db,
+            self.scheduler,
+            self.dispatcher,
+            *self.services,
+        ):
+            fields = getattr(component, "CONFIG_FIELDS", None)
+            if fields and fields & changed:
+                component.reconfigure(configuration, fields & changed)
+
+    def service(self, service_type: type):
+        """Returns the first service of the given type, or None."""
+        for service in self.services:
+            if isinstance(service, service_type):
+                return service
+        return None
+
+    def start(self) -> None:
+        """Starts every component that serves in the background."""
+        for component in (
+            self.db,
+            self.dispatcher,
+            self.scheduler,
+            self.api,
+            *self.services,
+        ):
+            start = getattr(component, "start", None)
+            if start is not None:
+                start()
+
+    def stop(self) -> None:
+        """Stops every started component, in the reverse order of `start()`."""
+        for component in (
+            *reversed(self.services),
+            self.api,
+            self.scheduler,
+            self.dispatcher,
+            self.db,
+        ):
+            stop = getattr(component, "stop", None)
+            if stop is not None:
+                stop()
 
 
 class Log:
@@ -2,8 +2,12 @@ import binascii
 import base64
 import sys
 import os
+import time
 
-from jorkieserver.logging import LogWriter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from jorkieserver.logging import LogWriter
 
 
 def file_exists(file_path: str) -> bool:
@@ -41,7 +45,7 @@ def file_writable(file_path: str) -> bool:
         return False
 
 
-def get_file_contents(file_path: str, log_writer: LogWriter) -> str | bool:
+def get_file_contents(file_path: str, log_writer: "LogWriter") -> str | bool:
     """Reads the contents of the file at the given path.
     Returns the contnets of the file if it exists, otherwise returns False.
 
@@ -60,6 +64,32 @@ def get_file_contents(file_path: str, log_writer: LogWriter) -> str | bool:
         log_writer.critical("Failed to read file contents.", component="CONFIGURATOR")
 
 
+def write_file_atomic(file_path: str, contents: str) -> None:
+    """Writes `contents` to a temporary file next to `file_path`, then renames it over `file_path`,
+    so readers see either the old or the new contents, never a partial file.
+
+    Args:
+    -----
+        file_path (str): The path of the file to replace.
+        contents (str): The new contents of the file.
+
+    Raises:
+    -------
+        OSError: If the temporary file cannot be written or renamed
+    """
+    temporary_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, "w") as file:
+            file.write(contents)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, file_path)
+    except OSError:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
 def base64_encode(data: str, component: str) -> str:
     """
     Transforms a string (`data`) into a base64 encoded string
@@ -173,16 +203,25 @@ def create_directory(dir: str, component: str) -> str:
 
 
 def prompt_user(question: str, timeout: int) -> bool:
+    """Prompts the user with a yes/no question until a valid answer is given or `timeout` seconds elapse.
+
+    Args:
+    -----
+        question (str): The question to print before prompting.
+        timeout (int): Number of seconds after which the prompt is treated as a "no".
+
+    Returns:
+    --------
+        bool: True if the user answered yes, false otherwise.
+    """
     print(question)
-    answer: str = input("Answer (y,n)")
-    while True and elapsed < timeout:
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        answer: str = input("Answer (y,n)").strip()
         if len(answer) == 0:
             continue
         if answer[0].lower() == "y":
             return True
         elif answer[0].lower() == "n":
             return False
-    if len(answer) == 0:
-        continue
-    if answer[0].lower() == "y":
-        return True
+    return False
@@ -0,0 +1,242 @@
+import os
+import select
+import struct
+import threading
+import time
+from typing import Callable
+
+from jorkieserver.configurator import Configurator
+from jorkieserver.constants import (
+    CONFIG_RACY_MTIME_WINDOW,
+    DEFAULT_CONFIG_POLL_INTERVAL,
+    DEFAULT_CONFIG_RELOAD_DELAY,
+)
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Configuration
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatch:
+    """
+    Minimal ctypes wrapper around Linux inotify, watching a directory for files
+    being written, created or moved into place (editors usually save through a rename).
+
+    Raises:
+    -------
+        OSError: If inotify is not available or the directory cannot be watched
+    """
+
+    def __init__(self, directory: str) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform.")
+        self.__fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1() failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.__fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.__fd)
+            raise OSError(errno, f"inotify_add_watch() failed for '{directory}'")
+
+    def fileno(self) -> int:
+        return self.__fd
+
+    def read_names(self) -> set[str]:
+        """Returns the names of the files that had an event since the last call."""
+        names = set()
+        try:
+            data = os.read(self.__fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            names.add(os.fsdecode(data[offset : offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        os.close(self.__fd)
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    Background thread that calls `on_change()` whenever the configuration file may have changed.
+    Uses inotify on the file's directory when available, and falls back to polling its mtime.
+    """
+
+    def __init__(
+        self,
+        config_file_path: str,
+        on_change: Callable[[], None],
+        log_writer: LogWriter,
+        poll_interval: float = DEFAULT_CONFIG_POLL_INTERVAL,
+        reload_delay: float = DEFAULT_CONFIG_RELOAD_DELAY,
+    ) -> None:
+        super().__init__(name="jorkie-config-watcher", daemon=True)
+        self.config_file_path = os.path.abspath(config_file_path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.reload_delay = reload_delay
+        self.mode: str | None = None
+        self.__log = log_writer.component("CONFIGURATOR")
+        self.__stopped = threading.Event()
+        self.__wake_read, self.__wake_write = os.pipe()
+
+    def stop(self) -> None:
+        """Stops watching and waits for the thread to exit."""
+        if self.__stopped.is_set():
+            return
+        self.__stopped.set()
+        os.write(self.__wake_write, b"\0")
+        if self.is_alive():
+            self.join()
+        os.close(self.__wake_read)
+        os.close(self.__wake_write)
+
+    def run(self) -> None:
+        try:
+            watch = InotifyWatch(os.path.dirname(self.config_file_path))
+        except OSError as e:
+            self.mode = "polling"
+            self.__log.debug("inotify unavailable (%s), polling the config file.", e)
+            self.__poll()
+            return
+        self.mode = "inotify"
+        try:
+            self.__watch(watch)
+        finally:
+            watch.close()
+
+    def __watch(self, watch: InotifyWatch) -> None:
+        config_file_name = os.path.basename(self.config_file_path)
+        while not self.__stopped.is_set():
+            readable, _, _ = select.select([watch, self.__wake_read], [], [])
+            if self.__wake_read in readable:
+                break
+            if config_file_name not in watch.read_names():
+                continue
+            # Let a burst of events (truncate, write, rename) settle into a single reload.
+            while select.select([watch], [], [], self.reload_delay)[0]:
+                watch.read_names()
+            self.__notify()
+
+    def __poll(self) -> None:
+        last_mtime = self.__mtime()
+        while not self.__stopped.wait(self.poll_interval):
+            mtime = self.__mtime()
+            # A file rewritten within the timestamp granularity keeps its mtime, so recently
+            # modified files are always handed to the reloader, which compares their hash.
+            if mtime != last_mtime or (
+                mtime is not None and time.time_ns() - mtime < CONFIG_RACY_MTIME_WINDOW
+            ):
+                last_mtime = mtime
+                self.__notify()
+
+    def __mtime(self) -> int | None:
+        try:
+            return os.stat(self.config_file_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def __notify(self) -> None:
+        try:
+            self.on_change()
+        except Exception as e:
+            self.__log.error("Config reload failed: %s", e)
+
+
+def diff_configurations(old: Configuration, new: Configuration) -> set[str]:
+    """Returns the names of the fields whose values differ between two snapshots."""
+    return {
+        name
+        for name in Configuration.__slots__
+        if getattr(old, name) != getattr(new, name)
+    }
+
+
+class ConfigReloader:
+    """
+    Publishes configuration snapshots to the live server.
+
+    `reload()` re-reads the configuration file through the `Configurator`, swaps `current`
+    to the new snapshot in one assignment (readers never take a lock), and calls only the
+    subscribers whose fields changed.
+    """
+
+    def __init__(
+        self,
+        configurator: Configurator,
+        config_file_path: str,
+        log_writer: LogWriter,
+        configuration: Configuration,
+    ) -> None:
+        self.configurator = configurator
+        self.config_file_path = config_file_path
+        self.current = configuration
+        self.__log = log_writer.component("CONFIGURATOR")
+        self.__subscribers: list[
+            tuple[frozenset[str] | None, Callable[[Configuration, set[str]], None]]
+        ] = []
+        self.__lock = threading.Lock()
+
+    def subscribe(
+        self,
+        callback: Callable[[Configuration, set[str]], None],
+        fields: frozenset[str] | None = None,
+    ) -> None:
+        """Registers `callback(configuration, changed_fields)` to be called after a reload.
+
+        Args:
+        -----
+            callback (Callable[[Configuration, set[str]], None]): Receives the new snapshot and the changed fields it subscribed to.
+            fields (frozenset[str] | None): Only call `callback` if one of these fields changed. None subscribes to every field.
+        """
+        self.__subscribers.append((fields, callback))
+
+    def reload(self) -> set[str]:
+        """Reloads the configuration file and pushes the changes to the subscribers.
+
+        Returns:
+        --------
+            set[str]: The names of the fields that changed. Empty if the file is unchanged or not valid.
+        """
+        with self.__lock:
+            started = time.perf_counter()
+            configuration = self.configurator.reload_configuration(
+                self.config_file_path
+            )
+            if configuration is None or configuration == self.current:
+                return set()
+
+            changed = diff_configurations(self.current, configuration)
+            self.current = configuration
+            for fields, callback in self.__subscribers:
+                relevant = changed if fields is None else changed & fields
+                if not relevant:
+                    continue
+                try:
+                    callback(configuration, relevant)
+                except Exception as e:
+                    self.__log.error(
+                        "Failed to apply configuration fields %s: %s",
+                        ", ".join(sorted(relevant)),
+                        e,
+                    )
+            self.__log.info(
+                "Configuration reloaded in %.1f ms (changed: %s).",
+                (time.perf_counter() - started) * 1000,
+                ", ".join(sorted(changed)),
+            )
+            return changed
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable
+
+from jorkieserver.constants import WORKER_PING_TIMEOUT
+from jorkieserver.logging import LogWriter
+
+if TYPE_CHECKING:
+    from jorkieserver.dispatch import Job
+
+
+class WorkerError(Exception):
+    """
+    A worker died, or broke the worker protocol.
+    """
+
+
+class Worker:
+    """
+    A long-lived agent process, taking one task at a time over its stdin and stdout pipes.
+    """
+
+    __slots__ = ("agent", "process", "stderr", "tasks", "last_used", "__ids")
+
+    def __init__(
+        self, agent: str, process: asyncio.subprocess.Process, stderr: int
+    ) -> None:
+        self.agent = agent
+        self.process = process
+        self.stderr = stderr
+        self.tasks = 0
+        self.last_used = time.monotonic()
+        self.__ids = 0
+        self.discard_output()
+
+    @classmethod
+    async def spawn(cls, agent: str, command: list[str]) -> "Worker":
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=write_fd,
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        return cls(agent, process, read_fd)
+
+    def discard_output(self) -> None:
+        """Reads and drops the stderr output of the worker between tasks."""
+        asyncio.get_running_loop().add_reader(self.stderr, self.__discard)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def request(self, message: dict, timeout: float | None = None) -> dict:
+        """Sends a message, and returns the worker's answer.
+
+        Raises:
+        -------
+            WorkerError: If the worker died, did not answer in time or sent an invalid answer
+        """
+        self.__ids += 1
+        message["id"] = self.__ids
+        try:
+            self.process.stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+            async with asyncio.timeout(timeout):
+                await self.process.stdin.drain()
+                line = await self.process.stdout.readline()
+            answer = json.loads(line)
+        except (ConnectionError, TimeoutError, ValueError) as e:
+            raise WorkerError(f"{e!r}")
+        if not isinstance(answer, dict) or answer.get("id") != self.__ids:
+            raise WorkerError(f"Unexpected answer {answer!r}")
+        return answer
+
+    async def close(self) -> None:
+        """Asks the worker to exit by closing its stdin, and kills it if it does not."""
+        try:
+            if self.alive:
+                self.process.stdin.close()
+                try:
+                    async with asyncio.timeout(WORKER_PING_TIMEOUT):
+                        await self.process.wait()
+                    return
+                except TimeoutError:
+                    pass
+            self.kill()
+            await self.process.wait()
+        finally:
+            if self.stderr >= 0:
+                asyncio.get_running_loop().remove_reader(self.stderr)
+                os.close(self.stderr)
+                self.stderr = -1
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+
+    def __discard(self) -> None:
+        try:
+            if not os.read(self.stderr, 65536):
+                asyncio.get_running_loop().remove_reader(self.stderr)
+        except BlockingIOError:
+            pass
+
+
+class WorkerPool:
+    """
+    Keeps warm agent processes, so that short tasks don't pay for an agent start each.
+
+    A worker is started with the command `command_for(agent)` returns, and reads one JSON task
+    per line on its stdin: `{"id": n, "op": "run", "project": ..., "target": ...}`, answered on
+    its stdout with `{"id": n, "returncode": <exit code of the task>}`. `{"id": n, "op": "ping"}`
+    is a health check, answered with `{"id": n}`. A worker exits when its stdin is closed.
+    What a worker writes to stderr while running a task is the output of the task's job.
+
+    The first task of an agent type warms up `warm` workers for it. Idle workers are reused most
+    recently used first, so the surplus of a burst stays idle and is stopped after `idle_timeout`
+    seconds. A worker is replaced after `max_tasks` tasks, and idle workers that fail a health
+    check (every `health_interval` seconds) are stopped.
+    """
+
+    def __init__(
+        self,
+        command_for: Callable[[str], list[str]],
+        log_writer: LogWriter,
+        warm: int,
+        idle_timeout: float,
+        max_tasks: int,
+        health_interval: float,
+    ) -> None:
+        self.command_for = command_for
+        self.warm = warm
+        self.idle_timeout = idle_timeout
+        self.max_tasks = max_tasks
+        self.health_interval = health_interval
+        self.spawned = 0
+        self.__log = log_writer.component("WORKERS")
+        self.__idle: dict[str, deque[Worker]] = {}
+        self.__busy: set[Worker] = set()
+        self.__tasks: set[asyncio.Task] = set()
+        self.__maintenance: asyncio.Task | None = None
+
+    def idle(self, agent: str) -> int:
+        """Number of idle workers of an agent type."""
+        return len(self.__idle.get(agent, ()))
+
+    def start(self) -> None:
+        """Starts the idle eviction and health checks, must be called from the event loop."""
+        self.__maintenance = asyncio.get_running_loop().create_task(self.__maintain())
+
+    async def warm_up(self, agent: str) -> None:
+        """Starts workers for an agent type until `warm` of them are idle."""
+        idle = self.__idle.setdefault(agent, deque())
+        missing = self.warm - len(idle)
+        if missing <= 0:
+            return
+        results = await asyncio.gather(
+            *(self.__spawn(agent) for _ in range(missing)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Worker):
+                idle.append(result)
+            else:
+                self.__log.error("Failed to start a %s worker: %r", agent, result)
+
+    async def run(self, job: "Job") -> int:
+        """Runs a job on a worker of its agent type, see `Dispatcher`.
+
+        Raises:
+        -------
+            WorkerError: If the worker died while running the job
+        """
+        if job.agent not in self.__idle:
+            self.__background(self.warm_up(job.agent))
+        worker = await self.__acquire(job.agent)
+        self.__busy.add(worker)
+        if job.output is not None:
+            job.output.attach(worker.stderr)
+        try:
+            answer = await worker.request(
+                {"op": "run", "project": job.project, "target": job.target}
+            )
+        except BaseException:
+            # Cancelled or broken in the middle of a task, the worker can't be reused.
+            self.__busy.discard(worker)
+            worker.kill()
+            if job.output is not None:
+                await asyncio.shield(job.output.detach(worker.stderr))
+            self.__background(worker.close())
+            raise
+        self.__busy.discard(worker)
+        if job.output is not None:
+            await job.output.detach(worker.stderr)
+            worker.discard_output()
+        worker.tasks += 1
+        worker.last_used = time.monotonic()
+        if worker.tasks >= self.max_tasks:
+            self.__background(self.__recycle(worker))
+        else:
+            self.__idle[job.agent].append(worker)
+        return answer.get("returncode", 0)
+
+    async def close(self) -> None:
+        """Stops every worker."""
+        if self.__maintenance is not None:
+            self.__maintenance.cancel()
+        workers = [*self.__busy]
+        for idle in self.__idle.values():
+            workers.extend(idle)
+            idle.clear()
+        await asyncio.gather(
+            *(worker.close() for worker in workers),
+            *self.__tasks,
+            return_exceptions=True,
+        )
+
+    async def check(self) -> None:
+        """Stops the idle workers unused for `idle_timeout`, and the ones failing a health check."""
+        now = time.monotonic()
+        for idle in list(self.__idle.values()):
+            # Workers are out of the idle queue while checked, so no task is sent to them meanwhile.
+            workers = list(idle)
+            idle.clear()
+            healthy = await asyncio.gather(
+                *(self.__check(worker, now) for worker in workers)
+            )
+            idle.extend(worker for worker, ok in zip(workers, healthy) if ok)
+
+    async def __acquire(self, agent: str) -> Worker:
+        idle = self.__idle.setdefault(agent, deque())
+        while idle:
+            worker = idle.pop()
+            if worker.alive:
+                return worker
+            await worker.close()
+        return await self.__spawn(agent)
+
+    async def __spawn(self, agent: str) -> Worker:
+        self.spawned += 1
+        return await Worker.spawn(agent, self.command_for(agent))
+
+    async def __check(self, worker: Worker, now: float) -> bool:
+        if now - worker.last_used > self.idle_timeout:
+            await worker.close()
+            return False
+        try:
+            await worker.request({"op": "ping"}, WORKER_PING_TIMEOUT)
+        except WorkerError as e:
+            self.__log.error("Stopping unhealthy %s worker: %s", worker.agent, e)
+            worker.kill()
+            await worker.close()
+            return False
+        return True
+
+    async def __recycle(self, worker: Worker) -> None:
+        await worker.close()
+        if self.idle(worker.agent) < self.warm:
+            try:
+                self.__idle[worker.agent].append(await self.__spawn(worker.agent))
+            except OSError as e:
+                self.__log.error("Failed to start a %s worker: %r", worker.agent, e)
+
+    def __background(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    async def __maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                self.__log.error("Worker health check failed: %r", e)
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import socket
+import time
+
+import pytest
+
+from jorkieserver.api import ApiComponent, HttpError, Response, Router
+from jorkieserver.types import Configuration
+
+
+@pytest.fixture
+def api(log_writer):
+    api = ApiComponent(
+        Configuration(api_host="127.0.0.1", api_port=0, api_timeout=5), log_writer
+    )
+
+    @api.route("POST", "/echo")
+    async def echo(request):
+        return Response(await request.body())
+
+    @api.route("GET", "/count/{n}")
+    async def count(request):
+        async def numbers():
+            for i in range(int(request.params["n"])):
+                yield f"{i}\n".encode()
+
+        return Response(numbers())
+
+    yield api
+    api.stop()
+
+
+def connect(api) -> socket.socket:
+    return socket.create_connection(api.address, timeout=5)
+
+
+def read_response(file) -> tuple[int, dict[str, str], bytes]:
+    status = int(file.readline().split(b" ")[1])
+    headers = {}
+    while (line := file.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    if "content-length" in headers:
+        return status, headers, file.read(int(headers["content-length"]))
+    body = b""
+    while (size := int(file.readline(), 16)) != 0:
+        body += file.read(size)
+        file.readline()
+    file.readline()
+    return status, headers, body
+
+
+def test_keep_alive_and_pipelining(api):
+    api.start()
+    with connect(api) as client, client.makefile("rb") as file:
+        # Three pipelined requests on one connection are answered in order.
+        client.sendall(
+            b"GET /api/v1/health HTTP/1.1\r\nHost: x\r\n\r\n"
+            b"POST /api/v1/echo HTTP/1.1\r\nContent-Length: 5\r\n\r\nhello"
+            b"GET /api/v1/health HTTP/1.1\r\nConnection: close\r\n\r\n"
+        )
+        status, headers, body = read_response(file)
+        assert status == 200 and json.loads(body) == {"status": "ok"}
+        assert headers["connection"] == "keep-alive"
+        assert read_response(file)[2] == b"hello"
+        status, headers, _ = read_response(file)
+        assert headers["connection"] == "close"
+        assert file.read() == b""
+
+
+def test_streaming_request_and_response(api):
+    api.start()
+    with connect(api) as client, client.makefile("rb") as file:
+        client.sendall(
+            b"POST /api/v1/echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"3\r\nabc\r\n4\r\ndefg\r\n0\r\n\r\n"
+            b"GET /api/v1/count/3 HTTP/1.1\r\n\r\n"
+        )
+        assert read_response(file)[2] == b"abcdefg"
+        status, headers, body = read_response(file)
+        assert headers["transfer-encoding"] == "chunked"
+        assert body == b"0\n1\n2\n"
+
+
+def test_errors_and_histograms(api):
+    api.start()
+    with connect(api) as client, client.makefile("rb") as file:
+        client.sendall(b"GET /nowhere HTTP/1.1\r\n\r\n")
+        assert read_response(file)[0] == 404
+        client.sendall(b"GET /api/v1/echo HTTP/1.1\r\n\r\n")
+        assert read_response(file)[0] == 405
+        client.sendall(b"GET /api/v1/health HTTP/1.1\r\n\r\n")
+        assert read_response(file)[0] == 200
+    # The latency is recorded once the response is written, just after the client got it.
+    for _ in range(100):
+        if "/api/v1/health" in api.histograms:
+            break
+        time.sleep(0.01)
+    summary = api.latency_summary()
+    assert summary["/api/v1/health"]["count"] == 1
+    assert summary["unmatched"]["count"] == 2
+    assert summary["/api/v1/health"]["p99"] >= summary["/api/v1/health"]["p50"] > 0
+
+
+def test_client_concurrency_is_bounded(log_writer):
+    api = ApiComponent(
+        Configuration(api_host="127.0.0.1", api_port=0, api_client_concurrency=2),
+        log_writer,
+    )
+    running = []
+    peak = []
+
+    @api.route("GET", "/slow")
+    async def slow(request):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.pop()
+        return Response("done")
+
+    api.start()
+    try:
+        clients = [connect(api) for _ in range(6)]
+        for client in clients:
+            client.sendall(b"GET /api/v1/slow HTTP/1.1\r\n\r\n")
+        for client in clients:
+            with client, client.makefile("rb") as file:
+                assert read_response(file)[2] == b"done"
+    finally:
+        api.stop()
+    assert max(peak) == 2
+
+
+def test_stop_waits_for_requests_up_to_the_grace_period(api, tmp_path):
+    @api.route("GET", "/sleep/{seconds}")
+    async def sleep(request):
+        await asyncio.sleep(float(request.params["seconds"]))
+        return Response("done")
+
+    api.grace_period = 0.5
+    api.start()
+    with (
+        connect(api) as quick,
+        quick.makefile("rb") as quick_file,
+        connect(api) as slow,
+        slow.makefile("rb") as slow_file,
+    ):
+        quick.sendall(b"GET /api/v1/sleep/0.2 HTTP/1.1\r\n\r\n")
+        slow.sendall(b"GET /api/v1/sleep/10 HTTP/1.1\r\n\r\n")
+        time.sleep(0.1)
+        started = time.monotonic()
+        api.stop()
+        assert time.monotonic() - started < 2
+        status, headers, body = read_response(quick_file)
+        assert (status, body, headers["connection"]) == (200, b"done", "close")
+        # Closed without an answer once the grace period is over.
+        assert slow_file.read() == b""
+    log = (tmp_path / "jorkie.log").read_text()
+    assert "Closing 1 connections with requests in progress" in log
+
+
+def test_router_patterns():
+    router = Router()
+
+    async def handler(request):
+        pass
+
+    router.add("GET", "/jobs/{job_id}/output", handler)
+    assert router.match("GET", "/jobs/42/output") == (
+        handler,
+        {"job_id": "42"},
+        "/jobs/{job_id}/output",
+    )
+    with pytest.raises(HttpError) as error:
+        router.match("DELETE", "/jobs/42/output")
+    assert error.value.status == 405
+
+
+def test_reconfigure_keeps_listening_if_the_new_address_cannot_be_bound(api, tmp_path):
+    api.start()
+    old = api.address
+    with socket.create_server(("127.0.0.1", 0)) as taken:
+        configuration = Configuration(
+            api_host="127.0.0.1", api_port=taken.getsockname()[1], api_timeout=5
+        )
+        api.reconfigure(configuration, {"api_port"})
+        assert api.address == old and api.port == 0
+        with connect(api) as client, client.makefile("rb") as file:
+            client.sendall(b"GET /api/v1/health HTTP/1.1\r\n\r\n")
+            assert read_response(file)[0] == 200
+    assert (
+        "Cannot listen on 127.0.0.1:%d" % configuration.api_port
+        in (tmp_path / "jorkie.log").read_text()
+    )
+
+    # Moving to another host on the same port closes the previous listener first.
+    api.reconfigure(
+        Configuration(api_host="0.0.0.0", api_port=old[1], api_timeout=5), {"api_host"}
+    )
+    assert api.address == ("0.0.0.0", old[1])
+    with socket.create_connection(old, timeout=5) as client:
+        with client.makefile("rb") as file:
+            client.sendall(b"GET /api/v1/health HTTP/1.1\r\n\r\n")
+            assert read_response(file)[0] == 200
+
+    api.reconfigure(
+        Configuration(api_host="127.0.0.1", api_port=0, api_timeout=5), {"api_port"}
+    )
+    assert api.address[1] != old[1]
+    with pytest.raises(ConnectionRefusedError):
+        socket.create_connection(old, timeout=5).close()
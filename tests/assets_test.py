@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from jorkieserver.assets import AssetStore, CodeTable
+from jorkieserver.types import CommandOptions, Components
+
+
+def test_store_round_trips_every_value_encoding():
+    store = AssetStore()
+    assets = [
+        ("ip", "192.0.2.1"),
+        ("ip", "0.0.0.0"),
+        ("ip", "255.255.255.255"),
+        ("ip", "2001:db8::1"),
+        ("ip", "::ffff:192.0.2.1"),
+        # Not canonical, kept as text so the value reads back as it was added.
+        ("ip", "192.000.2.1"),
+        ("ip", "2001:DB8::1"),
+        # Not addresses, the socket functions reject a NUL character with ValueError.
+        ("ip", "1.2.3.\x00"),
+        ("ip", "2001:db8::\x00"),
+        ("subdomain", "www.example.com"),
+        ("subdomain", "ünïcödé.example"),
+        ("domain", ""),
+        ("asn", "AS13335"),
+    ]
+    for i, (kind, value) in enumerate(assets):
+        assert store.add(kind, value, "dnsx" if i % 2 else None, float(i))
+    assert len(store) == len(assets)
+    assert list(store.pairs()) == assets
+    for i, asset in enumerate(store):
+        assert (asset.kind, asset.value) == assets[i]
+        assert asset.source == ("dnsx" if i % 2 else None)
+        assert asset.first_seen == asset.last_seen == float(i)
+
+
+def test_store_deduplicates_and_updates_last_seen():
+    store = AssetStore()
+    assert store.add("subdomain", "a.example.com", "subfinder", 10.0)
+    assert not store.add("subdomain", "a.example.com", "amass", 20.0)
+    assert not store.add("subdomain", "a.example.com", "amass", 15.0)
+    # The same value is another asset under another kind.
+    assert store.add("domain", "a.example.com", seen_at=30.0)
+    assert len(store) == 2
+    asset = store.find("subdomain", "a.example.com")
+    assert asset.as_dict() == {
+        "type": "subdomain",
+        "value": "a.example.com",
+        "source": "subfinder",
+        "first_seen": 10.0,
+        "last_seen": 20.0,
+    }
+    assert store.find("subdomain", "b.example.com") is None
+    assert store.find("cidr", "a.example.com") is None
+    assert ("domain", "a.example.com") in store
+    assert store[1] == store.find("domain", "a.example.com")
+    with pytest.raises(IndexError):
+        store[2]
+
+
+def test_store_matches_a_set_while_growing():
+    rng = random.Random(0)
+    store = AssetStore()
+    expected = set()
+    for i in range(20_000):
+        kind = rng.choice(("ip", "subdomain"))
+        if kind == "ip":
+            value = f"10.{rng.randrange(8)}.{rng.randrange(256)}.{rng.randrange(256)}"
+        else:
+            value = f"host-{rng.randrange(10_000)}.example.com"
+        assert store.add(kind, value) == ((kind, value) not in expected)
+        expected.add((kind, value))
+    assert len(store) == len(expected)
+    assert set(store.pairs()) == expected
+    assert all(pair in store for pair in expected)
+    # Packed addresses and interned kinds keep rows far below an object per asset.
+    assert store.nbytes < 80 * len(store)
+
+
+def test_code_table_overflows():
+    table = CodeTable(3)
+    assert [table.code(name) for name in ("a", "b", "a", None)] == [1, 2, 1, 0]
+    with pytest.raises(OverflowError):
+        table.code("c")
+
+
+def test_holders_have_no_instance_dict():
+    options = CommandOptions(1, "server.log", "config.yaml")
+    components = Components()
+    for holder in (options, components):
+        assert not hasattr(holder, "__dict__")
+    with pytest.raises(AttributeError):
+        components.membership = None
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from jorkieserver.configurator import CONFIG_SCHEMA, Configurator
+from jorkieserver.constants import DEFAULT_LOG_ROTATE_MAX_BYTES
+from jorkieserver.types import Configuration
+
+
+def test_generates_default_config(log_writer, tmp_path):
+    config_file_path = str(tmp_path / "config" / "config.yaml")
+    configuration = Configurator(log_writer, config_file_path).get_configuration(
+        config_file_path
+    )
+    assert (tmp_path / "config" / "config.yaml").exists()
+    assert configuration.log_rotate_max_bytes == DEFAULT_LOG_ROTATE_MAX_BYTES
+    assert configuration.config_file == config_file_path
+
+
+def test_loads_rotation_settings(log_writer, tmp_path):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        'version: "0.1.0"\n'
+        "logging:\n"
+        "  rotation:\n"
+        "    max_bytes: 1024\n"
+        "    interval: 0\n"
+        "    retention: 3\n"
+        "    compression: none\n"
+    )
+    configuration = Configurator(log_writer, str(config_file)).get_configuration(
+        str(config_file)
+    )
+    assert configuration.log_rotate_max_bytes == 1024
+    assert configuration.log_rotate_interval == 0
+    assert configuration.log_retention == 3
+    assert configuration.log_compression == "none"
+
+
+def test_invalid_config_exits(log_writer, tmp_path):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        'version: "0.1.0"\nlogging:\n  rotation:\n    compression: lz4\n'
+    )
+    with pytest.raises(SystemExit):
+        Configurator(log_writer, str(config_file)).get_configuration(str(config_file))
+
+
+def test_configuration_is_cached_and_reloaded_on_change(log_writer, tmp_path):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        'version: "0.1.0"\nlogging:\n  rotation:\n    retention: 3\n'
+    )
+    configurator = Configurator(log_writer, str(config_file))
+    first = configurator.get_configuration(str(config_file))
+    assert configurator.get_configuration(str(config_file)) is first
+    assert configurator.configuration is first
+
+    # Touched without changing the contents.
+    os.utime(config_file, ns=(1, 1))
+    assert (
+        Configurator(log_writer, str(config_file)).get_configuration(str(config_file))
+        is first
+    )
+
+    config_file.write_text(
+        'version: "0.1.0"\nlogging:\n  rotation:\n    retention: 5\n'
+    )
+    os.utime(config_file, ns=(2, 2))
+    second = configurator.get_configuration(str(config_file))
+    assert second is not first
+    assert second.log_retention == 5
+
+
+def test_configuration_is_immutable():
+    configuration = Configuration(log_retention=3)
+    with pytest.raises(AttributeError):
+        configuration.log_retention = 4
+    replaced = configuration.replace(log_retention=4)
+    assert (configuration.log_retention, replaced.log_retention) == (3, 4)
+    assert replaced == Configuration(log_retention=4)
+
+
+def test_schema_reports_every_error():
+    values, errors = CONFIG_SCHEMA.load(
+        {"logging": {"rotation": {"max_bytes": -1, "interval": True}}}
+    )
+    assert values["log_compression"] == "gzip"
+    assert len(errors) == 3
@@ -0,0 +1,134 @@
+import socket
+from collections.abc import Iterable
+
+import pytest
+
+from jorkieserver.logging import LogWriter
+from jorkieserver.startup import (
+    COMPONENT_FACTORIES,
+    StartupProfile,
+    boot_components,
+    init_services,
+)
+from jorkieserver.types import Configuration
+
+
+@pytest.fixture(autouse=True)
+def working_dir(tmp_path, monkeypatch):
+    """Runs every test from a temporary directory so generated config and log files don't land in the repository."""
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+
+
+@pytest.fixture
+def log_writer(tmp_path):
+    """Log writer of the components under test, closed once they are stopped."""
+    log_writer = LogWriter(2, str(tmp_path / "jorkie.log"), str(tmp_path))
+    yield log_writer
+    log_writer.close()
+
+
+@pytest.fixture
+def configuration(tmp_path):
+    """Configuration of the components under test, listening on a free local port with all their files in the test's directory."""
+    data_dir = tmp_path / "data"
+    return Configuration(
+        api_host="127.0.0.1",
+        api_port=0,
+        db_path=str(data_dir / "jorkie.db"),
+        membership_dir=str(data_dir / "membership"),
+        snapshot_dir=str(data_dir / "snapshots"),
+        scheduler_path=str(data_dir / "schedules.db"),
+        notifications_path=str(data_dir / "notifications.db"),
+        dispatch_agents_dir=str(tmp_path / "agents"),
+        output_dir=str(tmp_path / "output"),
+        ingest_batch_size=100,
+    )
+
+
+@pytest.fixture
+def component_names():
+    """Names of the `COMPONENT_FACTORIES` the `components` fixture creates, override or parametrize it to change them."""
+    return ("api", "db")
+
+
+@pytest.fixture
+def services():
+    """Service factories the `components` fixture builds, override or parametrize it to change them."""
+    return ()
+
+
+@pytest.fixture
+def components(configuration, component_names, services, log_writer):
+    """Started components with their services, built from the `configuration`, `component_names` and `services` fixtures."""
+    profile = StartupProfile()
+    components = boot_components(
+        configuration,
+        log_writer,
+        profile,
+        {name: COMPONENT_FACTORIES[name] for name in component_names},
+    )
+    init_services(components, configuration, log_writer, profile, services)
+    components.start()
+    yield components
+    components.stop()
+
+
+def decode_chunked(body: bytes) -> bytes:
+    """Returns the content of a chunked transfer-encoded body."""
+    content = b""
+    while True:
+        line, _, body = body.partition(b"\r\n")
+        size = int(line.split(b";")[0], 16)
+        if not size:
+            return content
+        content += body[:size]
+        body = body[size + 2 :]
+
+
+def http_request(
+    address,
+    method: str,
+    path: str,
+    body: bytes | Iterable[bytes] = b"",
+    headers: str = "",
+    source: str | None = None,
+) -> tuple[int, bytes]:
+    """Sends one request on its own connection and reads the response until the server closes it.
+
+    Args:
+    -----
+        address (tuple[str, int]): The address the API listens on.
+        method (str): The request method.
+        path (str): The request path, with its query string.
+        body (bytes | Iterable[bytes]): The request body, sent with chunked transfer encoding if it is given as chunks.
+        headers (str): Extra header lines, each ending with CRLF.
+        source (str | None): The local address to connect from.
+
+    Returns:
+    --------
+        tuple[int, bytes]: The response status and its body, decoded if it was chunked.
+    """
+    with socket.create_connection(
+        address, timeout=10, source_address=(source, 0) if source else None
+    ) as client:
+        if isinstance(body, bytes):
+            client.sendall(
+                f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                f"{headers}Connection: close\r\n\r\n".encode() + body
+            )
+        else:
+            client.sendall(
+                f"{method} {path} HTTP/1.1\r\nTransfer-Encoding: chunked\r\n"
+                f"{headers}Connection: close\r\n\r\n".encode()
+            )
+            for chunk in body:
+                client.sendall(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+            client.sendall(b"0\r\n\r\n")
+        response = b""
+        while data := client.recv(65536):
+            response += data
+    head, _, body = response.partition(b"\r\n\r\n")
+    if b"transfer-encoding: chunked" in head.lower():
+        body = decode_chunked(body)
+    return int(head.split()[1]), body
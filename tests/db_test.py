@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from jorkieserver.db import Database, asset_hash
+from jorkieserver.logging import LogWriter
+from jorkieserver.types import Configuration
+
+
+@pytest.fixture
+def db(tmp_path):
+    log_writer = LogWriter(2, str(tmp_path / "db.log"), str(tmp_path))
+    db = Database(
+        Configuration(db_path=str(tmp_path / "data" / "jorkie.db"), db_pool_size=2),
+        log_writer,
+    )
+    db.start()
+    yield db
+    db.stop()
+
+
+def test_uses_wal_mode(db):
+    with sqlite3.connect(db.path) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_insert_deduplicates_per_project(db):
+    assets = [
+        ("domain", "a.example.com"),
+        ("ip", "10.0.0.1"),
+        ("domain", "a.example.com"),
+    ]
+    assert db.insert_assets("acme", assets, 1.0) == 2
+    assert db.insert_assets("acme", assets, 2.0) == 0
+    assert db.insert_assets("globex", assets, 2.0) == 2
+    assert db.count_assets("acme") == 2
+    assert db.count_assets("unknown") == 0
+
+
+def test_upsert_updates_known_assets(db):
+    db.upsert_assets("acme", [("domain", "a.example.com")], 1.0)
+    db.upsert_assets("acme", [("domain", "a.example.com"), ("asn", "AS13335")], 5.0)
+    asset = db.lookup_asset("acme", "domain", "a.example.com")
+    assert asset["first_seen"] == 1.0
+    assert asset["last_seen"] == 5.0
+    assert asset["seen_count"] == 2
+    assert db.lookup_asset("acme", "domain", "b.example.com") is None
+    assert db.lookup_asset("globex", "domain", "a.example.com") is None
+
+
+def test_results_upsert_their_assets(db):
+    rows = [
+        ("acme", "scan-1", "domain", "a.example.com", None, 1.0),
+        ("acme", "scan-2", "domain", "a.example.com", '{"source":"crt"}', 2.0),
+    ]
+    assert db.insert_results(rows) == 2
+    assert db.count_results("acme") == 2
+    assert db.count_results() == 2
+    assert db.count_assets("acme") == 1
+    assert db.lookup_asset("acme", "domain", "a.example.com")["seen_count"] == 2
+
+
+def test_asset_hash_distinguishes_kinds():
+    assert asset_hash("domain", "1") != asset_hash("asn", "1")
+    assert -(2**63) <= asset_hash("domain", "a.example.com") < 2**63
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+from jorkieserver.dispatch import (
+    DispatchComponent,
+    Dispatcher,
+    Job,
+    TokenBucket,
+    run_command,
+    target_host,
+)
+from jorkieserver.types import Configuration
+
+# A stand-in agent: a child process that works for 20 ms.
+STAND_IN = [sys.executable, "-c", "import time; time.sleep(0.02)"]
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2, burst=2, now=0)
+    for _ in range(2):
+        assert bucket.delay(0) == 0
+        bucket.take()
+    assert bucket.delay(0) == pytest.approx(0.5)
+    assert bucket.delay(0.5) == 0
+    assert bucket.delay(100) == 0 and bucket.tokens == 2
+
+
+def test_projects_share_slots_by_weight(log_writer):
+    started = []
+
+    async def runner(job):
+        started.append(job.project)
+        return await run_command(job)
+
+    async def run():
+        dispatcher = Dispatcher(2, 1000, 1000, log_writer, runner)
+        dispatcher.set_weight("big", 3)
+        # The small project queues its jobs after the big one, and still gets a share.
+        for _ in range(24):
+            dispatcher.submit(Job("big", "nmap", command=STAND_IN))
+        for _ in range(8):
+            dispatcher.submit(Job("small", "nmap", command=STAND_IN))
+        await dispatcher.join()
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+    assert stats["big"]["started"] == 24 and stats["small"]["started"] == 8
+    # Under contention, the 3:1 weights split the first 16 runs 12:4.
+    assert started[:16].count("small") == 4
+    # In FIFO order, it would have waited for the 24 runs of the big project.
+    assert started.index("small") < 4
+    assert all(0 <= s["mean_wait"] <= s["max_wait"] for s in stats.values())
+    # In FIFO order, the small project would wait longer on average than any big run.
+    assert stats["small"]["mean_wait"] < stats["big"]["max_wait"]
+
+
+def test_global_concurrency_cap(log_writer):
+    running = 0
+    peak = 0
+
+    async def runner(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.005)
+        running -= 1
+        return 0
+
+    async def run():
+        dispatcher = Dispatcher(3, 1000, 1000, log_writer, runner)
+        for i in range(30):
+            dispatcher.submit(Job(f"project-{i % 5}", "nmap"))
+        assert len(dispatcher.running) == 3
+        await dispatcher.join()
+
+    asyncio.run(run())
+    assert peak == 3
+
+
+def test_host_rate_limit_does_not_block_other_hosts(log_writer):
+    async def runner(job):
+        return 0
+
+    async def run():
+        dispatcher = Dispatcher(10, 1000, 10, log_writer, runner)
+        limited = [
+            dispatcher.submit(Job("acme", "nmap", "a.example.com")) for _ in range(8)
+        ]
+        other = dispatcher.submit(Job("acme", "httpx", "b.example.com"))
+        await dispatcher.join()
+        return limited, other
+
+    limited, other = asyncio.run(run())
+    # A burst of 5, then one run every 100 ms.
+    assert [job.wait < 0.05 for job in limited] == [True] * 5 + [False] * 3
+    assert limited[-1].wait >= 0.25
+    assert other.wait < 0.05
+
+
+def test_target_host():
+    assert target_host("https://WWW.Example.com:8443/login") == "www.example.com"
+    assert target_host("www.example.com:443/x") == "www.example.com"
+    assert target_host("www.example.com.") == "www.example.com"
+    assert target_host("http://[2001:DB8::1]:80/") == "2001:db8::1/128"
+    assert target_host("10.0.0.7/8") == "10.0.0.0/8"
+    assert target_host("AS13335") == "as13335"
+
+
+def test_host_rate_limit_applies_to_every_url_of_a_host(log_writer):
+    async def runner(job):
+        return 0
+
+    async def run():
+        dispatcher = Dispatcher(10, 1000, 10, log_writer, runner)
+        targets = ["https://a.example.com/x", "https://A.example.com/y"]
+        jobs = [
+            dispatcher.submit(Job("acme", "httpx", target))
+            for target in targets + ["a.example.com"] * 4
+        ]
+        await dispatcher.join()
+        return jobs
+
+    # A burst of 5 for the host, whatever the form of the target.
+    assert [job.wait < 0.05 for job in asyncio.run(run())] == [True] * 5 + [False]
+
+
+def test_idle_host_rate_limits_are_dropped(log_writer, monkeypatch):
+    monkeypatch.setattr("jorkieserver.dispatch.DISPATCH_RATE_LIMITS", 10)
+
+    async def runner(job):
+        return 0
+
+    async def run():
+        dispatcher = Dispatcher(10, 1000, 1000, log_writer, runner)
+        buckets = dispatcher._Dispatcher__host_buckets
+        sizes = []
+        for i in range(100):
+            dispatcher.submit(Job("acme", "httpx", f"h{i}.example.com"))
+            await dispatcher.join()
+            await asyncio.sleep(0.01)
+            sizes.append(len(buckets))
+        return sizes
+
+    # Swept once there are more than 10, every one is full again by then.
+    assert max(asyncio.run(run())) <= 11
+
+
+def test_component_runs_agent_executables(log_writer, tmp_path):
+    agents_dir = tmp_path / "agents"
+    agents_dir.mkdir()
+    agent = agents_dir / "probe"
+    agent.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "sys.exit(3 if sys.argv[1:] == ['--project', 'acme', '--target', 'a.example.com'] else 1)\n"
+    )
+    agent.chmod(agent.stat().st_mode | stat.S_IEXEC)
+    component = DispatchComponent(
+        Configuration(
+            dispatch_agents_dir=str(agents_dir), output_dir=str(tmp_path / "output")
+        ),
+        log_writer,
+    )
+    finished = []
+    done = threading.Event()
+    component.dispatcher.subscribe(lambda job: (finished.append(job), done.set()))
+    component.start()
+    try:
+        job = component.submit("acme", "probe", "a.example.com")
+        assert done.wait(10)
+        assert finished == [job] and job.returncode == 3
+        with pytest.raises(ValueError):
+            component.submit("acme", "../bin/sh")
+        assert component.command("probe", "acme")[0] == os.path.join(
+            str(agents_dir), "probe"
+        )
+    finally:
+        component.stop()
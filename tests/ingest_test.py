@@ -0,0 +1,143 @@
+import asyncio
+import gzip
+import json
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import http_request
+
+from jorkieserver.api import HttpError
+from jorkieserver.ingest import (
+    BatchWriter,
+    IngestReport,
+    StreamDecoder,
+    parse_records,
+    register_routes,
+)
+
+
+@pytest.fixture
+def services():
+    return (register_routes,)
+
+
+def test_decoder_splits_compressed_lines_across_chunks():
+    data = gzip.compress(b"".join(b'{"n": %d}\n' % i for i in range(1000)) + b"last")
+    decoder = StreamDecoder("gzip")
+    lines = []
+    for offset in range(0, len(data), 7):
+        lines.extend(decoder.feed(data[offset : offset + 7]))
+    lines.extend(decoder.finish())
+    assert len(lines) == 1001
+    assert lines[0] == b'{"n": 0}' and lines[-1] == b"last"
+
+
+def test_decoder_rejects_unknown_and_truncated_encodings():
+    with pytest.raises(HttpError) as error:
+        StreamDecoder("br")
+    assert error.value.status == 415
+    decoder = StreamDecoder("gzip")
+    list(decoder.feed(gzip.compress(b"a\nb\n")[:-8]))
+    with pytest.raises(HttpError):
+        list(decoder.finish())
+
+
+def test_decoder_bounds_and_checks_zstd_bodies():
+    zstandard = pytest.importorskip("zstandard")
+    body = b"".join(b'{"n": %d}\n' % i for i in range(100_000)) + b"last"
+    compressor = zstandard.ZstdCompressor(write_checksum=True)
+    streamed = compressor.compressobj()
+    for data in (
+        zstandard.ZstdCompressor().compress(body),
+        streamed.compress(body) + streamed.flush(),
+    ):
+        decoder = StreamDecoder("zstd")
+        lines = []
+        for offset in range(0, len(data), 777):
+            lines.extend(decoder.feed(data[offset : offset + 777]))
+        lines.extend(decoder.finish())
+        assert lines == body.split(b"\n")
+
+        decoder = StreamDecoder("zstd")
+        list(decoder.feed(data[:-1]))
+        with pytest.raises(HttpError) as error:
+            list(decoder.finish())
+        assert error.value.status == 400
+
+    # A 256 MiB line is rejected after a few blocks, not decompressed in one go.
+    bomb = zstandard.ZstdCompressor().compress(b"a" * (1 << 28))
+    tracemalloc.start()
+    try:
+        with pytest.raises(HttpError) as error:
+            list(StreamDecoder("zstd").feed(bomb))
+        assert tracemalloc.get_traced_memory()[1] < 16 * 1024 * 1024
+    finally:
+        tracemalloc.stop()
+    assert error.value.status == 413
+
+
+def test_parse_records_reports_invalid_lines():
+    report = IngestReport()
+    rows = list(
+        parse_records(
+            [
+                b'{"type": "subdomain", "value": "a.example.com", "scan_id": 7, "source": "crt"}',
+                b"not json",
+                b"",
+                b'{"type": "subdomain"}',
+            ],
+            "project",
+            1.0,
+            report,
+        )
+    )
+    assert rows == [
+        ("project", "7", "subdomain", "a.example.com", '{"source":"crt"}', 1.0)
+    ]
+    assert report.rejected == 2
+    assert report.errors[0].startswith("line 2")
+
+
+def test_batch_writer_applies_backpressure():
+    written = []
+
+    def write(batch):
+        time.sleep(0.02)
+        written.append(len(batch))
+        return len(batch)
+
+    async def submit_all():
+        writer = BatchWriter(write, executor, max_pending=1)
+        await writer.submit([1])
+        await writer.submit([2])
+        # The first batch had to be written before the second could be queued.
+        assert written == [1]
+        return await writer.finish()
+
+    with ThreadPoolExecutor(1) as executor:
+        assert asyncio.run(submit_all()) == 2
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_ingests_chunked_ndjson(components, encoding):
+    body = b"".join(
+        b'{"type": "subdomain", "value": "host-%d.example.com"}\n' % i
+        for i in range(12345)
+    )
+    body += b"{broken\n"
+    if encoding == "gzip":
+        body = gzip.compress(body)
+    status, report = http_request(
+        components.api.address,
+        "POST",
+        "/api/v1/projects/acme/results",
+        (body[offset : offset + 4096] for offset in range(0, len(body), 4096)),
+        f"Content-Encoding: {encoding}\r\n",
+    )
+    assert status == 200
+    report = json.loads(report)
+    assert report["accepted"] == 12345
+    assert report["rejected"] == 1
+    assert components.db.count_results("acme") == 12345
@@ -3,6 +3,7 @@ from unittest.mock import patch
 from argparse import Namespace
 
 from jorkieserver.server import Server
+from jorkieserver.logging import LogQueue, LogWriter
 
 
 @pytest.fixture
@@ -29,8 +30,98 @@ def test_logging_initialization(mock_parse_args, temporary_log_dir):
     args.log_level = 1
     args.log_file = "default.log"
     args.config_file = "default.conf"
+    args.log_async = False
+    args.log_overflow = "block"
+    args.log_queue_size = 8192
+    args.log_format = "text"
+    args.watch_config = False
+    args.startup_profile = False
+    args.workers = 0
     mock_parse_args.return_value = args
     server = Server()
     assert server.cmd_opts.log_level == 1
     assert server.cmd_opts.log_file == "default.log"
     assert server.cmd_opts.config_file == "default.conf"
+
+
+def test_log_queue_drop_oldest():
+    queue = LogQueue(capacity=2, overflow_policy="drop-oldest")
+    for i in range(4):
+        assert queue.put((0.0, False, str(i)))
+    assert [record[2] for record in queue.get_batch(10, 0)] == ["2", "3"]
+    assert queue.dropped == 2
+
+
+def test_log_queue_sample():
+    queue = LogQueue(capacity=1, overflow_policy="sample", sample_rate=3)
+    accepted = [queue.put((0.0, False, str(i))) for i in range(7)]
+    assert accepted == [True, False, False, True, False, False, True]
+    assert [record[2] for record in queue.get_batch(10, 0)] == ["6"]
+
+
+def test_log_queue_invalid_policy():
+    with pytest.raises(ValueError):
+        LogQueue(capacity=1, overflow_policy="ignore")
+
+
+def test_async_log_writer_flush(temporary_log_dir, capsys):
+    log_file = temporary_log_dir.join("async.log")
+    log_writer = LogWriter(0, str(log_file), str(temporary_log_dir), async_mode=True)
+    for i in range(100):
+        log_writer.info(f"message {i}", component="TEST")
+    log_writer.error("failure", component="TEST")
+    assert log_writer.flush(timeout=5)
+    log_writer.close()
+
+    lines = log_file.read().splitlines()
+    assert len(lines) == 101
+    assert lines[0].endswith(" - INFO: [COMPONENT: TEST] message 0")
+    captured = capsys.readouterr()
+    assert captured.out.count("INFO: [COMPONENT: TEST]") == 100
+    assert captured.err == "ERROR: [COMPONENT: TEST] failure\n"
+
+
+def test_async_log_writer_critical_flushes(temporary_log_dir):
+    log_file = temporary_log_dir.join("critical.log")
+    log_writer = LogWriter(
+        1,
+        str(log_file),
+        str(temporary_log_dir),
+        async_mode=True,
+        queue_size=1,
+        overflow_policy="drop-oldest",
+    )
+    log_writer.info("before", component="TEST")
+    with pytest.raises(SystemExit):
+        log_writer.critical("fatal", component="TEST")
+    assert (
+        log_file.read()
+        .splitlines()[-1]
+        .endswith("CRITICAL: [COMPONENT: TEST] fatal - Exiting.")
+    )
+
+
+def test_lazy_formatting_skips_filtered_levels(temporary_log_dir, capsys):
+    log_writer = LogWriter(
+        2, str(temporary_log_dir.join("lazy.log")), str(temporary_log_dir)
+    )
+
+    def expensive() -> str:
+        raise AssertionError("filtered message was formatted")
+
+    log_writer.debug(expensive, "TEST")
+    log_writer.info("%s", "TEST", expensive)
+    log_writer.error("scan %d failed for %s", "TEST", 7, "example.com")
+    assert capsys.readouterr().err == (
+        "ERROR: [COMPONENT: TEST] scan 7 failed for example.com\n"
+    )
+
+
+def test_component_loggers_are_cached(temporary_log_dir, capsys):
+    log_writer = LogWriter(
+        0, str(temporary_log_dir.join("component.log")), str(temporary_log_dir)
+    )
+    component_logger = log_writer.component("SCHEDULER")
+    assert log_writer.component("SCHEDULER") is component_logger
+    component_logger.debug(lambda: "tick")
+    assert capsys.readouterr().out == "DEBUG: [COMPONENT: SCHEDULER] tick\n"
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from jorkieserver import logstore
+from jorkieserver.logging import LogWriter
+from jorkieserver.logstore import LogStore, load_segment_index
+from jorkieserver.rotation import list_segments
+
+
+def write_scan_logs(tmp_path, async_mode: bool, compression: str) -> str:
+    log_file_path = str(tmp_path / "server.log")
+    log_writer = LogWriter(
+        1, log_file_path, str(tmp_path), async_mode=async_mode, log_format="json"
+    )
+    log_writer.configure_rotation(4096, 0, 0, compression)
+    agent_logger = log_writer.component("AGENT")
+    for i in range(200):
+        agent_id = f"agent-{i % 4}"
+        agent_logger.info("result %d", i, agent_id=agent_id, scan_id="scan-1")
+        if i % 50 == 0:
+            agent_logger.error("failed %d", i, agent_id=agent_id, scan_id="scan-1")
+    log_writer.info("unrelated", "API")
+    log_writer.close()
+    return log_file_path
+
+
+def test_json_lines_fields(tmp_path, capsys):
+    log_file_path = write_scan_logs(tmp_path, async_mode=False, compression="none")
+    with open(log_file_path) as log_file:
+        entry = json.loads(log_file.readlines()[-1])
+    assert entry["level"] == "INFO"
+    assert entry["component"] == "API"
+    assert entry["message"] == "unrelated"
+    assert entry["agent_id"] is None
+    assert "INFO: [COMPONENT: API] unrelated" in capsys.readouterr().out
+
+
+def test_rotated_segments_are_indexed(tmp_path):
+    log_file_path = write_scan_logs(tmp_path, async_mode=True, compression="none")
+    segments = list_segments(log_file_path)
+    assert len(segments) > 1
+    for _, segment_path in segments:
+        index = load_segment_index(segment_path)
+        assert index["size"] == os.path.getsize(segment_path)
+        assert index["start"] <= index["end"]
+        assert "AGENT" in index["components"]
+
+
+def test_query_agent_failures(tmp_path):
+    for compression in ("none", "gzip"):
+        log_dir = tmp_path / compression
+        log_dir.mkdir()
+        log_file_path = write_scan_logs(
+            log_dir, async_mode=True, compression=compression
+        )
+        failures = list(
+            LogStore(log_file_path).query(level="ERROR", agent_id="agent-2")
+        )
+        assert [entry["message"] for entry in failures] == ["failed 50", "failed 150"]
+        assert all(entry["scan_id"] == "scan-1" for entry in failures)
+
+
+def test_query_time_range(tmp_path):
+    log_file_path = write_scan_logs(tmp_path, async_mode=False, compression="none")
+    assert list(LogStore(log_file_path).query(until=0)) == []
+    assert len(list(LogStore(log_file_path).query(component="API"))) == 1
+
+
+def test_zstd_segments_need_zstandard(tmp_path, monkeypatch):
+    monkeypatch.setattr(logstore, "zstandard", None)
+    log_file_path = tmp_path / "server.log"
+    log_file_path.write_text("")
+    (tmp_path / "server.log.1.zst").write_bytes(b"")
+    with pytest.raises(RuntimeError, match="zstandard package is not installed"):
+        list(LogStore(str(log_file_path)).query(level="ERROR"))
@@ -0,0 +1,202 @@
+import json
+import time
+
+import pytest
+from conftest import http_request
+
+from jorkieserver import ingest, membership, snapshot
+from jorkieserver.db import asset_hash
+from jorkieserver.membership import (
+    BloomFilter,
+    MembershipStore,
+    ProjectMembership,
+    SortedHashSet,
+)
+
+
+@pytest.fixture
+def services():
+    return (
+        ingest.register_routes,
+        snapshot.register_routes,
+        membership.register_routes,
+    )
+
+
+def request(
+    address, method: str, path: str, body: bytes = b"", status: int = 200
+) -> dict:
+    response_status, body = http_request(address, method, path, body)
+    assert response_status == status, body
+    return json.loads(body)
+
+
+def test_bloom_filter_has_no_false_negatives(tmp_path):
+    bloom = BloomFilter(10_000)
+    hashes = [asset_hash("ip", f"10.0.{i // 256}.{i % 256}") for i in range(10_000)]
+    for hash_ in hashes:
+        bloom.add(hash_)
+    assert all(bloom.might_contain(hash_) for hash_ in hashes)
+    false_positives = sum(
+        bloom.might_contain(asset_hash("ip", f"10.1.{i // 256}.{i % 256}"))
+        for i in range(10_000)
+    )
+    assert false_positives < 500
+    bloom.save(str(tmp_path / "a.bloom"))
+    loaded = BloomFilter.load(str(tmp_path / "a.bloom"))
+    assert loaded.words == bloom.words and loaded.count == 10_000
+    assert BloomFilter.load(str(tmp_path / "missing.bloom")) is None
+
+
+def test_sorted_hash_set_lookups(tmp_path):
+    path = str(tmp_path / "a.set")
+    hashes = sorted({asset_hash("domain", f"{i}.example.com") for i in range(5000)})
+    SortedHashSet.write(path, hashes)
+    stored = SortedHashSet(path)
+    assert len(stored) == 5000
+    assert all(hash_ in stored for hash_ in hashes[::7])
+    assert asset_hash("domain", "other.example.com") not in stored
+    assert list(stored) == hashes
+    stored.close()
+    assert asset_hash("x", "y") not in SortedHashSet(str(tmp_path / "empty.set"))
+
+
+def test_classifies_new_and_known_assets_across_reopen(tmp_path):
+    project = ProjectMembership(str(tmp_path), "acme/corp")
+    assert project.classify(asset_hash("domain", "a.example.com"))
+    assert not project.classify(asset_hash("domain", "a.example.com"))
+    assert project.classify(asset_hash("domain", "b.example.com"))
+    project.flush()
+    project.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "acme%2Fcorp.bloom",
+        "acme%2Fcorp.set",
+    ]
+
+    reopened = ProjectMembership(str(tmp_path), "acme/corp")
+    assert len(reopened) == 2 and reopened.pending == 0
+    assert not reopened.classify(asset_hash("domain", "b.example.com"))
+    assert reopened.classify(asset_hash("domain", "c.example.com"))
+
+
+def test_bloom_filter_grows_with_the_project(tmp_path):
+    project = ProjectMembership(str(tmp_path), "acme")
+    hashes = [asset_hash("ip", str(i)) for i in range(5000)]
+    assert all(project.classify(hash_) for hash_ in hashes)
+    assert not any(project.classify(hash_) for hash_ in hashes)
+    assert len(project) == 5000
+
+
+def test_store_flushes_past_threshold(tmp_path, log_writer):
+    store = MembershipStore(str(tmp_path), log_writer, flush_threshold=10)
+    rows = [("acme", "1", "ip", str(i), None, 0.0) for i in range(25)]
+    store.observe(rows)
+    assert store.project("acme").pending == 0
+    assert len(store.scan_diff("acme", "1")) == 25
+    store.observe(rows)
+    assert store.scan_diff("acme", "1", after=20) == [
+        ("ip", str(i)) for i in range(20, 25)
+    ]
+    assert store.scan_diff("acme", "1", limit=3) == [
+        ("ip", "0"),
+        ("ip", "1"),
+        ("ip", "2"),
+    ]
+    assert len(store.finish_scan("acme", "1")) == 25
+    assert store.scan_diff("acme", "1") == []
+    store.stop()
+
+
+def test_values_that_look_like_addresses_do_not_stop_a_batch(tmp_path, log_writer):
+    store = MembershipStore(str(tmp_path), log_writer)
+    discovered = []
+    store.subscribe(lambda *args: discovered.append(args))
+    assets = [("ip", "1.2.3.\x00"), ("ip", "::\x00"), ("ip", "10.0.0.1")]
+    store.observe([("acme", "1", kind, value, None, 0.0) for kind, value in assets])
+    assert discovered == [("acme", "1", assets)]
+    assert store.scan_diff("acme", "1") == assets
+    store.stop()
+
+
+def test_subscribers_receive_new_discoveries(tmp_path, log_writer):
+    store = MembershipStore(str(tmp_path), log_writer)
+    discovered = []
+    store.subscribe(lambda *args: discovered.append(args))
+    store.observe([("acme", "1", "ip", "10.0.0.1", None, 0.0)])
+    store.observe(
+        [
+            ("acme", "2", "ip", "10.0.0.1", None, 0.0),
+            ("acme", "2", "ip", "10.0.0.2", None, 0.0),
+            ("other", None, "ip", "10.0.0.1", None, 0.0),
+        ]
+    )
+    assert discovered == [
+        ("acme", "1", [("ip", "10.0.0.1")]),
+        ("acme", "2", [("ip", "10.0.0.2")]),
+        ("other", None, [("ip", "10.0.0.1")]),
+    ]
+    # Results without a scan have no diff to keep.
+    assert len(store.finish_scan("other", None)) == 0
+    assert store.scan_diff("acme", "2") == [("ip", "10.0.0.2")]
+    store.stop()
+
+
+def test_diffs_of_scans_never_finished_expire(tmp_path, log_writer):
+    store = MembershipStore(str(tmp_path), log_writer, diff_ttl=1.0)
+    store.observe([("acme", "1", "ip", "10.0.0.1", None, 0.0)])
+    store.observe([("acme", "2", "ip", "10.0.0.2", None, 0.0)])
+    time.sleep(0.6)
+    store.observe([("acme", "1", "ip", "10.0.0.3", None, 0.0)])
+    time.sleep(0.5)
+    store.observe([("acme", "3", "ip", "10.0.0.4", None, 0.0)])
+    assert store.scan_diff("acme", "2") == []
+    assert store.scan_diff("acme", "1") == [("ip", "10.0.0.1"), ("ip", "10.0.0.3")]
+    time.sleep(1.1)
+    store.observe([("acme", "3", "ip", "10.0.0.5", None, 0.0)])
+    assert store.scan_diff("acme", "1") == []
+    assert len(store.scan_diff("acme", "3")) == 2
+    # The assets stay known once their diff is dropped.
+    assert not store.classify("acme", "ip", "10.0.0.2")
+
+    # Results of known assets keep the diff of their scan.
+    time.sleep(0.6)
+    store.observe([("acme", "3", "ip", "10.0.0.4", None, 0.0)])
+    time.sleep(0.6)
+    store.observe([("acme", "4", "ip", "10.0.0.6", None, 0.0)])
+    assert len(store.scan_diff("acme", "3")) == 2
+    store.stop()
+
+
+def test_scan_diff_is_ready_after_ingest(components):
+    first = b"".join(
+        b'{"type": "subdomain", "value": "%d.example.com", "scan_id": "s1"}\n' % i
+        for i in range(250)
+    )
+    second = b"".join(
+        b'{"type": "subdomain", "value": "%d.example.com", "scan_id": "s2"}\n' % i
+        for i in range(200, 300)
+    )
+    address = components.api.address
+    request(address, "POST", "/api/v1/projects/acme/results", first)
+    request(address, "POST", "/api/v1/projects/acme/results", second)
+    base = "/api/v1/projects/acme/scans"
+    diff = request(address, "GET", f"{base}/s2/new")
+    assert diff["scan_id"] == "s2" and diff["next"] is None
+    assert [asset["value"] for asset in diff["items"]] == [
+        f"{i}.example.com" for i in range(250, 300)
+    ]
+
+    # Pages follow the query routes: `limit` items, then `?cursor=<next>`.
+    values, path = [], f"{base}/s1/new?limit=100"
+    while path:
+        page = request(address, "GET", path)
+        values += [asset["value"] for asset in page["items"]]
+        path = page["next"] and f"{base}/s1/new?limit=100&cursor={page['next']}"
+    assert values == [f"{i}.example.com" for i in range(250)]
+    for query in ("limit=0", "limit=x", "cursor=-1", "cursor=x"):
+        request(address, "GET", f"{base}/s1/new?{query}", status=400)
+
+    # A scan is finished once compacted, its diff is dropped.
+    request(address, "POST", f"{base}/s1/snapshot", status=201)
+    assert request(address, "GET", f"{base}/s1/new")["items"] == []
+    assert len(request(address, "GET", f"{base}/s2/new")["items"]) == 50
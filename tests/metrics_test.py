@@ -0,0 +1,58 @@
+import math
+
+from jorkieserver.metrics import Family, Histogram, MetricsRegistry
+
+
+def test_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs run.").inc(3)
+    phases = registry.gauge("phase_seconds", "Phase durations.", "phase")
+    phases.labels('say "hi"').set(0.5)
+    phases.labels("boot").set(2)
+    histogram = registry.histogram("batch_rows", "Rows per batch.", (10, 100))
+    for rows in (1, 10, 50, 1000):
+        histogram.observe(rows)
+    assert registry.counter("jobs_total", "Jobs run.").value == 3
+    assert registry.render() == (
+        "# HELP batch_rows Rows per batch.\n"
+        "# TYPE batch_rows histogram\n"
+        'batch_rows_bucket{le="10"} 2\n'
+        'batch_rows_bucket{le="100"} 3\n'
+        'batch_rows_bucket{le="+Inf"} 4\n'
+        "batch_rows_sum 1061.0\n"
+        "batch_rows_count 4\n"
+        "# HELP jobs_total Jobs run.\n"
+        "# TYPE jobs_total counter\n"
+        "jobs_total 3\n"
+        "# HELP phase_seconds Phase durations.\n"
+        "# TYPE phase_seconds gauge\n"
+        'phase_seconds{phase="boot"} 2\n'
+        'phase_seconds{phase="say \\"hi\\""} 0.5\n'
+    )
+
+
+def test_collected_metrics_read_their_owner():
+    registry = MetricsRegistry()
+    state = {"depth": 4}
+    registry.gauge("depth", "Queue depth.", function=lambda: state["depth"])
+    registry.gauge("broken", "Failing gauge.", function=lambda: 1 / 0)
+    routes = {"/health": Histogram((0.1,))}
+    registry.register("latency", "histogram", "Latency.", Family("route", None, routes))
+    routes["/health"].observe(0.05)
+    state["depth"] = 7
+    lines = registry.render().splitlines()
+    assert "depth 7" in lines and "broken NaN" in lines
+    assert 'latency_bucket{route="/health",le="0.1"} 1' in lines
+    assert 'latency_sum{route="/health"} 0.05' in lines
+
+
+def test_histogram_percentiles():
+    histogram = Histogram((0.001, 0.01, 0.1))
+    for _ in range(98):
+        histogram.observe(0.0005)
+    histogram.observe(0.05)
+    histogram.observe(3.0)
+    summary = histogram.summary()
+    assert summary["p50"] == 0.001 and summary["p99"] == 0.1
+    assert summary["max"] == 3.0 and histogram.percentile(1.0) == 3.0
+    assert math.isclose(summary["mean"], (98 * 0.0005 + 3.05) / 100)
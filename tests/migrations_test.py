@@ -0,0 +1,90 @@
+import pytest
+import yaml
+
+from jorkieserver import configurator as configurator_module
+from jorkieserver.configurator import Configurator
+from jorkieserver.constants import LATEST_CONFIG_VERSION
+from jorkieserver.migrations import MigrationRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = MigrationRegistry()
+
+    @registry.register("0.0.1", "0.0.2")
+    def add_logging(document):
+        document["logging"] = {"level": 1}
+
+    @registry.register("0.0.2", "0.0.3")
+    def bump(document):
+        pass
+
+    @registry.register("0.0.3", LATEST_CONFIG_VERSION)
+    def rename_retention(document):
+        document["logging"]["rotation"] = {"retention": document.pop("keep")}
+
+    @registry.register("0.0.1", "0.0.3")
+    def skip(document):
+        document["logging"] = {"level": 2}
+
+    yield registry
+
+
+def test_finds_shortest_path(registry):
+    path = registry.path("0.0.1", LATEST_CONFIG_VERSION)
+    assert [(m.source, m.target) for m in path] == [
+        ("0.0.1", "0.0.3"),
+        ("0.0.3", LATEST_CONFIG_VERSION),
+    ]
+    assert registry.path("0.0.1", LATEST_CONFIG_VERSION) is path
+    assert registry.path(LATEST_CONFIG_VERSION, LATEST_CONFIG_VERSION) == ()
+
+
+def test_missing_path_raises(registry):
+    with pytest.raises(LookupError):
+        registry.path("9.9.9", LATEST_CONFIG_VERSION)
+
+
+def test_apply_does_not_modify_input(registry):
+    document = {"version": "0.0.1", "keep": 3}
+    migrated = registry.apply(document, registry.path("0.0.1", LATEST_CONFIG_VERSION))
+    assert document == {"version": "0.0.1", "keep": 3}
+    assert migrated == {
+        "version": LATEST_CONFIG_VERSION,
+        "logging": {"level": 2, "rotation": {"retention": 3}},
+    }
+
+
+def test_configurator_migrates_and_rewrites_file(
+    registry, log_writer, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(configurator_module, "MIGRATIONS", registry)
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text('version: "0.0.1"\nkeep: 5\n')
+
+    configuration = Configurator(log_writer, str(config_file)).get_configuration(
+        str(config_file)
+    )
+    assert configuration.version == LATEST_CONFIG_VERSION
+    assert configuration.log_level == 2
+    assert configuration.log_retention == 5
+    assert yaml.safe_load(config_file.read_text())["version"] == LATEST_CONFIG_VERSION
+    assert not list(tmp_path.glob("config.yaml.*.tmp"))
+
+
+def test_migration_requiring_input_is_not_applied_on_reload(
+    log_writer, tmp_path, monkeypatch
+):
+    registry = MigrationRegistry()
+    registry.register(
+        "0.0.1", LATEST_CONFIG_VERSION, requires_input=True, description="Set api.key."
+    )(lambda document: None)
+    monkeypatch.setattr(configurator_module, "MIGRATIONS", registry)
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text('version: "0.0.1"\n')
+
+    configurator = Configurator(log_writer, str(config_file))
+    assert configurator.reload_configuration(str(config_file)) is None
+    assert config_file.read_text() == 'version: "0.0.1"\n'
+    with pytest.raises(SystemExit):
+        configurator.get_configuration(str(config_file))
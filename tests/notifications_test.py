@@ -0,0 +1,252 @@
+import json
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from jorkieserver import notifications
+from jorkieserver.dispatch import Job
+from jorkieserver.notifications import (
+    EVENT_NEW_ASSET,
+    Event,
+    NotificationService,
+    SmtpChannel,
+    WebhookChannel,
+)
+from jorkieserver.types import Configuration
+
+
+class Webhook(ThreadingHTTPServer):
+    """
+    A local stand-in for a chat webhook, failing the first `failures` requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, failures: int = 0, delay: float = 0.0) -> None:
+        self.failures = failures
+        self.delay = delay
+        self.received: list[dict] = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), WebhookHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/hooks/jorkie"
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.concurrent += 1
+            server.max_concurrent = max(server.max_concurrent, server.concurrent)
+        time.sleep(server.delay)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.concurrent -= 1
+            failed = server.failures > 0
+            if failed:
+                server.failures -= 1
+            else:
+                server.received.append(body)
+        self.send_response(500 if failed else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough of SMTP to take messages from `smtplib`.
+    """
+
+    def handle(self):
+        self.wfile.write(b"220 localhost\r\n")
+        while line := self.rfile.readline():
+            command = line[:4].upper()
+            if command == b"DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                data = b""
+                while (line := self.rfile.readline()) != b".\r\n":
+                    data += line
+                self.server.messages.append(data)
+                self.wfile.write(b"250 queued\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+def make_service(log_writer, tmp_path, channels, **options) -> NotificationService:
+    settings = {
+        "notifications_path": str(tmp_path / "data" / "notifications.db"),
+        "notifications_window": 0,
+    }
+    settings.update(options)
+    service = NotificationService(Configuration(**settings), log_writer, channels)
+    service.start()
+    return service
+
+
+def wait_for(condition, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_events_are_coalesced_and_batched(log_writer, tmp_path):
+    webhook = Webhook()
+    service = make_service(
+        log_writer,
+        tmp_path,
+        {"webhook": WebhookChannel(webhook.url)},
+        notifications_window=1,
+        notifications_batch_size=500,
+    )
+    try:
+        service.assets_discovered(
+            "acme", "scan-1", [("subdomain", f"{i}.acme.com") for i in range(1200)]
+        )
+        service.job_finished(Job("other", "nmap", "b.example.com"))
+        job = Job("other", "subfinder")
+        job.returncode = 0
+        service.job_finished(job)
+        # Full batches are sent right away, the rest at the end of the window.
+        wait_for(lambda: len(webhook.received) == 2)
+        assert service.stats()["queued"] == 201
+        wait_for(lambda: len(webhook.received) == 4)
+        stats = service.stats()
+    finally:
+        service.stop()
+        webhook.shutdown()
+    by_project = {}
+    for notification in webhook.received:
+        by_project.setdefault(notification["project"], []).append(notification)
+    assert [len(n["events"]) for n in by_project["acme"]] == [500, 500, 200]
+    [failed] = by_project["other"]
+    assert [e["subject"] for e in failed["events"]] == [
+        "nmap on b.example.com failed to run"
+    ]
+    assert failed["text"].startswith("[jorkie] other: 1 failed jobs")
+    assert stats["delivered"] == 4 and stats["outbox"] == 0 and stats["queued"] == 0
+    assert stats["latency_p99"] >= stats["latency_p50"] > 0
+
+
+def test_failed_deliveries_are_retried_with_backoff(log_writer, tmp_path, monkeypatch):
+    monkeypatch.setattr(notifications, "NOTIFICATIONS_RETRY_DELAY", 0.05)
+    webhook = Webhook(failures=3)
+    service = make_service(
+        log_writer, tmp_path, {"webhook": WebhookChannel(webhook.url)}
+    )
+    try:
+        started = time.monotonic()
+        service.publish([Event("acme", EVENT_NEW_ASSET, "ip 10.0.0.1")])
+        wait_for(lambda: service.delivered == 1)
+        # Waited about 0.05 + 0.1 + 0.2 s, with jitter halving the delays at most.
+        assert time.monotonic() - started >= 0.175
+        assert service.retried == 3 and len(webhook.received) == 1
+    finally:
+        service.stop()
+        webhook.shutdown()
+
+
+def test_notifications_are_dropped_after_max_attempts(
+    log_writer, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(notifications, "NOTIFICATIONS_RETRY_DELAY", 0.01)
+    webhook = Webhook(failures=100)
+    service = make_service(
+        log_writer,
+        tmp_path,
+        {"webhook": WebhookChannel(webhook.url)},
+        notifications_max_attempts=3,
+    )
+    try:
+        service.publish([Event("acme", EVENT_NEW_ASSET, "ip 10.0.0.1")])
+        wait_for(lambda: service.dropped == 1)
+        assert service.stats()["outbox"] == 0 and webhook.failures == 97
+    finally:
+        service.stop()
+        webhook.shutdown()
+
+
+def test_outbox_survives_restarts(log_writer, tmp_path, monkeypatch):
+    monkeypatch.setattr(notifications, "NOTIFICATIONS_RETRY_DELAY", 0.2)
+    # Nothing listens on the port of a closed socket.
+    with socket.socket() as closed:
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+    channel = WebhookChannel(f"http://127.0.0.1:{port}/")
+    service = make_service(log_writer, tmp_path, {"webhook": channel})
+    service.publish(
+        [Event("acme", EVENT_NEW_ASSET, f"ip 10.0.0.{i}") for i in range(3)]
+    )
+    wait_for(lambda: service.retried == 1)
+    service.stop()
+    assert service.stats()["outbox"] == 1
+
+    webhook = Webhook()
+    service = make_service(
+        log_writer, tmp_path, {"webhook": WebhookChannel(webhook.url)}
+    )
+    try:
+        assert service.stats()["outbox"] == 1
+        # Retried once the backoff delay of the failed attempt is over.
+        wait_for(lambda: service.delivered == 1)
+        assert len(webhook.received[0]["events"]) == 3
+    finally:
+        service.stop()
+        webhook.shutdown()
+
+
+def test_concurrent_deliveries_are_limited(log_writer, tmp_path):
+    webhook = Webhook(delay=0.05)
+    service = make_service(
+        log_writer,
+        tmp_path,
+        {"webhook": WebhookChannel(webhook.url)},
+        notifications_max_connections=2,
+    )
+    try:
+        service.publish(
+            [Event(f"project-{i}", EVENT_NEW_ASSET, "ip 10.0.0.1") for i in range(8)]
+        )
+        wait_for(lambda: service.delivered == 8)
+        assert webhook.max_concurrent == 2
+    finally:
+        service.stop()
+        webhook.shutdown()
+
+
+def test_email_notifications(log_writer, tmp_path):
+    smtp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SmtpHandler)
+    smtp.daemon_threads = True
+    smtp.messages = []
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+    channel = SmtpChannel(
+        "127.0.0.1",
+        smtp.server_address[1],
+        "jorkie@example.com",
+        "ops@example.com, sec@example.com",
+    )
+    service = make_service(log_writer, tmp_path, {"email": channel})
+    try:
+        service.assets_discovered("acme", None, [("subdomain", "new.acme.com")])
+        wait_for(lambda: service.delivered == 1)
+    finally:
+        service.stop()
+        smtp.shutdown()
+        smtp.server_close()
+    [message] = smtp.messages
+    assert b"Subject: [jorkie] acme: 1 new assets" in message
+    assert b"To: ops@example.com, sec@example.com" in message
+    assert b"- subdomain new.acme.com" in message
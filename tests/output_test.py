@@ -0,0 +1,244 @@
+import asyncio
+import os
+import stat
+import sys
+import threading
+import time
+
+import pytest
+from conftest import http_request
+
+from jorkieserver import dispatch, output
+from jorkieserver.output import OutputBuffer, OutputStore, events
+
+
+async def collect(buffer: OutputBuffer, offset: int = 0) -> list[tuple[int, bytes]]:
+    return [item async for item in buffer.subscribe(offset)]
+
+
+def test_ring_keeps_the_last_capacity_bytes():
+    async def run():
+        buffer = OutputBuffer(16)
+        await buffer.write(b"0123456789")
+        await buffer.write(b"abcdefghij")
+        await buffer.close()
+        return buffer, await collect(buffer), await collect(buffer, 12)
+
+    buffer, everything, tail = asyncio.run(run())
+    assert buffer.written == 20
+    assert everything == [(4, b"456789abcdefghij")]
+    assert tail == [(12, b"cdefghij")]
+
+
+def test_slow_subscriber_skips_without_holding_back_others():
+    async def run():
+        buffer = OutputBuffer(64)
+        fast = asyncio.create_task(collect(buffer))
+        slow_chunks = []
+
+        async def slow():
+            async for start, chunk in buffer.subscribe():
+                slow_chunks.append((start, chunk))
+                await asyncio.sleep(0.05)
+
+        slow_task = asyncio.create_task(slow())
+        await asyncio.sleep(0)
+        for i in range(100):
+            await buffer.write(b"line %03d\n" % i)
+            await asyncio.sleep(0)
+        await buffer.close()
+        return await fast, await slow_task, slow_chunks
+
+    fast, _, slow = asyncio.run(run())
+    assert b"".join(chunk for _, chunk in fast) == b"".join(
+        b"line %03d\n" % i for i in range(100)
+    )
+    # The slow subscriber missed most of the output, and ends with its last bytes.
+    offsets = [start for start, _ in slow]
+    assert offsets == sorted(offsets) and len(slow) < 20
+    assert slow[-1][0] + len(slow[-1][1]) == 900
+
+
+def test_spill_file_that_cannot_be_opened_does_not_block_the_job(tmp_path):
+    data = os.urandom(300_000)
+
+    async def run():
+        buffer = OutputBuffer(4096, str(tmp_path / "missing" / "job.log"))
+        read, write = os.pipe()
+        os.set_blocking(read, False)
+        buffer.attach(read)
+        # Blocked on a full pipe if the buffer stops reading.
+        threading.Thread(
+            target=lambda: (os.write(write, data), os.close(write)), daemon=True
+        ).start()
+        assert await buffer.wait_eof(10)
+        await buffer.close()
+        os.close(read)
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert isinstance(buffer.spill_error, FileNotFoundError)
+    assert buffer.spill_path is None
+    assert buffer.written == len(data)
+
+
+def test_spill_keeps_the_whole_output(tmp_path):
+    path = tmp_path / "job.log"
+    data = os.urandom(100_000)
+
+    async def run():
+        buffer = OutputBuffer(4096, str(path))
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        buffer.attach(read_fd)
+        writer = threading.Thread(
+            target=lambda: (os.write(write_fd, data), os.close(write_fd))
+        )
+        writer.start()
+        assert await buffer.wait_eof(10)
+        writer.join()
+        await buffer.detach(read_fd)
+        os.close(read_fd)
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(run())
+    assert buffer.written == buffer.spilled == len(data)
+    assert buffer.spill_error is None
+    assert path.read_bytes() == data
+
+
+def test_read_from_pipe_reports_eof():
+    async def run():
+        buffer = OutputBuffer(8)
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        with pytest.raises(BlockingIOError):
+            buffer.read_from(read_fd)
+        os.write(write_fd, b"0123456789ab")
+        os.close(write_fd)
+        # Reads at most the capacity, wrapping around the ring.
+        counts = [buffer.read_from(read_fd) for _ in range(3)]
+        os.close(read_fd)
+        await buffer.close()
+        return counts, await collect(buffer)
+
+    counts, chunks = asyncio.run(run())
+    assert counts == [8, 4, 0]
+    assert chunks == [(4, b"456789ab")]
+
+
+def test_subscribers_on_other_event_loops():
+    buffer_ready = threading.Event()
+    state = {}
+
+    def subscriber():
+        buffer_ready.wait()
+        state["chunks"] = asyncio.run(collect(state["buffer"]))
+
+    async def run():
+        state["buffer"] = buffer = OutputBuffer(1024)
+        buffer_ready.set()
+        await asyncio.sleep(0.05)
+        for i in range(10):
+            await buffer.write(b"%d\n" % i)
+            await asyncio.sleep(0.01)
+        await buffer.close()
+
+    thread = threading.Thread(target=subscriber)
+    thread.start()
+    asyncio.run(run())
+    thread.join(10)
+    assert (
+        b"".join(chunk for _, chunk in state["chunks"])
+        == b"0\n1\n2\n3\n4\n5\n6\n7\n8\n9\n"
+    )
+
+
+def test_events_carry_complete_lines_and_gaps():
+    async def run():
+        buffer = OutputBuffer(16)
+        await buffer.write(b"first\nsec")
+        await buffer.write(b"ond\nthird")
+        await buffer.close()
+        return b"".join([event async for event in events(buffer, 0)])
+
+    assert asyncio.run(run()) == (
+        b"event: dropped\ndata: 2\n\n"
+        b"id: 13\ndata: rst\ndata: second\n\n"
+        b"id: 18\ndata: third\n\n"
+        b"event: end\ndata: 18\n\n"
+    )
+
+
+def test_store_retains_the_last_finished_jobs(tmp_path):
+    store = OutputStore(str(tmp_path / "output"), capacity=64, retained=2)
+
+    async def run():
+        jobs = [dispatch.Job("acme", "probe") for _ in range(3)]
+        for job in jobs:
+            buffer = store.create(job)
+            await buffer.write(b"job %d\n" % job.id)
+            await buffer.close()
+            store.release(job)
+        return jobs
+
+    jobs = asyncio.run(run())
+    assert store.get(jobs[0].id) is None
+    assert all(store.get(job.id) is not None for job in jobs[1:])
+    assert (
+        tmp_path / "output" / os.path.basename(store.path(jobs[0].id))
+    ).read_bytes() == (b"job %d\n" % jobs[0].id)
+
+
+@pytest.fixture
+def component_names():
+    return ("api", "dispatcher")
+
+
+@pytest.fixture
+def services():
+    return (output.register_routes,)
+
+
+def get(address, path: str, headers: str = "") -> bytes:
+    status, body = http_request(address, "GET", path, headers=headers)
+    assert status == 200, body
+    return body
+
+
+def test_output_route_streams_job_output(components, tmp_path):
+    agents_dir = tmp_path / "agents"
+    agents_dir.mkdir()
+    agent = agents_dir / "probe"
+    agent.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        "for i in range(5):\n"
+        "    print('found', i, flush=True)\n"
+        "    time.sleep(0.05)\n"
+        "print('done', file=sys.stderr)\n"
+    )
+    agent.chmod(agent.stat().st_mode | stat.S_IEXEC)
+    finished = threading.Event()
+    components.dispatcher.dispatcher.subscribe(lambda job: finished.set())
+    address = components.api.address
+    job = components.dispatcher.submit("acme", "probe")
+    while components.dispatcher.outputs.get(job.id) is None:
+        time.sleep(0.01)
+    # Subscribes while the job runs, and streams until it ends.
+    body = get(
+        address,
+        f"/api/v1/jobs/{job.id}/output",
+        "Accept: text/event-stream\r\n",
+    )
+    assert finished.wait(10)
+    lines = [line for line in body.split(b"\n") if line.startswith(b"data: ")]
+    assert lines[:6] == [b"data: found %d" % i for i in range(5)] + [b"data: done"]
+    assert body.endswith(b"event: end\ndata: 45\n\n")
+    assert get(address, f"/api/v1/jobs/{job.id}/output?offset=40") == b"done\n"
+    # Once evicted from memory, the output is read from its spill file.
+    components.dispatcher.outputs.retained = 0
+    components.dispatcher.outputs.release(dispatch.Job("acme", "probe"))
+    assert components.dispatcher.outputs.get(job.id) is None
+    assert get(address, f"/api/v1/jobs/{job.id}/output").startswith(b"found 0\n")
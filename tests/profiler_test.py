@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import pstats
+import threading
+import time
+
+import pytest
+from conftest import http_request
+
+from jorkieserver import profiler
+from jorkieserver.profiler import ProfilerService, SamplingProfiler
+
+
+def busy_worker(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def sleepy_worker(stop: threading.Event) -> None:
+    stop.wait()
+
+
+def run_threads(duration: float, **options):
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=busy_worker, args=(stop,), name="busy"),
+        threading.Thread(target=sleepy_worker, args=(stop,), name="sleepy"),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        sampler = SamplingProfiler(interval=0.002, **options)
+        sampler.start()
+        time.sleep(duration)
+        return sampler.stop()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def roots(profile) -> dict[str, int]:
+    counts = {}
+    for (root, _), count in profile.samples.items():
+        counts[root] = counts.get(root, 0) + count
+    return counts
+
+
+def test_wall_profile_samples_every_thread():
+    profile = run_threads(0.2)
+    counts = roots(profile)
+    assert counts["thread:busy"] > 10 and counts["thread:sleepy"] > 10
+    assert "thread:jorkie-profiler" not in counts
+    collapsed = profile.collapsed()
+    assert any(
+        line.startswith("thread:busy;") and "busy_worker (profiler_test.py:" in line
+        for line in collapsed.splitlines()
+    )
+
+
+def test_cpu_profile_skips_waiting_threads():
+    if not os.path.exists("/proc/self/task"):
+        pytest.skip("needs /proc")
+    counts = roots(run_threads(0.2, mode="cpu"))
+    assert counts.get("thread:sleepy", 0) < counts.get("thread:busy", 0) / 10
+
+
+def test_samples_suspended_asyncio_tasks():
+    async def waiting_for_results():
+        await asyncio.sleep(10)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(waiting_for_results(), name="results")
+        sampler = SamplingProfiler(interval=0.002, loops=lambda: [loop])
+        sampler.start()
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return sampler.stop()
+
+    profile = asyncio.run(main())
+    stacks = [
+        stack for (root, stack), _ in profile.samples.items() if root == "task:results"
+    ]
+    assert stacks and stacks[0][-1][2] == "waiting_for_results"
+
+
+def test_writes_loadable_pstats(tmp_path):
+    profile = run_threads(0.2)
+    path = str(tmp_path / "profile.pstats")
+    profile.write(path, "pstats")
+    stats = pstats.Stats(path)
+    [busy] = [key for key in stats.stats if key[2] == "busy_worker"]
+    cc, nc, tt, ct, callers = stats.stats[busy]
+    assert ct >= tt and ct > 0
+    assert any(key[2] == "run" for key in callers)
+
+
+@pytest.fixture
+def component_names():
+    return ("api",)
+
+
+@pytest.fixture
+def services():
+    return (profiler.register_routes,)
+
+
+def test_admin_routes_toggle_profiles(components, log_writer):
+    service = components.service(ProfilerService)
+
+    def request(method: str, query: str = "") -> tuple[int, dict]:
+        status, body = http_request(
+            components.api.address, method, f"/api/v1/admin/profile{query}"
+        )
+        return status, json.loads(body)
+
+    assert request("POST", "?seconds=0")[0] == 400
+    assert request("POST", "?format=svg")[0] == 400
+    assert request("DELETE")[0] == 409
+    assert request("POST", "?seconds=60&format=pstats") == (
+        202,
+        {"running": True, "seconds": 60.0},
+    )
+    assert request("POST")[0] == 409
+    assert request("GET")[1]["running"] is True
+    time.sleep(0.05)
+    status, body = request("DELETE")
+    assert status == 200 and body["path"].endswith("-wall.pstats")
+    assert os.path.dirname(body["path"]) == log_writer.log_dir
+    # The API event loop's tasks were sampled along with the threads.
+    stats = pstats.Stats(body["path"])
+    assert any(key[2] == "__serve" for key in stats.stats)
+    assert request("GET")[1] == {"running": False, "last": body["path"]}
+    # A profile ends by itself once its duration is over.
+    service.start_profile(0.05)
+    time.sleep(0.3)
+    assert not service.running and service.last_path.endswith("-wall.collapsed")
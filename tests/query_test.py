@@ -0,0 +1,158 @@
+import json
+
+import pytest
+from conftest import http_request
+
+from jorkieserver.ingest import register_routes as register_ingest
+from jorkieserver.query import QueryCache, register_routes
+
+
+@pytest.fixture
+def services():
+    return (register_ingest, register_routes)
+
+
+def get(address, path: str) -> tuple[int, dict]:
+    status, body = http_request(address, "GET", path)
+    return status, json.loads(body)
+
+
+def ingest(address, project: str, scan_id: str, records: list[dict]) -> dict:
+    body = "".join(
+        json.dumps({**record, "scan_id": scan_id}) + "\n" for record in records
+    ).encode()
+    status, report = http_request(
+        address, "POST", f"/api/v1/projects/{project}/results", body
+    )
+    assert status == 200
+    return json.loads(report)
+
+
+def test_cache_evicts_expires_and_invalidates_by_tag():
+    now = [0.0]
+    cache = QueryCache(size=2, ttl=10.0, clock=lambda: now[0])
+    cache.put("a", 1, ("p",), cache.generation(("p",)))
+    cache.put("b", 2, ("p", "s"), cache.generation(("p", "s")))
+    assert cache.get("a") == 1
+    cache.put("c", 3, ("q",), cache.generation(("q",)))
+    assert cache.get("b") is None  # Least recently used.
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    assert cache.invalidate(["p"]) == 1
+    assert cache.get("a") is None and cache.get("c") == 3
+    now[0] = 10.0
+    assert cache.get("c") is None and len(cache) == 0
+
+    # A value computed before its data changed is not cached.
+    generation = cache.generation(("p",))
+    cache.invalidate(["p"])
+    cache.put("a", 1, ("p",), generation)
+    assert cache.get("a") is None
+
+
+def test_asset_pages_cover_every_asset_once(components):
+    db = components.db
+    assets = [("subdomain", f"h{i}.example.com") for i in range(50)]
+    assets += [("ip", f"10.0.0.{i}") for i in range(30)]
+    assets += [("asn", f"AS{i}") for i in range(5)]
+    db.insert_assets("acme", assets, 1.0)
+    db.insert_assets("other", assets[:10], 1.0)
+
+    def read_all(kind=None, limit=7):
+        rows, after = [], ("", 0)
+        while True:
+            page = db.select_assets("acme", ["type", "value"], after, limit, kind)
+            rows += page
+            if len(page) < limit:
+                return rows
+            after = page[-1][:2]
+
+    rows = read_all()
+    assert [row[:2] for row in rows] == sorted(row[:2] for row in rows)
+    assert sorted((kind, value) for _, _, kind, value in rows) == sorted(assets)
+    ips = read_all("ip", 4)
+    assert [value for _, _, _, value in ips] == [f"10.0.0.{i}" for i in range(30)]
+    # A cursor of another kind starts the kind over, or ends it.
+    assert len(db.select_assets("acme", ["id"], ("asn", 10**9), 100, "ip")) == 30
+    assert db.select_assets("acme", ["id"], ("subdomain", 0), 100, "ip") == []
+    assert db.select_assets("nobody", ["id"]) == []
+    with pytest.raises(KeyError):
+        db.select_assets("acme", ["hash"])
+
+
+def test_query_routes_paginate_project_and_stream(components):
+    address = components.api.address
+    ingest(
+        address,
+        "acme",
+        "s1",
+        [
+            {"type": "subdomain", "value": f"h{i}.acme.com", "port": i}
+            for i in range(25)
+        ],
+    )
+    ingest(address, "acme", "s2", [{"type": "ip", "value": "10.0.0.1"}])
+
+    base = "/api/v1/projects/acme"
+    results, cursor = [], ""
+    while True:
+        status, page = get(
+            address, f"{base}/scans/s1/results?limit=10&fields=value,data{cursor}"
+        )
+        assert status == 200
+        results += page["items"]
+        if page["next"] is None:
+            break
+        cursor = f"&cursor={page['next']}"
+    assert len(results) == 25
+    assert results[3] == {"value": "h3.acme.com", "data": {"port": 3}}
+
+    status, page = get(address, f"{base}/assets?type=ip&fields=type,value,seen_count")
+    assert page == {
+        "items": [{"type": "ip", "value": "10.0.0.1", "seen_count": 1}],
+        "next": None,
+    }
+    assert get(address, f"{base}/assets?fields=hash")[0] == 400
+    assert get(address, f"{base}/assets?limit=0")[0] == 400
+    assert get(address, f"{base}/assets?cursor=ip:x")[0] == 400
+
+    status, body = http_request(
+        address,
+        "GET",
+        f"{base}/assets?fields=value",
+        headers="Accept: application/x-ndjson\r\n",
+    )
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert status == 200 and len(lines) == 26 and lines[0] == {"value": "10.0.0.1"}
+
+    status, summary = get(address, f"{base}/summary")
+    assert summary["assets"] == 26 and summary["kinds"] == {"ip": 1, "subdomain": 25}
+    assert summary["results"] == 26
+    assert summary["latest_scan"]["scan_id"] == "s2"
+    assert summary["latest_scan"]["results"] == 1
+    assert get(address, "/api/v1/projects/nobody/summary")[0] == 404
+
+
+def test_ingestion_invalidates_the_cache_of_its_project(components):
+    address = components.api.address
+    ingest(address, "acme", "s1", [{"type": "domain", "value": "acme.com"}])
+    ingest(address, "globex", "s1", [{"type": "domain", "value": "globex.com"}])
+    cache = components.services[1].cache
+    paths = [
+        "/api/v1/projects/acme/summary",
+        "/api/v1/projects/acme/scans/s1/results",
+        "/api/v1/projects/globex/summary",
+    ]
+    before = [get(address, path)[1] for path in paths]
+    hits = cache.hits
+    assert [get(address, path)[1] for path in paths] == before
+    assert cache.hits == hits + 3
+
+    # A new scan of acme: its summary changes, the pages of its other scans and of globex stay.
+    ingest(address, "acme", "s2", [{"type": "ip", "value": "10.0.0.1"}])
+    hits = cache.hits
+    after = [get(address, path)[1] for path in paths]
+    assert after[0]["latest_scan"]["scan_id"] == "s2" and after[0]["assets"] == 2
+    assert after[1:] == before[1:]
+    assert cache.hits == hits + 2
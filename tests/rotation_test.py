@@ -0,0 +1,46 @@
+import gzip
+import time
+
+from jorkieserver.rotation import RotatingLogFile, list_segments
+
+
+def test_size_rotation_compresses_segments(tmp_path):
+    log_file_path = str(tmp_path / "server.log")
+    log_file = RotatingLogFile(
+        log_file_path, max_bytes=100, retention=0, compression="gzip"
+    )
+    for i in range(10):
+        log_file.write(f"line {i:02d} " + "x" * 40 + "\n")
+    log_file.close()
+
+    segments = list_segments(log_file_path)
+    assert [index for index, _ in segments] == [1, 2, 3, 4]
+    assert all(path.endswith(".gz") for _, path in segments)
+    with gzip.open(segments[0][1], "rt") as segment:
+        assert segment.read().startswith("line 00 ")
+
+
+def test_retention_removes_oldest_segments(tmp_path):
+    log_file_path = str(tmp_path / "server.log")
+    log_file = RotatingLogFile(
+        log_file_path, max_bytes=10, retention=2, compression="none"
+    )
+    for i in range(6):
+        log_file.write(f"line {i}...\n")
+    log_file.close()
+
+    assert [index for index, _ in list_segments(log_file_path)] == [4, 5]
+    with open(log_file_path) as active:
+        assert active.read() == "line 5...\n"
+
+
+def test_time_rotation(tmp_path, monkeypatch):
+    log_file_path = str(tmp_path / "server.log")
+    log_file = RotatingLogFile(log_file_path, interval=60, compression="none")
+    log_file.write("before\n")
+    clock = time.time() + 61
+    monkeypatch.setattr("jorkieserver.rotation.time.time", lambda: clock)
+    log_file.write("after\n")
+    log_file.close()
+
+    assert [index for index, _ in list_segments(log_file_path)] == [1]
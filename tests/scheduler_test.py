@@ -0,0 +1,159 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+from conftest import http_request
+
+from jorkieserver.scheduler import Scheduler, register_routes
+
+
+@pytest.fixture
+def scheduler(configuration, log_writer):
+    scheduler = Scheduler(configuration, log_writer)
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+@pytest.fixture
+def component_names():
+    return ("api", "scheduler")
+
+
+@pytest.fixture
+def services():
+    return (register_routes,)
+
+
+def test_tick_fires_due_schedules_in_order(scheduler):
+    now = time.time() + 1000
+    late = scheduler.add("acme", "subfinder", 60, first_fire=now + 30)
+    early = scheduler.add("acme", "nmap", 60, first_fire=now + 10)
+    assert scheduler.next_fire == now + 10
+    assert scheduler.tick(now) == []
+    assert scheduler.tick(now + 30) == [early, late]
+    assert early.next_fire == now + 70 and early.last_fired == now + 30
+    assert scheduler.tick(now + 60) == []
+    assert scheduler.tick(now + 70) == [early]
+    # Fired 20 s late, then on time twice.
+    assert scheduler.lag.count == 3 and scheduler.lag.maximum == 20
+
+
+def test_removed_schedules_never_fire(scheduler):
+    now = time.time() + 1000
+    schedules = [scheduler.add("acme", "nmap", 60, first_fire=now) for _ in range(10)]
+    for schedule in schedules[:9]:
+        assert scheduler.remove(schedule.id)
+    assert not scheduler.remove(schedules[0].id)
+    assert scheduler.tick(now) == [schedules[9]]
+    assert len(scheduler) == 1
+    assert scheduler.schedules("acme") == [schedules[9]]
+
+
+def test_rejects_short_intervals_and_values_that_are_not_finite(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.add("acme", "nmap", 0.1)
+    for interval, first_fire in (
+        (float("inf"), None),
+        (float("nan"), None),
+        (True, None),
+        (60, float("-inf")),
+        (60, float("nan")),
+        (60, False),
+    ):
+        with pytest.raises(ValueError):
+            scheduler.add("acme", "nmap", interval, first_fire)
+    assert len(scheduler) == 0
+
+
+def test_invalid_stored_schedules_are_removed_without_stopping_the_thread(
+    configuration, log_writer
+):
+    scheduler = Scheduler(configuration, log_writer)
+    scheduler.start()
+    scheduler.add("acme", "nmap", 60, first_fire=time.time() + 1000)
+    scheduler.stop()
+    # As stored before the fire times were checked.
+    connection = sqlite3.connect(configuration.scheduler_path)
+    with connection:
+        connection.execute("UPDATE schedules SET next_fire = ?", (float("-inf"),))
+    connection.close()
+
+    fired = threading.Event()
+    scheduler = Scheduler(configuration, log_writer)
+    scheduler.subscribe(lambda schedule: fired.set())
+    scheduler.start()
+    try:
+        scheduler.add("acme", "subfinder", 60, first_fire=time.time() + 0.05)
+        assert fired.wait(5)
+        assert [s.agent for s in scheduler.schedules("acme")] == ["subfinder"]
+    finally:
+        scheduler.stop()
+
+
+def test_recovers_missed_fires_after_restart(configuration, log_writer):
+    scheduler = Scheduler(configuration, log_writer)
+    scheduler.start()
+    now = time.time() + 1000
+    missed = scheduler.add("acme", "nmap", 60, first_fire=now)
+    pending = scheduler.add("acme", "subfinder", 60, first_fire=now + 500)
+    scheduler.stop()
+
+    restarted = Scheduler(configuration, log_writer)
+    restarted.start()
+    try:
+        assert len(restarted) == 2
+        # Down for 250 s: the four missed runs are coalesced into a single fire.
+        fired = restarted.tick(now + 250)
+        assert [schedule.id for schedule in fired] == [missed.id]
+        assert fired[0].next_fire == now + 300
+        assert restarted.get(pending.id).next_fire == now + 500
+    finally:
+        restarted.stop()
+
+    reloaded = Scheduler(configuration, log_writer)
+    reloaded.start()
+    try:
+        assert reloaded.get(missed.id).next_fire == now + 300
+        assert reloaded.get(missed.id).last_fired == now + 250
+    finally:
+        reloaded.stop()
+
+
+def test_thread_fires_subscribers(scheduler):
+    fired = threading.Event()
+    scheduler.subscribe(lambda schedule: fired.set())
+    scheduler.add("acme", "nmap", 60, first_fire=time.time() + 0.05)
+    assert fired.wait(5)
+
+
+def test_schedule_routes(components):
+    address = components.api.address
+    status, body = http_request(
+        address,
+        "POST",
+        "/api/v1/projects/acme/schedules",
+        b'{"agent": "nmap", "interval": 3600}',
+    )
+    assert status == 201
+    schedule = json.loads(body)
+    assert schedule["agent"] == "nmap" and schedule["project"] == "acme"
+    for body in (
+        b'{"agent": "nmap"}',
+        b'{"agent": "nmap", "interval": 3600, "first_fire": -Infinity}',
+        b'{"agent": "nmap", "interval": 3600, "first_fire": NaN}',
+        b'{"agent": "nmap", "interval": true}',
+    ):
+        status, _ = http_request(
+            address, "POST", "/api/v1/projects/acme/schedules", body
+        )
+        assert status == 400
+    status, body = http_request(address, "GET", "/api/v1/projects/acme/schedules")
+    assert [s["id"] for s in json.loads(body)] == [schedule["id"]]
+    path = f"/api/v1/projects/other/schedules/{schedule['id']}"
+    assert http_request(address, "DELETE", path)[0] == 404
+    path = f"/api/v1/projects/acme/schedules/{schedule['id']}"
+    assert http_request(address, "DELETE", path)[0] == 204
+    assert len(components.scheduler) == 0
@@ -0,0 +1,199 @@
+import ipaddress
+import json
+import random
+
+import pytest
+from conftest import http_request
+
+from jorkieserver.dispatch import register_routes as register_dispatch
+from jorkieserver.ingest import register_routes as register_ingest
+from jorkieserver.scope import (
+    PrefixTrie,
+    ScopeMatcher,
+    normalize_rule,
+    parse_rule,
+    register_routes,
+)
+
+
+@pytest.fixture
+def component_names():
+    return ("api", "db", "dispatcher")
+
+
+@pytest.fixture
+def services():
+    return (register_routes, register_ingest, register_dispatch)
+
+
+def request(address, method: str, path: str, body: bytes = b"") -> tuple[int, dict]:
+    status, body = http_request(address, method, path, body)
+    return status, json.loads(body) if body else None
+
+
+@pytest.mark.parametrize("bits", [32, 128])
+def test_prefix_trie_matches_a_linear_scan(bits):
+    rng = random.Random(bits)
+    network_type = ipaddress.IPv4Network if bits == 32 else ipaddress.IPv6Network
+    # Few distinct top bits, so that blocks nest and share prefixes.
+    blocks = set()
+    for _ in range(300):
+        length = rng.randint(1, bits)
+        address = rng.randrange(4) << (bits - 2) | rng.getrandbits(bits - 2)
+        blocks.add(network_type((address, length), strict=False))
+    trie = PrefixTrie(bits)
+    for block in blocks:
+        assert trie.insert(int(block.network_address), block.prefixlen)
+    assert len(trie) == len(blocks)
+
+    def check(blocks):
+        for _ in range(2000):
+            address = rng.randrange(4) << (bits - 2) | rng.getrandbits(bits - 2)
+            expected = any(
+                int(block.network_address)
+                == address >> (bits - block.prefixlen) << (bits - block.prefixlen)
+                for block in blocks
+            )
+            assert trie.contains(address) == expected
+        for block in rng.sample(sorted(blocks), 50):
+            assert trie.covers(int(block.network_address), block.prefixlen)
+
+    check(blocks)
+    removed = set(rng.sample(sorted(blocks), len(blocks) // 2))
+    for block in removed:
+        assert trie.remove(int(block.network_address), block.prefixlen)
+        assert not trie.remove(int(block.network_address), block.prefixlen)
+    assert len(trie) == len(blocks) - len(removed)
+    check(blocks - removed)
+
+
+def test_prefix_trie_covers_and_overlaps():
+    trie = PrefixTrie(32)
+    network = int(ipaddress.IPv4Address("10.1.0.0"))
+    trie.insert(network, 16)
+    assert trie.covers(int(ipaddress.IPv4Address("10.1.2.0")), 24)
+    assert not trie.covers(int(ipaddress.IPv4Address("10.0.0.0")), 8)
+    assert trie.overlaps(int(ipaddress.IPv4Address("10.0.0.0")), 8)
+    assert trie.overlaps(int(ipaddress.IPv4Address("10.1.2.0")), 24)
+    assert not trie.overlaps(int(ipaddress.IPv4Address("10.2.0.0")), 16)
+    assert not PrefixTrie(32).overlaps(0, 0)
+
+
+def test_rules_are_parsed_and_normalized():
+    assert parse_rule("10.1.2.3/8") == ("network", 32, 10 << 24, 8)
+    assert normalize_rule(" 10.1.2.3/8 ") == "10.0.0.0/8"
+    assert normalize_rule("2001:DB8::1") == "2001:db8::1/128"
+    assert normalize_rule("as13335") == "AS13335"
+    assert normalize_rule("AS64512-65534") == "AS64512-AS65534"
+    assert normalize_rule("*.Example.COM.") == "*.example.com"
+    for invalid in ("10.0.0.0/33", "AS5-AS1", "*.*.example.com", "exa mple.com", ""):
+        with pytest.raises(ValueError):
+            parse_rule(invalid)
+
+
+def test_scope_matches_domains_addresses_and_asns():
+    scope = ScopeMatcher(
+        include=[
+            "*.example.com",
+            "example.org",
+            "192.0.2.0/24",
+            "2001:db8::/32",
+            "AS64512-AS64520",
+            "AS13335",
+        ],
+        exclude=["admin.example.com", "*.internal.example.com", "192.0.2.128/25"],
+    )
+    assert scope.in_scope("domain", "www.example.com")
+    assert scope.in_scope("subdomain", "a.b.EXAMPLE.com.")
+    assert not scope.in_scope("domain", "example.com")
+    assert scope.in_scope("domain", "example.org")
+    assert not scope.in_scope("domain", "www.example.org")
+    assert not scope.in_scope("domain", "admin.example.com")
+    assert scope.in_scope("domain", "www.admin.example.com")
+    assert not scope.in_scope("domain", "db.internal.example.com")
+    assert scope.in_scope("ip", "192.0.2.1")
+    assert not scope.in_scope("ip", "192.0.2.200")
+    assert not scope.in_scope("ip", "198.51.100.1")
+    assert scope.in_scope("ip", "2001:db8::42")
+    assert not scope.in_scope("ip", "not an address")
+    assert scope.in_scope("asn", "AS64515") and scope.in_scope("asn", "13335")
+    assert not scope.in_scope("asn", "AS64521")
+    assert scope.in_scope("cidr", "192.0.2.0/26")
+    assert not scope.in_scope("cidr", "192.0.2.0/23")
+
+    assert scope.target_in_scope("192.0.2.0/25")
+    assert not scope.target_in_scope("192.0.2.0/24")  # Overlaps an excluded block.
+    assert scope.target_in_scope("api.example.com")
+    assert scope.target_in_scope("AS64512")
+
+    # Changes apply to the compiled matcher rule by rule.
+    scope.exclude.remove("192.0.2.128/25")
+    scope.include.add("example.com")
+    scope.include.remove("AS13335")
+    assert scope.in_scope("ip", "192.0.2.200")
+    assert scope.in_scope("domain", "example.com")
+    assert not scope.in_scope("asn", "AS13335")
+
+
+def test_scope_without_include_rules_only_excludes():
+    scope = ScopeMatcher(exclude=["*.example.com"])
+    assert scope.in_scope("domain", "example.net")
+    assert scope.in_scope("ip", "203.0.113.1")
+    assert not scope.in_scope("domain", "www.example.com")
+
+
+def test_scope_routes_store_rules_and_filter_ingest(components):
+    address = components.api.address
+    path = "/api/v1/projects/acme/scope"
+    body = json.dumps(
+        {"include": ["*.acme.com", "10.0.0.0/8"], "exclude": ["10.9.0.0/16"]}
+    ).encode()
+    assert request(address, "POST", path, body)[0] == 204
+    assert request(address, "POST", path, b'{"include": ["bad rule"]}')[0] == 400
+    assert request(address, "GET", path) == (
+        200,
+        {"include": ["*.acme.com", "10.0.0.0/8"], "exclude": ["10.9.0.0/16"]},
+    )
+    status, body = request(address, "GET", path + "/check?type=ip&value=10.9.1.1")
+    assert (status, body) == (200, {"in_scope": False})
+
+    # The cached matcher is updated in place.
+    scope = components.services[0]
+    matcher = scope.matcher("acme")
+    body = json.dumps({"exclude": ["10.9.0.0/16"]}).encode()
+    assert request(address, "DELETE", path, body)[0] == 204
+    assert scope.matcher("acme") is matcher and matcher.in_scope("ip", "10.9.1.1")
+    assert components.db.scope_rules("acme") == [
+        ("*.acme.com", False),
+        ("10.0.0.0/8", False),
+    ]
+
+    records = [
+        {"type": "subdomain", "value": "www.acme.com"},
+        {"type": "subdomain", "value": "www.other.com"},
+        {"type": "ip", "value": "10.1.2.3"},
+        {"type": "ip", "value": "192.168.1.1"},
+    ]
+    body = "".join(json.dumps(record) + "\n" for record in records * 100).encode()
+    status, report = request(address, "POST", "/api/v1/projects/acme/results", body)
+    assert status == 200
+    assert report["accepted"] == 200 and report["out_of_scope"] == 200
+    assert components.db.lookup_asset("acme", "subdomain", "www.acme.com")
+    assert components.db.lookup_asset("acme", "ip", "192.168.1.1") is None
+
+    # Projects without a scope keep every result.
+    status, report = request(address, "POST", "/api/v1/projects/other/results", body)
+    assert report["accepted"] == 400 and report["out_of_scope"] == 0
+
+
+def test_jobs_out_of_scope_are_refused(components):
+    address = components.api.address
+    body = json.dumps({"include": ["*.acme.com"]}).encode()
+    assert request(address, "POST", "/api/v1/projects/acme/scope", body)[0] == 204
+    jobs = "/api/v1/projects/acme/jobs"
+    job = {"agent": "probe", "target": "www.evil.com"}
+    status, body = request(address, "POST", jobs, json.dumps(job).encode())
+    assert status == 403
+    job["target"] = "www.acme.com"
+    status, body = request(address, "POST", jobs, json.dumps(job).encode())
+    assert status == 202 and body["target"] == "www.acme.com"
@@ -1,6 +1,10 @@
+import threading
+import time
+
 import pytest
 from unittest.mock import patch
 from argparse import Namespace
+from conftest import http_request
 
 from jorkieserver.server import Server
 
@@ -16,6 +20,13 @@ def test_default_arguments(mock_parse_args):
     args.log_level = 1
     args.log_file = "default.log"
     args.config_file = "default.conf"
+    args.log_async = False
+    args.log_overflow = "block"
+    args.log_queue_size = 8192
+    args.log_format = "text"
+    args.watch_config = False
+    args.startup_profile = False
+    args.workers = 0
     mock_parse_args.return_value = args
     server = Server()
     assert server.cmd_opts.log_level == 1
@@ -28,8 +39,79 @@ def test_custom_arguments(mock_parse_args):
     args.log_level = 2
     args.log_file = "custom.log"
     args.config_file = "custom.conf"
+    args.log_async = False
+    args.log_overflow = "block"
+    args.log_queue_size = 8192
+    args.log_format = "text"
+    args.watch_config = False
+    args.startup_profile = False
+    args.workers = 0
     mock_parse_args.return_value = args
     server = Server()
     assert server.cmd_opts.log_level == 2
     assert server.cmd_opts.log_file == "custom.log"
     assert server.cmd_opts.config_file == "custom.conf"
+
+
+def test_startup_profile(mock_parse_args, capsys):
+    args = Namespace()
+    args.log_level = 2
+    args.log_file = "profile.log"
+    args.config_file = "profile.conf"
+    args.log_async = False
+    args.log_overflow = "block"
+    args.log_queue_size = 8192
+    args.log_format = "text"
+    args.watch_config = False
+    args.startup_profile = True
+    args.workers = 0
+    mock_parse_args.return_value = args
+    server = Server()
+    phases = [name for name, _ in server.startup_profile.phases]
+    assert phases[:3] == ["imports", "arguments", "logging"]
+    assert server.startup_profile.ready is not None
+    assert "configuration" in capsys.readouterr().err
+
+
+def test_run_serves_until_stopped(mock_parse_args, tmp_path):
+    config_file = tmp_path / "run.yaml"
+    config_file.write_text(
+        'version: "0.1.0"\n'
+        "api:\n  host: 127.0.0.1\n  port: 0\n"
+        f"database:\n  path: {tmp_path / 'run.db'}\n"
+        f"scheduler:\n  path: {tmp_path / 'schedules.db'}\n"
+        f"notifications:\n  path: {tmp_path / 'notifications.db'}\n"
+    )
+    args = Namespace()
+    args.log_level = 2
+    args.log_file = "run.log"
+    args.config_file = str(config_file)
+    args.log_async = False
+    args.log_overflow = "block"
+    args.log_queue_size = 8192
+    args.log_format = "text"
+    args.watch_config = False
+    args.startup_profile = False
+    args.workers = 0
+    mock_parse_args.return_value = args
+    server = Server()
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    try:
+        for _ in range(100):
+            if server.components.api.address[1] != 0:
+                break
+            time.sleep(0.01)
+        address = server.components.api.address
+        assert http_request(address, "GET", "/api/v1/health")[0] == 200
+        status, response = http_request(address, "GET", "/metrics")
+        assert status == 200
+        assert b'jorkie_startup_phase_seconds{phase="components"}' in response
+        assert (
+            b'jorkie_api_request_duration_seconds_count{route="/api/v1/health"} 1'
+            in response
+        )
+    finally:
+        server.stop()
+        thread.join(5)
+    assert not thread.is_alive()
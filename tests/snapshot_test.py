@@ -0,0 +1,155 @@
+import json
+import os
+
+import pytest
+from conftest import http_request
+
+from jorkieserver.ingest import register_routes as register_ingest
+from jorkieserver.snapshot import Snapshot, SnapshotWriter, register_routes
+
+
+@pytest.fixture
+def services():
+    return (register_ingest, register_routes)
+
+
+def ingest(address, project: str, scan_id: str, records: list[dict]) -> None:
+    body = "".join(
+        json.dumps({**record, "scan_id": scan_id}) + "\n" for record in records
+    ).encode()
+    assert (
+        http_request(address, "POST", f"/api/v1/projects/{project}/results", body=body)[
+            0
+        ]
+        == 200
+    )
+
+
+def test_snapshot_round_trips_its_columns(tmp_path):
+    rows = [
+        (1, "subdomain", "www.example.com", '{"port":443}', 10.0),
+        (2, "ip", "192.0.2.1", None, 11.5),
+        (5, "subdomain", "ünïcödé.example", "{}", 12.0),
+        (9, "subdomain", "www.example.com", '{"port":80}', 13.0),
+        (10, "domain", "", None, 14.0),
+    ]
+    writer = SnapshotWriter()
+    for row in rows:
+        writer.append(*row)
+    path = str(tmp_path / "scan.jks")
+    size = writer.write(path, "acme", "s1")
+    assert size == os.path.getsize(path) and size % 8 == 0
+
+    with Snapshot(path) as snapshot:
+        assert (snapshot.project, snapshot.scan_id, len(snapshot)) == ("acme", "s1", 5)
+        assert list(snapshot.column("id")) == [1, 2, 5, 9, 10]
+        for row, (id, kind, value, data, received_at) in enumerate(rows):
+            assert snapshot.kind(row) == kind
+            assert snapshot.value(row) == value
+            assert snapshot.data(row) == data
+            assert snapshot.record(row) == {
+                "id": id,
+                "scan_id": "s1",
+                "type": kind,
+                "value": value,
+                "data": None if data is None else json.loads(data),
+                "received_at": received_at,
+            }
+        assert snapshot.count_by_kind() == {"subdomain": 3, "ip": 1, "domain": 1}
+        assert len(snapshot.column("assets")) == 4
+        assert ("subdomain", "www.example.com") in snapshot
+        assert ("domain", "www.example.com") not in snapshot
+        lines = snapshot.ndjson(3, 100).splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [9, 10]
+        assert (
+            b"".join(bytes(chunk) for chunk in snapshot.chunks(64))
+            == open(path, "rb").read()
+        )
+
+    with open(path, "r+b") as file:
+        file.write(b"NOTASNAP")
+    with pytest.raises(ValueError):
+        Snapshot(path)
+
+
+def test_snapshot_diff_lists_each_asset_once(tmp_path):
+    def write(name: str, values: list[str]) -> Snapshot:
+        writer = SnapshotWriter()
+        for i, value in enumerate(values):
+            writer.append(i + 1, "subdomain", value, None, float(i))
+        writer.write(str(tmp_path / name), "acme", name)
+        return Snapshot(str(tmp_path / name))
+
+    with (
+        write("a", ["h1", "h2", "h2", "h3"]) as first,
+        write("b", ["h3", "h4", "h4", "h5", "h1"]) as second,
+    ):
+        added = second.missing_from(first)
+        assert len(added) == 2
+        assert [second.value(row) for row in second.first_rows(added)] == ["h4", "h5"]
+        removed = first.missing_from(second)
+        assert [first.value(row) for row in first.first_rows(removed)] == ["h2"]
+        assert first.missing_from(first) == set()
+
+
+def test_snapshot_routes_compact_download_and_compare(components):
+    address = components.api.address
+    ingest(
+        address,
+        "acme",
+        "s1",
+        [
+            {"type": "subdomain", "value": f"h{i}.acme.com", "port": i}
+            for i in range(30)
+        ],
+    )
+    ingest(
+        address,
+        "acme",
+        "s2",
+        [{"type": "subdomain", "value": f"h{i}.acme.com"} for i in range(10, 45)],
+    )
+    base = "/api/v1/projects/acme/scans"
+
+    status, body = http_request(address, "POST", f"{base}/s1/snapshot")
+    assert status == 201
+    assert json.loads(body) == {
+        "project": "acme",
+        "scan_id": "s1",
+        "rows": 30,
+        "assets": 30,
+        "bytes": json.loads(body)["bytes"],
+    }
+    assert http_request(address, "POST", f"{base}/s1/snapshot")[0] == 409
+    assert http_request(address, "POST", f"{base}/s3/snapshot")[0] == 404
+    assert http_request(address, "POST", f"{base}/s2/snapshot")[0] == 201
+
+    service = components.services[1]
+    status, body = http_request(address, "GET", f"{base}/s1/snapshot")
+    assert status == 200
+    assert body == open(service.path("acme", "s1"), "rb").read()
+
+    status, body = http_request(
+        address,
+        "GET",
+        f"{base}/s1/snapshot",
+        headers="Accept: application/x-ndjson\r\n",
+    )
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert len(lines) == 30 and lines[4]["value"] == "h4.acme.com"
+    assert lines[4]["data"] == {"port": 4}
+
+    status, body = http_request(
+        address, "GET", f"{base}/s2/snapshot/diff?against=s1&limit=3"
+    )
+    diff = json.loads(body)
+    assert status == 200 and (diff["added"], diff["removed"]) == (15, 10)
+    assert diff["new"] == [
+        {"type": "subdomain", "value": f"h{i}.acme.com"} for i in (30, 31, 32)
+    ]
+    assert len(diff["gone"]) == 3
+    assert http_request(address, "GET", f"{base}/s2/snapshot/diff")[0] == 400
+    assert http_request(address, "GET", f"{base}/s2/snapshot/diff?against=s9")[0] == 404
+
+    status, body = http_request(address, "GET", "/api/v1/projects/acme/snapshots")
+    assert [item["scan_id"] for item in json.loads(body)["snapshots"]] == ["s1", "s2"]
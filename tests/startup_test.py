@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from jorkieserver.startup import StartupProfile, boot_components, resolve_factory
+from jorkieserver.types import Configuration
+
+
+def test_profile_reports_every_phase():
+    profile = StartupProfile()
+    with profile.phase("configuration"):
+        time.sleep(0.01)
+    profile.mark_ready()
+    report = profile.report()
+    assert [name for name, _ in profile.phases] == ["configuration"]
+    assert profile.phases[0][1] >= 0.01
+    assert profile.total >= 0.01
+    assert "configuration" in report and "ready" in report
+
+
+def test_resolve_factory_imports_lazily():
+    assert resolve_factory("collections:OrderedDict").__name__ == "OrderedDict"
+    assert resolve_factory(len) is len
+
+
+def test_components_boot_concurrently(log_writer):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def factory(configuration, log_writer):
+        # Both factories must be running at the same time to pass the barrier.
+        barrier.wait()
+        return configuration.version
+
+    profile = StartupProfile()
+    components = boot_components(
+        Configuration(version="0.1.0"),
+        log_writer,
+        profile,
+        {"db": factory, "scheduler": factory},
+    )
+    assert components.db == "0.1.0"
+    assert components.scheduler == "0.1.0"
+    assert components.api is None
+    assert {name for name, _ in profile.phases} == {
+        "component:db",
+        "component:scheduler",
+    }
+
+
+def test_failing_component_exits(log_writer):
+    def factory(configuration, log_writer):
+        raise RuntimeError("port in use")
+
+    with pytest.raises(SystemExit):
+        boot_components(
+            Configuration(version="0.1.0"),
+            log_writer,
+            StartupProfile(),
+            {"api": factory},
+        )
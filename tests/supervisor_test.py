@@ -0,0 +1,214 @@
+import json
+import os
+import signal
+import threading
+import time
+
+import pytest
+from conftest import http_request
+
+from jorkieserver.ingest import IngestService
+from jorkieserver.snapshot import SnapshotService
+from jorkieserver.supervisor import Supervisor, worker_log_file
+from jorkieserver.types import CommandOptions
+
+SERVICES = (
+    "jorkieserver.scope:register_routes",
+    "jorkieserver.ingest:register_routes",
+    "jorkieserver.query:register_routes",
+    "jorkieserver.snapshot:register_routes",
+    "jorkieserver.profiler:register_routes",
+)
+
+
+@pytest.fixture
+def services(tmp_path):
+    options = CommandOptions(2, str(tmp_path / "server.log"), "", workers=2)
+
+    def supervisor(components, configuration, log_writer):
+        return Supervisor(components, configuration, options, log_writer)
+
+    return SERVICES + (supervisor,)
+
+
+@pytest.fixture
+def supervisor(components):
+    return components.service(Supervisor)
+
+
+def request(
+    port: int,
+    method: str,
+    path: str,
+    body: bytes = b"",
+    source: str = "127.0.0.1",
+    headers: str = "",
+) -> tuple[int, bytes]:
+    return http_request(
+        ("127.0.0.1", port), method, f"/api/v1{path}", body, headers, source
+    )
+
+
+def get(port: int, path: str) -> dict:
+    status, body = request(port, "GET", path)
+    assert status == 200, body
+    return json.loads(body)
+
+
+def ingest(port: int, project: str, records: list[dict]) -> dict:
+    body = "".join(json.dumps(record) + "\n" for record in records).encode()
+    status, report = request(port, "POST", f"/projects/{project}/results", body)
+    assert status == 200
+    return json.loads(report)
+
+
+def wait_for(condition, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = condition()
+        if result:
+            return result
+        time.sleep(0.05)
+    raise AssertionError("Timed out")
+
+
+def test_worker_log_file():
+    assert worker_log_file("/logs/server.log", 1) == "/logs/server.worker-1.log"
+    assert worker_log_file("server", 0) == "server.worker-0"
+
+
+def test_workers_share_the_port_and_the_supervisor_state(supervisor):
+    port = supervisor.port
+    workers = get(port, "/workers")["workers"]
+    assert len(workers) == 2 and all(worker["ready"] for worker in workers)
+    assert {worker["pid"] for worker in workers}.isdisjoint({os.getpid()})
+
+    # Scope rules go through the supervisor, which tells every worker to recompile them.
+    status, _ = request(
+        port, "POST", "/projects/acme/scope", b'{"include": ["*.acme.com"]}'
+    )
+    assert status == 204
+    for _ in range(4):
+        report = ingest(
+            port,
+            "acme",
+            [
+                {"type": "subdomain", "value": "www.acme.com", "scan_id": "s1"},
+                {"type": "subdomain", "value": "www.other.com", "scan_id": "s1"},
+            ],
+        )
+        assert (report["accepted"], report["out_of_scope"]) == (1, 1)
+
+    # Summaries cached by any worker are dropped once another worker ingests.
+    assert all(get(port, "/projects/acme/summary")["results"] == 4 for _ in range(6))
+    ingest(
+        port, "acme", [{"type": "subdomain", "value": "api.acme.com", "scan_id": "s2"}]
+    )
+    assert all(get(port, "/projects/acme/summary")["results"] == 5 for _ in range(6))
+    assert get(port, "/projects/acme/scans/s1/results")["items"][0]["value"] == (
+        "www.acme.com"
+    )
+    assert request(port, "GET", "/nowhere")[0] == 404
+
+
+def test_local_routes_are_not_opened_by_the_proxy(supervisor):
+    port = supervisor.port
+    # Every request forwarded by a worker reaches the supervisor from a local address.
+    for _ in range(4):
+        assert request(port, "GET", "/admin/profile")[0] == 200
+        assert request(port, "GET", "/admin/profile", source="127.0.0.2")[0] == 403
+        status, _ = request(
+            port,
+            "POST",
+            "/admin/profile",
+            source="127.0.0.2",
+            headers="X-Forwarded-For: 127.0.0.1\r\n",
+        )
+        assert status == 403
+    assert request(port, "GET", "/workers", source="127.0.0.2")[0] == 200
+
+
+def test_scans_compacted_by_workers_are_reported_to_the_supervisor(
+    components, supervisor
+):
+    compacted = []
+    components.service(SnapshotService).subscribe(
+        lambda project, scan_id: compacted.append((project, scan_id))
+    )
+    ingest(
+        supervisor.port,
+        "acme",
+        [{"type": "subdomain", "value": "www.acme.com", "scan_id": "s1"}],
+    )
+    status, _ = request(supervisor.port, "POST", "/projects/acme/scans/s1/snapshot")
+    assert status == 201
+    assert wait_for(lambda: compacted) == [("acme", "s1")]
+
+
+def test_crashed_workers_are_respawned_and_restarts_keep_serving(supervisor):
+    port = supervisor.port
+    crashed = supervisor.workers()[0].process.pid
+    os.kill(crashed, signal.SIGKILL)
+    # Connections queued on the killed worker are reset, the others are not disturbed.
+    wait_for(
+        lambda: [
+            worker
+            for worker in supervisor.workers()
+            if worker.ready.is_set() and worker.process.pid != crashed
+        ][1:]
+    )
+    workers = get(port, "/workers")
+    assert crashed not in {worker["pid"] for worker in workers["workers"]}
+    assert workers["respawns"] == supervisor.respawns == 1
+
+    failures = []
+    stop = threading.Event()
+
+    def load() -> None:
+        while not stop.is_set():
+            try:
+                status, _ = request(port, "GET", "/health")
+                if status != 200:
+                    failures.append(status)
+            except OSError as e:
+                failures.append(e)
+
+    before = {worker.process.pid for worker in supervisor.workers()}
+    thread = threading.Thread(target=load)
+    thread.start()
+    try:
+        status, _ = request(port, "POST", "/workers/restart")
+        assert status == 202
+        wait_for(
+            lambda: before.isdisjoint(
+                worker.process.pid for worker in supervisor.workers()
+            )
+            and all(worker.ready.is_set() for worker in supervisor.workers())
+        )
+    finally:
+        stop.set()
+        thread.join()
+    assert failures == []
+    assert supervisor.respawns == 1
+
+
+def test_workers_ignoring_stop_are_killed(components, monkeypatch, tmp_path):
+    monkeypatch.setattr("jorkieserver.supervisor.SUPERVISOR_STOP_TIMEOUT", 0.5)
+    supervisor = components.service(Supervisor)
+    hung = supervisor.workers()[0].process
+    os.kill(hung.pid, signal.SIGSTOP)
+    wait_for(lambda: open(f"/proc/{hung.pid}/stat").read().split(") ")[1][0] == "T")
+
+    # The batch is written once the other worker dropped its cached queries, without waiting
+    # for the hung one longer than `SUPERVISOR_INVALIDATE_TIMEOUT`.
+    rows = [("acme", "s1", "subdomain", "www.acme.com", None, time.time())]
+    assert components.service(IngestService).submit(rows).result(timeout=10) == 1
+
+    started = time.monotonic()
+    supervisor.stop()
+    assert time.monotonic() - started < 5
+    assert hung.exitcode == -signal.SIGKILL
+    assert not any(worker.process.is_alive() for worker in supervisor.workers())
+    log = (tmp_path / "jorkie.log").read_text()
+    assert "did not drop their cached queries in time" in log
+    assert "API worker 0 did not stop in time, killing it" in log
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from jorkieserver.configurator import Configurator
+from jorkieserver.watcher import ConfigReloader, ConfigWatcher, InotifyWatch
+
+CONFIG = 'version: "0.1.0"\nlogging:\n  level: {level}\n  rotation:\n    retention: {retention}\n'
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(CONFIG.format(level=2, retention=3))
+    yield config_file
+
+
+def make_reloader(log_writer, config_file) -> ConfigReloader:
+    configurator = Configurator(log_writer, str(config_file))
+    configuration = configurator.get_configuration(str(config_file))
+    return ConfigReloader(configurator, str(config_file), log_writer, configuration)
+
+
+def test_reload_pushes_only_changed_fields(log_writer, config_file):
+    reloader = make_reloader(log_writer, config_file)
+    calls = []
+    reloader.subscribe(lambda configuration, changed: calls.append(("all", changed)))
+    reloader.subscribe(
+        lambda configuration, changed: calls.append(("level", changed)),
+        frozenset({"log_level"}),
+    )
+
+    config_file.write_text(CONFIG.format(level=2, retention=5))
+    assert reloader.reload() == {"log_retention"}
+    assert calls == [("all", {"log_retention"})]
+    assert reloader.current.log_retention == 5
+
+    # Unchanged file, nothing to publish.
+    assert reloader.reload() == set()
+
+
+def test_invalid_reload_keeps_current_configuration(log_writer, config_file):
+    reloader = make_reloader(log_writer, config_file)
+    current = reloader.current
+    config_file.write_text("logging: [")
+    assert reloader.reload() == set()
+    assert reloader.current is current
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_watcher_detects_changes(log_writer, config_file, monkeypatch, inotify):
+    if not inotify:
+
+        def unavailable(self, directory):
+            raise OSError("unavailable")
+
+        monkeypatch.setattr(InotifyWatch, "__init__", unavailable)
+
+    reloader = make_reloader(log_writer, config_file)
+    reloaded = threading.Event()
+    reloader.subscribe(lambda configuration, changed: reloaded.set())
+    watcher = ConfigWatcher(
+        str(config_file), reloader.reload, log_writer, poll_interval=0.01
+    )
+    watcher.start()
+    try:
+        while watcher.mode is None:
+            pass
+        config_file.write_text(CONFIG.format(level=0, retention=3))
+        assert reloaded.wait(timeout=5)
+        assert reloader.current.log_level == 0
+    finally:
+        watcher.stop()
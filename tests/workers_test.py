@@ -0,0 +1,151 @@
+import asyncio
+import stat
+import sys
+import threading
+
+import pytest
+
+from jorkieserver.dispatch import DispatchComponent, Job
+from jorkieserver.output import OutputBuffer
+from jorkieserver.types import Configuration
+from jorkieserver.workers import WorkerError, WorkerPool
+
+STAND_IN = """
+import json, sys
+if sys.argv[1:] == ["--worker"]:
+    for line in sys.stdin:
+        task = json.loads(line)
+        if task.get("target") == "crash":
+            sys.exit(1)
+        answer = {"id": task["id"]}
+        if task["op"] == "run":
+            print("scanning", task["target"], file=sys.stderr, flush=True)
+            answer["returncode"] = 0 if task["project"] == "acme" else 2
+        print(json.dumps(answer), flush=True)
+"""
+
+
+@pytest.fixture
+def agents_dir(tmp_path):
+    agents_dir = tmp_path / "agents"
+    agents_dir.mkdir()
+    agent = agents_dir / "probe"
+    agent.write_text(f"#!{sys.executable}\n{STAND_IN}")
+    agent.chmod(agent.stat().st_mode | stat.S_IEXEC)
+    yield agents_dir
+
+
+def make_pool(log_writer, agents_dir, **options) -> WorkerPool:
+    settings = {"warm": 2, "idle_timeout": 60, "max_tasks": 100, "health_interval": 60}
+    settings.update(options)
+    return WorkerPool(
+        lambda agent: [str(agents_dir / agent), "--worker"], log_writer, **settings
+    )
+
+
+def test_reuses_warm_workers(log_writer, agents_dir):
+    async def run():
+        pool = make_pool(log_writer, agents_dir)
+        await pool.warm_up("probe")
+        assert pool.idle("probe") == 2
+        codes = [await pool.run(Job(p, "probe")) for p in ["acme", "other"] * 10]
+        await pool.close()
+        return pool, codes
+
+    pool, codes = asyncio.run(run())
+    assert codes == [0, 2] * 10
+    assert pool.spawned == 2
+
+
+def test_recycles_workers_after_max_tasks(log_writer, agents_dir):
+    async def run():
+        pool = make_pool(log_writer, agents_dir, warm=0, max_tasks=3)
+        for _ in range(7):
+            await pool.run(Job("acme", "probe"))
+        await pool.close()
+        return pool
+
+    assert asyncio.run(run()).spawned == 3
+
+
+def test_evicts_idle_and_unhealthy_workers(log_writer, agents_dir):
+    async def run():
+        pool = make_pool(log_writer, agents_dir, warm=3)
+        await pool.warm_up("probe")
+        await pool.run(Job("acme", "probe"))
+        # Kill one of the idle workers behind the pool's back.
+        worker = pool._WorkerPool__idle["probe"][0]
+        worker.process.kill()
+        await worker.process.wait()
+        await pool.check()
+        assert pool.idle("probe") == 2
+        pool.idle_timeout = 0
+        await pool.check()
+        assert pool.idle("probe") == 0
+        await pool.close()
+
+    asyncio.run(run())
+
+
+def test_task_output_is_read_from_worker_stderr(log_writer, agents_dir):
+    async def run():
+        pool = make_pool(log_writer, agents_dir, warm=1)
+        await pool.warm_up("probe")
+        outputs = []
+        for target in ["a.example.com", None, "b.example.com"]:
+            job = Job("acme", "probe", target)
+            # The task of the second job writes to stderr, unread between tasks.
+            if target is not None:
+                job.output = OutputBuffer(1024)
+            await pool.run(job)
+            if target is not None:
+                await job.output.close()
+                outputs.append([chunk async for _, chunk in job.output.subscribe()])
+        await pool.close()
+        return pool, outputs
+
+    pool, outputs = asyncio.run(run())
+    assert outputs == [[b"scanning a.example.com\n"], [b"scanning b.example.com\n"]]
+    assert pool.spawned == 1
+
+
+def test_worker_crash_fails_only_its_job(log_writer, agents_dir):
+    async def run():
+        pool = make_pool(log_writer, agents_dir, warm=0)
+        with pytest.raises(WorkerError):
+            await pool.run(Job("acme", "probe", "crash"))
+        code = await pool.run(Job("acme", "probe"))
+        await pool.close()
+        return code
+
+    assert asyncio.run(run()) == 0
+
+
+def test_component_runs_jobs_on_workers(log_writer, agents_dir, tmp_path):
+    component = DispatchComponent(
+        Configuration(
+            dispatch_agents_dir=str(agents_dir),
+            workers_enabled=True,
+            workers_warm=1,
+            output_dir=str(tmp_path / "output"),
+        ),
+        log_writer,
+    )
+    finished = []
+    done = threading.Event()
+
+    def on_finished(job):
+        finished.append(job)
+        if len(finished) == 5:
+            done.set()
+
+    component.dispatcher.subscribe(on_finished)
+    component.start()
+    try:
+        for _ in range(5):
+            component.submit("other", "probe", "a.example.com")
+        assert done.wait(10)
+        assert [job.returncode for job in finished] == [2] * 5
+        assert component.workers.spawned <= 1 + component.dispatcher.max_concurrency
+    finally:
+        component.stop()